@@ -1,12 +1,16 @@
 import pandas as pd
 import os
 import re
+import sys
 import logging
 from datetime import datetime
 from typing import Dict, List, Tuple, Optional
 from pathlib import Path
 import unicodedata
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'services', 'api')))
+from utils import limpieza  # noqa: E402  (limpieza vectorizada compartida con setup/importar.py)
+
 # =============================================================================
 # CONFIGURACIÓN DE LOGGING
 # =============================================================================
@@ -34,11 +38,6 @@ class Config:
     DOMINIO_DOCENTE = 'conservatoriobolivar.edu.ec'
     PASSWORD_DEFAULT = 'Cb2025$'
     
-    # Patrones de validación
-    PATRON_EMAIL = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    PATRON_CEDULA_EC = r'^\d{10}$'  # Cédulas ecuatorianas tienen 10 dígitos
-    PATRON_CELULAR_EC = r'^09\d{8}$'  # Formato: 09XXXXXXXX
-    
     # Hojas a omitir
     HOJAS_OMITIR = ['total', 'resumen', 'consolidado']
     
@@ -88,7 +87,10 @@ class Config:
 # CLASES AUXILIARES PARA LIMPIEZA Y VALIDACIÓN
 # =============================================================================
 class DataCleaner:
-    """Clase para operaciones de limpieza de datos"""
+    """
+    Normalización de nombres de columna. La limpieza y validación de los
+    valores se hace por columnas completas con utils/limpieza.py.
+    """
     
     @staticmethod
     def normalizar_nombre_columna(nombre: str) -> str:
@@ -104,120 +106,6 @@ class DataCleaner:
         nombre = re.sub(r'[^\w\s]', '', nombre)
         nombre = re.sub(r'\s+', '_', nombre)
         return nombre.strip('_')
-    
-    @staticmethod
-    def normalizar_texto(texto: str, titulo: bool = False) -> str:
-        """Normaliza texto general con opción de formato título"""
-        if pd.isna(texto) or texto == '':
-            return ''
-        
-        texto = str(texto).strip()
-        texto = re.sub(r'\s+', ' ', texto)
-        
-        if titulo:
-            # Formato: Primera Letra Mayúscula
-            texto = texto.title()
-        
-        return texto
-    
-    @staticmethod
-    def limpiar_email(email: str) -> str:
-        """Limpia y normaliza emails"""
-        if pd.isna(email):
-            return ''
-        
-        email = str(email).lower().strip()
-        # Remover espacios
-        email = re.sub(r'\s+', '', email)
-        return email
-    
-    @staticmethod
-    def limpiar_cedula(cedula: str) -> str:
-        """Limpia y normaliza cédulas"""
-        if pd.isna(cedula):
-            return ''
-        
-        # Extraer solo dígitos
-        cedula = re.sub(r'\D', '', str(cedula))
-        return cedula
-    
-    @staticmethod
-    def limpiar_celular(celular: str) -> str:
-        """Limpia y normaliza números de celular"""
-        if pd.isna(celular):
-            return ''
-        
-        # Extraer solo dígitos
-        celular = re.sub(r'\D', '', str(celular))
-        
-        # Si tiene 9 dígitos, agregar 0 al inicio
-        if len(celular) == 9 and celular[0] == '9':
-            celular = '0' + celular
-        
-        return celular
-    
-    @staticmethod
-    def generar_username_desde_nombre(nombre_completo: str, dominio: str = None) -> str:
-        """Genera username/email desde nombre completo"""
-        if pd.isna(nombre_completo) or nombre_completo == '':
-            return ''
-        
-        # Normalizar y limpiar
-        username = nombre_completo.lower().strip()
-        # Remover acentos
-        username = unicodedata.normalize('NFKD', username)
-        username = username.encode('ASCII', 'ignore').decode('utf-8')
-        # Solo letras y espacios
-        username = re.sub(r'[^a-z\s]', '', username)
-        # Reemplazar espacios con puntos
-        username = re.sub(r'\s+', '.', username).strip('.')
-        
-        if dominio:
-            return f"{username}@{dominio}"
-        return username
-
-
-class DataValidator:
-    """Clase para validaciones de datos"""
-    
-    @staticmethod
-    def validar_email(email: str) -> bool:
-        """Valida formato de email"""
-        if pd.isna(email) or email == '':
-            return False
-        return bool(re.match(Config.PATRON_EMAIL, str(email)))
-    
-    @staticmethod
-    def validar_cedula_ecuatoriana(cedula: str) -> bool:
-        """Valida cédula ecuatoriana (10 dígitos + dígito verificador)"""
-        if pd.isna(cedula) or cedula == '':
-            return False
-        
-        cedula = str(cedula).strip()
-        
-        if not re.match(Config.PATRON_CEDULA_EC, cedula):
-            return False
-        
-        # Validación del dígito verificador
-        try:
-            coeficientes = [2, 1, 2, 1, 2, 1, 2, 1, 2]
-            suma = 0
-            
-            for i in range(9):
-                valor = int(cedula[i]) * coeficientes[i]
-                suma += valor if valor < 10 else valor - 9
-            
-            digito_verificador = (10 - (suma % 10)) % 10
-            return digito_verificador == int(cedula[9])
-        except:
-            return False
-    
-    @staticmethod
-    def validar_celular_ecuatoriano(celular: str) -> bool:
-        """Valida número de celular ecuatoriano"""
-        if pd.isna(celular) or celular == '':
-            return False
-        return bool(re.match(Config.PATRON_CELULAR_EC, str(celular)))
 
 
 class DataQualityReport:
@@ -256,7 +144,6 @@ class ProcesadorEstudiantes:
     
     def __init__(self):
         self.cleaner = DataCleaner()
-        self.validator = DataValidator()
         self.quality_report = DataQualityReport()
     
     def procesar(self, archivo_nombre: str, ruta_archivo: str, sheet_name: str) -> Optional[pd.DataFrame]:
@@ -292,25 +179,25 @@ class ProcesadorEstudiantes:
             
             # Email
             if 'email_estudiante' in df.columns:
-                df['email'] = df['email_estudiante'].apply(self.cleaner.limpiar_email)
+                df['email'] = limpieza.email(df['email_estudiante'])
                 # Validar emails
-                emails_invalidos = df[~df['email'].apply(self.validator.validar_email) & (df['email'] != '')]
-                if len(emails_invalidos) > 0:
-                    self.quality_report.add_issue('Email Inválido', 'Estudiantes con email mal formado', len(emails_invalidos))
-                    logger.warning(f"Se encontraron {len(emails_invalidos)} emails inválidos")
+                emails_validos = limpieza.email_valido(df['email'])
+                emails_invalidos = int(limpieza.invalidos(df['email'], emails_validos).sum())
+                if emails_invalidos > 0:
+                    self.quality_report.add_issue('Email Inválido', 'Estudiantes con email mal formado', emails_invalidos)
+                    logger.warning(f"Se encontraron {emails_invalidos} emails inválidos")
                 
                 # Filtrar registros sin email válido
-                df = df[df['email'].apply(self.validator.validar_email)]
+                df = df[emails_validos]
             else:
                 logger.error(f"Columna 'email_estudiante' no encontrada en {sheet_name}")
                 return None
             
             # Nombres completos
             if 'apellidos' in df.columns and 'nombres' in df.columns:
-                df['apellidos'] = df['apellidos'].apply(lambda x: self.cleaner.normalizar_texto(x, titulo=True))
-                df['nombres'] = df['nombres'].apply(lambda x: self.cleaner.normalizar_texto(x, titulo=True))
-                df['full_name'] = df['apellidos'] + ' ' + df['nombres']
-                df['full_name'] = df['full_name'].apply(lambda x: self.cleaner.normalizar_texto(x, titulo=True))
+                df['apellidos'] = limpieza.texto(df['apellidos'], titulo=True)
+                df['nombres'] = limpieza.texto(df['nombres'], titulo=True)
+                df['full_name'] = limpieza.texto(df['apellidos'] + ' ' + df['nombres'], titulo=True)
             else:
                 logger.error(f"Columnas 'apellidos' o 'nombres' no encontradas en {sheet_name}")
                 return None
@@ -320,11 +207,11 @@ class ProcesadorEstudiantes:
             
             # Cédula
             if 'cedula' in df.columns:
-                df['cedula'] = df['cedula'].apply(self.cleaner.limpiar_cedula)
-                cedulas_invalidas = df[~df['cedula'].apply(self.validator.validar_cedula_ecuatoriana) & (df['cedula'] != '')]
-                if len(cedulas_invalidas) > 0:
-                    self.quality_report.add_issue('Cédula Inválida', 'Estudiantes con cédula mal formada', len(cedulas_invalidas))
-                    logger.warning(f"Se encontraron {len(cedulas_invalidas)} cédulas inválidas")
+                df['cedula'] = limpieza.cedula(df['cedula'])
+                cedulas_invalidas = int(limpieza.invalidos(df['cedula'], limpieza.cedula_valida(df['cedula'])).sum())
+                if cedulas_invalidas > 0:
+                    self.quality_report.add_issue('Cédula Inválida', 'Estudiantes con cédula mal formada', cedulas_invalidas)
+                    logger.warning(f"Se encontraron {cedulas_invalidas} cédulas inválidas")
             
             # Grado
             if 'grado' not in df.columns:
@@ -342,31 +229,31 @@ class ProcesadorEstudiantes:
             
             # Nombres representante
             if 'rep_nombres' in df.columns:
-                df['rep_nombres'] = df['rep_nombres'].apply(lambda x: self.cleaner.normalizar_texto(x, titulo=True))
+                df['rep_nombres'] = limpieza.texto(df['rep_nombres'], titulo=True)
             
             if 'rep_apellidos' in df.columns:
-                df['rep_apellidos'] = df['rep_apellidos'].apply(lambda x: self.cleaner.normalizar_texto(x, titulo=True))
+                df['rep_apellidos'] = limpieza.texto(df['rep_apellidos'], titulo=True)
             
             # Email representante 
             if 'rep_email' in df.columns:
-                df['rep_email'] = df['rep_email'].apply(self.cleaner.limpiar_email)
-                rep_emails_invalidos = df[~df['rep_email'].apply(self.validator.validar_email) & (df['rep_email'] != '')]
-                if len(rep_emails_invalidos) > 0:
-                    self.quality_report.add_issue('Email Rep. Inválido', 'Representantes con email mal formado', len(rep_emails_invalidos))
+                df['rep_email'] = limpieza.email(df['rep_email'])
+                rep_emails_invalidos = int(limpieza.invalidos(df['rep_email'], limpieza.email_valido(df['rep_email'])).sum())
+                if rep_emails_invalidos > 0:
+                    self.quality_report.add_issue('Email Rep. Inválido', 'Representantes con email mal formado', rep_emails_invalidos)
             
             # Cédula representante
             if 'rep_cedula' in df.columns:
-                df['rep_cedula'] = df['rep_cedula'].apply(self.cleaner.limpiar_cedula)
-                rep_cedulas_invalidas = df[~df['rep_cedula'].apply(self.validator.validar_cedula_ecuatoriana) & (df['rep_cedula'] != '')]
-                if len(rep_cedulas_invalidas) > 0:
-                    self.quality_report.add_issue('Cédula Rep. Inválida', 'Representantes con cédula mal formada', len(rep_cedulas_invalidas))
+                df['rep_cedula'] = limpieza.cedula(df['rep_cedula'])
+                rep_cedulas_invalidas = int(limpieza.invalidos(df['rep_cedula'], limpieza.cedula_valida(df['rep_cedula'])).sum())
+                if rep_cedulas_invalidas > 0:
+                    self.quality_report.add_issue('Cédula Rep. Inválida', 'Representantes con cédula mal formada', rep_cedulas_invalidas)
             
             # Celular representante
             if 'rep_celular' in df.columns:
-                df['rep_celular'] = df['rep_celular'].apply(self.cleaner.limpiar_celular)
-                rep_celulares_invalidos = df[~df['rep_celular'].apply(self.validator.validar_celular_ecuatoriano) & (df['rep_celular'] != '')]
-                if len(rep_celulares_invalidos) > 0:
-                    self.quality_report.add_issue('Celular Rep. Inválido', 'Representantes con celular mal formado', len(rep_celulares_invalidos))
+                df['rep_celular'] = limpieza.celular(df['rep_celular'])
+                rep_celulares_invalidos = int(limpieza.invalidos(df['rep_celular'], limpieza.celular_valido(df['rep_celular'])).sum())
+                if rep_celulares_invalidos > 0:
+                    self.quality_report.add_issue('Celular Rep. Inválido', 'Representantes con celular mal formado', rep_celulares_invalidos)
             
             # Metadatos
             df['rol'] = 'ESTUDIANTE'
@@ -429,18 +316,14 @@ class ProcesadorDocentes:
             df_docentes = pd.DataFrame({'full_name_raw': nombres_docentes})
             
             # Limpiar nombres
-            df_docentes['full_name'] = df_docentes['full_name_raw'].apply(
-                lambda x: self.cleaner.normalizar_texto(x, titulo=True)
-            )
+            df_docentes['full_name'] = limpieza.texto(df_docentes['full_name_raw'], titulo=True)
             
             # Eliminar valores vacíos
             df_docentes = df_docentes[df_docentes['full_name'].str.strip() != '']
             df_docentes = df_docentes[df_docentes['full_name'] != 'Nan']
             
             # Generar emails
-            df_docentes['email'] = df_docentes['full_name'].apply(
-                lambda x: self.cleaner.generar_username_desde_nombre(x, Config.DOMINIO_DOCENTE)
-            )
+            df_docentes['email'] = limpieza.username(df_docentes['full_name'], Config.DOMINIO_DOCENTE)
             
             # Eliminar duplicados
             df_docentes = df_docentes.drop_duplicates(subset=['email'], keep='first')
@@ -485,10 +368,9 @@ class ProcesadorAsignaciones:
             
             # Generar nombre completo del estudiante (necesario para la unión)
             if 'apellidos' in df.columns and 'nombres' in df.columns:
-                df['apellidos'] = df['apellidos'].apply(lambda x: self.cleaner.normalizar_texto(x, titulo=True))
-                df['nombres'] = df['nombres'].apply(lambda x: self.cleaner.normalizar_texto(x, titulo=True))
-                df['full_name'] = df['apellidos'] + ' ' + df['nombres']
-                df['full_name'] = df['full_name'].apply(lambda x: self.cleaner.normalizar_texto(x, titulo=True))
+                df['apellidos'] = limpieza.texto(df['apellidos'], titulo=True)
+                df['nombres'] = limpieza.texto(df['nombres'], titulo=True)
+                df['full_name'] = limpieza.texto(df['apellidos'] + ' ' + df['nombres'], titulo=True)
             else:
                 logger.warning(f"Faltan columnas de nombre para generar full_name en asignaciones de {sheet_name}")
                 return None
@@ -513,20 +395,14 @@ class ProcesadorAsignaciones:
                     df['teacher_name_final'] = df['teacher_name_final'].fillna(df[col])
 
             # Renombrar la columna consolidada y limpiarla
-            df['teacher_name'] = df['teacher_name_final'].apply(
-                lambda x: self.cleaner.normalizar_texto(x, titulo=True)
-            )
+            df['teacher_name'] = limpieza.texto(df['teacher_name_final'], titulo=True)
             
             # Limpieza y normalización de especialización
             if 'specialization_instrument' in df.columns:
-                df['specialization_instrument'] = df['specialization_instrument'].apply(
-                    lambda x: self.cleaner.normalizar_texto(x, titulo=True)
-                )
+                df['specialization_instrument'] = limpieza.texto(df['specialization_instrument'], titulo=True)
             
             if 'specialization_group' in df.columns:
-                df['specialization_group'] = df['specialization_group'].apply(
-                    lambda x: self.cleaner.normalizar_texto(x, titulo=True)
-                )
+                df['specialization_group'] = limpieza.texto(df['specialization_group'], titulo=True)
             
             # Grado y paralelo
             if 'grado' in df.columns:
@@ -571,7 +447,6 @@ class ConsolidadorDatos:
         self.ruta_salida = Path(ruta_salida)
         self.ruta_salida.mkdir(exist_ok=True)
         self.cleaner = DataCleaner()
-        self.validator = DataValidator()
         
     def consolidar_y_exportar(self, 
                                datos_estudiantes: List[pd.DataFrame],
@@ -7,6 +7,10 @@ from typing import Optional, List, Dict, Tuple
 from pathlib import Path
 import unicodedata
 
+import numpy as np
+
+from libro_excel import abrir_libro
+
 # =============================================================================
 # CONFIGURACIÓN Y LOGGING
 # =============================================================================
@@ -50,7 +54,7 @@ class ProcesadorHorarios:
         self.start_row = start_row # Fila donde inician los números de clase (1, 2, 3...)
         self.columnas_horario = ['No', 'HORA'] + self.DIAS
     
-    def _extraer_metadatos(self, df_raw: pd.DataFrame) -> Dict[str, str]:
+    def _extraer_metadatos(self, grilla: np.ndarray) -> Dict[str, str]:
         """Extrae el Curso, Paralelo y Docente Tutor del encabezado."""
         metadatos = {
             'curso': 'ND',
@@ -62,7 +66,7 @@ class ProcesadorHorarios:
         # Buscar "PRIMERO A" en la segunda fila del Excel (índice 1 en pandas)
         # Asumimos que es la celda fusionada grande del título
         try:
-            titulo = self.cleaner.normalizar_texto(df_raw.iloc[0, 3], titulo=False) # Suponemos celda fusionada en 0,3
+            titulo = self.cleaner.normalizar_texto(grilla[0, 3], titulo=False) # Suponemos celda fusionada en 0,3
             match = re.search(r'([A-Z]+)\s+([A-Z])$', titulo)
             if match:
                 metadatos['curso'] = self.cleaner.normalizar_texto(match.group(1), titulo=True)
@@ -79,7 +83,7 @@ class ProcesadorHorarios:
         # 2. Extraer DOCENTE TUTOR (Fila 1)
         # Buscar 'Lic.' en la segunda fila, debajo de CURSO/PARALELO
         try:
-            tutor_raw = self.cleaner.normalizar_texto(df_raw.iloc[1, 3], titulo=False) # Suponemos celda debajo del título
+            tutor_raw = self.cleaner.normalizar_texto(grilla[1, 3], titulo=False) # Suponemos celda debajo del título
             
             # Limpieza para quedarnos solo con el nombre
             tutor_nombre = re.sub(r'^(Lic\.?|Tg\.?)\s*', '', tutor_raw, flags=re.IGNORECASE)
@@ -193,24 +197,26 @@ class ProcesadorHorarios:
         logger.info(f"\nProcesando horario: {ruta_archivo} - Hoja '{sheet_name}'")
         
         try:
-            # Leer el archivo sin encabezados para preservar la estructura de la tabla
-            df_raw = pd.read_excel(ruta_archivo, sheet_name=sheet_name, header=None, engine='openpyxl')
+            # Grilla cruda de la hoja (sin encabezados); el libro se parsea una sola vez para todas las hojas
+            grilla = abrir_libro(ruta_archivo).grilla(sheet_name)
             
             # 1. Extraer metadatos del Curso/Tutor
-            metadatos = self._extraer_metadatos(df_raw)
+            metadatos = self._extraer_metadatos(grilla)
             
             # 2. Identificar el área de la tabla de horario
             # Asumimos que la fila de encabezados de DÍAS (LUNES, MARTES...) está en self.start_row
             
             # Obtener los nombres de las columnas de la tabla de horarios
             # La tabla real empieza en la fila 3 (índice 2) según la imagen, pero ajustamos dinámicamente.
-            df_clases = df_raw.iloc[self.start_row:].copy()
+            clases = grilla[self.start_row:]
             
-            # 3. Asignar nombres de columnas
+            # 3. Ubicar columnas
             # Asumimos que las 7 primeras columnas son ['No', 'HORA', 'LUNES', ..., 'VIERNES']
-            if df_clases.shape[1] >= len(self.columnas_horario):
-                df_clases = df_clases.iloc[:, :len(self.columnas_horario)]
-                df_clases.columns = self.columnas_horario
+            if clases.shape[1] >= len(self.columnas_horario):
+                clases = clases[:, :len(self.columnas_horario)]
+                col_hora = self.columnas_horario.index('HORA')
+                # Saltar filas sin hora (filtro sobre toda la columna)
+                clases = clases[pd.notna(clases[:, col_hora])]
             else:
                 logger.error("❌ El DataFrame de clases no tiene suficientes columnas para los días y horas.")
                 return None
@@ -218,14 +224,11 @@ class ProcesadorHorarios:
             # 4. Descomponer las celdas y aplanar el DataFrame
             registros = []
             
-            for index, row in df_clases.iterrows():
-                hora_rango = row['HORA']
-                if pd.isna(hora_rango): continue # Saltar filas sin hora
-
-                hora_inicio, hora_fin = self._descomponer_horas(hora_rango)
+            for fila in clases:
+                hora_inicio, hora_fin = self._descomponer_horas(fila[col_hora])
                 
                 for dia in self.DIAS:
-                    contenido_celda = row[dia]
+                    contenido_celda = fila[self.columnas_horario.index(dia)]
                     
                     if pd.isna(contenido_celda) or contenido_celda.strip() == '':
                         continue
@@ -297,8 +300,8 @@ def main_horarios():
     # === 2. PROCESAR HOJAS ===
     logger.info(f"\n📄 Procesando archivo: {archivo_seleccionado.name}")
     try:
-        xls = pd.ExcelFile(archivo_seleccionado, engine='openpyxl')
-        for sheet_name in xls.sheet_names:
+        libro = abrir_libro(archivo_seleccionado)
+        for sheet_name in libro.hojas:
             df_temp = proc.procesar(str(archivo_seleccionado), sheet_name)
             if df_temp is not None:
                 datos_horarios.append(df_temp)
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: lectura con pandas (ExcelFile + read_excel por hoja, recorrido de
+celdas con iloc) frente a LibroExcel (un solo parseo read_only + búsqueda
+vectorizada), sobre los libros 2025-2026 de data/.
+
+Uso:
+    python benchmark_libro_excel.py [libro.xlsx ...] [--repeticiones N]
+
+Además de los tiempos, verifica que ambas lecturas den los mismos valores y
+los mismos anclajes TUTOR.
+"""
+import argparse
+import re
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from libro_excel import LibroExcel, contiene, coordenadas
+
+RAIZ_DATOS = Path(__file__).resolve().parents[2]
+KEY_TUTOR = ['TUTOR', 'DOCENTE TUTOR', 'TUTOR/A']
+
+
+def limpiar_texto(texto) -> str:
+    if pd.isna(texto): return ""
+    return re.sub(r'\s+', ' ', str(texto).replace('\n', ' ').replace(',', ' ')).strip()
+
+
+def libros_por_defecto():
+    return sorted(p for p in RAIZ_DATOS.rglob('*.xlsx') if re.search(r'(25-26|2025-2026)', p.name) and not p.name.startswith('~$'))
+
+
+def cronometrar(funcion, repeticiones):
+    mejor = float('inf')
+    resultado = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+
+# --- Enfoque anterior -------------------------------------------------------
+def leer_pandas(ruta):
+    xls = pd.ExcelFile(ruta, engine='openpyxl')
+    return {hoja: pd.read_excel(ruta, sheet_name=hoja, header=None, engine='openpyxl') for hoja in xls.sheet_names}
+
+
+def anclajes_pandas(hojas):
+    coords = {}
+    for hoja, df in hojas.items():
+        coords[hoja] = [
+            (r, c)
+            for r in range(len(df))
+            for c in range(len(df.columns))
+            if any(k in limpiar_texto(df.iloc[r, c]).upper() for k in KEY_TUTOR)
+        ]
+    return coords
+
+
+# --- LibroExcel -------------------------------------------------------------
+def leer_libro(ruta):
+    return LibroExcel(ruta)
+
+
+def anclajes_libro(libro):
+    return {
+        hoja: coordenadas(contiene(libro.texto(hoja, limpiar_texto, mayusculas=True), KEY_TUTOR))
+        for hoja in libro.hojas
+    }
+
+
+def mismos_valores(df, grilla):
+    if df.shape != grilla.shape:
+        return False
+    esperado = df.to_numpy(dtype=object)
+    vacios = pd.isna(esperado)
+    return bool(np.array_equal(vacios, pd.isna(grilla)) and (esperado[~vacios] == grilla[~vacios]).all())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('libros', nargs='*', type=Path)
+    parser.add_argument('--repeticiones', type=int, default=3)
+    args = parser.parse_args()
+
+    libros = args.libros or libros_por_defecto()
+    if not libros:
+        print("❌ No se encontraron libros 2025-2026.")
+        return
+
+    print(f"{'libro':<50} {'celdas':>8} {'lectura pd':>11} {'lectura np':>11} {'anclas pd':>10} {'anclas np':>10} {'total x':>8}  ok")
+    for ruta in libros:
+        t_pd, hojas = cronometrar(lambda: leer_pandas(ruta), args.repeticiones)
+        t_np, libro = cronometrar(lambda: leer_libro(ruta), args.repeticiones)
+        ta_pd, anclas_pd = cronometrar(lambda: anclajes_pandas(hojas), args.repeticiones)
+        # Incluye la limpieza del texto: se descarta la caché de textos en cada repetición
+        ta_np, anclas_np = cronometrar(lambda: (libro._textos.clear(), anclajes_libro(libro))[1], args.repeticiones)
+
+        ok = (
+            list(hojas) == libro.hojas
+            and all(mismos_valores(hojas[h], libro.grilla(h)) for h in libro.hojas)
+            and anclas_pd == anclas_np
+        )
+        celdas = sum(df.size for df in hojas.values())
+        mejora = (t_pd + ta_pd) / (t_np + ta_np)
+        print(f"{ruta.name[:50]:<50} {celdas:>8} {t_pd:>10.3f}s {t_np:>10.3f}s {ta_pd:>9.3f}s {ta_np:>9.3f}s {mejora:>7.1f}x  {'✅' if ok else '❌'}")
+
+
+if __name__ == "__main__":
+    main()
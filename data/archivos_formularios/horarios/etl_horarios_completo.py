@@ -7,6 +7,10 @@ from datetime import datetime
 from typing import Optional, Dict, Tuple, List
 from pathlib import Path
 
+import numpy as np
+
+from libro_excel import abrir_libro, contiene, coordenadas, valor_junto_a
+
 # =============================================================================
 # CONFIGURACIÓN Y LOGGING
 # =============================================================================
@@ -44,22 +48,16 @@ def normalizar_nombre(texto: str) -> str:
 # =============================================================================
 class ProcesadorHorario:
     
-    def buscar_dato_por_etiqueta(self, df_area: pd.DataFrame, keywords: list, filas_limite: int = 6) -> str:
-        """Busca una keyword en un área definida y devuelve el valor de la celda adyacente."""
-        df_head = df_area.head(filas_limite)
-        
-        for rowIndex in range(len(df_head)):
-            for colIndex in range(len(df_head.columns)):
-                cellValue = df_head.iloc[rowIndex, colIndex]
-                texto_celda = limpiar_texto(cellValue).upper()
-                
-                if any(k in texto_celda for k in keywords):
-                    for offset in range(1, 5):
-                        if colIndex + offset < len(df_head.columns):
-                            valor = limpiar_texto(df_head.iloc[rowIndex, colIndex + offset])
-                            if valor and valor.upper() not in texto_celda:
-                                return valor
-        return "ND"
+    def buscar_dato_por_etiqueta(self, area: np.ndarray, keywords: list, filas_limite: int = 6) -> str:
+        """Busca una keyword en un área (grilla de texto limpio) y devuelve el valor de la celda adyacente."""
+        area = area[:filas_limite]
+        mayus = np.char.upper(area)
+        valor = valor_junto_a(
+            area, contiene(mayus, keywords),
+            lambda valor, etiqueta: valor and valor.upper() not in etiqueta,
+            etiquetas=mayus,
+        )
+        return valor or "ND"
         
     def normalizar_curso_paralelo(self, curso_raw_value: str, hoja_default: str) -> Tuple[str, str]:
         """Procesa el valor crudo del curso para separar el paralelo."""
@@ -108,36 +106,29 @@ class ProcesadorHorario:
         all_registros = []
         
         try:
-            xls = pd.ExcelFile(archivo, engine='openpyxl')
-            hoja_principal = xls.sheet_names[0] 
-            df_raw = pd.read_excel(archivo, sheet_name=hoja_principal, header=None, engine='openpyxl')
+            libro = abrir_libro(archivo)
+            hoja_principal = libro.hojas[0]
         except Exception as e:
             logger.error(f"❌ Error al leer el archivo {archivo}: {e}")
             return []
 
-        # 1. Escanear DF para encontrar todas las etiquetas clave 'TUTOR' (inicio de bloque)
-        tutor_coords = [] # Almacenará tuplas (fila, columna)
-        
-        for rowIndex in range(len(df_raw)):
-            for colIndex in range(len(df_raw.columns)):
-                cellValue = df_raw.iloc[rowIndex, colIndex]
-                texto_celda = limpiar_texto(cellValue).upper()
-                
-                if any(k in texto_celda for k in Config.KEY_TUTOR):
-                    tutor_coords.append((rowIndex, colIndex))
+        # Texto limpio de toda la hoja (y en mayúsculas), calculado una sola vez
+        textos = libro.texto(hoja_principal, limpiar_texto)
+        mayus = libro.texto(hoja_principal, limpiar_texto, mayusculas=True)
+        n_filas, n_columnas = textos.shape
+
+        # 1. Encontrar todas las etiquetas clave 'TUTOR' (inicio de bloque), ya ordenadas por (fila, columna)
+        tutor_coords = coordenadas(contiene(mayus, Config.KEY_TUTOR))
         
         if not tutor_coords:
             logger.error("❌ No se encontraron anclajes de Tutor en el documento. No se puede definir bloques.")
             return []
 
-        # 2. Ordenar las coordenadas para definir los límites de los bloques
-        tutor_coords.sort(key=lambda x: (x[0], x[1]))
-
-        # 3. Procesar cada bloque encontrado (ventanas)
+        # 2. Procesar cada bloque encontrado (ventanas)
         for i, (start_row, start_col) in enumerate(tutor_coords):
             
-            end_row = len(df_raw)
-            end_col = len(df_raw.columns)
+            end_row = n_filas
+            end_col = n_columnas
             
             # Buscamos el siguiente punto de inicio (vertical o horizontal) para definir los límites
             for j in range(i + 1, len(tutor_coords)):
@@ -152,11 +143,11 @@ class ProcesadorHorario:
 
             logger.info(f"--- Procesando Bloque {i+1} --- (R:{start_row}-{end_row-1}, C:{start_col}-{end_col-1})")
             
-            # 4. EXTRAER METADATOS DEL BLOQUE
-            df_metadata_area = df_raw.iloc[start_row:start_row + 5, start_col:min(end_col, start_col + 10)].copy()
+            # 3. EXTRAER METADATOS DEL BLOQUE
+            area_metadatos = textos[start_row:start_row + 5, start_col:min(end_col, start_col + 10)]
 
-            tutor_raw_value = self.buscar_dato_por_etiqueta(df_metadata_area, Config.KEY_TUTOR)
-            curso_raw_value = self.buscar_dato_por_etiqueta(df_metadata_area, Config.KEY_CURSO)
+            tutor_raw_value = self.buscar_dato_por_etiqueta(area_metadatos, Config.KEY_TUTOR)
+            curso_raw_value = self.buscar_dato_por_etiqueta(area_metadatos, Config.KEY_CURSO)
             
             curso, paralelo = self.normalizar_curso_paralelo(curso_raw_value, hoja_principal)
             tutor = normalizar_nombre(tutor_raw_value)
@@ -167,36 +158,28 @@ class ProcesadorHorario:
 
             logger.info(f"   > Curso: {curso} | Paralelo: {paralelo} | Tutor: {tutor}")
 
-            # 5. ENCONTRAR LA TABLA DE HORARIOS DENTRO DEL BLOQUE
-            start_grid_row_index = -1
-            col_map = {}
-            
-            df_block_area = df_raw.iloc[start_row: end_row, start_col: end_col].copy()
-            
-            for idx_block, row in df_block_area.iterrows():
-                row_slice = row[start_col: end_col]
-                row_str = row_slice.astype(str).str.upper().tolist()
-                
-                if "HORA" in str(row_str) and "LUNES" in str(row_str):
-                    start_grid_row_index = idx_block 
-                    
-                    for col_idx, val in row_slice.items():
-                        val_str = limpiar_texto(val).upper()
-                        if "HORA" in val_str: col_map['HORA'] = col_idx
-                        for dia in Config.DIAS:
-                            if dia in val_str: col_map[dia] = col_idx
-                    break
+            # 4. ENCONTRAR LA TABLA DE HORARIOS DENTRO DEL BLOQUE: primera fila con HORA y LUNES
+            bloque = mayus[start_row:end_row, start_col:end_col]
+            filas_encabezado = np.flatnonzero(
+                contiene(bloque, ['HORA']).any(axis=1) & contiene(bloque, ['LUNES']).any(axis=1)
+            )
             
-            if start_grid_row_index == -1 or not col_map:
+            if not filas_encabezado.size:
                 logger.warning("   ⚠️ No se encontró la cuadrícula de horarios dentro del bloque. Saltando.")
                 continue
+
+            start_grid_row_index = start_row + int(filas_encabezado[0])
+            encabezado = bloque[filas_encabezado[0]]
+            col_map = {}
+            for clave in ['HORA'] + Config.DIAS:
+                columnas = np.flatnonzero(np.char.find(encabezado, clave) >= 0)
+                if columnas.size:
+                    col_map[clave] = start_col + int(columnas[-1])
                 
-            # 6. PROCESAR EL GRID
-            df_grid = df_raw.iloc[start_grid_row_index + 1: end_row].copy()
-            
-            for _, row in df_grid.iterrows():
-                idx_hora = col_map.get('HORA')
-                rango_hora = limpiar_texto(row[idx_hora]) if idx_hora is not None else ""
+            # 5. PROCESAR EL GRID
+            idx_hora = col_map.get('HORA')
+            for fila in textos[start_grid_row_index + 1: end_row]:
+                rango_hora = str(fila[idx_hora]) if idx_hora is not None else ""
                 
                 if not rango_hora or ":" not in rango_hora: continue
 
@@ -204,7 +187,7 @@ class ProcesadorHorario:
                     idx_dia = col_map.get(dia)
                     if idx_dia is not None and idx_dia >= start_col and idx_dia < end_col:
                         
-                        contenido = limpiar_texto(row[idx_dia])
+                        contenido = str(fila[idx_dia])
                         
                         if contenido:
                             detalles = self.descomponer_celda_clase(contenido)
@@ -254,7 +237,7 @@ def main():
     print(f"\n📄 Procesando archivo: {archivo}")
     
     try:
-        pd.ExcelFile(archivo, engine='openpyxl') 
+        abrir_libro(archivo)
     except Exception as e:
         print(f"❌ Error al abrir el archivo: {e}")
         return
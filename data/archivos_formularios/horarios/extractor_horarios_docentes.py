@@ -17,6 +17,10 @@ from datetime import datetime
 from typing import Dict, Tuple, List, Optional
 from pathlib import Path
 
+import numpy as np
+
+from libro_excel import abrir_libro, contiene, coordenadas, igual_a
+
 # =============================================================================
 # CONFIGURACIÓN
 # =============================================================================
@@ -106,56 +110,45 @@ def descomponer_celda_clase(contenido: str) -> Dict[str, str]:
 # =============================================================================
 class ProcesadorHorariosV7:
     
-    def encontrar_anclajes(self, df_raw: pd.DataFrame) -> List[Tuple[int, int, str]]:
-        """Escanea todo el documento buscando celdas que parezcan encabezados de curso."""
+    def encontrar_anclajes(self, textos: np.ndarray) -> List[Tuple[int, int, str]]:
+        """Busca en toda la grilla de texto limpio celdas que parezcan encabezados de curso."""
+        mayus = np.char.upper(textos)
+        largos = np.char.str_len(textos)
+
+        # Caso A: Etiqueta "CURSO" (coincidencia exacta); el valor suele estar a la derecha
+        es_etiqueta = igual_a(mayus, Config.KEY_CURSO)
+        vecino_valido = np.zeros(textos.shape, dtype=bool)
+        vecino_valido[:, :-1] = largos[:, 1:] > 3
+        caso_a = es_etiqueta & vecino_valido
+        # Caso B: La celda contiene directamente el curso (Ej: "PRIMERO A"),
+        # validando que no sea un texto largo de contenido
+        caso_b = ~es_etiqueta & contiene(mayus, Config.PATRONES_NIVEL) & (largos < 50)
+
         anchors = []
-        # Escaneamos un número razonable de filas, o todo el documento si es necesario
-        rows_to_scan = len(df_raw) 
-        
-        for r in range(rows_to_scan):
-            for c in range(len(df_raw.columns)):
-                val = limpiar_texto(df_raw.iloc[r, c]).upper()
-                
-                es_anclaje = False
-                valor_curso = "ND"
-                
-                # Caso A: Etiqueta "CURSO"
-                if any(k == val for k in Config.KEY_CURSO): # Coincidencia exacta o muy cercana
-                    # El valor suele estar a la derecha
-                    if c + 1 < len(df_raw.columns):
-                        vecino = limpiar_texto(df_raw.iloc[r, c+1])
-                        if len(vecino) > 3:
-                            valor_curso = vecino
-                            es_anclaje = True
-                
-                # Caso B: La celda contiene directamente el curso (Ej: "PRIMERO A")
-                elif any(pat in val for pat in Config.PATRONES_NIVEL) and len(val) < 50:
-                    # Validar que no sea un texto largo de contenido
-                    valor_curso = val
-                    es_anclaje = True
-                
-                if es_anclaje:
-                    # Evitar duplicados cercanos (mismo bloque detectado varias veces)
-                    if not any(abs(a[0]-r) < 5 and abs(a[1]-c) < 5 for a in anchors):
-                        anchors.append((r, c, valor_curso))
-                        logger.info(f"   📍 Bloque detectado en R{r}, C{c}: {valor_curso}")
+        for r, c in coordenadas(caso_a | caso_b):
+            valor_curso = str(textos[r, c + 1]) if caso_a[r, c] else str(mayus[r, c])
+            # Evitar duplicados cercanos (mismo bloque detectado varias veces)
+            if not any(abs(a[0]-r) < 5 and abs(a[1]-c) < 5 for a in anchors):
+                anchors.append((r, c, valor_curso))
+                logger.info(f"   📍 Bloque detectado en R{r}, C{c}: {valor_curso}")
         
-        # Ordenar por fila y luego columna
-        return sorted(anchors, key=lambda x: (x[0], x[1]))
+        # coordenadas() ya recorre por fila y luego columna
+        return anchors
 
     def procesar_hoja(self, archivo: str) -> Tuple[List[dict], List[dict]]:
         registros_horarios = []
         registros_tutores = []
         
         try:
-            xls = pd.ExcelFile(archivo, engine='openpyxl')
-            hoja = xls.sheet_names[0]
-            df = pd.read_excel(archivo, sheet_name=hoja, header=None, engine='openpyxl')
+            libro = abrir_libro(archivo)
+            textos = libro.texto(0, limpiar_texto)
         except Exception as e:
             logger.error(f"Error leyendo archivo: {e}")
             return [], []
 
-        anchors = self.encontrar_anclajes(df)
+        mayus = libro.texto(0, limpiar_texto, mayusculas=True)
+        n_filas, n_columnas = textos.shape
+        anchors = self.encontrar_anclajes(textos)
         
         if not anchors:
             logger.error("No se encontraron bloques de cursos.")
@@ -164,9 +157,9 @@ class ProcesadorHorariosV7:
         for i, (r_start, c_start, raw_curso) in enumerate(anchors):
             # 1. Definir límites del bloque actual
             # Límite vertical: hasta el siguiente anclaje que esté más abajo
-            r_end = len(df)
+            r_end = n_filas
             # Límite horizontal: hasta el siguiente anclaje que esté a la derecha (en la misma franja de filas)
-            c_end = len(df.columns)
+            c_end = n_columnas
             
             for next_r, next_c, _ in anchors:
                 if next_r > r_start and next_r < r_end:
@@ -177,55 +170,46 @@ class ProcesadorHorariosV7:
             # Ajuste fino: A veces el siguiente bloque vertical está mucho más abajo,
             # pero el bloque actual horizontalmente tiene un límite claro.
             # Asumiremos un ancho máximo de ~10 columnas si no hay otro bloque a la derecha.
-            if c_end == len(df.columns) and (c_end - c_start) > 15:
+            if c_end == n_columnas and (c_end - c_start) > 15:
                 c_end = c_start + 10 
 
             logger.info(f"--- Procesando Bloque {raw_curso} (R:{r_start}-{r_end}, C:{c_start}-{c_end}) ---")
             
             # 2. Extraer Metadatos (Tutor)
-            # Buscamos "Tutor" en las primeras filas del bloque
+            # Buscamos "Tutor" en las primeras filas del bloque; el valor está a la derecha
             tutor = "ND"
             curso, paralelo = normalizar_curso_paralelo(raw_curso)
             
-            df_bloque_meta = df.iloc[r_start:r_start+5, c_start:c_end]
-            
-            for br in range(len(df_bloque_meta)):
-                for bc in range(len(df_bloque_meta.columns)):
-                    val = limpiar_texto(df_bloque_meta.iloc[br, bc]).upper()
-                    if any(k in val for k in Config.KEY_TUTOR):
-                        # Buscar valor a la derecha
-                        if bc + 1 < len(df_bloque_meta.columns):
-                            t_val = limpiar_texto(df_bloque_meta.iloc[br, bc+1])
-                            if len(t_val) > 3:
-                                tutor = normalizar_nombre(t_val)
+            meta = textos[r_start:r_start+5, c_start:c_end]
+            etiquetas_tutor = contiene(mayus[r_start:r_start+5, c_start:c_end], Config.KEY_TUTOR)
+            etiquetas_tutor[:, -1:] = False
+            etiquetas_tutor[:, :-1] &= np.char.str_len(meta[:, 1:]) > 3
+            encontrados = coordenadas(etiquetas_tutor)
+            if encontrados:
+                # Si hay varias etiquetas, prevalece la última
+                br, bc = encontrados[-1]
+                tutor = normalizar_nombre(str(meta[br, bc+1]))
             
             registros_tutores.append({'curso': curso, 'paralelo': paralelo, 'tutor': tutor})
 
             # 3. Encontrar Cuadrícula LOCALMENTE
-            # Buscamos la fila de encabezados (LUNES, MARTES) DENTRO de este bloque
-            df_bloque = df.iloc[r_start:r_end, c_start:c_end]
+            # La fila de encabezados (LUNES, MARTES) es la primera DENTRO de este bloque
+            # que menciona al menos 3 días de la semana
+            bloque = mayus[r_start:r_end, c_start:c_end]
+            dias_por_fila = sum(contiene(bloque, [d]).any(axis=1).astype(int) for d in Config.DIAS)
             
             header_row_idx = -1
             col_map = {}
             
-            for br, row in df_bloque.iterrows():
-                row_vals = [limpiar_texto(v).upper() for v in row]
-                # Si la fila tiene al menos 3 días de la semana, es el encabezado
-                matches = sum(1 for d in Config.DIAS if any(d in rv for rv in row_vals))
-                
-                if matches >= 3:
-                    header_row_idx = br
-                    # Mapear columnas
-                    for bc, val in enumerate(row): # bc es relativo al bloque slice, cuidado
-                        val_u = limpiar_texto(val).upper()
-                        real_col_idx = df_bloque.columns[bc] # Índice real en el DF original
-                        
-                        for d in Config.DIAS:
-                            if d in val_u: col_map[d] = real_col_idx
-                        
-                        if any(k in val_u for k in Config.KEY_HORA):
-                            col_map['HORA'] = real_col_idx
-                    break
+            filas_encabezado = np.flatnonzero(dias_por_fila >= 3)
+            if filas_encabezado.size:
+                header_row_idx = r_start + int(filas_encabezado[0])
+                encabezado = bloque[filas_encabezado[0]]
+                # Mapear columnas (índice real en la hoja; si se repite, prevalece la última)
+                for clave, palabras in [(d, [d]) for d in Config.DIAS] + [('HORA', Config.KEY_HORA)]:
+                    columnas = np.flatnonzero(contiene(encabezado, palabras))
+                    if columnas.size:
+                        col_map[clave] = c_start + int(columnas[-1])
             
             if header_row_idx == -1:
                 logger.warning(f"   ⚠️ No se encontró cuadrícula de horarios para {curso} {paralelo}")
@@ -244,9 +228,7 @@ class ProcesadorHorariosV7:
             # 4. Extraer Clases
             # Iteramos desde la fila siguiente al encabezado hasta el fin del bloque
             for r_data in range(header_row_idx + 1, r_end):
-                if r_data not in df.index: break
-                
-                hora_val = limpiar_texto(df.iloc[r_data, col_map['HORA']])
+                hora_val = str(textos[r_data, col_map['HORA']])
                 
                 # Validar que sea una fila de hora (tiene números y ':' o '-')
                 if not (re.search(r'\d', hora_val) and (':' in hora_val or '-' in hora_val or 'A' in hora_val.upper())):
@@ -254,7 +236,7 @@ class ProcesadorHorariosV7:
                 
                 for dia in Config.DIAS:
                     if dia in col_map:
-                        contenido = limpiar_texto(df.iloc[r_data, col_map[dia]])
+                        contenido = str(textos[r_data, col_map[dia]])
                         if len(contenido) > 3: # Celda no vacía
                             detalles = descomponer_celda_clase(contenido)
                             
@@ -7,6 +7,10 @@ from datetime import datetime
 from typing import Dict, Tuple, List
 from pathlib import Path
 
+import numpy as np
+
+from libro_excel import abrir_libro, contiene, coordenadas, valor_junto_a
+
 # =============================================================================
 # CONFIGURACIÓN Y LOGGING
 # =============================================================================
@@ -44,25 +48,17 @@ def normalizar_nombre(texto: str) -> str:
 # =============================================================================
 class ExtractorMetadatosBloque:
     
-    def buscar_dato_por_etiqueta(self, df_area: pd.DataFrame, keywords: list, filas_limite: int = 6) -> str:
-        """Busca una keyword en un área definida y devuelve el valor de la celda adyacente."""
-        df_head = df_area.head(filas_limite)
-        
-        for rowIndex in range(len(df_head)):
-            for colIndex in range(len(df_head.columns)):
-                cellValue = df_head.iloc[rowIndex, colIndex]
-                texto_celda = limpiar_texto(cellValue).upper()
-                
-                if any(k in texto_celda for k in keywords):
-                    # Búsqueda en celdas de la derecha
-                    for offset in range(1, 5):
-                        if colIndex + offset < len(df_head.columns):
-                            valor = limpiar_texto(df_head.iloc[rowIndex, colIndex + offset])
-                            
-                            # CORRECCIÓN CLAVE: El valor debe ser no vacío y tener al menos 3 caracteres
-                            if valor != "ND" and len(valor) > 2 and valor.upper() not in texto_celda:
-                                return valor
-        return "ND"
+    def buscar_dato_por_etiqueta(self, area: np.ndarray, keywords: list, filas_limite: int = 6) -> str:
+        """Busca una keyword en un área (grilla de texto limpio) y devuelve el valor de la celda adyacente."""
+        area = area[:filas_limite]
+        mayus = np.char.upper(area)
+        # CORRECCIÓN CLAVE: El valor debe ser no vacío y tener al menos 3 caracteres
+        valor = valor_junto_a(
+            area, contiene(mayus, keywords),
+            lambda valor, etiqueta: valor != "ND" and len(valor) > 2 and valor.upper() not in etiqueta,
+            etiquetas=mayus,
+        )
+        return valor or "ND"
         
     def normalizar_curso_paralelo(self, curso_raw_value: str) -> Tuple[str, str]:
         """Procesa el valor crudo del curso para separar el paralelo (A, B, C, etc.)."""
@@ -89,38 +85,29 @@ class ExtractorMetadatosBloque:
         metadatos_bloques = []
         
         try:
-            xls = pd.ExcelFile(archivo, engine='openpyxl')
-            hoja_principal = xls.sheet_names[0] 
-            df_raw = pd.read_excel(archivo, sheet_name=hoja_principal, header=None, engine='openpyxl')
+            libro = abrir_libro(archivo)
+            hoja_principal = libro.hojas[0]
         except Exception as e:
             logger.error(f"❌ Error al leer el archivo {archivo}: {e}")
             return []
 
-        # 1. Escanear DF para encontrar todas las etiquetas clave 'TUTOR' (inicio de bloque)
-        tutor_coords = []
-        
-        for rowIndex in range(len(df_raw)):
-            for colIndex in range(len(df_raw.columns)):
-                cellValue = df_raw.iloc[rowIndex, colIndex]
-                texto_celda = limpiar_texto(cellValue).upper()
-                
-                if any(k in texto_celda for k in Config.KEY_TUTOR):
-                    tutor_coords.append((rowIndex, colIndex))
+        textos = libro.texto(hoja_principal, limpiar_texto)
+        n_filas, n_columnas = textos.shape
+
+        # 1. Encontrar todas las etiquetas clave 'TUTOR' (inicio de bloque), ordenadas por (fila, columna)
+        tutor_coords = coordenadas(contiene(libro.texto(hoja_principal, limpiar_texto, mayusculas=True), Config.KEY_TUTOR))
         
         if not tutor_coords:
             logger.error("❌ No se encontraron anclajes de Tutor en el documento. No se puede definir bloques.")
             return []
 
-        # 2. Ordenar las coordenadas para definir los límites de los bloques
-        tutor_coords.sort(key=lambda x: (x[0], x[1]))
-        
         bloques_unicos = set()
 
-        # 3. Procesar cada bloque encontrado (ventanas)
+        # 2. Procesar cada bloque encontrado (ventanas)
         for i, (start_row, start_col) in enumerate(tutor_coords):
             
-            end_row = len(df_raw)
-            end_col = len(df_raw.columns)
+            end_row = n_filas
+            end_col = n_columnas
             
             # Buscamos el siguiente punto de inicio (vertical o horizontal) para definir los límites
             for j in range(i + 1, len(tutor_coords)):
@@ -138,12 +125,12 @@ class ExtractorMetadatosBloque:
             
             logger.info(f"--- Buscando metadatos en R:{metadata_start_row}-{start_row+4}, C:{start_col}-{min(end_col, start_col + 10)-1} ---")
             
-            # 4. EXTRAER METADATOS DEL BLOQUE
+            # 3. EXTRAER METADATOS DEL BLOQUE
             # Área de búsqueda: 10 filas x 10 columnas desde el inicio del bloque
-            df_metadata_area = df_raw.iloc[metadata_start_row:start_row + 5, start_col:min(end_col, start_col + 10)].copy()
+            area_metadatos = textos[metadata_start_row:start_row + 5, start_col:min(end_col, start_col + 10)]
 
-            tutor_raw_value = self.buscar_dato_por_etiqueta(df_metadata_area, Config.KEY_TUTOR)
-            curso_raw_value = self.buscar_dato_por_etiqueta(df_metadata_area, Config.KEY_CURSO)
+            tutor_raw_value = self.buscar_dato_por_etiqueta(area_metadatos, Config.KEY_TUTOR)
+            curso_raw_value = self.buscar_dato_por_etiqueta(area_metadatos, Config.KEY_CURSO)
             
             curso, paralelo = self.normalizar_curso_paralelo(curso_raw_value)
             tutor = normalizar_nombre(tutor_raw_value)
@@ -199,7 +186,7 @@ def main():
     print(f"\n📄 Analizando: {os.path.basename(archivo)}")
     
     try:
-        pd.ExcelFile(archivo, engine='openpyxl') 
+        abrir_libro(archivo)
     except Exception as e:
         print(f"❌ Error al abrir el archivo: {e}")
         return
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+Lector de libros Excel compartido por los extractores de horarios.
+
+Cada archivo se parsea UNA sola vez (openpyxl en modo read_only) y cada hoja
+queda como una grilla NumPy de objetos (None = celda vacía). Los textos
+limpios y en mayúsculas se calculan una vez por hoja y función de limpieza,
+y la búsqueda de etiquetas/anclajes (TUTOR, CURSO, LUNES...) se hace sobre
+la grilla completa con operaciones vectorizadas en lugar de recorrer celdas
+con iloc/iterrows.
+
+Los valores se convierten igual que pd.read_excel(header=None): los números
+enteros guardados como float pasan a int y las cadenas vacías son celdas vacías.
+"""
+import os
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+Hoja = Union[int, str]
+
+
+def _convertir(valor):
+    if isinstance(valor, str):
+        return valor if valor != '' else None
+    if isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    return valor
+
+
+def _leer_hoja(ws) -> np.ndarray:
+    filas = []
+    ancho = 0
+    for fila in ws.iter_rows(values_only=True):
+        fila = [_convertir(v) for v in fila]
+        while fila and fila[-1] is None:
+            fila.pop()
+        filas.append(fila)
+        if fila:
+            ancho = max(ancho, len(fila))
+    # Filas vacías al final: pandas tampoco las incluye
+    while filas and not filas[-1]:
+        filas.pop()
+
+    grilla = np.full((len(filas), ancho), None, dtype=object)
+    for i, fila in enumerate(filas):
+        grilla[i, :len(fila)] = fila
+    return grilla
+
+
+class LibroExcel:
+    """Libro Excel parseado una vez, con grillas y textos cacheados por hoja."""
+
+    def __init__(self, ruta):
+        self.ruta = str(ruta)
+        libro = load_workbook(self.ruta, read_only=True, data_only=True)
+        try:
+            self._grillas: Dict[str, np.ndarray] = {ws.title: _leer_hoja(ws) for ws in libro.worksheets}
+        finally:
+            libro.close()
+        self._textos: Dict[Tuple[str, Callable, bool], np.ndarray] = {}
+
+    @property
+    def hojas(self) -> List[str]:
+        return list(self._grillas)
+
+    def _nombre(self, hoja: Hoja) -> str:
+        return self.hojas[hoja] if isinstance(hoja, int) else hoja
+
+    def grilla(self, hoja: Hoja = 0) -> np.ndarray:
+        """Valores crudos de la hoja (ndarray de objetos; None = vacía)."""
+        return self._grillas[self._nombre(hoja)]
+
+    def texto(self, hoja: Hoja = 0, limpiar: Callable = str, mayusculas: bool = False) -> np.ndarray:
+        """
+        Grilla de texto: `limpiar` aplicado a cada celda (incluidas las vacías,
+        que llegan como None), opcionalmente en mayúsculas. Cacheada por
+        (hoja, limpiar, mayusculas).
+        """
+        clave = (self._nombre(hoja), limpiar, mayusculas)
+        if clave not in self._textos:
+            grilla = self.grilla(hoja)
+            if mayusculas:
+                textos = np.char.upper(self.texto(hoja, limpiar))
+            else:
+                textos = np.frompyfunc(limpiar, 1, 1)(grilla).astype(str) if grilla.size else grilla.astype(str)
+            self._textos[clave] = textos
+        return self._textos[clave]
+
+    def dataframe(self, hoja: Hoja = 0) -> pd.DataFrame:
+        """Hoja como DataFrame sin encabezados (equivalente a read_excel(header=None))."""
+        valores = self.grilla(hoja).copy()
+        valores[pd.isna(valores)] = np.nan
+        return pd.DataFrame(valores).infer_objects()
+
+
+_LIBROS: Dict[Tuple[str, int, int], LibroExcel] = {}
+
+
+def abrir_libro(ruta) -> LibroExcel:
+    """LibroExcel cacheado por ruta; se vuelve a leer si el archivo cambió."""
+    ruta = os.path.abspath(str(ruta))
+    estado = os.stat(ruta)
+    clave = (ruta, estado.st_mtime_ns, estado.st_size)
+    if clave not in _LIBROS:
+        for anterior in [k for k in _LIBROS if k[0] == ruta]:
+            del _LIBROS[anterior]
+        _LIBROS[clave] = LibroExcel(ruta)
+    return _LIBROS[clave]
+
+
+# =============================================================================
+# BÚSQUEDA VECTORIZADA
+# =============================================================================
+def contiene(textos: np.ndarray, palabras: Iterable[str]) -> np.ndarray:
+    """Máscara de celdas que contienen alguna de las palabras."""
+    mascara = np.zeros(textos.shape, dtype=bool)
+    for palabra in palabras:
+        mascara |= np.char.find(textos, palabra) >= 0
+    return mascara
+
+
+def igual_a(textos: np.ndarray, palabras: Iterable[str]) -> np.ndarray:
+    """Máscara de celdas cuyo texto es exactamente una de las palabras."""
+    return np.isin(textos, list(palabras))
+
+
+def coordenadas(mascara: np.ndarray, fila0: int = 0, col0: int = 0) -> List[Tuple[int, int]]:
+    """(fila, columna) de las celdas marcadas, por filas y luego columnas."""
+    return [(int(f) + fila0, int(c) + col0) for f, c in np.argwhere(mascara)]
+
+
+def valor_junto_a(textos: np.ndarray, mascara: np.ndarray, aceptar: Callable[[str, str], bool],
+                  etiquetas: Optional[np.ndarray] = None, desplazamientos: Iterable[int] = range(1, 5)) -> Optional[str]:
+    """
+    Primer valor a la derecha de una celda marcada que cumple
+    aceptar(valor, etiqueta). Las celdas se recorren por filas y, para cada
+    una, los desplazamientos en orden. `etiquetas` es la grilla con la que se
+    compara el valor (por defecto, la misma `textos`).
+    """
+    etiquetas = textos if etiquetas is None else etiquetas
+    ancho = textos.shape[1] if textos.ndim == 2 else 0
+    for fila, col in np.argwhere(mascara):
+        for offset in desplazamientos:
+            if col + offset < ancho:
+                valor = textos[fila, col + offset]
+                if aceptar(valor, etiquetas[fila, col]):
+                    return str(valor)
+    return None
@@ -4,6 +4,8 @@ import re
 import os
 from pathlib import Path
 
+from libro_excel import abrir_libro, contiene, coordenadas
+
 def limpiar_texto(texto):
     """Limpia espacios y normaliza texto."""
     if pd.isna(texto): return ""
@@ -14,35 +16,30 @@ def extraer_tutor_exacto(ruta_archivo, nombre_hoja):
     print(f"\n--- Analizando hoja: {nombre_hoja} ---")
     
     try:
-        # Leemos el Excel sin encabezados para tener una matriz pura de datos
-        df = pd.read_excel(ruta_archivo, sheet_name=nombre_hoja, header=None, engine='openpyxl')
+        # Matriz pura de datos (texto limpio), leída una sola vez por libro
+        libro = abrir_libro(ruta_archivo)
+        textos = libro.texto(nombre_hoja, limpiar_texto)
+        mayus = libro.texto(nombre_hoja, limpiar_texto, mayusculas=True)
         
         tutor_encontrado = "NO ENCONTRADO"
         
-        # Recorremos todas las celdas buscando la palabra clave "TUTOR"
-        for rowIndex, row in df.iterrows():
-            for colIndex, cellValue in row.items():
-                
-                texto_celda = limpiar_texto(cellValue).upper()
-                
-                # Verificamos si la celda contiene la palabra "TUTOR"
-                # Usamos una validación estricta para evitar falsos positivos
-                if "TUTOR" in texto_celda: 
-                    print(f"   > Palabra 'TUTOR' encontrada en Fila {rowIndex}, Columna {colIndex}")
+        # Celdas que contienen la palabra clave "TUTOR", buscadas sobre toda la hoja a la vez
+        for rowIndex, colIndex in coordenadas(contiene(mayus, ["TUTOR"])):
+            print(f"   > Palabra 'TUTOR' encontrada en Fila {rowIndex}, Columna {colIndex}")
+            
+            # Intentamos obtener el valor de la celda de la derecha (colIndex + 1)
+            # Si esa está vacía, probamos la siguiente (por si hay celdas combinadas vacías en medio)
+            for offset in range(1, 5): # Buscamos hasta 4 celdas a la derecha
+                if colIndex + offset < textos.shape[1]:
+                    posible_nombre = str(textos[rowIndex, colIndex + offset])
                     
-                    # Intentamos obtener el valor de la celda de la derecha (colIndex + 1)
-                    # Si esa está vacía, probamos la siguiente (por si hay celdas combinadas vacías en medio)
-                    for offset in range(1, 5): # Buscamos hasta 4 celdas a la derecha
-                        if colIndex + offset < len(df.columns):
-                            posible_nombre = limpiar_texto(df.iloc[rowIndex, colIndex + offset])
-                            
-                            if posible_nombre and posible_nombre.upper() != "TUTOR": # Si tiene texto y no es la palabra tutor repetida
-                                # Limpieza del nombre (quitar títulos Lic., Mgs., etc.)
-                                nombre_limpio = re.sub(r'^(LIC\.?|TG\.?|MGS\.?|DR\.?|MSC\.?|PROF\.?)\s*', '', posible_nombre, flags=re.IGNORECASE)
-                                tutor_encontrado = nombre_limpio.strip().title()
-                                print(f"   ✅ ¡Tutor extraído!: {tutor_encontrado} (estaba en columna {colIndex + offset})")
-                                return tutor_encontrado
-        
+                    if posible_nombre and posible_nombre.upper() != "TUTOR": # Si tiene texto y no es la palabra tutor repetida
+                        # Limpieza del nombre (quitar títulos Lic., Mgs., etc.)
+                        nombre_limpio = re.sub(r'^(LIC\.?|TG\.?|MGS\.?|DR\.?|MSC\.?|PROF\.?)\s*', '', posible_nombre, flags=re.IGNORECASE)
+                        tutor_encontrado = nombre_limpio.strip().title()
+                        print(f"   ✅ ¡Tutor extraído!: {tutor_encontrado} (estaba en columna {colIndex + offset})")
+                        return tutor_encontrado
+
         if tutor_encontrado == "NO ENCONTRADO":
             print("   ❌ No se encontró la etiqueta 'TUTOR' o la celda adyacente estaba vacía.")
             
@@ -95,9 +92,9 @@ if __name__ == "__main__":
     print(f"\n📄 Procesando: {os.path.basename(archivo_seleccionado)}")
     
     try:
-        xls = pd.ExcelFile(archivo_seleccionado, engine='openpyxl')
+        libro = abrir_libro(archivo_seleccionado)
         # 2. Procesa todas las hojas
-        for hoja in xls.sheet_names:
+        for hoja in libro.hojas:
             extraer_tutor_exacto(archivo_seleccionado, hoja)
     except Exception as e:
         print(f"❌ Error crítico abriendo el archivo: {e}")
\ No newline at end of file
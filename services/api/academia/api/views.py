@@ -11,6 +11,7 @@ from students.models import Student
 from teachers.models import Teacher
 from utils.notifications import NotificacionWhatsApp
 from utils.whatsapp import evolution
+from utils.api import ConsultaOptimizadaMixin
 
 logger = logging.getLogger(__name__)
 
@@ -19,7 +20,7 @@ logger = logging.getLogger(__name__)
 # ViewSet existente (sin cambios)
 # ──────────────────────────────────────────────
 
-class HorarioViewSet(viewsets.ReadOnlyModelViewSet):
+class HorarioViewSet(ConsultaOptimizadaMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Horario.objects.all().select_related('curso', 'docente', 'clase')
     serializer_class = HorarioSerializer
 
@@ -0,0 +1,213 @@
+"""
+Agente IA Académico — Capa de acceso al modelo de lenguaje
+
+  - completar(sistema, usuario): una petición con caché por contenido
+  - completar_lote(peticiones): muchas peticiones con caché, deduplicación,
+    agrupación de prompts en una sola llamada y concurrencia limitada
+  - Backends: 'openai' (producción) y 'fake' (pruebas / desarrollo sin clave),
+    seleccionados con settings.AGENTE_LLM_BACKEND
+
+La caché se indexa por (modelo, prompt de sistema, prompt de usuario
+normalizado): si los datos de un estudiante no cambian, la semana siguiente
+no se vuelve a llamar al modelo.
+"""
+import hashlib
+import json
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+RESPUESTA_ERROR = {
+    'analisis': 'Análisis no disponible (error de IA).',
+    'recomendaciones': '',
+    'mensaje_docente': '',
+    'mensaje_representante': '',
+}
+
+INSTRUCCION_GRUPO = """
+Recibirás un JSON {"peticiones": [...]} con varias solicitudes independientes.
+Responde con un JSON {"resultados": [...]} con un objeto por solicitud, en el
+mismo orden, cada uno con las claves indicadas arriba.
+"""
+
+
+# ─── BACKENDS ───────────────────────────────────────────────────────────────
+
+class OpenAIBackend:
+    def __init__(self):
+        api_key = getattr(settings, 'OPENAI_API_KEY', '')
+        if not api_key:
+            raise ValueError('OPENAI_API_KEY no configurada')
+        from openai import OpenAI
+        self.client = OpenAI(api_key=api_key)
+
+    def completar(self, modelo, sistema, usuario, max_tokens=1500):
+        response = self.client.chat.completions.create(
+            model=modelo,
+            messages=[
+                {'role': 'system', 'content': sistema},
+                {'role': 'user', 'content': usuario},
+            ],
+            response_format={'type': 'json_object'},
+            temperature=0.4,
+            max_tokens=max_tokens,
+        )
+        return json.loads(response.choices[0].message.content)
+
+
+class FakeBackend:
+    """Respuestas deterministas sin red; cuenta las llamadas realizadas."""
+
+    llamadas = 0
+
+    def completar(self, modelo, sistema, usuario, max_tokens=1500):
+        type(self).llamadas += 1
+        try:
+            peticiones = json.loads(usuario)['peticiones']
+        except (ValueError, KeyError, TypeError):
+            return self._respuesta(usuario)
+        return {'resultados': [self._respuesta(p) for p in peticiones]}
+
+    @staticmethod
+    def _respuesta(usuario):
+        resumen = usuario.strip().splitlines()[0][:120] if usuario.strip() else ''
+        return {
+            'analisis': f'[simulado] {resumen}',
+            'recomendaciones': '',
+            'mensaje_docente': '',
+            'mensaje_representante': '',
+            'texto_mejorado': usuario,
+            'sugerencias': '',
+        }
+
+
+BACKENDS = {
+    'openai': OpenAIBackend,
+    'fake': FakeBackend,
+}
+
+
+def get_backend():
+    nombre = getattr(settings, 'AGENTE_LLM_BACKEND', 'openai')
+    return BACKENDS[nombre]()
+
+
+# ─── CACHÉ ──────────────────────────────────────────────────────────────────
+
+def _normalizar(texto):
+    return re.sub(r'\s+', ' ', texto or '').strip()
+
+
+def clave_cache(modelo, sistema, usuario):
+    contenido = '\x1f'.join((modelo, _normalizar(sistema), _normalizar(usuario)))
+    return 'agente_llm:' + hashlib.sha256(contenido.encode()).hexdigest()
+
+
+def _modelo(modelo=None):
+    return modelo or getattr(settings, 'AGENTE_LLM_MODELO', 'gpt-4o')
+
+
+def _ttl():
+    return getattr(settings, 'AGENTE_LLM_CACHE_TTL', 60 * 60 * 24 * 14)
+
+
+# ─── API ────────────────────────────────────────────────────────────────────
+
+def completar(sistema, usuario, modelo=None, backend=None):
+    """
+    Respuesta JSON (dict) del modelo, desde caché si el mismo prompt ya se
+    resolvió. Los errores no se cachean y devuelven RESPUESTA_ERROR.
+    """
+    modelo = _modelo(modelo)
+    clave = clave_cache(modelo, sistema, usuario)
+    resultado = cache.get(clave)
+    if resultado is not None:
+        return resultado
+    try:
+        resultado = (backend or get_backend()).completar(modelo, sistema, usuario)
+    except Exception as e:
+        logger.error(f'agente.llm.completar error: {e}')
+        return dict(RESPUESTA_ERROR)
+    cache.set(clave, resultado, _ttl())
+    return resultado
+
+
+def _completar_grupo(backend, modelo, sistema, usuarios):
+    """Resuelve varios prompts con el mismo sistema en una sola llamada."""
+    if len(usuarios) == 1:
+        return [backend.completar(modelo, sistema, usuarios[0])]
+    respuesta = backend.completar(
+        modelo,
+        sistema + INSTRUCCION_GRUPO,
+        json.dumps({'peticiones': usuarios}, ensure_ascii=False),
+        max_tokens=1500 * len(usuarios),
+    )
+    resultados = respuesta.get('resultados') if isinstance(respuesta, dict) else None
+    if not isinstance(resultados, list) or len(resultados) != len(usuarios):
+        # El modelo no respetó el formato: se resuelve uno a uno
+        logger.warning('agente.llm: respuesta agrupada inválida, reintentando individualmente')
+        return [backend.completar(modelo, sistema, u) for u in usuarios]
+    return resultados
+
+
+def completar_lote(peticiones, modelo=None, backend=None, concurrencia=None, tamano_grupo=None):
+    """
+    Resuelve una lista de (sistema, usuario) y devuelve los dicts en el mismo orden.
+
+    1. Sirve desde caché las peticiones ya resueltas y deduplica las repetidas.
+    2. Agrupa las pendientes con el mismo prompt de sistema en bloques de
+       `tamano_grupo` prompts por llamada.
+    3. Ejecuta los bloques con a lo sumo `concurrencia` llamadas simultáneas.
+    """
+    modelo = _modelo(modelo)
+    concurrencia = concurrencia or getattr(settings, 'AGENTE_LLM_CONCURRENCIA', 4)
+    tamano_grupo = tamano_grupo or getattr(settings, 'AGENTE_LLM_TAMANO_GRUPO', 5)
+
+    claves = [clave_cache(modelo, s, u) for s, u in peticiones]
+    resueltas = cache.get_many(set(claves))
+
+    pendientes = {}
+    for clave, (sistema, usuario) in zip(claves, peticiones):
+        if clave not in resueltas:
+            pendientes.setdefault(clave, (sistema, usuario))
+
+    if pendientes:
+        try:
+            backend = backend or get_backend()
+        except Exception as e:
+            logger.error(f'agente.llm.completar_lote error: {e}')
+            backend = None
+
+        por_sistema = {}
+        for clave, (sistema, usuario) in pendientes.items():
+            por_sistema.setdefault(sistema, []).append((clave, usuario))
+        bloques = [
+            (sistema, items[i:i + tamano_grupo])
+            for sistema, items in por_sistema.items()
+            for i in range(0, len(items), tamano_grupo)
+        ]
+
+        def ejecutar(bloque):
+            sistema, items = bloque
+            try:
+                return items, _completar_grupo(backend, modelo, sistema, [u for _, u in items])
+            except Exception as e:
+                logger.error(f'agente.llm.completar_lote error: {e}')
+                return items, None
+
+        nuevas = {}
+        if backend is not None:
+            with ThreadPoolExecutor(max_workers=concurrencia) as executor:
+                for items, resultados in executor.map(ejecutar, bloques):
+                    if resultados is not None:
+                        nuevas.update({clave: r for (clave, _), r in zip(items, resultados)})
+        if nuevas:
+            cache.set_many(nuevas, _ttl())
+        resueltas.update(nuevas)
+
+    return [resueltas.get(clave, dict(RESPUESTA_ERROR)) for clave in claves]
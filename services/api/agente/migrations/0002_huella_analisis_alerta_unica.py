@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def resolver_alertas_duplicadas(apps, schema_editor):
+    """Deja abierta solo la alerta más reciente de cada (estudiante, tipo, materia, ciclo)."""
+    AlertaEstudiante = apps.get_model('agente', 'AlertaEstudiante')
+    vistas = set()
+    duplicadas = []
+    abiertas = AlertaEstudiante.objects.exclude(estado='RESUELTA').order_by('-created_at', '-pk')
+    for alerta in abiertas.only('pk', 'estudiante_id', 'tipo', 'materia_id', 'ciclo_lectivo'):
+        clave = (alerta.estudiante_id, alerta.tipo, alerta.materia_id, alerta.ciclo_lectivo)
+        if clave in vistas:
+            duplicadas.append(alerta.pk)
+        else:
+            vistas.add(clave)
+    AlertaEstudiante.objects.filter(pk__in=duplicadas).update(estado='RESUELTA')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agente', '0001_initial'),
+        ('students', '0004_student_representante_usuario'),
+        ('subjects', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HuellaAnalisis',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('huella', models.CharField(max_length=64)),
+                ('ciclo_lectivo', models.CharField(blank=True, max_length=20)),
+                ('alertas_generadas', models.PositiveIntegerField(default=0)),
+                ('fecha_analisis', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Huella de Análisis',
+                'verbose_name_plural': 'Huellas de Análisis',
+            },
+        ),
+        migrations.RunPython(resolver_alertas_duplicadas, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='alertaestudiante',
+            constraint=models.UniqueConstraint(condition=models.Q(models.Q(('estado', 'RESUELTA'), _negated=True), ('materia__isnull', False)), fields=('estudiante', 'tipo', 'materia', 'ciclo_lectivo'), name='alerta_abierta_unica_materia'),
+        ),
+        migrations.AddConstraint(
+            model_name='alertaestudiante',
+            constraint=models.UniqueConstraint(condition=models.Q(models.Q(('estado', 'RESUELTA'), _negated=True), ('materia__isnull', True)), fields=('estudiante', 'tipo', 'ciclo_lectivo'), name='alerta_abierta_unica_general'),
+        ),
+        migrations.AddField(
+            model_name='huellaanalisis',
+            name='estudiante',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='huella_analisis', to='students.student'),
+        ),
+    ]
@@ -58,11 +58,48 @@ class AlertaEstudiante(models.Model):
         ordering = ['-severidad', '-created_at']
         verbose_name = 'Alerta de Estudiante'
         verbose_name_plural = 'Alertas de Estudiantes'
+        # Una sola alerta abierta por (estudiante, tipo, materia, ciclo); la materia
+        # nula necesita su propia restricción porque NULL no colisiona en UNIQUE.
+        constraints = [
+            models.UniqueConstraint(
+                fields=['estudiante', 'tipo', 'materia', 'ciclo_lectivo'],
+                condition=~models.Q(estado='RESUELTA') & models.Q(materia__isnull=False),
+                name='alerta_abierta_unica_materia',
+            ),
+            models.UniqueConstraint(
+                fields=['estudiante', 'tipo', 'ciclo_lectivo'],
+                condition=~models.Q(estado='RESUELTA') & models.Q(materia__isnull=True),
+                name='alerta_abierta_unica_general',
+            ),
+        ]
 
     def __str__(self):
         return f'{self.get_tipo_display()} — {self.estudiante} [{self.severidad}]'
 
 
+class HuellaAnalisis(models.Model):
+    """
+    Huella (hash) de los datos con los que se analizó por última vez a un
+    estudiante: promedios por materia, inasistencias, ciclo y umbrales. Si no
+    cambió, el análisis semanal lo omite.
+    """
+
+    estudiante = models.OneToOneField(
+        'students.Student', on_delete=models.CASCADE, related_name='huella_analisis'
+    )
+    huella = models.CharField(max_length=64)
+    ciclo_lectivo = models.CharField(max_length=20, blank=True)
+    alertas_generadas = models.PositiveIntegerField(default=0)
+    fecha_analisis = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Huella de Análisis'
+        verbose_name_plural = 'Huellas de Análisis'
+
+    def __str__(self):
+        return f'{self.estudiante} — {self.huella[:12]} ({self.fecha_analisis:%Y-%m-%d})'
+
+
 class InformeAsistido(models.Model):
     """Informe de clase mejorado por el agente IA."""
 
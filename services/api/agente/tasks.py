@@ -4,12 +4,21 @@ Agente IA Académico — Tareas Celery
 Tareas disponibles:
   - analizar_rendimiento_semanal(): escaneo completo, programada semanalmente
   - analizar_estudiante(student_id): análisis individual bajo demanda
+  - analizar_estudiantes_lote(student_ids): análisis de un bloque de estudiantes
+    con las llamadas al modelo agrupadas (ver agente/llm.py)
   - mejorar_informe_docente(texto, activity_id, docente_id): mejora de texto
   - enviar_notificaciones_pendientes(): envío de emails acumulados
+
+Los estudiantes cuyos datos no cambiaron desde el último análisis (misma
+HuellaAnalisis) se omiten, y nunca se crea una segunda alerta abierta del
+mismo (estudiante, tipo, materia, ciclo).
 """
+import hashlib
+import json
 import logging
 from celery import shared_task
 from django.conf import settings
+from django.db import IntegrityError, transaction
 from django.utils import timezone
 from datetime import date
 
@@ -18,14 +27,6 @@ logger = logging.getLogger(__name__)
 
 # ─── UTILIDADES ─────────────────────────────────────────────────────────────
 
-def _get_openai_client():
-    api_key = getattr(settings, 'OPENAI_API_KEY', '')
-    if not api_key:
-        raise ValueError('OPENAI_API_KEY no configurada')
-    from openai import OpenAI
-    return OpenAI(api_key=api_key)
-
-
 def _ciclo_actual():
     today = date.today()
     return f"{today.year}-{today.year + 1}"
@@ -83,10 +84,12 @@ def _obtener_promedios_por_materia(student):
 # ─── ANÁLISIS INDIVIDUAL ─────────────────────────────────────────────────────
 
 @shared_task(bind=True, max_retries=2)
-def analizar_estudiante(self, student_id: int):
-    """Analiza el rendimiento de un estudiante específico y genera alertas si necesario."""
+def analizar_estudiante(self, student_id: int, forzar: bool = False):
+    """
+    Analiza el rendimiento de un estudiante específico y genera alertas si necesario.
+    Con forzar=True se analiza aunque sus datos no hayan cambiado.
+    """
     from students.models import Student
-    from agente.models import AlertaEstudiante, ConfiguracionAgente
 
     try:
         student = Student.objects.select_related('usuario').get(pk=student_id)
@@ -94,15 +97,144 @@ def analizar_estudiante(self, student_id: int):
         logger.warning(f'analizar_estudiante: student {student_id} no encontrado')
         return
 
+    return _analizar_estudiantes([student], forzar=forzar)
+
+
+@shared_task
+def analizar_estudiantes_lote(student_ids):
+    """Analiza un bloque de estudiantes resolviendo todas sus alertas en un lote de IA."""
+    from students.models import Student
+
+    estudiantes = list(Student.objects.select_related('usuario').filter(pk__in=student_ids))
+    return _analizar_estudiantes(estudiantes)
+
+
+def _analizar_estudiantes(estudiantes, forzar=False):
+    """
+    Detecta las alertas de cada estudiante, resuelve los textos de IA de todas
+    ellas con agente.llm.completar_lote y crea las AlertaEstudiante.
+
+    Se omiten los estudiantes cuya huella de datos coincide con la del último
+    análisis (salvo forzar=True) y las alertas que ya tienen una equivalente
+    abierta. Retorna el número de alertas generadas.
+    """
+    from agente.llm import completar_lote
+    from agente.models import ConfiguracionAgente, HuellaAnalisis
+
     config = ConfiguracionAgente.get()
     if not config.analisis_activo:
         return
 
     ciclo = config.ciclo_lectivo_activo or _ciclo_actual()
-    promedios = _obtener_promedios_por_materia(student)
-    total_clases, ausencias, pct_inasistencia = _calcular_porcentaje_inasistencia(student)
+    anteriores = dict(
+        HuellaAnalisis.objects
+        .filter(estudiante__in=estudiantes)
+        .values_list('estudiante_id', 'huella')
+    )
+
+    alertas = []
+    huellas = {}
+    for student in estudiantes:
+        datos = _datos_estudiante(student)
+        huella = _huella_datos(datos, config, ciclo)
+        if not forzar and anteriores.get(student.pk) == huella:
+            continue
+        huellas[student.pk] = huella
+        alertas.extend(_detectar_alertas(student, config, ciclo, datos))
+
+    abiertas = _alertas_abiertas(huellas.keys(), ciclo)
+    alertas = [
+        (prompt, campos) for prompt, campos in alertas
+        if _clave_alerta(campos) not in abiertas
+    ]
+
+    resultados = completar_lote([(SISTEMA_ALERTAS, prompt) for prompt, _campos in alertas])
+    creadas = [
+        alerta for alerta in (
+            _guardar_alerta(campos, resultado)
+            for (_prompt, campos), resultado in zip(alertas, resultados)
+        )
+        if alerta is not None
+    ]
+
+    _guardar_huellas(huellas, creadas, ciclo)
+
+    logger.info(
+        f'analizar_estudiantes: {len(estudiantes)} estudiantes, '
+        f'{len(estudiantes) - len(huellas)} sin cambios → {len(creadas)} alertas generadas'
+    )
+    return len(creadas)
+
+
+def _datos_estudiante(student):
+    """Promedios por materia e inasistencia: la entrada del análisis."""
+    return {
+        'promedios': _obtener_promedios_por_materia(student),
+        'inasistencia': _calcular_porcentaje_inasistencia(student),
+    }
+
+
+def _huella_datos(datos, config, ciclo):
+    """sha256 de los datos del estudiante, el ciclo y los umbrales configurados."""
+    contenido = {
+        # subject es opcional: las notas sin materia van al final
+        'promedios': sorted(
+            ((m['subject_id'], m['promedio']) for m in datos['promedios']),
+            key=lambda t: (t[0] is None, t[0] or 0, t[1]),
+        ),
+        'inasistencia': datos['inasistencia'][:2],
+        'ciclo': ciclo,
+        'umbrales': [float(config.umbral_nota_alerta), float(config.umbral_inasistencia_pct)],
+    }
+    return hashlib.sha256(json.dumps(contenido, sort_keys=True).encode()).hexdigest()
 
-    alertas_generadas = []
+
+def _clave_alerta(campos):
+    return (campos['estudiante'].pk, campos['tipo'], campos.get('materia_id'), campos['ciclo_lectivo'])
+
+
+def _alertas_abiertas(student_ids, ciclo):
+    """Claves (estudiante, tipo, materia, ciclo) de las alertas no resueltas."""
+    from agente.models import AlertaEstudiante
+
+    return set(
+        AlertaEstudiante.objects
+        .filter(estudiante_id__in=list(student_ids), ciclo_lectivo=ciclo)
+        .exclude(estado=AlertaEstudiante.Estado.RESUELTA)
+        .values_list('estudiante_id', 'tipo', 'materia_id', 'ciclo_lectivo')
+    )
+
+
+def _guardar_huellas(huellas, creadas, ciclo):
+    from agente.models import HuellaAnalisis
+
+    por_estudiante = {}
+    for alerta in creadas:
+        por_estudiante[alerta.estudiante_id] = por_estudiante.get(alerta.estudiante_id, 0) + 1
+
+    HuellaAnalisis.objects.bulk_create(
+        [
+            HuellaAnalisis(
+                estudiante_id=student_id,
+                huella=huella,
+                ciclo_lectivo=ciclo,
+                alertas_generadas=por_estudiante.get(student_id, 0),
+            )
+            for student_id, huella in huellas.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['estudiante'],
+        update_fields=['huella', 'ciclo_lectivo', 'alertas_generadas', 'fecha_analisis'],
+    )
+
+
+def _detectar_alertas(student, config, ciclo, datos=None):
+    """Lista de (prompt_usuario, campos_alerta) que corresponden al estudiante."""
+    datos = datos or _datos_estudiante(student)
+    promedios = datos['promedios']
+    total_clases, ausencias, pct_inasistencia = datos['inasistencia']
+
+    alertas = []
 
     # ── 1. Materias con nota baja ────────────────────────────────────────────
     materias_bajas = [
@@ -111,22 +243,16 @@ def analizar_estudiante(self, student_id: int):
     ]
 
     if len(materias_bajas) >= 3:
-        alerta = _crear_alerta_multiples_materias(student, materias_bajas, pct_inasistencia, ciclo)
-        alertas_generadas.append(alerta)
+        alertas.append(_alerta_multiples_materias(student, materias_bajas, pct_inasistencia, ciclo))
     else:
         for m in materias_bajas:
-            alerta = _crear_alerta_nota_baja(student, m, pct_inasistencia, ciclo)
-            alertas_generadas.append(alerta)
+            alertas.append(_alerta_nota_baja(student, m, pct_inasistencia, ciclo))
 
     # ── 2. Alta inasistencia ─────────────────────────────────────────────────
     if pct_inasistencia >= float(config.umbral_inasistencia_pct):
-        alerta = _crear_alerta_inasistencia(student, total_clases, ausencias, pct_inasistencia, ciclo)
-        alertas_generadas.append(alerta)
+        alertas.append(_alerta_inasistencia(student, total_clases, ausencias, pct_inasistencia, ciclo))
 
-    logger.info(
-        f'analizar_estudiante: {student} → {len(alertas_generadas)} alertas generadas'
-    )
-    return len(alertas_generadas)
+    return alertas
 
 
 def _contexto_estudiante_texto(student, materias_bajas, pct_inasistencia):
@@ -147,29 +273,9 @@ def _contexto_estudiante_texto(student, materias_bajas, pct_inasistencia):
 
 
 def _llamar_agente(prompt_sistema: str, prompt_usuario: str) -> dict:
-    """Llama a GPT-4o y retorna {analisis, recomendaciones, mensaje_docente, mensaje_representante}."""
-    try:
-        client = _get_openai_client()
-        response = client.chat.completions.create(
-            model='gpt-4o',
-            messages=[
-                {'role': 'system', 'content': prompt_sistema},
-                {'role': 'user', 'content': prompt_usuario},
-            ],
-            response_format={'type': 'json_object'},
-            temperature=0.4,
-            max_tokens=1500,
-        )
-        import json
-        return json.loads(response.choices[0].message.content)
-    except Exception as e:
-        logger.error(f'_llamar_agente error: {e}')
-        return {
-            'analisis': 'Análisis no disponible (error de IA).',
-            'recomendaciones': '',
-            'mensaje_docente': '',
-            'mensaje_representante': '',
-        }
+    """Llama al modelo (con caché) y retorna {analisis, recomendaciones, mensaje_docente, mensaje_representante}."""
+    from agente.llm import completar
+    return completar(prompt_sistema, prompt_usuario)
 
 
 SISTEMA_ALERTAS = """
@@ -186,7 +292,7 @@ Responde SIEMPRE en JSON con las claves:
 """
 
 
-def _crear_alerta_nota_baja(student, materia_data, pct_inasistencia, ciclo):
+def _alerta_nota_baja(student, materia_data, pct_inasistencia, ciclo):
     from agente.models import AlertaEstudiante
 
     contexto = _contexto_estudiante_texto(student, [materia_data], pct_inasistencia)
@@ -199,34 +305,22 @@ def _crear_alerta_nota_baja(student, materia_data, pct_inasistencia, ciclo):
         else AlertaEstudiante.Severidad.MEDIA
     )
 
-    resultado = _llamar_agente(
-        SISTEMA_ALERTAS,
+    prompt = (
         f'El siguiente estudiante presenta calificación baja ({nivel}) en la materia '
-        f'"{materia_data["materia"]}" con promedio {promedio}.\n\n{contexto}',
+        f'"{materia_data["materia"]}" con promedio {promedio}.\n\n{contexto}'
     )
-
-    from subjects.models import Subject
-    try:
-        materia_obj = Subject.objects.get(pk=materia_data['subject_id'])
-    except Subject.DoesNotExist:
-        materia_obj = None
-
-    return AlertaEstudiante.objects.create(
+    return prompt, dict(
         estudiante=student,
         tipo=AlertaEstudiante.TipoAlerta.CALIFICACION_BAJA,
         severidad=severidad,
-        materia=materia_obj,
+        materia_id=materia_data['subject_id'],
         promedio_detectado=promedio,
         porcentaje_inasistencia=pct_inasistencia,
-        analisis_ia=resultado.get('analisis', ''),
-        recomendaciones_ia=resultado.get('recomendaciones', ''),
-        mensaje_docente=resultado.get('mensaje_docente', ''),
-        mensaje_representante=resultado.get('mensaje_representante', ''),
         ciclo_lectivo=ciclo,
     )
 
 
-def _crear_alerta_multiples_materias(student, materias_bajas, pct_inasistencia, ciclo):
+def _alerta_multiples_materias(student, materias_bajas, pct_inasistencia, ciclo):
     from agente.models import AlertaEstudiante
 
     contexto = _contexto_estudiante_texto(student, materias_bajas, pct_inasistencia)
@@ -234,27 +328,21 @@ def _crear_alerta_multiples_materias(student, materias_bajas, pct_inasistencia,
         sum(m['promedio'] for m in materias_bajas if m['promedio']) / len(materias_bajas), 2
     )
 
-    resultado = _llamar_agente(
-        SISTEMA_ALERTAS,
+    prompt = (
         f'El estudiante presenta bajo rendimiento en {len(materias_bajas)} materias simultáneamente. '
-        f'Promedio general afectado: {promedio_general}.\n\n{contexto}',
+        f'Promedio general afectado: {promedio_general}.\n\n{contexto}'
     )
-
-    return AlertaEstudiante.objects.create(
+    return prompt, dict(
         estudiante=student,
         tipo=AlertaEstudiante.TipoAlerta.MULTIPLES_MATERIAS,
         severidad=AlertaEstudiante.Severidad.CRITICA,
         promedio_detectado=promedio_general,
         porcentaje_inasistencia=pct_inasistencia,
-        analisis_ia=resultado.get('analisis', ''),
-        recomendaciones_ia=resultado.get('recomendaciones', ''),
-        mensaje_docente=resultado.get('mensaje_docente', ''),
-        mensaje_representante=resultado.get('mensaje_representante', ''),
         ciclo_lectivo=ciclo,
     )
 
 
-def _crear_alerta_inasistencia(student, total, ausencias, pct, ciclo):
+def _alerta_inasistencia(student, total, ausencias, pct, ciclo):
     from agente.models import AlertaEstudiante
 
     contexto = _contexto_estudiante_texto(student, [], pct)
@@ -264,32 +352,47 @@ def _crear_alerta_inasistencia(student, total, ausencias, pct, ciclo):
         else AlertaEstudiante.Severidad.MEDIA
     )
 
-    resultado = _llamar_agente(
-        SISTEMA_ALERTAS,
+    prompt = (
         f'El estudiante tiene {ausencias} ausencias de {total} clases ({pct}% de inasistencia). '
-        f'Esto supera el umbral permitido por el reglamento del conservatorio.\n\n{contexto}',
+        f'Esto supera el umbral permitido por el reglamento del conservatorio.\n\n{contexto}'
     )
-
-    return AlertaEstudiante.objects.create(
+    return prompt, dict(
         estudiante=student,
         tipo=AlertaEstudiante.TipoAlerta.INASISTENCIA,
         severidad=severidad,
         porcentaje_inasistencia=pct,
-        analisis_ia=resultado.get('analisis', ''),
-        recomendaciones_ia=resultado.get('recomendaciones', ''),
-        mensaje_docente=resultado.get('mensaje_docente', ''),
-        mensaje_representante=resultado.get('mensaje_representante', ''),
         ciclo_lectivo=ciclo,
     )
 
 
+def _guardar_alerta(campos, resultado):
+    """Crea la alerta; None si otra ejecución ya abrió una equivalente."""
+    from agente.models import AlertaEstudiante
+
+    try:
+        with transaction.atomic():
+            return AlertaEstudiante.objects.create(
+                analisis_ia=resultado.get('analisis', ''),
+                recomendaciones_ia=resultado.get('recomendaciones', ''),
+                mensaje_docente=resultado.get('mensaje_docente', ''),
+                mensaje_representante=resultado.get('mensaje_representante', ''),
+                **campos,
+            )
+    except IntegrityError:
+        logger.info(f'_guardar_alerta: alerta abierta duplicada omitida {_clave_alerta(campos)}')
+        return None
+
+
 # ─── ANÁLISIS SEMANAL MASIVO ─────────────────────────────────────────────────
 
+TAMANO_LOTE_SEMANAL = 25
+
+
 @shared_task
 def analizar_rendimiento_semanal():
     """
     Tarea periódica: analiza todos los estudiantes activos.
-    Encola una tarea individual por estudiante.
+    Encola una tarea por bloque de TAMANO_LOTE_SEMANAL estudiantes.
     """
     from students.models import Student
     from agente.models import ConfiguracionAgente
@@ -299,12 +402,11 @@ def analizar_rendimiento_semanal():
         logger.info('analizar_rendimiento_semanal: agente desactivado')
         return
 
-    estudiantes = Student.objects.select_related('usuario').all()
-    total = 0
-    for student in estudiantes:
-        analizar_estudiante.delay(student.pk)
-        total += 1
+    student_ids = list(Student.objects.values_list('pk', flat=True))
+    for i in range(0, len(student_ids), TAMANO_LOTE_SEMANAL):
+        analizar_estudiantes_lote.delay(student_ids[i:i + TAMANO_LOTE_SEMANAL])
 
+    total = len(student_ids)
     logger.info(f'analizar_rendimiento_semanal: {total} estudiantes encolados')
     return total
 
@@ -1,3 +1,104 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 
-# Create your tests here.
+from agente import llm
+
+
+@override_settings(AGENTE_LLM_BACKEND='fake')
+class LLMCacheLoteTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        llm.FakeBackend.llamadas = 0
+
+    def test_completar_usa_cache_por_contenido(self):
+        primera = llm.completar('Sistema', 'Estudiante: Ana\nPromedio 5')
+        # Espacios distintos, mismo contenido normalizado
+        segunda = llm.completar('Sistema', 'Estudiante:   Ana\n Promedio 5 ')
+        self.assertEqual(primera, segunda)
+        self.assertEqual(llm.FakeBackend.llamadas, 1)
+
+    def test_lote_agrupa_deduplica_y_conserva_orden(self):
+        peticiones = [('Sistema', f'Estudiante {i}') for i in range(7)] + [('Sistema', 'Estudiante 0')]
+        resultados = llm.completar_lote(peticiones, tamano_grupo=5, concurrencia=2)
+        self.assertEqual(len(resultados), 8)
+        self.assertEqual(resultados[3]['analisis'], '[simulado] Estudiante 3')
+        self.assertEqual(resultados[7], resultados[0])
+        # 7 prompts distintos en grupos de 5 → 2 llamadas
+        self.assertEqual(llm.FakeBackend.llamadas, 2)
+
+        llm.completar_lote(peticiones)
+        self.assertEqual(llm.FakeBackend.llamadas, 2)
+
+    def test_error_de_backend_no_se_cachea(self):
+        class BackendRoto:
+            def completar(self, *args, **kwargs):
+                raise RuntimeError('sin red')
+
+        resultado = llm.completar('Sistema', 'Estudiante', backend=BackendRoto())
+        self.assertEqual(resultado, llm.RESPUESTA_ERROR)
+        self.assertEqual(llm.completar('Sistema', 'Estudiante')['analisis'], '[simulado] Estudiante')
+
+
+@override_settings(AGENTE_LLM_BACKEND='fake')
+class AnalisisEstudianteTests(TestCase):
+    def setUp(self):
+        from unittest.mock import patch
+        from classes.factories import EnrollmentFactory
+        from classes.models import CalificacionParcial, TipoAporte
+        from students.models import Student
+        cache.clear()
+        enrollment = EnrollmentFactory()
+        self.student, _ = Student.objects.get_or_create(usuario=enrollment.estudiante)
+        tipo = TipoAporte.objects.create(nombre='Lección', codigo='AGT_LEC', peso=1)
+        with patch('utils.notifications.NotificacionWhatsApp'):
+            CalificacionParcial.objects.create(
+                student=self.student, subject=enrollment.clase.subject, parcial='1P',
+                quimestre='Q1', tipo_aporte=tipo, calificacion=4,
+            )
+
+    def test_genera_alerta_de_nota_baja(self):
+        from agente.models import AlertaEstudiante
+        from agente.tasks import analizar_estudiante
+        self.assertEqual(analizar_estudiante(self.student.pk), 1)
+        alerta = AlertaEstudiante.objects.get(estudiante=self.student)
+        self.assertEqual(alerta.tipo, AlertaEstudiante.TipoAlerta.CALIFICACION_BAJA)
+        self.assertTrue(alerta.analisis_ia.startswith('[simulado]'))
+
+    def test_estudiante_sin_cambios_se_omite(self):
+        from agente.models import AlertaEstudiante, HuellaAnalisis
+        from agente.tasks import analizar_estudiante
+        self.assertEqual(analizar_estudiante(self.student.pk), 1)
+        llamadas = llm.FakeBackend.llamadas
+
+        self.assertEqual(analizar_estudiante(self.student.pk), 0)
+        self.assertEqual(llm.FakeBackend.llamadas, llamadas)
+        self.assertEqual(HuellaAnalisis.objects.get(estudiante=self.student).alertas_generadas, 1)
+
+        # Forzado: se reanaliza, pero la alerta abierta no se duplica
+        cache.clear()
+        self.assertEqual(analizar_estudiante(self.student.pk, forzar=True), 0)
+        self.assertEqual(AlertaEstudiante.objects.filter(estudiante=self.student).count(), 1)
+
+    def test_huella_con_notas_sin_materia(self):
+        from types import SimpleNamespace
+        from agente.tasks import _huella_datos
+        config = SimpleNamespace(umbral_nota_alerta=7, umbral_inasistencia_pct=20)
+        promedios = [{'subject_id': None, 'promedio': 6.0}, {'subject_id': 3, 'promedio': 8.0}]
+        datos = {'promedios': promedios, 'inasistencia': (10, 1, 10.0)}
+        huella = _huella_datos(datos, config, '2025-2026')
+        datos['promedios'] = promedios[::-1]
+        self.assertEqual(_huella_datos(datos, config, '2025-2026'), huella)
+
+    def test_restriccion_una_alerta_abierta(self):
+        from django.db import IntegrityError, transaction
+        from agente.models import AlertaEstudiante
+        campos = dict(
+            estudiante=self.student, tipo=AlertaEstudiante.TipoAlerta.INASISTENCIA,
+            ciclo_lectivo='2025-2026',
+        )
+        primera = AlertaEstudiante.objects.create(**campos)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            AlertaEstudiante.objects.create(**campos)
+        primera.estado = AlertaEstudiante.Estado.RESUELTA
+        primera.save()
+        AlertaEstudiante.objects.create(**campos)
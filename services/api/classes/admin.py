@@ -17,7 +17,9 @@ from .models import (
     GradeLevel, MallaCurricular,
     Clase, Enrollment, Horario,
     TipoAporte, CalificacionParcial, Asistencia,
-    Activity, Deber, DeberEntrega, PromedioCache,
+    Activity, Deber, DeberEntrega, PromedioCache, EstadisticaAsistenciaClase,
+    RegistroEliminado, CierreCicloLectivo, ResumenAnualMateria,
+    EtlEjecucion, EtlEtapa,
 )
 from subjects.models import Subject
 
@@ -832,3 +834,64 @@ class PromedioCacheAdmin(admin.ModelAdmin):
         n = queryset.count()
         queryset.delete()
         self.message_user(request, f'{n} entrada(s) de caché eliminadas.')
+
+
+@admin.register(EstadisticaAsistenciaClase)
+class EstadisticaAsistenciaClaseAdmin(admin.ModelAdmin):
+    list_display  = ['clase', 'total', 'presentes', 'ausentes', 'justificados', 'tasa', 'actualizado']
+    list_filter   = ['clase__grade_level__ciclo', 'clase__subject']
+    search_fields = ['clase__name', 'clase__subject__name']
+    readonly_fields = ['clase', 'total', 'presentes', 'ausentes', 'justificados', 'tasa', 'actualizado']
+
+    def has_add_permission(self, request):
+        return False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('clase__subject')
+
+
+@admin.register(RegistroEliminado)
+class RegistroEliminadoAdmin(admin.ModelAdmin):
+    list_display  = ['modelo', 'objeto_id', 'ambito', 'eliminado']
+    list_filter   = ['modelo']
+    date_hierarchy = 'eliminado'
+    readonly_fields = ['modelo', 'objeto_id', 'ambito', 'eliminado']
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(CierreCicloLectivo)
+class CierreCicloLectivoAdmin(admin.ModelAdmin):
+    list_display  = ['ciclo_lectivo', 'cerrado_en', 'cerrado_por', 'directorio']
+    readonly_fields = ['ciclo_lectivo', 'cerrado_en', 'cerrado_por', 'directorio', 'conteos']
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(ResumenAnualMateria)
+class ResumenAnualMateriaAdmin(admin.ModelAdmin):
+    list_display  = ['student', 'subject', 'ciclo_lectivo', 'promedio_q1', 'promedio_q2', 'promedio_anual', 'ausencias']
+    list_filter   = ['ciclo_lectivo']
+    search_fields = ['student__usuario__nombre', 'subject__name']
+    list_select_related = ['student__usuario', 'subject']
+
+
+class EtlEtapaInline(admin.TabularInline):
+    model = EtlEtapa
+    extra = 0
+    can_delete = False
+    fields = ['nombre', 'estado', 'inicio', 'segundos', 'conteos', 'error']
+    readonly_fields = fields
+
+
+@admin.register(EtlEjecucion)
+class EtlEjecucionAdmin(admin.ModelAdmin):
+    list_display  = ['id', 'ciclo_lectivo', 'fuente', 'iniciada', 'finalizada']
+    list_filter   = ['ciclo_lectivo']
+    readonly_fields = ['fuente', 'ciclo_lectivo', 'firma', 'iniciada', 'finalizada']
+    inlines = [EtlEtapaInline]
+
+    def has_add_permission(self, request):
+        return False
@@ -1,3 +1,4 @@
+from django.db.models import Case, Count, Max, Q, When
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -9,15 +10,19 @@ from classes.serializers import (
     ClaseSerializer, EnrollmentSerializer, TipoAporteSerializer,
     CalificacionParcialSerializer, AsistenciaSerializer,
     DeberSerializer, DeberEntregaSerializer, ActivitySerializer,
+    DeberEstudianteSerializer,
 )
+from classes.deberes import ENTREGADO, resumen_deberes_estudiante
+from users.models import Usuario
+from utils.api import ConsultaOptimizadaMixin, SincronizacionMixin
 
 
-class ClaseViewSet(viewsets.ReadOnlyModelViewSet):
+class ClaseViewSet(ConsultaOptimizadaMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Clase.objects.all().select_related('subject', 'docente_base', 'grade_level')
     serializer_class = ClaseSerializer
 
 
-class EnrollmentViewSet(viewsets.ReadOnlyModelViewSet):
+class EnrollmentViewSet(ConsultaOptimizadaMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Enrollment.objects.all().select_related('estudiante', 'clase', 'docente')
     serializer_class = EnrollmentSerializer
 
@@ -32,9 +37,10 @@ class EnrollmentViewSet(viewsets.ReadOnlyModelViewSet):
         return qs
 
 
-class TipoAporteViewSet(viewsets.ModelViewSet):
+class TipoAporteViewSet(ConsultaOptimizadaMixin, viewsets.ModelViewSet):
     queryset = TipoAporte.objects.filter(activo=True).order_by('orden', 'nombre')
     serializer_class = TipoAporteSerializer
+    cursor_ordering = ('orden', 'pk')
 
     def get_permissions(self):
         if self.action in ('list', 'retrieve'):
@@ -42,7 +48,7 @@ class TipoAporteViewSet(viewsets.ModelViewSet):
         return [permissions.IsAdminUser()]
 
 
-class CalificacionParcialViewSet(viewsets.ModelViewSet):
+class CalificacionParcialViewSet(SincronizacionMixin, ConsultaOptimizadaMixin, viewsets.ModelViewSet):
     serializer_class = CalificacionParcialSerializer
 
     def get_queryset(self):
@@ -61,8 +67,12 @@ class CalificacionParcialViewSet(viewsets.ModelViewSet):
             qs = qs.filter(quimestre=quimestre)
         return qs
 
+    def ambito_eliminados(self):
+        student = self.request.query_params.get('student')
+        return [student] if student else None
+
 
-class AsistenciaViewSet(viewsets.ModelViewSet):
+class AsistenciaViewSet(SincronizacionMixin, ConsultaOptimizadaMixin, viewsets.ModelViewSet):
     serializer_class = AsistenciaSerializer
 
     def get_queryset(self):
@@ -78,8 +88,17 @@ class AsistenciaViewSet(viewsets.ModelViewSet):
             qs = qs.filter(fecha=fecha)
         return qs
 
+    def ambito_eliminados(self):
+        student = self.request.query_params.get('student')
+        inscripcion = self.request.query_params.get('inscripcion')
+        if inscripcion:
+            return [inscripcion]
+        if student:
+            return Enrollment.objects.filter(estudiante_id=student).values('pk')
+        return None
+
 
-class ActivityViewSet(viewsets.ModelViewSet):
+class ActivityViewSet(ConsultaOptimizadaMixin, viewsets.ModelViewSet):
     serializer_class = ActivitySerializer
 
     def get_queryset(self):
@@ -96,11 +115,22 @@ class ActivityViewSet(viewsets.ModelViewSet):
         return qs
 
 
-class DeberViewSet(viewsets.ModelViewSet):
+class DeberViewSet(SincronizacionMixin, ConsultaOptimizadaMixin, viewsets.ModelViewSet):
     serializer_class = DeberSerializer
 
     def get_queryset(self):
-        qs = Deber.objects.select_related('teacher', 'clase')
+        qs = Deber.objects.select_related('teacher', 'clase').annotate(
+            n_entregas=Count('entregas', filter=Q(entregas__estado__in=ENTREGADO), distinct=True),
+            # Igual que Deber.total_estudiantes: sin clase cuentan los estudiantes específicos
+            n_estudiantes=Case(
+                When(clase__isnull=True, then=Count('estudiantes_especificos', distinct=True)),
+                default=Count(
+                    'clase__enrollments',
+                    filter=Q(clase__enrollments__estado=Enrollment.Estado.ACTIVO),
+                    distinct=True,
+                ),
+            ),
+        )
         clase = self.request.query_params.get('clase')
         estado = self.request.query_params.get('estado')
         teacher = self.request.query_params.get('teacher')
@@ -112,6 +142,17 @@ class DeberViewSet(viewsets.ModelViewSet):
             qs = qs.filter(teacher_id=teacher)
         return qs
 
+    def ambito_eliminados(self):
+        clase = self.request.query_params.get('clase')
+        return [clase] if clase else None
+
+    def firma_extra(self, queryset):
+        # Los conteos anotados dependen de las entregas
+        entregas = DeberEntrega.objects.filter(deber__in=queryset.values('pk')).aggregate(
+            ultimo=Max('fecha_actualizacion'), total=Count('pk'),
+        )
+        return entregas['ultimo'], entregas['total']
+
     @action(detail=True, methods=['get'], url_path='entregas')
     def entregas(self, request, pk=None):
         deber = self.get_object()
@@ -119,8 +160,32 @@ class DeberViewSet(viewsets.ModelViewSet):
         serializer = DeberEntregaSerializer(entregas, many=True)
         return Response(serializer.data)
 
-
-class DeberEntregaViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['get'], url_path='resumen-estudiante')
+    def resumen_estudiante(self, request):
+        """
+        Deberes del estudiante agrupados por estado y promedios por materia.
+        Sin ?estudiante=<usuario_id> usa el usuario autenticado.
+        """
+        estudiante = request.query_params.get('estudiante')
+        if estudiante:
+            usuario = Usuario.objects.filter(pk=estudiante).first()
+        else:
+            usuario = getattr(request.user, 'usuario', None)
+        if usuario is None:
+            return Response({'detail': 'Estudiante no encontrado.'}, status=status.HTTP_404_NOT_FOUND)
+
+        resumen = resumen_deberes_estudiante(usuario)
+        data = {
+            clave: DeberEstudianteSerializer(resumen[clave], many=True).data
+            for clave in ('pendientes', 'proximos', 'vencidos', 'entregados')
+        }
+        data['totales'] = {clave: len(data[clave]) for clave in ('pendientes', 'proximos', 'vencidos', 'entregados')}
+        data['promedio_general'] = resumen['promedio_general']
+        data['promedios_materias'] = resumen['promedios_materias']
+        return Response(data)
+
+
+class DeberEntregaViewSet(ConsultaOptimizadaMixin, viewsets.ModelViewSet):
     serializer_class = DeberEntregaSerializer
 
     def get_queryset(self):
@@ -7,4 +7,6 @@ class ClassesConfig(AppConfig):
     verbose_name = '🎓 Clases y Evaluación'
 
     def ready(self):
-        import classes.signals  # noqa: F401 — registra señales
\ No newline at end of file
+        import classes.signals  # noqa: F401 — registra señales
+        from utils.cache import conectar_invalidaciones
+        conectar_invalidaciones()
\ No newline at end of file
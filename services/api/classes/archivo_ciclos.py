@@ -0,0 +1,374 @@
+"""
+Cierre y archivo de ciclos lectivos (almacenamiento en frío).
+
+cerrar_ciclo(ciclo) deja en las tablas de producción solo el año activo:
+  1. Congela los promedios finales (Q1, Q2, anual, general) y los totales de
+     asistencia en ResumenAnualMateria.
+  2. Exporta el detalle del ciclo (calificaciones, asistencias y sus
+     justificaciones, actividades, envíos de WhatsApp y alertas) a archivos
+     JSON Lines comprimidos con gzip en ARCHIVO_CICLOS_DIR/<ciclo>/<clave>.jsonl.gz.
+     Las calificaciones se escriben por estudiante: un miembro gzip por
+     estudiante y un índice <clave>.indice.json con su posición en el archivo.
+  3. Borra ese detalle por conjuntos (sin señales por fila), registra los
+     tombstones de la sincronización móvil y refresca la caché de promedios.
+
+Lectura histórica: libreta_historica(student_id, ciclo) arma la libreta desde
+el resumen y el archivo, cacheada (solo descomprime las filas del estudiante);
+leer_archivo(ciclo, clave) recorre todas las filas.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+from collections import defaultdict
+from decimal import Decimal
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Count, Q
+
+from utils.cache import clave as clave_cache, invalidar_dominio
+
+logger = logging.getLogger(__name__)
+
+# (clave del archivo, modelo, lookup del ciclo lectivo). El orden es el de
+# borrado: las justificaciones antes que las asistencias que referencian.
+ARCHIVABLES = [
+    ('calificaciones', 'classes.CalificacionParcial', 'ciclo_lectivo'),
+    ('justificaciones', 'classes.JustificacionAusencia', 'asistencia__inscripcion__clase__ciclo_lectivo'),
+    ('asistencias', 'classes.Asistencia', 'inscripcion__clase__ciclo_lectivo'),
+    ('actividades', 'classes.Activity', 'clase__ciclo_lectivo'),
+    ('envios_whatsapp', 'informes.RegistroEnvioWhatsapp', 'ciclo_lectivo'),
+    ('alertas', 'agente.AlertaEstudiante', 'ciclo_lectivo'),
+]
+
+# Archivos con un miembro gzip por valor de este campo y su índice de posiciones
+INDEXADOS = {'calificaciones': 'student_id'}
+
+TAMANO_LOTE = 1000
+LIBRETA_HISTORICA_TTL = 60 * 60 * 24 * 7
+
+
+def directorio_ciclo(ciclo):
+    if not re.fullmatch(r'[\w\-]+', ciclo):
+        raise ValueError(f'Ciclo lectivo inválido: {ciclo!r}')
+    return Path(settings.ARCHIVO_CICLOS_DIR) / ciclo
+
+
+def _consulta(modelo, lookup, ciclo):
+    qs = modelo.objects.filter(**{lookup: ciclo})
+    if modelo._meta.label == 'classes.Activity':
+        # InformeAsistido (app agente) cuelga de la actividad con CASCADE: esas
+        # actividades se conservan para no perder los informes.
+        qs = qs.filter(informe_asistido__isnull=True)
+    return qs.order_by('pk')
+
+
+def _ruta_indice(ruta):
+    return ruta.with_name(ruta.name.replace('.jsonl.gz', '.indice.json'))
+
+
+def _linea(fila):
+    return json.dumps(fila, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def _exportar(qs, ruta):
+    """Escribe las filas en JSON Lines + gzip (archivo temporal y rename). Retorna los ids."""
+    campos = [f.attname for f in qs.model._meta.concrete_fields]
+    ids = []
+    temporal = ruta.with_name(ruta.name + '.tmp')
+    with gzip.open(temporal, 'wt', encoding='utf-8') as salida:
+        for fila in qs.values(*campos).iterator(chunk_size=2000):
+            salida.write(_linea(fila))
+            ids.append(fila['id'])
+    os.replace(temporal, ruta)
+    return ids
+
+
+def _exportar_indexado(qs, ruta, campo):
+    """
+    Como _exportar, pero agrupado por `campo`: cada grupo es un miembro gzip
+    independiente y el índice guarda {valor: [inicio, longitud]} en bytes. El
+    archivo sigue siendo un gzip válido que leer_archivo recorre completo.
+    """
+    campos = [f.attname for f in qs.model._meta.concrete_fields]
+    ids = []
+    indice = {}
+    temporal = ruta.with_name(ruta.name + '.tmp')
+
+    with open(temporal, 'wb') as salida:
+        def escribir(valor, lineas):
+            inicio = salida.tell()
+            salida.write(gzip.compress(''.join(lineas).encode('utf-8')))
+            indice[str(valor)] = [inicio, salida.tell() - inicio]
+
+        actual, lineas = None, []
+        for fila in qs.order_by(campo, 'pk').values(*campos).iterator(chunk_size=2000):
+            if lineas and fila[campo] != actual:
+                escribir(actual, lineas)
+                lineas = []
+            actual = fila[campo]
+            lineas.append(_linea(fila))
+            ids.append(fila['id'])
+        if lineas:
+            escribir(actual, lineas)
+
+    _ruta_indice(ruta).write_text(json.dumps(indice), encoding='utf-8')
+    os.replace(temporal, ruta)
+    return ids
+
+
+def _borrar(modelo, ids):
+    """
+    DELETE por lotes de ids sin pasar por el Collector: evita las señales por
+    fila (p. ej. el recálculo de PromedioCache de CalificacionParcial), que
+    se reemplazan por un refresco en bloque al final del cierre.
+    """
+    for i in range(0, len(ids), TAMANO_LOTE):
+        lote = modelo.objects.filter(pk__in=ids[i:i + TAMANO_LOTE])
+        lote._raw_delete(lote.db)
+
+
+def resumir_ciclo(ciclo):
+    """Filas de ResumenAnualMateria del ciclo (sin guardar) a partir de las tablas vivas."""
+    from classes.estadisticas import promedios_anuales, promedios_generales, promedios_parciales, promedios_quimestre
+    from classes.models import Asistencia, ResumenAnualMateria
+    from students.models import Student
+
+    quimestres = promedios_quimestre(promedios_parciales(ciclo_lectivo=ciclo))
+    anuales = promedios_anuales(quimestres)
+    generales = promedios_generales(quimestres)
+
+    conteos = (
+        Asistencia.objects.filter(inscripcion__clase__ciclo_lectivo=ciclo)
+        .order_by()
+        .values('inscripcion__estudiante_id', 'inscripcion__clase__subject_id')
+        .annotate(
+            total=Count('id'),
+            ausentes=Count('id', filter=Q(estado=Asistencia.Estado.AUSENTE)),
+            justificados=Count('id', filter=Q(estado=Asistencia.Estado.JUSTIFICADO)),
+        )
+    )
+    conteos = list(conteos)
+    student_por_usuario = dict(
+        Student.objects
+        .filter(usuario_id__in={c['inscripcion__estudiante_id'] for c in conteos})
+        .values_list('usuario_id', 'id')
+    )
+
+    filas = {}
+
+    def fila(student_id, subject_id):
+        if (student_id, subject_id) not in filas:
+            filas[(student_id, subject_id)] = ResumenAnualMateria(
+                student_id=student_id, subject_id=subject_id, ciclo_lectivo=ciclo,
+            )
+        return filas[(student_id, subject_id)]
+
+    for (student_id, subject_id, quimestre), prom in quimestres.items():
+        if quimestre in ('Q1', 'Q2'):
+            setattr(fila(student_id, subject_id), f'promedio_{quimestre.lower()}', prom)
+    for (student_id, subject_id), prom in anuales.items():
+        fila(student_id, subject_id).promedio_anual = Decimal(str(round(prom, 2)))
+    for student_id, prom in generales.items():
+        fila(student_id, None).promedio_anual = prom
+
+    for c in conteos:
+        student_id = student_por_usuario.get(c['inscripcion__estudiante_id'])
+        if student_id is None:
+            continue
+        for resumen in (fila(student_id, c['inscripcion__clase__subject_id']), fila(student_id, None)):
+            resumen.asistencias_total += c['total']
+            resumen.ausencias += c['ausentes']
+            resumen.justificados += c['justificados']
+    return list(filas.values())
+
+
+def cerrar_ciclo(ciclo, usuario=None, forzar=False):
+    """
+    Cierra y archiva un ciclo lectivo. Retorna el CierreCicloLectivo creado.
+
+    Rechaza el año lectivo activo (ConfiguracionInstitucion.anio_lectivo) salvo
+    con forzar=True, y los ciclos ya cerrados.
+    """
+    from classes import particiones
+    from classes.estadisticas import invalidar_estadisticas_anuales, invalidar_libreta, refrescar_promedios
+    from classes.models import CierreCicloLectivo, RegistroEliminado, ResumenAnualMateria
+    from classes.signals import MODELOS_SINCRONIZADOS
+    from setup.models import ConfiguracionInstitucion
+
+    directorio = directorio_ciclo(ciclo)
+    if CierreCicloLectivo.objects.filter(ciclo_lectivo=ciclo).exists():
+        raise ValueError(f'El ciclo {ciclo} ya está cerrado.')
+    if ciclo == ConfiguracionInstitucion.get().anio_lectivo and not forzar:
+        raise ValueError(f'{ciclo} es el año lectivo activo; use forzar para cerrarlo.')
+
+    directorio.mkdir(parents=True, exist_ok=True)
+    with transaction.atomic():
+        resumenes = resumir_ciclo(ciclo)
+        ResumenAnualMateria.objects.filter(ciclo_lectivo=ciclo).delete()
+        ResumenAnualMateria.objects.bulk_create(resumenes, batch_size=500)
+
+        exportados = {}
+        for clave, etiqueta, lookup in ARCHIVABLES:
+            modelo = apps.get_model(etiqueta)
+            qs, ruta = _consulta(modelo, lookup, ciclo), directorio / f'{clave}.jsonl.gz'
+            if clave in INDEXADOS:
+                ids = _exportar_indexado(qs, ruta, INDEXADOS[clave])
+            else:
+                ids = _exportar(qs, ruta)
+            exportados[clave] = (modelo, ids)
+
+        for clave, (modelo, ids) in exportados.items():
+            etiqueta = modelo._meta.label
+            if etiqueta in MODELOS_SINCRONIZADOS:
+                for i in range(0, len(ids), TAMANO_LOTE):
+                    ambitos = modelo.objects.filter(pk__in=ids[i:i + TAMANO_LOTE]).values_list(
+                        'pk', MODELOS_SINCRONIZADOS[etiqueta],
+                    )
+                    RegistroEliminado.objects.bulk_create(
+                        [RegistroEliminado(modelo=etiqueta, objeto_id=pk, ambito=ambito) for pk, ambito in ambitos],
+                        batch_size=TAMANO_LOTE,
+                    )
+            _borrar(modelo, ids)
+
+        student_ids = {r.student_id for r in resumenes}
+        refrescar_promedios(student_ids=student_ids)
+        particiones.eliminar_particion(ciclo)
+
+        cierre = CierreCicloLectivo.objects.create(
+            ciclo_lectivo=ciclo,
+            cerrado_por=usuario,
+            directorio=str(directorio),
+            conteos={clave: len(ids) for clave, (_modelo, ids) in exportados.items()},
+        )
+
+        def invalidar_caches():
+            invalidar_libreta(*student_ids)
+            invalidar_estadisticas_anuales(ciclo)
+            invalidar_dominio('dashboards')
+        transaction.on_commit(invalidar_caches)
+
+    logger.info('cerrar_ciclo %s: %s', ciclo, cierre.conteos)
+    return cierre
+
+
+# ── Lectura histórica ────────────────────────────────────────────────────────
+
+def leer_archivo(ciclo, clave):
+    """Itera las filas (dicts) archivadas de un modelo del ciclo; vacío si no hay archivo."""
+    ruta = directorio_ciclo(ciclo) / f'{clave}.jsonl.gz'
+    if not ruta.exists():
+        return
+    with gzip.open(ruta, 'rt', encoding='utf-8') as entrada:
+        for linea in entrada:
+            yield json.loads(linea)
+
+
+def leer_archivo_de(ciclo, clave, valor):
+    """
+    Filas archivadas de un solo valor del campo indexado (p. ej. un estudiante):
+    lee y descomprime solo su miembro gzip. Los archivos sin índice (cierres
+    anteriores) se recorren completos.
+    """
+    ruta = directorio_ciclo(ciclo) / f'{clave}.jsonl.gz'
+    indice = _ruta_indice(ruta)
+    if not indice.exists():
+        campo = INDEXADOS[clave]
+        return [f for f in leer_archivo(ciclo, clave) if f[campo] == valor]
+    posicion = json.loads(indice.read_text(encoding='utf-8')).get(str(valor))
+    if posicion is None:
+        return []
+    inicio, longitud = posicion
+    with open(ruta, 'rb') as entrada:
+        entrada.seek(inicio)
+        datos = gzip.decompress(entrada.read(longitud)).decode('utf-8')
+    return [json.loads(linea) for linea in datos.splitlines()]
+
+
+def calcular_libreta_historica(student, ciclo):
+    """Libreta de un ciclo cerrado con el mismo formato que calcular_libreta."""
+    from classes.models import ResumenAnualMateria, TipoAporte
+    from subjects.models import Subject
+
+    resumenes = list(
+        ResumenAnualMateria.objects.filter(student=student, ciclo_lectivo=ciclo).select_related('subject')
+    )
+    detalle = leer_archivo_de(ciclo, 'calificaciones', student.id)
+    if not resumenes and not detalle:
+        return None
+
+    nombres = dict(Subject.objects.filter(pk__in={f['subject_id'] for f in detalle}).values_list('id', 'name'))
+    tipos = dict(TipoAporte.objects.values_list('id', 'nombre'))
+    materias = defaultdict(list)
+    for f in sorted(detalle, key=lambda f: (nombres.get(f['subject_id'], ''), f['quimestre'], f['parcial'])):
+        materias[nombres.get(f['subject_id'], 'Sin materia')].append({
+            'id': f['id'],
+            'parcial': f['parcial'],
+            'quimestre': f['quimestre'],
+            'tipo_aporte': tipos.get(f['tipo_aporte_id'], ''),
+            'calificacion': float(f['calificacion']),
+        })
+
+    promedios_materias = {}
+    general = None
+    asistencia = {'total': 0, 'presentes': 0, 'ausentes': 0, 'justificados': 0}
+    for r in resumenes:
+        if r.subject is None:
+            general = r.promedio_anual
+            asistencia = {
+                'total': r.asistencias_total,
+                'presentes': r.asistencias_total - r.ausencias - r.justificados,
+                'ausentes': r.ausencias,
+                'justificados': r.justificados,
+            }
+            continue
+        promedios = {}
+        for quimestre, valor in (('Q1', r.promedio_q1), ('Q2', r.promedio_q2), ('anual', r.promedio_anual)):
+            if valor is not None:
+                promedios[quimestre] = float(valor)
+        if promedios:
+            promedios_materias[r.subject.name] = promedios
+    total = asistencia['total']
+    asistencia['porcentaje'] = round(asistencia['presentes'] / total * 100, 1) if total else 0
+
+    return {
+        'student_id': student.id,
+        'nombre': student.usuario.nombre if student.usuario else '',
+        'ciclo_lectivo': ciclo,
+        'promedio_general': float(general) if general is not None else None,
+        'promedios_materias': promedios_materias,
+        'materias': dict(materias),
+        'asistencia': asistencia,
+    }
+
+
+def libreta_historica(student_id, ciclo):
+    """
+    (datos, etag, ultimo) de la libreta de un ciclo cerrado, o None si el ciclo
+    no está cerrado o el estudiante no tiene datos en él. Un ciclo cerrado no
+    cambia, así que se cachea por una semana.
+    """
+    from classes.models import CierreCicloLectivo
+    from students.models import Student
+
+    clave = clave_cache('calificaciones', 'libreta_historica', student_id, ciclo)
+    libreta = cache.get(clave)
+    if libreta is None:
+        cierre = CierreCicloLectivo.objects.filter(ciclo_lectivo=ciclo).first()
+        student = Student.objects.select_related('usuario').filter(pk=student_id).first()
+        if cierre is None or student is None:
+            return None
+        datos = calcular_libreta_historica(student, ciclo)
+        if datos is None:
+            return None
+        firma = hashlib.md5(json.dumps(datos, sort_keys=True, default=str).encode()).hexdigest()
+        libreta = (datos, f'"{firma}"', cierre.cerrado_en)
+        cache.set(clave, libreta, LIBRETA_HISTORICA_TTL)
+    return libreta
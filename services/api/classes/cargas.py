@@ -0,0 +1,468 @@
+"""
+Carga masiva en proceso de materias, grados, docentes, estudiantes, clases e
+inscripciones.
+
+Cada función recibe una lista de filas (dicts con los mismos campos que la
+mutación GraphQL individual equivalente en config/schema.py) y aplica toda la
+lista en una sola transacción: búsquedas con filter(__in=...), altas con
+bulk_create y cambios con bulk_update. El resultado por fila es el mismo que
+daría la mutación individual (createSubject, createOrUpdateUsuarioStudent,
+enrollStudentInClass, ...), de modo que las herramientas de migración llaman
+a estas funciones directamente en lugar de mandar una petición HTTP por
+entidad, y las mutaciones bulk* las exponen por GraphQL.
+
+Un campo en None significa "no informado" y no modifica el valor guardado.
+Las filas inválidas (ids inexistentes, rol incorrecto, choque con una
+restricción única) se omiten y se devuelven en ResultadoCarga.errores con su
+índice; un error de base de datos revierte la carga completa.
+
+Las escrituras masivas no emiten post_save: los perfiles Teacher/Student, el
+registration_code, el ciclo del GradeLevel, el docente heredado de la clase,
+la auto-matrícula por malla y la invalidación de caché se aplican aquí.
+"""
+import logging
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.db import transaction
+
+from classes.estadisticas import invalidar_estadisticas_anuales
+from classes.models import Clase, Enrollment, GradeLevel, MallaCurricular
+from students.models import Student
+from subjects.models import Subject
+from teachers.models import Teacher
+from users.models import Usuario
+from utils.cache import invalidar_dominio
+
+logger = logging.getLogger(__name__)
+
+LOTE = 500
+CICLO_MALLA = '2025-2026'
+
+
+@dataclass
+class ResultadoCarga:
+    objetos: List[Any] = field(default_factory=list)  # por fila de entrada; None si se omitió
+    creados: int = 0
+    actualizados: int = 0
+    errores: List[Tuple[int, str]] = field(default_factory=list)
+
+    def omitir(self, indice: int, mensaje: str):
+        self.objetos.append(None)
+        self.errores.append((indice, mensaje))
+
+
+def _ids(filas, campo) -> set:
+    return {int(f[campo]) for f in filas if f.get(campo) not in (None, '')}
+
+
+def _id(valor) -> Optional[int]:
+    return int(valor) if valor not in (None, '') else None
+
+
+def _invalidar(*dominios):
+    transaction.on_commit(lambda: invalidar_dominio(*dominios))
+
+
+def _invalidar_anuales(ciclos):
+    # bulk_create no emite post_save: estadísticas anuales de esos ciclos
+    ciclos = set(ciclos)
+    transaction.on_commit(lambda: invalidar_estadisticas_anuales(*ciclos))
+
+
+# ─── Materias y grados ───────────────────────────────────────────────────────
+
+@transaction.atomic
+def cargar_materias(filas: List[Dict]) -> ResultadoCarga:
+    """Filas: name, description, tipo_materia (como createSubject)."""
+    resultado = ResultadoCarga()
+    materias = {s.name: s for s in Subject.objects.filter(name__in={f['name'] for f in filas})}
+    nuevas, cambiadas = {}, {}
+    for f in filas:
+        materia = materias.get(f['name'])
+        if materia is None:
+            materia = materias[f['name']] = nuevas[f['name']] = Subject(
+                name=f['name'], description=f.get('description') or '', tipo_materia=f.get('tipo_materia') or 'OTRO',
+            )
+        else:
+            for campo, valor in (('description', f.get('description')), ('tipo_materia', f.get('tipo_materia'))):
+                if valor is not None and getattr(materia, campo) != valor:
+                    setattr(materia, campo, valor)
+                    if materia.name not in nuevas:
+                        cambiadas[materia.name] = materia
+        resultado.objetos.append(materia)
+
+    Subject.objects.bulk_create(list(nuevas.values()), batch_size=LOTE)
+    Subject.objects.bulk_update(list(cambiadas.values()), ['description', 'tipo_materia'], batch_size=LOTE)
+    resultado.creados, resultado.actualizados = len(nuevas), len(cambiadas)
+    if nuevas or cambiadas:
+        _invalidar('catalogos', 'malla')
+    return resultado
+
+
+@transaction.atomic
+def cargar_grados(filas: List[Dict]) -> ResultadoCarga:
+    """Filas: level, section (como createGradeLevel)."""
+    resultado = ResultadoCarga()
+    grados = {(g.level, g.section): g for g in GradeLevel.objects.filter(level__in={f['level'] for f in filas})}
+    nuevos = []
+    for f in filas:
+        clave = (f['level'], f['section'])
+        if clave not in grados:
+            grados[clave] = GradeLevel(level=clave[0], section=clave[1], ciclo=GradeLevel._NIVEL_CICLO.get(clave[0], ''))
+            nuevos.append(grados[clave])
+        resultado.objetos.append(grados[clave])
+
+    GradeLevel.objects.bulk_create(nuevos, batch_size=LOTE)
+    resultado.creados = len(nuevos)
+    if nuevos:
+        _invalidar('catalogos', 'malla')
+    return resultado
+
+
+# ─── Usuarios ────────────────────────────────────────────────────────────────
+
+def _cargar_usuarios(filas: List[Dict], rol: str) -> Tuple[List[Usuario], set, set]:
+    """
+    Busca o crea el Usuario de cada fila (cédula → email → nombre con `rol`),
+    como createOrUpdateUsuarioTeacher / Student. Devuelve los usuarios por
+    fila y los ids creados y actualizados.
+    """
+    cedulas = {f['cedula'] for f in filas if f.get('cedula')}
+    emails = {f['email'] for f in filas if f.get('email')}
+    por_cedula = {u.cedula: u for u in Usuario.objects.filter(cedula__in=cedulas)}
+    por_email = {u.email: u for u in Usuario.objects.filter(email__in=emails)}
+    por_nombre = {}
+    for u in Usuario.objects.filter(rol=rol, nombre__in={f['nombre'] for f in filas}).order_by('id'):
+        por_nombre.setdefault(u.nombre, u)
+
+    usuarios, nuevos, cambiados = [], {}, {}
+    for f in filas:
+        cedula, email, phone = f.get('cedula'), f.get('email'), f.get('phone')
+        u = (por_cedula.get(cedula) if cedula else None) or (por_email.get(email) if email else None) \
+            or por_nombre.get(f['nombre'])
+        if u is None:
+            u = Usuario(
+                nombre=f['nombre'], rol=rol, phone=phone, cedula=cedula,
+                email=email if email not in por_email else None,
+            )
+            nuevos[id(u)] = u
+        else:
+            u.nombre, u.rol = f['nombre'], rol
+            if phone:
+                u.phone = phone
+            if cedula and por_cedula.setdefault(cedula, u) is u:
+                u.cedula = cedula
+            elif cedula:
+                logger.warning('Cédula %s ya pertenece a otro usuario; no se asigna a %s', cedula, u.nombre)
+            if email and u.email != email:
+                if por_email.setdefault(email, u) is u:
+                    u.email = email
+                else:
+                    logger.warning("Email '%s' ya pertenece a otro usuario; no se asigna a %s", email, u.nombre)
+            if id(u) not in nuevos:
+                cambiados[id(u)] = u
+        for indice, valor in ((por_cedula, u.cedula), (por_email, u.email), (por_nombre, u.nombre)):
+            if valor:
+                indice.setdefault(valor, u)
+        usuarios.append(u)
+
+    Usuario.objects.bulk_create(list(nuevos.values()), batch_size=LOTE)
+    # Un cambio de rol pasa por save(): las señales cambian el perfil
+    con_rol_nuevo = [u for u in cambiados.values() if u._original_rol != u.rol]
+    for u in con_rol_nuevo:
+        u.save()
+    Usuario.objects.bulk_update(
+        [u for u in cambiados.values() if u._original_rol == u.rol],
+        ['nombre', 'rol', 'phone', 'cedula', 'email'], batch_size=LOTE,
+    )
+    return usuarios, {u.pk for u in nuevos.values()}, {u.pk for u in cambiados.values()}
+
+
+@transaction.atomic
+def cargar_docentes(filas: List[Dict]) -> ResultadoCarga:
+    """Filas: nombre, email, phone, cedula, specialization. objetos = perfiles Teacher."""
+    resultado = ResultadoCarga()
+    usuarios, creados, actualizados = _cargar_usuarios(filas, Usuario.Rol.DOCENTE)
+
+    perfiles = {t.usuario_id: t for t in Teacher.objects.filter(usuario_id__in=[u.pk for u in usuarios])}
+    nuevos, cambiados = {}, {}
+    for f, u in zip(filas, usuarios):
+        especialidad = f.get('specialization')
+        perfil = perfiles.get(u.pk)
+        if perfil is None:
+            perfil = perfiles[u.pk] = nuevos[u.pk] = Teacher(usuario=u, specialization=especialidad or '')
+        elif especialidad is not None and perfil.specialization != especialidad:
+            perfil.specialization = especialidad
+            if u.pk not in nuevos:
+                cambiados[u.pk] = perfil
+        resultado.objetos.append(perfil)
+
+    Teacher.objects.bulk_create(list(nuevos.values()), batch_size=LOTE)
+    Teacher.objects.bulk_update(list(cambiados.values()), ['specialization'], batch_size=LOTE)
+    resultado.creados, resultado.actualizados = len(creados), len(actualizados)
+    return resultado
+
+
+@transaction.atomic
+def cargar_estudiantes(filas: List[Dict]) -> ResultadoCarga:
+    """
+    Filas: nombre, email, phone, cedula, grade_level_id, parent_name,
+    parent_phone. objetos = perfiles Student.
+    """
+    resultado = ResultadoCarga()
+    usuarios, creados, actualizados = _cargar_usuarios(filas, Usuario.Rol.ESTUDIANTE)
+    grados = set(GradeLevel.objects.filter(pk__in=_ids(filas, 'grade_level_id')).values_list('id', flat=True))
+
+    perfiles = {s.usuario_id: s for s in Student.objects.filter(usuario_id__in=[u.pk for u in usuarios])}
+    nuevos, cambiados = {}, {}
+    for f, u in zip(filas, usuarios):
+        grado = _id(f.get('grade_level_id'))
+        grado = grado if grado in grados else None
+        perfil = perfiles.get(u.pk)
+        if perfil is None:
+            perfil = perfiles[u.pk] = nuevos[u.pk] = Student(
+                usuario=u, grade_level_id=grado, registration_code=str(uuid.uuid4()),
+                parent_name=f.get('parent_name') or '', parent_phone=f.get('parent_phone') or '',
+            )
+        else:
+            antes = (perfil.grade_level_id, perfil.parent_name, perfil.parent_phone)
+            if grado:
+                perfil.grade_level_id = grado
+            for campo in ('parent_name', 'parent_phone'):
+                if f.get(campo) is not None:
+                    setattr(perfil, campo, f[campo])
+            if (perfil.grade_level_id, perfil.parent_name, perfil.parent_phone) != antes and u.pk not in nuevos:
+                cambiados[u.pk] = perfil
+        resultado.objetos.append(perfil)
+
+    Student.objects.bulk_create(list(nuevos.values()), batch_size=LOTE)
+    Student.objects.bulk_update(list(cambiados.values()), ['grade_level', 'parent_name', 'parent_phone'], batch_size=LOTE)
+    # Lo que haría la señal auto_matricular_por_malla en cada save()
+    matricular_por_malla(
+        (s.usuario_id, s.grade_level_id) for s in [*nuevos.values(), *cambiados.values()] if s.grade_level_id
+    )
+    resultado.creados, resultado.actualizados = len(creados), len(actualizados)
+    return resultado
+
+
+# ─── Clases e inscripciones ──────────────────────────────────────────────────
+
+def _docentes(filas, campo) -> set:
+    return set(Usuario.objects.filter(pk__in=_ids(filas, campo), rol=Usuario.Rol.DOCENTE).values_list('id', flat=True))
+
+
+@transaction.atomic
+def cargar_clases(filas: List[Dict]) -> ResultadoCarga:
+    """
+    Filas: name, subject_id, ciclo_lectivo, docente_base_id, description
+    (como createClase: una clase por nombre, materia y ciclo).
+    """
+    resultado = ResultadoCarga()
+    materias = set(Subject.objects.filter(pk__in=_ids(filas, 'subject_id')).values_list('id', flat=True))
+    docentes = _docentes(filas, 'docente_base_id')
+
+    por_nombre, ocupadas = {}, {}
+    for c in Clase.objects.filter(subject_id__in=materias, ciclo_lectivo__in={f['ciclo_lectivo'] for f in filas}):
+        por_nombre.setdefault((c.name, c.subject_id, c.ciclo_lectivo), c)
+        # Restricciones únicas de Clase: (materia, ciclo, docente) o (materia, ciclo, paralelo) sin docente
+        ocupadas[(c.subject_id, c.ciclo_lectivo, c.docente_base_id or f'p:{c.paralelo}')] = c
+
+    nuevas, cambiadas = {}, {}
+    for i, f in enumerate(filas):
+        materia, docente = _id(f['subject_id']), _id(f.get('docente_base_id'))
+        if materia not in materias:
+            resultado.omitir(i, f'Materia {materia} no encontrada')
+            continue
+        if docente and docente not in docentes:
+            resultado.omitir(i, f'Usuario {docente} no encontrado o no es docente')
+            continue
+        clave = (f['name'], materia, f['ciclo_lectivo'])
+        clase = por_nombre.get(clave)
+        if clase is None:
+            unica = (materia, f['ciclo_lectivo'], docente or 'p:')
+            if unica in ocupadas:
+                resultado.omitir(i, f'Ya existe la clase "{ocupadas[unica].name}" para esa materia, ciclo y docente')
+                continue
+            clase = por_nombre[clave] = ocupadas[unica] = nuevas[clave] = Clase(
+                name=f['name'], subject_id=materia, ciclo_lectivo=f['ciclo_lectivo'],
+                docente_base_id=docente, description=f.get('description') or '', active=True,
+            )
+        elif docente and clase.docente_base_id != docente:
+            unica = (materia, clase.ciclo_lectivo, docente)
+            if ocupadas.get(unica, clase) is not clase:
+                resultado.omitir(i, f'El docente {docente} ya tiene la clase "{ocupadas[unica].name}" de esa materia')
+                continue
+            clase.docente_base_id = docente
+            ocupadas[unica] = clase
+            if clave not in nuevas:
+                cambiadas[clase.pk] = clase
+        resultado.objetos.append(clase)
+
+    Clase.objects.bulk_create(list(nuevas.values()), batch_size=LOTE)
+    Clase.objects.bulk_update(list(cambiadas.values()), ['docente_base'], batch_size=LOTE)
+    resultado.creados, resultado.actualizados = len(nuevas), len(cambiadas)
+    if nuevas or cambiadas:
+        _invalidar('catalogos', 'dashboards')
+    return resultado
+
+
+@transaction.atomic
+def asignar_docentes_base(filas: List[Dict]) -> ResultadoCarga:
+    """Filas: clase_id, docente_id (como assignDocenteBaseToClase)."""
+    resultado = ResultadoCarga()
+    clases = Clase.objects.in_bulk(_ids(filas, 'clase_id'))
+    docentes = _docentes(filas, 'docente_id')
+    ocupadas = {
+        (c.subject_id, c.ciclo_lectivo, c.docente_base_id): c.pk
+        for c in Clase.objects.filter(
+            subject_id__in={c.subject_id for c in clases.values()}, docente_base_id__in=docentes,
+        )
+    }
+    cambiadas = {}
+    for i, f in enumerate(filas):
+        clase, docente = clases.get(_id(f['clase_id'])), _id(f['docente_id'])
+        if clase is None:
+            resultado.omitir(i, f'Clase {f["clase_id"]} no encontrada')
+            continue
+        if docente not in docentes:
+            resultado.omitir(i, f'Usuario {docente} no encontrado o no es docente')
+            continue
+        unica = (clase.subject_id, clase.ciclo_lectivo, docente)
+        if ocupadas.get(unica, clase.pk) != clase.pk:
+            resultado.omitir(i, f'El docente {docente} ya tiene otra clase de esa materia y ciclo')
+            continue
+        if clase.docente_base_id != docente:
+            ocupadas.pop((clase.subject_id, clase.ciclo_lectivo, clase.docente_base_id), None)
+            clase.docente_base_id = docente
+            ocupadas[unica] = clase.pk
+            cambiadas[clase.pk] = clase
+        resultado.objetos.append(clase)
+
+    Clase.objects.bulk_update(list(cambiadas.values()), ['docente_base'], batch_size=LOTE)
+    resultado.actualizados = len(cambiadas)
+    if cambiadas:
+        _invalidar('catalogos', 'dashboards')
+    return resultado
+
+
+@transaction.atomic
+def inscribir(filas: List[Dict]) -> ResultadoCarga:
+    """
+    Filas: estudiante_id, clase_id, docente_id y, opcional, tipo_materia
+    (como enrollStudentInClass). Sin docente se hereda el docente base de la
+    clase, igual que Enrollment.save().
+    """
+    resultado = ResultadoCarga()
+    estudiantes = set(
+        Usuario.objects.filter(pk__in=_ids(filas, 'estudiante_id'), rol=Usuario.Rol.ESTUDIANTE)
+        .values_list('id', flat=True)
+    )
+    clases = dict(Clase.objects.filter(pk__in=_ids(filas, 'clase_id')).values_list('id', 'docente_base_id'))
+    docentes = _docentes(filas, 'docente_id')
+    existentes = {
+        (e.estudiante_id, e.clase_id): e
+        for e in Enrollment.objects.filter(clase_id__in=clases, estudiante_id__in=estudiantes)
+    }
+
+    nuevas, cambiadas = {}, {}
+    for i, f in enumerate(filas):
+        estudiante, clase, docente = _id(f['estudiante_id']), _id(f['clase_id']), _id(f.get('docente_id'))
+        if estudiante not in estudiantes:
+            resultado.omitir(i, f'Usuario {estudiante} no encontrado o no es estudiante')
+            continue
+        if clase not in clases:
+            resultado.omitir(i, f'Clase {clase} no encontrada')
+            continue
+        if docente and docente not in docentes:
+            resultado.omitir(i, f'Usuario {docente} no encontrado o no es docente')
+            continue
+        docente = docente or clases[clase]
+        tipo = f.get('tipo_materia')
+        inscripcion = existentes.get((estudiante, clase))
+        if tipo == 'INSTRUMENTO' and not docente and not (inscripcion and inscripcion.docente_id):
+            resultado.omitir(i, 'Inscripción de instrumento sin docente')
+            continue
+        if inscripcion is None:
+            inscripcion = existentes[(estudiante, clase)] = nuevas[(estudiante, clase)] = Enrollment(
+                estudiante_id=estudiante, clase_id=clase, docente_id=docente,
+                estado=Enrollment.Estado.ACTIVO, **({'tipo_materia': tipo} if tipo else {}),
+            )
+        elif inscripcion.docente_id != docente and docente:
+            inscripcion.docente_id = docente
+            if (estudiante, clase) not in nuevas:
+                cambiadas[inscripcion.pk] = inscripcion
+        resultado.objetos.append(inscripcion)
+
+    Enrollment.objects.bulk_create(list(nuevas.values()), batch_size=LOTE)
+    Enrollment.objects.bulk_update(list(cambiadas.values()), ['docente'], batch_size=LOTE)
+    resultado.creados, resultado.actualizados = len(nuevas), len(cambiadas)
+    if nuevas:
+        _invalidar('horarios')
+        _invalidar_anuales(Clase.objects.filter(pk__in={c for _, c in nuevas}).values_list('ciclo_lectivo', flat=True))
+    return resultado
+
+
+# ─── Malla ───────────────────────────────────────────────────────────────────
+
+def matricular_por_malla(alumnos: Iterable[Tuple[int, int]], ciclo: str = CICLO_MALLA) -> Tuple[int, int, List[str]]:
+    """
+    Versión masiva de la señal auto_matricular_por_malla para pares
+    (usuario_id, grade_level_id): crea las clases que falten de las materias
+    obligatorias de cada nivel y las inscripciones que falten. Devuelve
+    (clases creadas, inscripciones creadas, conflictos).
+    """
+    alumnos = list(alumnos)
+    entradas = defaultdict(list)
+    for m in MallaCurricular.objects.filter(
+        nivel_id__in={g for _, g in alumnos}, obligatoria=True,
+    ).select_related('subject', 'nivel'):
+        entradas[m.nivel_id].append(m)
+    if not entradas:
+        return 0, 0, []
+
+    def clases_existentes():
+        return {
+            (c.subject_id, c.grade_level_id): c
+            for c in Clase.objects.filter(ciclo_lectivo=ciclo, grade_level_id__in=entradas).order_by('-id')
+        }
+
+    existentes = clases_existentes()
+    faltantes = [
+        Clase(
+            subject=m.subject, grade_level=m.nivel, ciclo_lectivo=ciclo, active=True,
+            name=f'{m.subject.name} — {m.nivel.get_level_display()} {ciclo}',
+            docente_base_id=m.nivel.docente_tutor_id,
+        )
+        for lista in entradas.values() for m in lista
+        if (m.subject_id, m.nivel_id) not in existentes
+    ]
+    if faltantes:
+        Clase.objects.bulk_create(faltantes, batch_size=LOTE, ignore_conflicts=True)
+        existentes = clases_existentes()
+        _invalidar('catalogos', 'dashboards')
+
+    inscritos = set(
+        Enrollment.objects.filter(clase_id__in=[c.pk for c in existentes.values()]).values_list('estudiante_id', 'clase_id')
+    )
+    nuevas, conflictos = [], []
+    for usuario, grado in alumnos:
+        for m in entradas.get(grado, ()):
+            clase = existentes.get((m.subject_id, grado))
+            if clase is None:
+                conflictos.append(f'Clase de malla en conflicto: {m.subject.name} {m.nivel}')
+                continue
+            if (usuario, clase.pk) in inscritos:
+                continue
+            inscritos.add((usuario, clase.pk))
+            nuevas.append(Enrollment(
+                estudiante_id=usuario, clase_id=clase.pk, estado=Enrollment.Estado.ACTIVO,
+                docente_id=m.nivel.docente_tutor_id or clase.docente_base_id,
+            ))
+    Enrollment.objects.bulk_create(nuevas, batch_size=LOTE)
+    if nuevas:
+        _invalidar('horarios')
+        _invalidar_anuales([ciclo])
+    return len(faltantes), len(nuevas), conflictos
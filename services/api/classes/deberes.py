@@ -0,0 +1,238 @@
+"""
+Estadísticas de deberes calculadas en SQL.
+
+- Por estudiante: estado de cada deber y promedios por materia. Lo usan
+  dashboard_estudiante (web) y la API REST
+  (/classes/api/v1/deberes/resumen-estudiante/) para la app móvil.
+- Por docente: tasas de entrega, promedios y estudiantes por clase, cacheadas
+  por docente e invalidadas desde classes.signals al escribir Deber/DeberEntrega.
+"""
+from datetime import timedelta
+
+from django.db.models import (
+    Avg, Case, CharField, Count, Exists, OuterRef, Q, Subquery, Sum, Value, When,
+)
+from django.core.cache import cache
+from django.utils import timezone
+
+from utils.cache import clave as clave_cache
+
+ENTREGADO = ('entregado', 'revisado', 'tarde')
+
+# Estados calculados del deber desde la perspectiva del estudiante
+ESTADO_ENTREGADO = 'entregado'
+ESTADO_VENCIDO = 'vencido'
+ESTADO_PROXIMO = 'proximo'
+ESTADO_PENDIENTE = 'pendiente'
+
+
+def deberes_estudiante(usuario, dias_proximos=3, ahora=None):
+    """
+    Deberes activos del estudiante anotados con su entrega en una sola consulta:
+    entrega_estado, entrega_calificacion y estado_estudiante
+    (entregado / vencido / proximo / pendiente).
+    """
+    from classes.models import Deber, DeberEntrega, Enrollment
+
+    ahora = ahora or timezone.now()
+    entrega = DeberEntrega.objects.filter(deber=OuterRef('pk'), estudiante=usuario)
+    asignado_directo = Deber.estudiantes_especificos.through.objects.filter(
+        deber_id=OuterRef('pk'), usuario_id=usuario.pk,
+    )
+    inscrito = Enrollment.objects.filter(clase_id=OuterRef('clase_id'), estudiante=usuario)
+
+    return (
+        Deber.objects
+        .filter(Q(Exists(asignado_directo)) | Q(Exists(inscrito)), estado='activo')
+        .select_related('clase__subject')
+        .annotate(
+            entrega_estado=Subquery(entrega.values('estado')[:1]),
+            entrega_calificacion=Subquery(entrega.values('calificacion')[:1]),
+        )
+        .annotate(
+            estado_estudiante=Case(
+                When(entrega_estado__in=ENTREGADO, then=Value(ESTADO_ENTREGADO)),
+                When(fecha_entrega__lt=ahora, then=Value(ESTADO_VENCIDO)),
+                When(fecha_entrega__lte=ahora + timedelta(days=dias_proximos), then=Value(ESTADO_PROXIMO)),
+                default=Value(ESTADO_PENDIENTE),
+                output_field=CharField(),
+            )
+        )
+        .order_by('fecha_entrega')
+    )
+
+
+def promedios_deberes_por_materia(usuario):
+    """Promedio y porcentaje de puntos por materia de las entregas calificadas."""
+    from classes.models import DeberEntrega
+
+    filas = (
+        DeberEntrega.objects
+        .filter(estudiante=usuario, calificacion__isnull=False)
+        .order_by()
+        .values('deber__clase__subject__name')
+        .annotate(
+            promedio=Avg('calificacion'),
+            puntos_obtenidos=Sum('calificacion'),
+            total_puntos=Sum('deber__puntos_totales'),
+            total=Count('id'),
+        )
+        .order_by('deber__clase__subject__name')
+    )
+    resultado = []
+    for f in filas:
+        total_puntos = float(f['total_puntos'] or 0)
+        resultado.append({
+            'materia': f['deber__clase__subject__name'] or 'Sin materia',
+            'promedio': round(float(f['promedio']), 2),
+            'porcentaje': round(float(f['puntos_obtenidos']) / total_puntos * 100, 1) if total_puntos else 0,
+            'total': f['total'],
+        })
+    return resultado
+
+
+def resumen_deberes_estudiante(usuario, dias_proximos=3):
+    """
+    Resumen completo para dashboards y API:
+    {'pendientes','vencidos','proximos','entregados': [Deber], 'promedios_materias': [...],
+     'promedio_general': float}
+    """
+    resumen = {
+        ESTADO_PENDIENTE + 's': [],
+        ESTADO_VENCIDO + 's': [],
+        ESTADO_PROXIMO + 's': [],
+        ESTADO_ENTREGADO + 's': [],
+    }
+    for deber in deberes_estudiante(usuario, dias_proximos=dias_proximos):
+        resumen[deber.estado_estudiante + 's'].append(deber)
+
+    promedios = promedios_deberes_por_materia(usuario)
+    total_calificadas = sum(p['total'] for p in promedios)
+    resumen['promedios_materias'] = promedios
+    resumen['promedio_general'] = round(
+        sum(p['promedio'] * p['total'] for p in promedios) / total_calificadas, 2
+    ) if total_calificadas else 0
+    return resumen
+
+
+# ── Estadísticas del docente ─────────────────────────────────────────────────
+
+ESTADISTICAS_DOCENTE_TTL = 60 * 15
+
+
+def estadisticas_deberes_por_clase(teacher_usuario):
+    """
+    Una fila por clase del docente (docente_base) con deberes, estudiantes
+    inscritos distintos, entregas realizadas, promedio y tasa de entrega:
+    [{'clase_id','nombre','materia','total_deberes','deberes_activos',
+      'estudiantes','entregas','promedio','tasa_entrega'}]
+    """
+    from classes.models import Clase, DeberEntrega, Enrollment
+
+    clases = (
+        Clase.objects.filter(docente_base=teacher_usuario)
+        .order_by()
+        .values('id', 'name', 'subject__name')
+        .annotate(
+            total_deberes=Count('deberes', distinct=True),
+            deberes_activos=Count('deberes', filter=Q(deberes__estado='activo'), distinct=True),
+            estudiantes=Count(
+                'enrollments__estudiante',
+                filter=Q(enrollments__estado=Enrollment.Estado.ACTIVO),
+                distinct=True,
+            ),
+        )
+    )
+    entregas = {
+        f['deber__clase_id']: f
+        for f in (
+            DeberEntrega.objects.filter(deber__clase__docente_base=teacher_usuario)
+            .order_by()
+            .values('deber__clase_id')
+            .annotate(
+                entregas=Count('id', filter=Q(estado__in=ENTREGADO)),
+                promedio=Avg('calificacion'),
+            )
+        )
+    }
+
+    resultado = []
+    for c in clases:
+        e = entregas.get(c['id'], {})
+        esperadas = c['total_deberes'] * c['estudiantes']
+        n_entregas = e.get('entregas', 0)
+        promedio = e.get('promedio')
+        resultado.append({
+            'clase_id': c['id'],
+            'nombre': c['name'],
+            'materia': c['subject__name'],
+            'total_deberes': c['total_deberes'],
+            'deberes_activos': c['deberes_activos'],
+            'estudiantes': c['estudiantes'],
+            'entregas': n_entregas,
+            'promedio': round(float(promedio), 2) if promedio is not None else 0,
+            'tasa_entrega': round(n_entregas / esperadas * 100, 1) if esperadas else 0,
+        })
+    resultado.sort(key=lambda r: -r['total_deberes'])
+    return resultado
+
+
+def _clave_estadisticas_docente(teacher_usuario_id):
+    return clave_cache('dashboards', 'deberes_docente', teacher_usuario_id)
+
+
+def estadisticas_deberes_docente(teacher_usuario):
+    """
+    Totales del dashboard docente más el detalle por clase, cacheados por docente:
+    {'total_deberes','deberes_activos','total_estudiantes','entregas_pendientes',
+     'estados_entregas','clases'}
+    """
+    from classes.models import Deber, DeberEntrega, Enrollment
+    from users.models import Usuario
+
+    clave = _clave_estadisticas_docente(teacher_usuario.pk)
+    estadisticas = cache.get(clave)
+    if estadisticas is not None:
+        return estadisticas
+
+    totales = Deber.objects.filter(teacher=teacher_usuario).aggregate(
+        total_deberes=Count('id'),
+        deberes_activos=Count('id', filter=Q(estado='activo')),
+    )
+    estados = {
+        f['estado']: f['total']
+        for f in (
+            DeberEntrega.objects.filter(deber__teacher=teacher_usuario)
+            .order_by()
+            .values('estado')
+            .annotate(total=Count('id'))
+        )
+    }
+    # Estudiantes con algún deber del docente: asignados directamente o
+    # inscritos en una clase suya que tenga deberes
+    asignado_directo = Deber.estudiantes_especificos.through.objects.filter(
+        usuario_id=OuterRef('pk'), deber__teacher=teacher_usuario,
+    )
+    inscrito = Enrollment.objects.filter(
+        estudiante_id=OuterRef('pk'),
+        clase__docente_base=teacher_usuario,
+        clase__deberes__isnull=False,
+    )
+    total_estudiantes = Usuario.objects.filter(
+        Q(Exists(asignado_directo)) | Q(Exists(inscrito))
+    ).count()
+
+    estadisticas = {
+        'total_deberes': totales['total_deberes'],
+        'deberes_activos': totales['deberes_activos'],
+        'total_estudiantes': total_estudiantes,
+        'entregas_pendientes': estados.get('pendiente', 0),
+        'estados_entregas': [{'estado': e, 'total': t} for e, t in sorted(estados.items())],
+        'clases': estadisticas_deberes_por_clase(teacher_usuario),
+    }
+    cache.set(clave, estadisticas, ESTADISTICAS_DOCENTE_TTL)
+    return estadisticas
+
+
+def invalidar_estadisticas_docente(*teacher_usuario_ids):
+    cache.delete_many([_clave_estadisticas_docente(pk) for pk in teacher_usuario_ids if pk])
@@ -0,0 +1,479 @@
+"""
+Estadísticas institucionales calculadas por conjuntos (sin N+1).
+
+- Motor de promedios ponderados: agrupa CalificacionParcial en SQL y replica
+  exactamente CalificacionParcial.calcular_promedio_parcial / _quimestre.
+- Capa materializada: EstadisticaAsistenciaClase (tasa de asistencia por clase)
+  y PromedioCache (promedios ponderados por estudiante/materia), refrescadas
+  por la tarea programada classes.tasks.refrescar_estadisticas_institucionales.
+- Estadísticas anuales por docente (informe final), cacheadas por año lectivo.
+- Libreta del estudiante para la API móvil, cacheada por estudiante.
+"""
+import hashlib
+import json
+import logging
+from collections import defaultdict
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Max, Q, Sum
+
+from utils.cache import clave as clave_cache, invalidar_dominio, invalidar_etiquetas
+
+logger = logging.getLogger(__name__)
+
+_CERO = Decimal('0.00')
+_DECIMAL = DecimalField(max_digits=12, decimal_places=4)
+
+
+def _a_decimal(valor):
+    if valor is None:
+        return Decimal('0')
+    if isinstance(valor, Decimal):
+        return valor
+    # SQLite devuelve float en agregaciones decimales
+    return Decimal(str(round(float(valor), 6)))
+
+
+def ciclo_activo():
+    """Año lectivo activo de la institución (ConfiguracionInstitucion.anio_lectivo)."""
+    from setup.models import ConfiguracionInstitucion
+    return ConfiguracionInstitucion.get().anio_lectivo
+
+
+# ── Motor de promedios ponderados ────────────────────────────────────────────
+
+def promedios_parciales(**filtros):
+    """
+    Promedio ponderado por (student_id, subject_id, quimestre, parcial) en una
+    sola consulta agrupada. Ignora notas en 0, igual que calcular_promedio_parcial.
+    """
+    from classes.models import CalificacionParcial
+
+    filas = (
+        CalificacionParcial.objects
+        .filter(calificacion__gt=0, **filtros)
+        .order_by()
+        .values('student_id', 'subject_id', 'quimestre', 'parcial')
+        .annotate(
+            suma_ponderada=Sum(F('calificacion') * F('tipo_aporte__peso'), output_field=_DECIMAL),
+            suma_pesos=Sum('tipo_aporte__peso', output_field=_DECIMAL),
+        )
+    )
+    resultado = {}
+    for f in filas:
+        pesos = _a_decimal(f['suma_pesos'])
+        if pesos == 0:
+            promedio = _CERO
+        else:
+            promedio = round(_a_decimal(f['suma_ponderada']) / pesos, 2)
+        resultado[(f['student_id'], f['subject_id'], f['quimestre'], f['parcial'])] = promedio
+    return resultado
+
+
+def promedios_quimestre(parciales=None, **filtros):
+    """
+    Promedio de quimestre por (student_id, subject_id, quimestre): media de los
+    parciales con promedio > 0, igual que calcular_promedio_quimestre.
+    """
+    if parciales is None:
+        parciales = promedios_parciales(**filtros)
+    acumulado = defaultdict(list)
+    for (student_id, subject_id, quimestre, _parcial), prom in parciales.items():
+        if prom > 0:
+            acumulado[(student_id, subject_id, quimestre)].append(float(prom))
+    return {
+        clave: Decimal(str(round(sum(valores) / len(valores), 2)))
+        for clave, valores in acumulado.items()
+    }
+
+
+def promedios_anuales(quimestres):
+    """
+    Promedio anual por (student_id, subject_id): media de Q1/Q2 con nota > 0.
+    Recibe el resultado de promedios_quimestre.
+    """
+    acumulado = defaultdict(list)
+    for (student_id, subject_id, _q), prom in quimestres.items():
+        if prom > 0:
+            acumulado[(student_id, subject_id)].append(float(prom))
+    return {
+        clave: sum(valores) / len(valores)
+        for clave, valores in acumulado.items()
+    }
+
+
+def promedios_generales(quimestres):
+    """Promedio general por student_id, igual que calcular_promedio_general."""
+    por_estudiante = defaultdict(list)
+    for (student_id, _subject_id), prom in promedios_anuales(quimestres).items():
+        por_estudiante[student_id].append(prom)
+    return {
+        student_id: Decimal(str(round(sum(valores) / len(valores), 2)))
+        for student_id, valores in por_estudiante.items()
+    }
+
+
+# ── Estadísticas anuales (informe final docente) ─────────────────────────────
+
+ESTADISTICAS_ANUALES_TTL = 60 * 10
+
+
+def estadisticas_anuales_por_clase(clase_ids, ciclo_lectivo=None):
+    """
+    Conteos del año lectivo (Q1 + Q2) por clase en dos consultas (inscripciones
+    y promedios agrupados):
+    {clase_id: {'n_asignados','n_aprobados','n_retirados','n_supletorio','n_con_notas'}}
+
+    Con `ciclo_lectivo` solo cuentan las notas de ese ciclo.
+    Aprobado: promedio anual >= 7; supletorio: entre 4 y 7.
+    """
+    from classes.models import Enrollment
+
+    conteos = {
+        clase_id: {'n_asignados': 0, 'n_aprobados': 0, 'n_retirados': 0,
+                   'n_supletorio': 0, 'n_con_notas': 0}
+        for clase_id in clase_ids
+    }
+    inscripciones = list(
+        Enrollment.objects.filter(clase_id__in=clase_ids)
+        .order_by()
+        .values_list('clase_id', 'clase__subject_id', 'estado', 'estudiante__student_profile__id')
+    )
+    activos = []
+    for clase_id, subject_id, estado, student_id in inscripciones:
+        if estado == Enrollment.Estado.RETIRADO:
+            conteos[clase_id]['n_retirados'] += 1
+        elif estado == Enrollment.Estado.ACTIVO:
+            conteos[clase_id]['n_asignados'] += 1
+            if student_id and subject_id:
+                activos.append((clase_id, subject_id, student_id))
+
+    if activos:
+        filtros = {'ciclo_lectivo': ciclo_lectivo} if ciclo_lectivo else {}
+        anuales = promedios_anuales(promedios_quimestre(
+            student_id__in={a[2] for a in activos},
+            subject_id__in={a[1] for a in activos},
+            **filtros,
+        ))
+        for clase_id, subject_id, student_id in activos:
+            promedio = anuales.get((student_id, subject_id))
+            if promedio is None:
+                continue
+            conteos[clase_id]['n_con_notas'] += 1
+            if promedio >= 7:
+                conteos[clase_id]['n_aprobados'] += 1
+            elif promedio >= 4:
+                conteos[clase_id]['n_supletorio'] += 1
+    return conteos
+
+
+def _etiqueta_ciclo(anio_lectivo):
+    return f'ciclo:{anio_lectivo}'
+
+
+def _clave_estadisticas_anuales(teacher_usuario_id, anio_lectivo):
+    return clave_cache(
+        'dashboards', 'estadisticas_anuales', teacher_usuario_id, anio_lectivo,
+        etiquetas=(_etiqueta_ciclo(anio_lectivo),),
+    )
+
+
+def estadisticas_anuales_docente(teacher_usuario, anio_lectivo):
+    """
+    Filas de estadísticas del informe final para las clases activas del docente
+    en el ciclo `anio_lectivo`, cacheadas por (docente, año lectivo). Las notas
+    e inscripciones del ciclo invalidan la caché (invalidar_estadisticas_anuales).
+    """
+    from classes.models import Clase
+
+    clave = _clave_estadisticas_anuales(teacher_usuario.pk, anio_lectivo)
+    estadisticas = cache.get(clave)
+    if estadisticas is not None:
+        return estadisticas
+
+    clases = list(
+        Clase.objects.filter(
+            docente_base=teacher_usuario, active=True, subject__isnull=False, ciclo_lectivo=anio_lectivo,
+        )
+        .select_related('subject')
+    )
+    conteos = estadisticas_anuales_por_clase([c.id for c in clases], ciclo_lectivo=anio_lectivo)
+    estadisticas = []
+    for c in clases:
+        datos = conteos[c.id]
+        n_asignados = datos['n_asignados']
+        pct_avance = round(datos['n_con_notas'] / n_asignados * 100) if n_asignados else 0
+        estadisticas.append({
+            'asignatura': c.subject.name,
+            'n_asignados': str(n_asignados),
+            'n_aprobados': str(datos['n_aprobados']),
+            'n_retirados': str(datos['n_retirados']),
+            'n_supletorio': str(datos['n_supletorio']),
+            'pct_avance': f'{pct_avance}%',
+        })
+    cache.set(clave, estadisticas, ESTADISTICAS_ANUALES_TTL)
+    return estadisticas
+
+
+def invalidar_estadisticas_anuales(*ciclos):
+    """Invalida las estadísticas anuales de todos los docentes en esos ciclos."""
+    invalidar_etiquetas(*[_etiqueta_ciclo(c) for c in ciclos if c])
+
+
+# ── Asistencia por clase ─────────────────────────────────────────────────────
+
+def conteos_asistencia_por_clase(**filtros):
+    """{clase_id: {'total','presentes','ausentes','justificados'}} en una consulta."""
+    from classes.models import Asistencia
+
+    filas = (
+        Asistencia.objects.filter(**filtros)
+        .order_by()
+        .values('inscripcion__clase_id')
+        .annotate(
+            total=Count('id'),
+            presentes=Count('id', filter=Q(estado=Asistencia.Estado.PRESENTE)),
+            ausentes=Count('id', filter=Q(estado=Asistencia.Estado.AUSENTE)),
+            justificados=Count('id', filter=Q(estado=Asistencia.Estado.JUSTIFICADO)),
+        )
+    )
+    return {
+        f['inscripcion__clase_id']: {
+            'total': f['total'],
+            'presentes': f['presentes'],
+            'ausentes': f['ausentes'],
+            'justificados': f['justificados'],
+        }
+        for f in filas
+    }
+
+
+def _tasa(presentes, total):
+    return Decimal(str(round(presentes / total * 100, 2))) if total else _CERO
+
+
+# ── Refresco de la capa materializada ────────────────────────────────────────
+
+def refrescar_asistencia_clases():
+    """Recalcula EstadisticaAsistenciaClase para todas las clases (1 lectura + 1 upsert)."""
+    from classes.models import Clase, EstadisticaAsistenciaClase
+
+    conteos = conteos_asistencia_por_clase()
+    filas = []
+    for clase_id in Clase.objects.values_list('id', flat=True):
+        c = conteos.get(clase_id, {'total': 0, 'presentes': 0, 'ausentes': 0, 'justificados': 0})
+        filas.append(EstadisticaAsistenciaClase(
+            clase_id=clase_id,
+            total=c['total'],
+            presentes=c['presentes'],
+            ausentes=c['ausentes'],
+            justificados=c['justificados'],
+            tasa=_tasa(c['presentes'], c['total']),
+        ))
+    EstadisticaAsistenciaClase.objects.bulk_create(
+        filas,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=['clase'],
+        update_fields=['total', 'presentes', 'ausentes', 'justificados', 'tasa', 'actualizado'],
+    )
+    return len(filas)
+
+
+def refrescar_promedios(desde=None, student_ids=None):
+    """
+    Refresca PromedioCache (parcial, quimestre y general) de forma incremental.
+
+    Solo recalcula los estudiantes con calificaciones modificadas desde la fecha
+    `desde` (CalificacionParcial.fecha_actualizacion) o borradas desde entonces
+    (RegistroEliminado, cuyo ambito es el estudiante); a estos últimos se les
+    descarta la caché previa. Sin fecha, recalcula todo.
+    Con `student_ids` recalcula exactamente esos estudiantes y descarta su caché
+    previa (p. ej. tras archivar un ciclo, cuando ya no tienen notas).
+    Los promedios son del ciclo activo: un estudiante tiene una fila por ciclo
+    para el mismo parcial y aporte, y no se mezclan años.
+    Retorna el número de estudiantes refrescados.
+    """
+    from classes.models import CalificacionParcial, PromedioCache, RegistroEliminado
+
+    if student_ids is not None:
+        student_ids = list(student_ids)
+        PromedioCache.objects.filter(student_id__in=student_ids).delete()
+    else:
+        cambios = CalificacionParcial.objects.all()
+        if desde is not None:
+            cambios = cambios.filter(fecha_actualizacion__gte=desde)
+        student_ids = set(cambios.order_by().values_list('student_id', flat=True).distinct())
+        if desde is not None:
+            # Una nota borrada no deja fila modificada: puede quedar una materia sin notas
+            con_borrados = set(
+                RegistroEliminado.objects
+                .filter(modelo=CalificacionParcial._meta.label, eliminado__gte=desde, ambito__isnull=False)
+                .order_by().values_list('ambito', flat=True).distinct()
+            )
+            PromedioCache.objects.filter(student_id__in=con_borrados).delete()
+            student_ids |= con_borrados
+        student_ids = list(student_ids)
+    if not student_ids:
+        return 0
+
+    parciales = promedios_parciales(student_id__in=student_ids, ciclo_lectivo=ciclo_activo())
+    quimestres = promedios_quimestre(parciales)
+    generales = promedios_generales(quimestres)
+
+    filas = [
+        PromedioCache(student_id=s, subject_id=m, parcial=p, quimestre=q,
+                      tipo_promedio='parcial', promedio=prom)
+        for (s, m, q, p), prom in parciales.items() if m is not None
+    ]
+    filas += [
+        PromedioCache(student_id=s, subject_id=m, parcial='', quimestre=q,
+                      tipo_promedio='quimestre', promedio=prom)
+        for (s, m, q), prom in quimestres.items() if m is not None
+    ]
+
+    with transaction.atomic():
+        # Los promedios 'general' tienen subject NULL: no participan del upsert
+        PromedioCache.objects.filter(student_id__in=student_ids, tipo_promedio='general').delete()
+        PromedioCache.objects.bulk_create([
+            PromedioCache(student_id=s, subject=None, parcial='', quimestre='',
+                          tipo_promedio='general', promedio=prom)
+            for s, prom in generales.items()
+        ], batch_size=500)
+        PromedioCache.objects.bulk_create(
+            filas,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['student', 'subject', 'parcial', 'quimestre', 'tipo_promedio'],
+            update_fields=['promedio', 'fecha_calculo'],
+        )
+    return len(student_ids)
+
+
+def refrescar_estadisticas(completo=False):
+    """Refresco programado: asistencia completa + promedios desde el último cálculo."""
+    from classes.models import PromedioCache
+
+    desde = None
+    if not completo:
+        desde = PromedioCache.objects.aggregate(ultimo=Max('fecha_calculo'))['ultimo']
+    clases = refrescar_asistencia_clases()
+    estudiantes = refrescar_promedios(desde=desde)
+    invalidar_dominio('dashboards')
+    logger.info('refrescar_estadisticas: %s clases, %s estudiantes', clases, estudiantes)
+    return {'clases': clases, 'estudiantes': estudiantes}
+
+
+# ── Libreta del estudiante (API móvil) ───────────────────────────────────────
+
+LIBRETA_TTL = 60 * 30
+
+
+def _etiqueta_estudiante(student_id):
+    return f'estudiante:{student_id}'
+
+
+def _clave_libreta(student_id):
+    return clave_cache('calificaciones', 'libreta', student_id, etiquetas=(_etiqueta_estudiante(student_id),))
+
+
+def calcular_libreta(student):
+    """
+    Libreta del ciclo activo: ciclo, notas (con subject/tipo_aporte) y
+    asistencia con agregados condicionales; el motor ponderado corre en memoria.
+    Los ciclos cerrados se leen con archivo_ciclos.libreta_historica.
+    Retorna (datos, ultimo) con `ultimo` = última modificación conocida.
+    """
+    from classes.models import Asistencia, CalificacionParcial
+
+    ciclo = ciclo_activo()
+    calificaciones = list(
+        CalificacionParcial.objects.filter(student=student, ciclo_lectivo=ciclo)
+        .select_related('subject', 'tipo_aporte')
+        .order_by('subject__name', 'quimestre', 'parcial')
+    )
+
+    materias = {}
+    ponderadas = defaultdict(lambda: [_CERO, _CERO])
+    ultimo = None
+    for c in calificaciones:
+        sname = c.subject.name if c.subject else 'Sin materia'
+        materias.setdefault(sname, []).append({
+            'id': c.id,
+            'parcial': c.parcial,
+            'quimestre': c.quimestre,
+            'tipo_aporte': c.tipo_aporte.nombre if c.tipo_aporte else '',
+            'calificacion': float(c.calificacion),
+        })
+        if c.calificacion > 0 and c.tipo_aporte is not None:
+            acumulado = ponderadas[(student.id, c.subject_id, c.quimestre, c.parcial)]
+            acumulado[0] += c.calificacion * c.tipo_aporte.peso
+            acumulado[1] += c.tipo_aporte.peso
+        if ultimo is None or c.fecha_actualizacion > ultimo:
+            ultimo = c.fecha_actualizacion
+
+    # Mismo cálculo que promedios_parciales, sobre las filas ya cargadas
+    parciales = {
+        clave: round(suma / pesos, 2) if pesos else _CERO
+        for clave, (suma, pesos) in ponderadas.items()
+    }
+    quimestres = promedios_quimestre(parciales)
+    nombres = {c.subject_id: c.subject.name for c in calificaciones if c.subject}
+    promedios_materias = {}
+    for (_s, subject_id, quimestre), prom in quimestres.items():
+        promedios_materias.setdefault(nombres.get(subject_id, 'Sin materia'), {})[quimestre] = float(prom)
+    for (_s, subject_id), prom in promedios_anuales(quimestres).items():
+        promedios_materias.setdefault(nombres.get(subject_id, 'Sin materia'), {})['anual'] = round(prom, 2)
+    general = promedios_generales(quimestres).get(student.id)
+
+    asistencia = Asistencia.objects.filter(
+        inscripcion__estudiante_id=student.usuario_id, inscripcion__clase__ciclo_lectivo=ciclo,
+    ).aggregate(
+        total=Count('id'),
+        presentes=Count('id', filter=Q(estado=Asistencia.Estado.PRESENTE)),
+        ausentes=Count('id', filter=Q(estado=Asistencia.Estado.AUSENTE)),
+        justificados=Count('id', filter=Q(estado=Asistencia.Estado.JUSTIFICADO)),
+        ultimo=Max('fecha_actualizacion'),
+    )
+    ultima_asistencia = asistencia.pop('ultimo')
+    if ultima_asistencia and (ultimo is None or ultima_asistencia > ultimo):
+        ultimo = ultima_asistencia
+    total = asistencia['total']
+    asistencia['porcentaje'] = round(asistencia['presentes'] / total * 100, 1) if total else 0
+
+    datos = {
+        'student_id': student.id,
+        'nombre': student.usuario.nombre if student.usuario else '',
+        'promedio_general': float(general) if general is not None else None,
+        'promedios_materias': promedios_materias,
+        'materias': materias,
+        'asistencia': asistencia,
+    }
+    return datos, ultimo
+
+
+def libreta_estudiante(student_id):
+    """
+    (datos, etag, ultimo) de la libreta, cacheados por estudiante; None si el
+    estudiante no existe. El ETag es el hash del contenido, así un acierto de
+    caché responde (o devuelve 304) sin consultas.
+    """
+    from students.models import Student
+
+    clave = _clave_libreta(student_id)
+    libreta = cache.get(clave)
+    if libreta is None:
+        student = Student.objects.select_related('usuario').filter(pk=student_id).first()
+        if student is None:
+            return None
+        datos, ultimo = calcular_libreta(student)
+        firma = hashlib.md5(json.dumps(datos, sort_keys=True, default=str).encode()).hexdigest()
+        libreta = (datos, f'"{firma}"', ultimo)
+        cache.set(clave, libreta, LIBRETA_TTL)
+    return libreta
+
+
+def invalidar_libreta(*student_ids):
+    invalidar_etiquetas(*[_etiqueta_estudiante(pk) for pk in student_ids if pk])
@@ -0,0 +1,859 @@
+"""
+ETL por etapas de los CSVs normalizados (base_de_datos_json/normalizado/).
+
+Reemplaza la cadena de pasos fila a fila de migrar_desde_csv por etapas con
+punto de control (EtlEtapa) y un área de staging (EtlRegistro):
+
+  extraer              CSVs → EtlRegistro (una fila normalizada por clave
+                       natural); cada fuente se lee una sola vez
+  docentes             Usuario(DOCENTE) + Teacher
+  grados               GradeLevel
+  estudiantes          Usuario(ESTUDIANTE) + Student: nivel, representante,
+                       info médica y escolar
+  materias             Subject (instrumentos, agrupaciones, teoría)
+  clases               Resuelve estudiantes/docentes por nombre y crea Clases
+  inscripciones        Enrollment
+  docentes_agrupacion  Docente base de las agrupaciones (votos de instrumento)
+  malla                Matrícula por malla curricular del nivel
+
+Cada etapa resuelve sus entidades con unas pocas consultas filter(__in=...) y
+escribe con bulk_create / bulk_update: solo inserta lo que falta y solo
+actualiza lo que cambió, así que repetirla no duplica nada. Corre en su propia
+transacción junto con su EtlEtapa; si falla, las anteriores quedan COMPLETADAS
+y `etl_pipeline --resume` continúa desde la que falló.
+
+Las escrituras masivas no emiten post_save: los perfiles Teacher/Student, el
+registration_code, el ciclo de GradeLevel, el docente heredado de la clase y
+la auto-matrícula por malla (classes.signals) se aplican aquí explícitamente.
+"""
+import csv
+import hashlib
+import os
+import time
+import uuid
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from classes.cargas import matricular_por_malla
+from classes.estadisticas import invalidar_estadisticas_anuales
+from classes.models import Clase, Enrollment, EtlEjecucion, EtlEtapa, EtlRegistro, GradeLevel
+from students.models import Student
+from subjects.models import Subject
+from teachers.models import Teacher
+from users.models import Usuario
+from utils.cache import invalidar_dominio
+from utils.etl_normalization import map_grade_level, norm_key
+from utils.name_index import NameIndex
+
+ETAPAS = (
+    'extraer', 'docentes', 'grados', 'estudiantes', 'materias',
+    'clases', 'inscripciones', 'docentes_agrupacion', 'malla',
+)
+
+LOTE = 500
+MAX_AVISOS = 50
+CONFIANZA_AGRUPACION = 0.25
+
+
+# ─── Materias de teoría en horarios.csv ──────────────────────────────────────
+
+# nombre crudo normalizado → (nombre canónico, tipo_materia)
+MATERIAS_TEORIA: Dict[str, tuple] = {
+    'audioperceptiva':                   ('Audioperceptiva', 'TEORIA'),
+    'educacion ritmica audioperceptiva': ('Audioperceptiva', 'TEORIA'),
+    'lenguaje musical':                  ('Lenguaje Musical', 'TEORIA'),
+    'lenguaje musica':                   ('Lenguaje Musical', 'TEORIA'),
+    'lenguaje':                          ('Lenguaje Musical', 'TEORIA'),
+    'armonia':                           ('Armonía', 'TEORIA'),
+    'formas musicales':                  ('Formas Musicales', 'TEORIA'),
+    'formas musical':                    ('Formas Musicales', 'TEORIA'),
+    'historia de la musica':             ('Historia de la Música', 'TEORIA'),
+    'creacion y arreglos':               ('Creación y Arreglos Musicales', 'TEORIA'),
+    'produccion artistico musical':      ('Producción Artístico Musical', 'TEORIA'),
+    'capacitacion en musica':            ('Capacitación en Música', 'TEORIA'),
+    'informatica aplicada':              ('Informática Aplicada', 'TEORIA'),
+    'formacion y orientacion':           ('Formación y Orientación', 'TEORIA'),
+    'coro':                              ('Coro', 'AGRUPACION'),
+    'orquesta pedagogica':               ('Orquesta Pedagógica', 'AGRUPACION'),
+}
+
+# Ya importadas como INSTRUMENTO / AGRUPACION, o no relevantes
+MATERIAS_TEORIA_OMITIR = {
+    'agrupacion: orquesta, banda, ensamble de guitarra o coro',
+    'conjunto instrumental/vocal o mixto',
+    'piano complementario',
+    'instrumento',
+    'acompanamiento para pianistas',
+}
+
+CURSOS_HORARIO = {
+    'decimo primer': '11', 'decimo': '10', 'noveno': '9',
+    'octavo': '8', 'septimo': '7', 'sexto': '6', 'quinto': '5',
+    'cuarto': '4', 'tercero': '3', 'segundo': '2', 'primero': '1',
+}
+
+
+def nivel_de_curso(curso: str) -> Optional[str]:
+    s = norm_key(curso)
+    for clave, nivel in sorted(CURSOS_HORARIO.items(), key=lambda x: -len(x[0])):
+        if s.startswith(clave):
+            return nivel
+    return None
+
+
+def seccion_de_paralelo(paralelo: str) -> str:
+    return paralelo.strip().split()[0].upper() if paralelo.strip() else ''
+
+
+def materia_teoria(asignatura: str) -> Optional[tuple]:
+    """(nombre canónico, tipo) de una asignatura del horario, o None si se ignora."""
+    s = norm_key(asignatura)
+    # Nombres de docente pegados: "Lenguaje Musica Mgs.Jorge De La Cruz"
+    if 'mgs.' in s or 'mgs ' in s:
+        s = s.split('mgs.')[0].split('mgs ')[0].strip()
+    if 'jose luis' in s:
+        s = s.replace('jose luis cumbicos', '').strip()
+    if 'israel' in s and 'perez' in s:
+        s = s.split(' israel')[0].strip()
+    if 'jorge de la' in s:
+        s = s.split(' jorge de la')[0].strip()
+    if any(s.startswith(omitir) or omitir in s for omitir in MATERIAS_TEORIA_OMITIR):
+        return None
+    for clave, valor in MATERIAS_TEORIA.items():
+        if s.startswith(clave):
+            return valor
+    return None
+
+
+# ─── Fuentes ─────────────────────────────────────────────────────────────────
+
+def leer_csv(csv_dir: str, nombre: str, delimitador: str = ',') -> List[Dict]:
+    """Filas de `<nombre>.csv`; un archivo ausente es una fuente vacía."""
+    ruta = os.path.join(csv_dir, f'{nombre}.csv')
+    if not os.path.exists(ruta):
+        return []
+    with open(ruta, encoding='utf-8-sig') as f:
+        return list(csv.DictReader(f, delimiter=delimitador))
+
+
+def firma_fuentes(csv_dir: str) -> str:
+    """sha256 de los CSVs del directorio: --resume exige que no hayan cambiado."""
+    h = hashlib.sha256()
+    for nombre in sorted(os.listdir(csv_dir)):
+        if nombre.endswith('.csv'):
+            h.update(nombre.encode())
+            with open(os.path.join(csv_dir, nombre), 'rb') as f:
+                h.update(f.read())
+    return h.hexdigest()
+
+
+def _id(valor) -> str:
+    return str(valor or '').replace('.0', '').strip()
+
+
+def _texto(fila: Dict, campo: str) -> str:
+    return (fila.get(campo) or '').strip()
+
+
+def _nombre_completo(apellidos: str, nombres: str) -> str:
+    return f"{(apellidos or '').strip()} {(nombres or '').strip()}".strip()
+
+
+def _email(valor: str) -> Optional[str]:
+    valor = (valor or '').strip()
+    return valor if '@' in valor else None
+
+
+def _agregar_nota(notas: str, etiqueta: str, valor: str) -> str:
+    if not valor or etiqueta.lower() in notas.lower():
+        return notas
+    return (notas + f'\n{etiqueta}: {valor}').strip()
+
+
+# ─── Pipeline ────────────────────────────────────────────────────────────────
+
+class PipelineETL:
+    """
+    Ejecuta las etapas de una EtlEjecucion. `informar(etapa)` recibe cada
+    EtlEtapa completada (el comando imprime ahí los tiempos).
+    """
+
+    def __init__(self, ejecucion: EtlEjecucion, informar=None):
+        self.ejecucion = ejecucion
+        self.ciclo = ejecucion.ciclo_lectivo
+        self.informar = informar or (lambda etapa: None)
+        self._conteos: Counter = Counter()
+        self._avisos: List[str] = []
+
+    def completadas(self) -> set:
+        return set(
+            self.ejecucion.etapas.filter(estado=EtlEtapa.Estado.COMPLETADA).values_list('nombre', flat=True)
+        )
+
+    def ejecutar(self, etapas=None, reanudar=False) -> List[EtlEtapa]:
+        """
+        Ejecuta `etapas` (todas por defecto) en el orden de ETAPAS. Con
+        reanudar=True omite las ya COMPLETADAS; 'extraer' se antepone si el
+        staging de la ejecución todavía no existe.
+        """
+        pedidas = set(etapas or ETAPAS)
+        hechas = self.completadas()
+        if 'extraer' not in hechas:
+            pedidas.add('extraer')
+
+        ejecutadas = []
+        for nombre in ETAPAS:
+            if nombre in pedidas and not (reanudar and nombre in hechas):
+                ejecutadas.append(self.ejecutar_etapa(nombre))
+
+        if self.ejecucion.finalizada is None and set(ETAPAS) <= self.completadas():
+            self.ejecucion.finalizada = timezone.now()
+            self.ejecucion.save(update_fields=['finalizada'])
+        if ejecutadas:
+            transaction.on_commit(lambda: invalidar_dominio('catalogos', 'malla', 'dashboards'))
+            transaction.on_commit(lambda: invalidar_estadisticas_anuales(self.ciclo))
+        return ejecutadas
+
+    def ejecutar_etapa(self, nombre: str) -> EtlEtapa:
+        self._conteos = Counter()
+        self._avisos = []
+        inicio = timezone.now()
+        t0 = time.perf_counter()
+        try:
+            with transaction.atomic():
+                getattr(self, f'_etapa_{nombre}')()
+                etapa = self._punto_control(nombre, EtlEtapa.Estado.COMPLETADA, inicio, t0)
+        except Exception as exc:
+            self._punto_control(nombre, EtlEtapa.Estado.FALLIDA, inicio, t0, error=f'{type(exc).__name__}: {exc}')
+            raise
+        self.informar(etapa)
+        return etapa
+
+    def _punto_control(self, nombre, estado, inicio, t0, error='') -> EtlEtapa:
+        conteos = dict(self._conteos)
+        if self._avisos:
+            conteos['avisos'] = self._avisos
+        etapa, _ = EtlEtapa.objects.update_or_create(
+            ejecucion=self.ejecucion,
+            nombre=nombre,
+            defaults={
+                'estado': estado,
+                'inicio': inicio,
+                'fin': timezone.now(),
+                'segundos': round(time.perf_counter() - t0, 3),
+                'conteos': conteos,
+                'error': error,
+            },
+        )
+        return etapa
+
+    # ─── helpers ─────────────────────────────────────────────────────────────
+
+    def _contar(self, clave: str, n: int = 1):
+        if n:
+            self._conteos[clave] += n
+
+    def _avisar(self, mensaje: str):
+        self._conteos['con_aviso'] += 1
+        if len(self._avisos) < MAX_AVISOS:
+            self._avisos.append(mensaje)
+
+    def _registros(self, entidad: str) -> List[EtlRegistro]:
+        return list(self.ejecucion.registros.filter(entidad=entidad).order_by('id'))
+
+    def _coincidencia(self, indice: NameIndex, nombre: str, nombres_de=None):
+        """Exacta → subconjunto de tokens → difusa; los ambiguos se avisan y no se asignan."""
+        coincidencia = indice.match(nombre)
+        if coincidencia.ambiguous:
+            candidatos = coincidencia.candidates[:5]
+            if nombres_de:
+                candidatos = [nombres_de.get(c, c) for c in candidatos]
+            self._avisar(f'Nombre ambiguo "{nombre}": ' + ', '.join(map(str, candidatos)))
+        return coincidencia.value
+
+    def _indice_docentes(self):
+        nombres = dict(Usuario.objects.filter(rol=Usuario.Rol.DOCENTE).values_list('id', 'nombre'))
+        return NameIndex((nombre, pk) for pk, nombre in nombres.items()), nombres
+
+    def _docente(self, indice, nombres, nombre: str) -> Optional[int]:
+        return self._coincidencia(indice, nombre, nombres) if nombre else None
+
+    @staticmethod
+    def _docente_por_nombre_corto(indice, nombre_corto: str) -> Optional[int]:
+        """Docente por nombre parcial del horario ('Jorge Arias', 'Mgs. Arias.')."""
+        if not nombre_corto or nombre_corto.strip().upper() in ('ND', 'NULO', 'NULL'):
+            return None
+        partes = [w for w in nombre_corto.strip().rstrip('.').split() if len(w) > 2]
+        if not partes:
+            return None
+        candidatos = indice.candidates(' '.join(partes))
+        if len(candidatos) == 1:
+            return candidatos[0]
+        candidatos = indice.candidates(partes[-1])
+        return candidatos[0] if len(candidatos) == 1 else None
+
+    # ─── 1. extraer ──────────────────────────────────────────────────────────
+
+    def _etapa_extraer(self):
+        d = self.ejecucion.fuente
+        self.ejecucion.registros.all().delete()
+        filas: Dict[tuple, dict] = {}
+
+        def agregar(entidad, clave, datos):
+            filas.setdefault((entidad, clave[:255]), datos)
+
+        # Docentes
+        docentes_csv = {}
+        for r in leer_csv(d, 'docente'):
+            nombre = _texto(r, 'nombre_completo')
+            if not nombre:
+                continue
+            docentes_csv[_id(r.get('id'))] = nombre
+            # Variantes del mismo nombre ('PÉREZ' / 'PÈREZ') son un solo docente
+            datos = filas.setdefault(('docente', norm_key(nombre)[:255]), {
+                'nombre': nombre, 'cedula': None, 'email': None, 'phone': None,
+            })
+            datos['cedula'] = datos['cedula'] or _texto(r, 'cedula') or None
+            datos['email'] = datos['email'] or _email(r.get('correo_institucional') or r.get('correo_personal'))
+            datos['phone'] = datos['phone'] or _texto(r, 'celular') or None
+
+        # Grados: cada curso × cada paralelo
+        cursos = {_id(r.get('id')): map_grade_level(r.get('anio'), None).level for r in leer_csv(d, 'curso')}
+        paralelos = {_id(r.get('id')): _texto(r, 'letra') for r in leer_csv(d, 'paralelo')}
+        for nivel in sorted({n for n in cursos.values() if n}, key=int):
+            for seccion in sorted({s for s in paralelos.values() if s}):
+                agregar('grado', f'{nivel}-{seccion}', {'nivel': nivel, 'seccion': seccion})
+
+        # Estudiantes con cédula (estudiante.csv)
+        estudiantes: Dict[str, dict] = {}
+        indice_csv = NameIndex()
+
+        def estudiante(clave, nombre='', cedula=None, email=None):
+            return estudiantes.setdefault(clave, {
+                'nombre': nombre, 'cedula': cedula, 'email': email,
+                'nivel': None, 'seccion': None, 'nivel_fijo': False,
+                'padre': '', 'telefono_padre': '', 'direccion': '', 'notas': [],
+            })
+
+        est_csv = leer_csv(d, 'estudiante')
+        for r in est_csv:
+            nombre = _nombre_completo(r.get('apellidos'), r.get('nombres'))
+            if not nombre:
+                continue
+            cedula = _texto(r, 'cedula') or None
+            clave = f'c:{cedula}' if cedula else f'n:{norm_key(nombre)}'
+            estudiante(clave, nombre, cedula, _email(r.get('correo')))
+            indice_csv.add(nombre, clave)
+
+        # Representante: nombre, primer celular y dirección
+        est_rep = {_texto(r, 'cedula_estudiante'): r for r in leer_csv(d, 'estudiante_representante')}
+        representantes = {_texto(r, 'cedula'): r for r in leer_csv(d, 'representante')}
+        telefonos = {}
+        for r in leer_csv(d, 'telefono'):
+            ced = _texto(r, 'cedula_representante')
+            if ced not in telefonos and 'CELULAR' in (r.get('tipo') or ''):
+                telefonos[ced] = _texto(r, 'numero')
+        for r in est_csv:
+            cedula = _texto(r, 'cedula')
+            vinculo = est_rep.get(cedula)
+            if not cedula or not vinculo or f'c:{cedula}' not in estudiantes:
+                continue
+            cedula_rep = _texto(vinculo, 'cedula_representante')
+            rep = representantes.get(cedula_rep, {})
+            datos = estudiantes[f'c:{cedula}']
+            datos['padre'] = _nombre_completo(rep.get('apellidos'), rep.get('nombres'))
+            datos['telefono_padre'] = telefonos.get(cedula_rep, '')
+            datos['direccion'] = _texto(vinculo, 'direccion')
+
+        # Matrícula: nivel vigente (prevalece sobre el de las asignaciones)
+        for r in leer_csv(d, 'matricula'):
+            cedula = _texto(r, 'cedula_estudiante')
+            if not cedula:
+                continue
+            nivel = cursos.get(_id(r.get('curso_id')))
+            seccion = paralelos.get(_id(r.get('paralelo_id')))
+            if not nivel or not seccion:
+                self._avisar(f'Matrícula sin nivel/paralelo: est={cedula}')
+                continue
+            datos = estudiante(f'c:{cedula}', cedula=cedula)
+            datos.update(nivel=nivel, seccion=seccion, nivel_fijo=True)
+
+        # Info médica y escolar → notas
+        for r in leer_csv(d, 'info_medica'):
+            cedula = _texto(r, 'cedula_estudiante')
+            if not cedula:
+                continue
+            notas = estudiante(f'c:{cedula}', cedula=cedula)['notas']
+            alergias = _texto(r, 'alergias_condiciones')
+            detalle = _texto(r, 'detalle_necesidad')
+            if alergias and alergias not in ('nan', 'None', 'No'):
+                notas.append(['Alergias', alergias])
+            if _texto(r, 'tiene_necesidad_educativa') in ('Sí', 'Si', 'si', 'sí', 'YES', 'True', '1') and detalle:
+                notas.append(['NEE', detalle])
+        for r in leer_csv(d, 'info_escolar'):
+            cedula = _texto(r, 'cedula_estudiante')
+            if not cedula:
+                continue
+            notas = estudiante(f'c:{cedula}', cedula=cedula)['notas']
+            institucion = _texto(r, 'institucion_regular')
+            anio = _texto(r, 'anio_estudio_regular')
+            if institucion and institucion not in ('nan', 'None', 'No'):
+                notas.append(['Institución regular', institucion])
+            if anio and anio not in ('nan', 'None'):
+                notas.append(['Año escolar regular', anio])
+
+        # Materias
+        instrumentos = {_id(r.get('id')): _texto(r, 'nombre') for r in leer_csv(d, 'instrumento')}
+        agrupaciones = {_id(r.get('id')): _texto(r, 'nombre') for r in leer_csv(d, 'agrupacion')}
+        for nombre in instrumentos.values():
+            if nombre:
+                agregar('materia', nombre, {'nombre': nombre, 'tipo': 'INSTRUMENTO', 'forzar_tipo': True})
+        for nombre in agrupaciones.values():
+            if nombre:
+                agregar('materia', nombre, {'nombre': nombre, 'tipo': 'AGRUPACION', 'forzar_tipo': False})
+        for nombre in ('Piano Acompañamiento', 'Piano Complementario'):
+            agregar('materia', nombre, {'nombre': nombre, 'tipo': 'INSTRUMENTO', 'forzar_tipo': False})
+
+        # Asignaciones → inscripciones (y estudiantes sin cédula)
+        fuentes = (
+            ('instrumento', 'asignacion_instrumento'),
+            ('agrupacion', 'asignacion_agrupacion'),
+            ('complementario', 'asignacion_complementario'),
+            ('acompanamiento', 'asignacion_acompanamiento'),
+        )
+        for origen, archivo in fuentes:
+            for r in leer_csv(d, archivo):
+                ap, nm = _texto(r, 'apellidos_estudiante'), _texto(r, 'nombres_estudiante')
+                nombre = _nombre_completo(ap, nm)
+                if ap and nm and nombre not in indice_csv:
+                    datos = estudiante(f'n:{norm_key(nombre)}', nombre)
+                    if not datos['nivel']:
+                        datos['nivel'] = cursos.get(_id(r.get('curso_id')))
+                        datos['seccion'] = paralelos.get(_id(r.get('paralelo_id'))) or None
+
+                if origen == 'instrumento':
+                    materia = instrumentos.get(_id(r.get('instrumento_id')), '')
+                    docente, tipo = docentes_csv.get(_id(r.get('docente_id')), ''), 'INSTRUMENTO'
+                elif origen == 'agrupacion':
+                    materia = agrupaciones.get(_id(r.get('agrupacion_id')), '')
+                    docente, tipo = '', 'AGRUPACION'
+                elif origen == 'complementario':
+                    materia = 'Piano Complementario'
+                    docente, tipo = docentes_csv.get(_id(r.get('docente_complementario_id')), ''), 'INSTRUMENTO'
+                else:
+                    materia = 'Piano Acompañamiento'
+                    docente, tipo = docentes_csv.get(_id(r.get('docente_acompanamiento_id')), ''), 'INSTRUMENTO'
+
+                clave = '|'.join((origen, norm_key(nombre), norm_key(materia), norm_key(docente)))
+                agregar('inscripcion', clave, {
+                    'origen': origen, 'apellidos': ap, 'nombres': nm,
+                    'materia': materia, 'docente': docente, 'tipo': tipo,
+                })
+
+        for clave, datos in estudiantes.items():
+            agregar('estudiante', clave, datos)
+
+        # Teoría desde horarios.csv
+        for r in leer_csv(d, 'horarios', delimitador=';'):
+            info = materia_teoria(_texto(r, 'asignatura'))
+            nivel = nivel_de_curso(_texto(r, 'curso'))
+            seccion = seccion_de_paralelo(_texto(r, 'paralelo'))
+            if info is None or not nivel or not seccion:
+                continue
+            materia, tipo = info
+            docente_corto = _texto(r, 'docente')
+            agregar('materia', materia, {'nombre': materia, 'tipo': tipo, 'forzar_tipo': False})
+            agregar('teoria', f'{nivel}-{seccion}|{norm_key(materia)}|{norm_key(docente_corto)}', {
+                'nivel': nivel, 'seccion': seccion, 'materia': materia, 'docente_corto': docente_corto,
+            })
+
+        EtlRegistro.objects.bulk_create(
+            [
+                EtlRegistro(ejecucion=self.ejecucion, entidad=entidad, clave=clave, datos=datos)
+                for (entidad, clave), datos in filas.items()
+            ],
+            batch_size=LOTE,
+        )
+        for entidad, _clave in filas:
+            self._contar(entidad)
+
+    # ─── 2. docentes ─────────────────────────────────────────────────────────
+
+    def _etapa_docentes(self):
+        registros = self._registros('docente')
+        filas = [r.datos for r in registros]
+        por_cedula = {u.cedula: u for u in Usuario.objects.filter(cedula__in={f['cedula'] for f in filas if f['cedula']})}
+        por_email = {u.email: u for u in Usuario.objects.filter(email__in={f['email'] for f in filas if f['email']})}
+        por_nombre = {}
+        for u in Usuario.objects.filter(rol=Usuario.Rol.DOCENTE, nombre__in={f['nombre'] for f in filas}).order_by('id'):
+            por_nombre.setdefault(u.nombre, u)
+
+        nuevos, cambiados, usuarios = [], {}, []
+        for f in filas:
+            u = por_cedula.get(f['cedula']) or por_email.get(f['email']) or por_nombre.get(f['nombre'])
+            if u is None:
+                u = Usuario(
+                    nombre=f['nombre'], rol=Usuario.Rol.DOCENTE,
+                    cedula=f['cedula'] if f['cedula'] not in por_cedula else None,
+                    email=f['email'] if f['email'] not in por_email else None,
+                    phone=f['phone'],
+                )
+                nuevos.append(u)
+            else:
+                # Completa solo los campos vacíos, sin pisar un valor único ya usado
+                if f['cedula'] and not u.cedula and f['cedula'] not in por_cedula:
+                    u.cedula = f['cedula']
+                    cambiados[id(u)] = u
+                if f['email'] and not u.email and f['email'] not in por_email:
+                    u.email = f['email']
+                    cambiados[id(u)] = u
+                if f['phone'] and not u.phone:
+                    u.phone = f['phone']
+                    cambiados[id(u)] = u
+            for indice, valor in ((por_cedula, u.cedula), (por_email, u.email), (por_nombre, u.nombre)):
+                if valor:
+                    indice.setdefault(valor, u)
+            usuarios.append(u)
+
+        Usuario.objects.bulk_create(nuevos, batch_size=LOTE)
+        Usuario.objects.bulk_update([u for u in cambiados.values() if u.pk], ['cedula', 'email', 'phone'], batch_size=LOTE)
+
+        ids = {u.pk for u in usuarios}
+        con_perfil = set(Teacher.objects.filter(usuario_id__in=ids).values_list('usuario_id', flat=True))
+        perfiles = [Teacher(usuario_id=pk, specialization='') for pk in ids - con_perfil]
+        Teacher.objects.bulk_create(perfiles, batch_size=LOTE)
+        # Usuarios existentes encontrados por cédula o email (p. ej. PENDIENTE) pasan a DOCENTE
+        con_rol = Usuario.objects.filter(pk__in=ids).exclude(rol=Usuario.Rol.DOCENTE).update(rol=Usuario.Rol.DOCENTE)
+
+        for r, u in zip(registros, usuarios):
+            r.objeto_id = u.pk
+        EtlRegistro.objects.bulk_update(registros, ['objeto_id'], batch_size=LOTE)
+
+        self._contar('creados', len(nuevos))
+        self._contar('actualizados', len([u for u in cambiados.values() if u.pk]))
+        self._contar('perfiles', len(perfiles))
+        self._contar('rol_docente', con_rol)
+        self._contar('existentes', len(ids) - len(nuevos))
+
+    # ─── 3. grados ───────────────────────────────────────────────────────────
+
+    def _etapa_grados(self):
+        registros = self._registros('grado')
+        existentes = {(g.level, g.section): g for g in GradeLevel.objects.all()}
+        nuevos = []
+        for r in registros:
+            clave = (r.datos['nivel'], r.datos['seccion'])
+            if clave not in existentes:
+                existentes[clave] = GradeLevel(
+                    level=clave[0], section=clave[1], ciclo=GradeLevel._NIVEL_CICLO.get(clave[0], ''),
+                )
+                nuevos.append(existentes[clave])
+        GradeLevel.objects.bulk_create(nuevos, batch_size=LOTE)
+
+        for r in registros:
+            r.objeto_id = existentes[(r.datos['nivel'], r.datos['seccion'])].pk
+        EtlRegistro.objects.bulk_update(registros, ['objeto_id'], batch_size=LOTE)
+        self._contar('creados', len(nuevos))
+        self._contar('existentes', len(registros) - len(nuevos))
+
+    # ─── 4. estudiantes ──────────────────────────────────────────────────────
+
+    def _etapa_estudiantes(self):
+        registros = self._registros('estudiante')
+        filas = [r.datos for r in registros]
+        por_cedula = {u.cedula: u for u in Usuario.objects.filter(cedula__in={f['cedula'] for f in filas if f['cedula']})}
+        por_email = {u.email: u for u in Usuario.objects.filter(email__in={f['email'] for f in filas if f['email']})}
+        por_nombre = {}
+        sin_cedula = {f['nombre'] for f in filas if f['nombre'] and not f['cedula']}
+        for u in Usuario.objects.filter(rol=Usuario.Rol.ESTUDIANTE, nombre__in=sin_cedula).order_by('id'):
+            por_nombre.setdefault(u.nombre, u)
+
+        nuevos, resueltos = [], []
+        for r in registros:
+            f = r.datos
+            u = por_cedula.get(f['cedula']) if f['cedula'] else None
+            if u is None and f['email']:
+                u = por_email.get(f['email'])
+            if u is None and not f['cedula']:
+                u = por_nombre.get(f['nombre'])
+            if u is None:
+                if not f['nombre']:
+                    # Matrícula / info de una cédula que no está en estudiante.csv
+                    if f['nivel']:
+                        self._avisar(f'Matrícula: no se encontró estudiante cedula={f["cedula"]}')
+                    self._contar('omitidos')
+                    continue
+                u = Usuario(
+                    nombre=f['nombre'], rol=Usuario.Rol.ESTUDIANTE,
+                    cedula=f['cedula'],
+                    email=f['email'] if f['email'] not in por_email else None,
+                )
+                nuevos.append(u)
+                for indice, valor in ((por_cedula, u.cedula), (por_email, u.email), (por_nombre, u.nombre)):
+                    if valor:
+                        indice.setdefault(valor, u)
+            resueltos.append((r, u))
+
+        Usuario.objects.bulk_create(nuevos, batch_size=LOTE)
+        self._contar('creados', len(nuevos))
+
+        # Cambio de rol con save(): las señales ajustan los perfiles
+        for r, u in resueltos:
+            if r.datos['nombre'] and u.rol == Usuario.Rol.PENDIENTE:
+                u.rol = Usuario.Rol.ESTUDIANTE
+                u.save()
+                self._contar('rol_actualizado')
+
+        ids = {u.pk for r, u in resueltos}
+        perfiles = {s.usuario_id: s for s in Student.objects.filter(usuario_id__in=ids)}
+        faltantes = []
+        for r, u in resueltos:
+            if r.datos['nombre'] and u.pk not in perfiles:
+                perfiles[u.pk] = Student(usuario_id=u.pk, registration_code=str(uuid.uuid4()))
+                faltantes.append(perfiles[u.pk])
+        Student.objects.bulk_create(faltantes, batch_size=LOTE)
+        self._contar('perfiles', len(faltantes))
+
+        grados = {(g.level, g.section): g.pk for g in GradeLevel.objects.all()}
+        cambiados = {}
+        for r, u in resueltos:
+            f, st = r.datos, perfiles.get(u.pk)
+            if st is None:
+                continue
+            antes = (st.grade_level_id, st.parent_name, st.parent_phone, st.notes)
+            if f['nivel'] and f['seccion']:
+                grado = grados.get((f['nivel'], f['seccion']))
+                if grado is None:
+                    self._avisar(f'GL no encontrado: {f["nivel"]}{f["seccion"]}')
+                elif f['nivel_fijo'] or st.grade_level_id is None:
+                    st.grade_level_id = grado
+            if f['padre'] and not st.parent_name:
+                st.parent_name = f['padre']
+            if f['telefono_padre'] and not st.parent_phone:
+                st.parent_phone = f['telefono_padre']
+            if f['direccion'] and 'Dirección' not in st.notes:
+                st.notes = (st.notes + f'\nDirección: {f["direccion"]}').strip()
+            for etiqueta, valor in f['notas']:
+                st.notes = _agregar_nota(st.notes, etiqueta, valor)
+            if (st.grade_level_id, st.parent_name, st.parent_phone, st.notes) != antes:
+                cambiados[st.pk] = st
+        Student.objects.bulk_update(
+            list(cambiados.values()), ['grade_level', 'parent_name', 'parent_phone', 'notes'], batch_size=LOTE,
+        )
+        self._contar('actualizados', len(cambiados))
+
+        for r, u in resueltos:
+            r.objeto_id = u.pk
+        EtlRegistro.objects.bulk_update([r for r, _ in resueltos], ['objeto_id'], batch_size=LOTE)
+
+    # ─── 5. materias ─────────────────────────────────────────────────────────
+
+    def _etapa_materias(self):
+        registros = self._registros('materia')
+        existentes = {s.name: s for s in Subject.objects.filter(name__in=[r.datos['nombre'] for r in registros])}
+        nuevas, corregidas = [], []
+        for r in registros:
+            f = r.datos
+            materia = existentes.get(f['nombre'])
+            if materia is None:
+                materia = existentes[f['nombre']] = Subject(name=f['nombre'], tipo_materia=f['tipo'])
+                nuevas.append(materia)
+            elif f['forzar_tipo'] and materia.tipo_materia != f['tipo']:
+                materia.tipo_materia = f['tipo']
+                corregidas.append(materia)
+        Subject.objects.bulk_create(nuevas, batch_size=LOTE)
+        Subject.objects.bulk_update(corregidas, ['tipo_materia'], batch_size=LOTE)
+
+        for r in registros:
+            r.objeto_id = existentes[r.datos['nombre']].pk
+        EtlRegistro.objects.bulk_update(registros, ['objeto_id'], batch_size=LOTE)
+        self._contar('creadas', len(nuevas))
+        self._contar('tipo_corregido', len(corregidas))
+
+    # ─── 6. clases ───────────────────────────────────────────────────────────
+
+    def _etapa_clases(self):
+        materias = {r.clave: r.objeto_id for r in self._registros('materia')}
+        docentes, nombres_docente = self._indice_docentes()
+
+        estudiantes = NameIndex()
+        nombres_estudiante = {}
+        for r in self._registros('estudiante'):
+            if r.objeto_id and r.datos['nombre']:
+                estudiantes.add(r.datos['nombre'], r.objeto_id)
+                nombres_estudiante[r.objeto_id] = r.datos['nombre']
+
+        inscripciones = self._registros('inscripcion')
+        teoria = self._registros('teoria')
+        sin_estudiante = []
+        for r in inscripciones:
+            f = r.datos
+            est = self._coincidencia(estudiantes, _nombre_completo(f['apellidos'], f['nombres']), nombres_estudiante)
+            if est is None:
+                # Solo apellidos, si identifican a un único estudiante
+                por_apellidos = estudiantes.candidates(f['apellidos'])
+                est = por_apellidos[0] if len(por_apellidos) == 1 else None
+            f['estudiante_id'] = est
+            f['docente_id'] = self._docente(docentes, nombres_docente, f['docente'])
+            f['materia_id'] = materias.get(f['materia'])
+            if est is None:
+                sin_estudiante.append(_nombre_completo(f['apellidos'], f['nombres']))
+        for r in teoria:
+            r.datos['docente_id'] = self._docente_por_nombre_corto(docentes, r.datos['docente_corto'])
+            r.datos['materia_id'] = materias.get(r.datos['materia'])
+        if sin_estudiante:
+            self._avisar(
+                f'{len(sin_estudiante)} asignaciones sin estudiante: ' + ', '.join(sin_estudiante[:5])
+                + ('...' if len(sin_estudiante) > 5 else '')
+            )
+        self._contar('sin_estudiante', len(sin_estudiante))
+
+        # (materia, docente | None) → Clase del ciclo
+        existentes, por_materia = {}, {}
+        materia_ids = {m for m in materias.values() if m}
+        for c in Clase.objects.filter(ciclo_lectivo=self.ciclo, subject_id__in=materia_ids).order_by('id'):
+            if c.docente_base_id or c.paralelo == '':
+                existentes.setdefault((c.subject_id, c.docente_base_id), c)
+            if c.grade_level_id is None:
+                por_materia.setdefault(c.subject_id, c)
+        # Sin docente en la fuente: la clase a la que docentes_agrupacion ya
+        # asignó docente base sigue siendo la de la materia
+        for materia, c in por_materia.items():
+            existentes.setdefault((materia, None), c)
+
+        nombres_materia = dict(Subject.objects.filter(pk__in=materia_ids).values_list('id', 'name'))
+        nuevas = {}
+        for r, separador in [(r, ' - ') for r in inscripciones] + [(r, ' — ') for r in teoria]:
+            f = r.datos
+            if not f['materia_id'] or ('estudiante_id' in f and not f['estudiante_id']):
+                continue
+            clave = (f['materia_id'], f['docente_id'])
+            if clave not in existentes:
+                materia = nombres_materia[f['materia_id']]
+                nombre = f'{materia}{separador}{nombres_docente[f["docente_id"]]}' if f['docente_id'] else materia
+                existentes[clave] = nuevas[clave] = Clase(
+                    subject_id=f['materia_id'], ciclo_lectivo=self.ciclo,
+                    docente_base_id=f['docente_id'], paralelo='', name=nombre, active=True,
+                )
+        Clase.objects.bulk_create(list(nuevas.values()), batch_size=LOTE)
+        self._contar('clases_creadas', len(nuevas))
+
+        for r in inscripciones + teoria:
+            clase = existentes.get((r.datos['materia_id'], r.datos['docente_id']))
+            r.objeto_id = clase.pk if clase and r.datos.get('estudiante_id', True) else None
+        EtlRegistro.objects.bulk_update(inscripciones + teoria, ['datos', 'objeto_id'], batch_size=LOTE)
+
+    # ─── 7. inscripciones ────────────────────────────────────────────────────
+
+    def _etapa_inscripciones(self):
+        inscripciones = [r for r in self._registros('inscripcion') if r.objeto_id]
+        teoria = [r for r in self._registros('teoria') if r.objeto_id]
+
+        # (estudiante, clase) → (docente, tipo); la primera asignación gana
+        deseadas = {}
+        for r in inscripciones:
+            deseadas.setdefault((r.datos['estudiante_id'], r.objeto_id), (r.datos['docente_id'], r.datos['tipo']))
+
+        if teoria:
+            grados = {f'{g.level}-{g.section}': g.pk for g in GradeLevel.objects.all()}
+            alumnos = defaultdict(list)
+            for grado, usuario in Student.objects.filter(
+                grade_level_id__in=grados.values(), usuario__isnull=False,
+            ).values_list('grade_level_id', 'usuario_id'):
+                alumnos[grado].append(usuario)
+            for r in teoria:
+                grado = grados.get(f'{r.datos["nivel"]}-{r.datos["seccion"]}')
+                if grado is None:
+                    self._avisar(f'GL no encontrado: {r.datos["nivel"]}{r.datos["seccion"]}')
+                    continue
+                for usuario in alumnos[grado]:
+                    deseadas.setdefault((usuario, r.objeto_id), (r.datos['docente_id'], 'TEORICA'))
+
+        clase_ids = {clase for _, clase in deseadas}
+        docente_base = dict(Clase.objects.filter(pk__in=clase_ids).values_list('id', 'docente_base_id'))
+        existentes = set(
+            Enrollment.objects.filter(clase_id__in=clase_ids).values_list('estudiante_id', 'clase_id')
+        )
+        nuevas = []
+        for (estudiante, clase), (docente, tipo) in deseadas.items():
+            if (estudiante, clase) in existentes:
+                continue
+            docente = docente or docente_base.get(clase)
+            if tipo == 'INSTRUMENTO' and not docente:
+                self._avisar(f'Inscripción de instrumento sin docente: estudiante={estudiante} clase={clase}')
+                continue
+            nuevas.append(Enrollment(
+                estudiante_id=estudiante, clase_id=clase, docente_id=docente,
+                tipo_materia=tipo, estado=Enrollment.Estado.ACTIVO,
+            ))
+        Enrollment.objects.bulk_create(nuevas, batch_size=LOTE)
+        self._contar('creadas', len(nuevas))
+        self._contar('existentes', len(deseadas) - len(nuevas))
+
+    # ─── 8. docentes de agrupación ───────────────────────────────────────────
+
+    def _etapa_docentes_agrupacion(self):
+        # estudiante (norm) → votos por docente de instrumento
+        votos_estudiante = defaultdict(Counter)
+        for r in self._registros('inscripcion'):
+            f = r.datos
+            if f['origen'] == 'instrumento' and f['docente']:
+                votos_estudiante[norm_key(_nombre_completo(f['apellidos'], f['nombres']))][f['docente']] += 1
+        if not votos_estudiante:
+            return
+
+        docentes, nombres_docente = self._indice_docentes()
+        ocupadas = set(
+            Clase.objects.filter(ciclo_lectivo=self.ciclo, docente_base__isnull=False)
+            .values_list('subject_id', 'docente_base_id')
+        )
+        clases = (
+            Clase.objects.filter(ciclo_lectivo=self.ciclo, docente_base=None, subject__tipo_materia='AGRUPACION')
+            .select_related('subject')
+            .prefetch_related(Prefetch(
+                'enrollments', queryset=Enrollment.objects.select_related('estudiante').only('clase_id', 'estudiante__nombre'),
+            ))
+        )
+        actualizadas, por_docente = [], defaultdict(list)
+        for clase in clases:
+            inscritas = [e for e in clase.enrollments.all() if e.estudiante]
+            votos = Counter()
+            for e in inscritas:
+                votos.update(votos_estudiante.get(norm_key(e.estudiante.nombre), {}))
+            if not votos:
+                self._contar('sin_votos')
+                continue
+            mejor, n = votos.most_common(1)[0]
+            confianza = n / max(len(inscritas), 1)
+            docente = self._docente(docentes, nombres_docente, mejor)
+            if docente and confianza >= CONFIANZA_AGRUPACION and (clase.subject_id, docente) not in ocupadas:
+                clase.docente_base_id = docente
+                clase.name = f'{clase.subject.name} — {nombres_docente[docente]}'
+                actualizadas.append(clase)
+                ocupadas.add((clase.subject_id, docente))
+                por_docente[docente].append(clase.pk)
+            else:
+                self._avisar(f'{clase.subject.name}: sin docente confiable (mejor: {mejor!r} {n}/{len(inscritas)})')
+
+        Clase.objects.bulk_update(actualizadas, ['docente_base', 'name'], batch_size=LOTE)
+        for docente, ids in por_docente.items():
+            Enrollment.objects.filter(clase_id__in=ids, docente=None).update(docente_id=docente)
+        self._contar('asignadas', len(actualizadas))
+
+    # ─── 9. malla ────────────────────────────────────────────────────────────
+
+    def _etapa_malla(self):
+        ids = [r.objeto_id for r in self._registros('estudiante') if r.objeto_id]
+        alumnos = list(
+            Student.objects.filter(usuario_id__in=ids, grade_level__isnull=False)
+            .values_list('usuario_id', 'grade_level_id')
+        )
+        clases, inscripciones, conflictos = matricular_por_malla(alumnos, self.ciclo)
+        for conflicto in conflictos:
+            self._avisar(conflicto)
+        self._contar('clases_creadas', clases)
+        self._contar('inscripciones_creadas', inscripciones)
@@ -0,0 +1,74 @@
+"""
+Grilla de calificaciones de un parcial: estudiantes × tipos de aporte.
+
+Las vistas de notas del docente consultaban CalificacionParcial celda por
+celda (un .first() por estudiante y aporte) y luego el promedio de cada
+estudiante por separado. Aquí toda la grilla sale de una sola consulta de
+valores y se reorganiza en memoria; el promedio ponderado del parcial se
+calcula con las mismas filas, igual que
+CalificacionParcial.calcular_promedio_parcial (ignora notas en 0 e incluye
+aportes inactivos que tengan nota). Cada vista pasa el ciclo lectivo en
+`filtros`: un estudiante tiene una fila por ciclo en cada celda.
+
+La usan teachers.views.calificaciones_detalladas_view,
+teachers.views.export_calificaciones_csv y docente.views.calificaciones.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from classes.models import CalificacionParcial, TipoAporte
+
+_CERO = Decimal('0.00')
+
+
+class GrillaNotas:
+    """Notas {student_id: {tipo_aporte_id: Decimal}} y promedios del parcial."""
+
+    def __init__(self, tipos, notas, promedios):
+        self.tipos = tipos
+        self.notas = notas
+        self.promedios = promedios
+
+    def nota(self, student_id, tipo_id):
+        """Calificación registrada o None si la celda está vacía."""
+        return self.notas.get(student_id, {}).get(tipo_id)
+
+    def celdas(self, student_id):
+        """Notas del estudiante en el orden de `tipos` (None si falta)."""
+        fila = self.notas.get(student_id, {})
+        return [fila.get(tipo.id) for tipo in self.tipos]
+
+    def promedio(self, student_id):
+        return self.promedios.get(student_id, _CERO)
+
+
+def tipos_activos():
+    return list(TipoAporte.objects.filter(activo=True).order_by('orden', 'nombre'))
+
+
+def grilla_notas(student_ids, subject_id, quimestre, parcial, tipos=None, **filtros):
+    """Grilla del parcial para `student_ids` en una materia; una consulta de notas."""
+    if tipos is None:
+        tipos = tipos_activos()
+    filas = (
+        CalificacionParcial.objects
+        .filter(
+            student_id__in=list(student_ids), subject_id=subject_id,
+            quimestre=quimestre, parcial=parcial, **filtros,
+        )
+        .order_by()
+        .values_list('student_id', 'tipo_aporte_id', 'calificacion', 'tipo_aporte__peso')
+    )
+    notas = defaultdict(dict)
+    ponderado = defaultdict(lambda: [Decimal('0'), Decimal('0')])
+    for student_id, tipo_id, calificacion, peso in filas:
+        notas[student_id][tipo_id] = calificacion
+        if calificacion > 0:
+            acumulado = ponderado[student_id]
+            acumulado[0] += calificacion * peso
+            acumulado[1] += peso
+    promedios = {
+        student_id: round(suma / pesos, 2) if pesos else _CERO
+        for student_id, (suma, pesos) in ponderado.items()
+    }
+    return GrillaNotas(tipos, dict(notas), promedios)
@@ -0,0 +1,225 @@
+"""
+Motor de horarios: bloques semanales en minutos, índice por recurso y cruces.
+
+Los horarios viven en dos modelos: classes.Horario (día + TimeField) y
+academia.Horario (texto libre: dia='MIÉRCOLES', hora='07:30 a 08:15'). Ambos
+se normalizan a Bloque(dia 0-6, inicio, fin) con los minutos desde las 00:00
+y los recursos que ocupan: docente, aula y curso (GradeLevel).
+
+IndiceIntervalos agrupa los bloques por (recurso, día) y detecta cruces con un
+barrido ordenado por inicio: O(n log n + k) para k cruces, en lugar de
+comparar todos los pares. Los comandos de importación lo usan para reportar
+docentes, aulas o cursos con dos clases a la vez.
+
+Las grillas semanales de docente y estudiante salen de una sola consulta y se
+cachean en el dominio 'horarios' (ver utils/cache.py).
+"""
+import heapq
+import re
+from bisect import bisect_left
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import time
+from typing import Any, Iterable, List, Optional, Tuple
+
+from utils.cache import obtener as obtener_cache
+from utils.etl_normalization import norm_key
+
+DIAS = ('Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo')
+DIAS_LECTIVOS = DIAS[:6]
+_DIA_INDICE = {norm_key(d): i for i, d in enumerate(DIAS)}
+
+_RANGO = re.compile(r'(\d{1,2})[:h.](\d{2})\s*(?:a|-|–|hasta)\s*(\d{1,2})[:h.](\d{2})', re.IGNORECASE)
+
+HORARIOS_TTL = 60 * 60
+
+
+def dia_indice(texto) -> Optional[int]:
+    """'MIÉRCOLES' / 'miercoles' / 'Miércoles' → 2; None si no es un día."""
+    return _DIA_INDICE.get(norm_key(texto))
+
+
+def a_minutos(valor: time) -> int:
+    return valor.hour * 60 + valor.minute
+
+
+def parsear_rango(texto) -> Optional[Tuple[int, int]]:
+    """'07:30 a 08:15' → (450, 495); None si no se reconoce o el fin no es posterior."""
+    m = _RANGO.search(str(texto or ''))
+    if not m:
+        return None
+    h1, m1, h2, m2 = (int(g) for g in m.groups())
+    inicio, fin = h1 * 60 + m1, h2 * 60 + m2
+    if not (0 <= inicio < fin <= 24 * 60):
+        return None
+    return inicio, fin
+
+
+@dataclass(frozen=True)
+class Bloque:
+    dia: int
+    inicio: int
+    fin: int
+    docente: Optional[int] = None
+    aula: str = ''
+    curso: Optional[int] = None
+    ref: Any = None  # origen del bloque (pk, fila del archivo, ...)
+
+    def recursos(self):
+        if self.docente is not None:
+            yield ('docente', self.docente)
+        if self.aula:
+            yield ('aula', norm_key(self.aula))
+        if self.curso is not None:
+            yield ('curso', self.curso)
+
+    def __str__(self):
+        return (f'{DIAS[self.dia]} {self.inicio // 60:02d}:{self.inicio % 60:02d}-'
+                f'{self.fin // 60:02d}:{self.fin % 60:02d}')
+
+
+@dataclass(frozen=True)
+class Conflicto:
+    recurso: Tuple[str, Any]
+    a: Bloque
+    b: Bloque
+
+    def __str__(self):
+        tipo, valor = self.recurso
+        return f'{tipo} {valor}: {self.a} ({self.a.ref}) se cruza con {self.b} ({self.b.ref})'
+
+
+class IndiceIntervalos:
+    """Bloques por (recurso, día), ordenados por inicio."""
+
+    def __init__(self, bloques: Iterable[Bloque] = ()):
+        self._listas = defaultdict(list)
+        self._inicios = {}
+        self._ordenado = True
+        for bloque in bloques:
+            self.agregar(bloque)
+
+    def agregar(self, bloque: Bloque):
+        for recurso in bloque.recursos():
+            self._listas[(recurso, bloque.dia)].append(bloque)
+        self._ordenado = False
+
+    def _ordenar(self):
+        if not self._ordenado:
+            for clave, lista in self._listas.items():
+                lista.sort(key=lambda b: (b.inicio, b.fin))
+                self._inicios[clave] = [b.inicio for b in lista]
+            self._ordenado = True
+
+    def ocupados(self, recurso, dia, inicio, fin) -> List[Bloque]:
+        """Bloques del recurso ese día que se cruzan con [inicio, fin)."""
+        self._ordenar()
+        lista = self._listas.get((recurso, dia), [])
+        # Solo los que empiezan antes de `fin` pueden cruzarse
+        corte = bisect_left(self._inicios.get((recurso, dia), []), fin)
+        return [b for b in lista[:corte] if b.fin > inicio]
+
+    def conflictos(self) -> List[Conflicto]:
+        """Pares de bloques que ocupan el mismo recurso a la vez (barrido por inicio)."""
+        self._ordenar()
+        resultado = []
+        for (recurso, _dia), lista in self._listas.items():
+            activos = []  # heap de (fin, posición)
+            for i, bloque in enumerate(lista):
+                while activos and activos[0][0] <= bloque.inicio:
+                    heapq.heappop(activos)
+                for _fin, j in activos:
+                    resultado.append(Conflicto(recurso, lista[j], bloque))
+                heapq.heappush(activos, (bloque.fin, i))
+        return resultado
+
+
+def detectar_conflictos(bloques: Iterable[Bloque]) -> List[Conflicto]:
+    return IndiceIntervalos(bloques).conflictos()
+
+
+# ── Fuentes ──────────────────────────────────────────────────────────────────
+
+def bloques_clases(horarios) -> List[Bloque]:
+    """classes.Horario (con select_related('clase')) → bloques."""
+    bloques = []
+    for h in horarios:
+        dia = dia_indice(h.dia_semana)
+        if dia is None or h.hora_fin <= h.hora_inicio:
+            continue
+        bloques.append(Bloque(
+            dia, a_minutos(h.hora_inicio), a_minutos(h.hora_fin),
+            docente=h.clase.docente_base_id, aula=h.clase.room,
+            curso=h.clase.grade_level_id, ref=h.pk,
+        ))
+    return bloques
+
+
+def bloques_academia(horarios) -> List[Bloque]:
+    """academia.Horario → bloques; se omiten los de día u hora ilegibles."""
+    bloques = []
+    for h in horarios:
+        dia, rango = dia_indice(h.dia), parsear_rango(h.hora)
+        if dia is None or rango is None:
+            continue
+        bloques.append(Bloque(dia, *rango, docente=h.docente_id, aula=h.aula, curso=h.curso_id, ref=h.pk))
+    return bloques
+
+
+def conflictos_registrados() -> List[Conflicto]:
+    """Cruces entre todos los horarios guardados (una consulta por modelo)."""
+    from academia.models import Horario as HorarioAcademia
+    from classes.models import Horario
+
+    bloques = bloques_clases(Horario.objects.filter(clase__active=True).select_related('clase'))
+    bloques += bloques_academia(HorarioAcademia.objects.all())
+    return detectar_conflictos(bloques)
+
+
+# ── Grillas semanales (vistas de horario) ────────────────────────────────────
+
+def _grilla(horarios):
+    grilla = {dia: [] for dia in DIAS_LECTIVOS}
+    for h in horarios:
+        if h.dia_semana not in grilla:
+            continue
+        clase = h.clase
+        grilla[h.dia_semana].append({
+            'clase': {
+                'id': clase.id,
+                'name': clase.name,
+                'subject': {'name': clase.subject.name} if clase.subject else None,
+            },
+            'hora_inicio': h.hora_inicio,
+            'hora_fin': h.hora_fin,
+            'aula': clase.room,
+        })
+    for bloques in grilla.values():
+        bloques.sort(key=lambda b: b['hora_inicio'])
+    return grilla
+
+
+def grilla_docente(usuario_id):
+    """{día: [bloques]} de las clases activas del docente; una consulta, cacheada."""
+    from classes.models import Horario
+
+    def calcular():
+        return _grilla(
+            Horario.objects.filter(clase__docente_base_id=usuario_id, clase__active=True)
+            .select_related('clase__subject')
+        )
+    return obtener_cache('horarios', ('docente', usuario_id), calcular, HORARIOS_TTL)
+
+
+def grilla_estudiante(usuario_id):
+    """{día: [bloques]} de las inscripciones activas del estudiante; una consulta, cacheada."""
+    from classes.models import Horario
+
+    def calcular():
+        return _grilla(
+            Horario.objects.filter(
+                clase__enrollments__estudiante_id=usuario_id,
+                clase__enrollments__estado='ACTIVO',
+            ).select_related('clase__subject')
+        )
+    return obtener_cache('horarios', ('estudiante', usuario_id), calcular, HORARIOS_TTL)
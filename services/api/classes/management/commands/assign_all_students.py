@@ -5,31 +5,17 @@ import unicodedata
 import re
 import csv
 from django.core.management.base import BaseCommand
-from django.test import Client
-from django.contrib.auth.models import User
+from classes import cargas
 from users.models import Usuario
 from students.models import Student
 from classes.models import Clase, Subject, GradeLevel
+from utils.name_index import NameIndex
 
 # --- Configuración ---
 JSON_AGRUPACIONES_PATH = "/usr/src/app/base_de_datos_json/normalized/asignaciones_grupales/asignaciones_completas.json"
 JSON_TEORICAS_PATH = "/usr/src/app/base_de_datos_json/normalized/horarios_academicos/REPORTE_DOCENTES_HORARIOS_0858.json"
-GRAPHQL_URL = "http://localhost:8000/graphql/"
 ASSIGNMENT_LOG_FILE = "assignment_all_students_log.csv"
 
-ENROLL_STUDENT_MUTATION = """
-mutation EnrollStudent($studentId: ID!, $claseId: ID!, $docenteId: ID) {
-  enrollStudentInClass(studentUsuarioId: $studentId, claseId: $claseId, docenteUsuarioId: $docenteId) {
-    enrollment {
-      id
-      estudiante { nombre }
-      clase { name }
-      docente { nombre }
-    }
-  }
-}
-"""
-
 def normalize_name(name):
     if not name: return ""
     name = str(name)
@@ -43,10 +29,10 @@ class Command(BaseCommand):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.user_cache = {}
+        self.name_indexes = {}
         self.grade_level_cache = {}
         self.log_writer = None
         self.log_file = None
-        self.client = None
 
     def _setup_log_file(self):
         self.log_file = open(ASSIGNMENT_LOG_FILE, 'w', newline='', encoding='utf-8')
@@ -56,40 +42,42 @@ class Command(BaseCommand):
     def _close_log_file(self):
         if self.log_file: self.log_file.close()
 
-    def _get_authenticated_client(self):
-        client = Client()
-        user = User.objects.filter(is_superuser=True).first()
-        if not user: user = User.objects.first()
-        if not user:
-            self.stdout.write(self.style.ERROR("No se encontró ningún usuario para la autenticación."))
-            return None
-        client.force_login(user)
-        self.stdout.write(self.style.SUCCESS(f"Cliente autenticado como: {user.username}"))
-        return client
-
-    def _run_graphql_request(self, query, variables=None):
-        payload = {'query': query}
-        if variables: payload['variables'] = variables
-        try:
-            response = self.client.post(GRAPHQL_URL, json.dumps(payload), content_type='application/json', HTTP_HOST='localhost')
-            if response.status_code != 200:
-                return {'errors': [{'message': f"HTTP Error {response.status_code}", 'details': response.content.decode()}]}
-            json_response = response.json()
-            return json_response
-        except Exception as e:
-            return {'errors': [{'message': f"Error de petición: {str(e)}"}]}
+    def _inscribir(self, pendientes):
+        """
+        Inscribe en un solo lote (classes/cargas.inscribir) y registra cada fila
+        en el log. `pendientes` son pares (fila de inscripción, columnas del log).
+        """
+        resultado = cargas.inscribir([fila for fila, _ in pendientes])
+        errores = dict(resultado.errores)
+        for indice, (_, columnas) in enumerate(pendientes):
+            if indice in errores:
+                self.log_writer.writerow([*columnas, "FALLO", errores[indice]])
+            else:
+                self.log_writer.writerow([*columnas, "EXITO", ""])
+        self.stdout.write(self.style.SUCCESS(
+            f"    -> {len(pendientes) - len(errores)} inscripciones aplicadas ({resultado.creados} nuevas), {len(errores)} fallidas"
+        ))
+        return len(pendientes) - len(errores)
+
+    def _indice(self, rol):
+        if rol not in self.name_indexes:
+            self.name_indexes[rol] = NameIndex(
+                (u.nombre, u) for u in Usuario.objects.filter(rol=rol)
+            )
+        return self.name_indexes[rol]
 
     def _get_or_create_user_and_student(self, full_name):
         normalized_name = normalize_name(full_name)
         if normalized_name in self.user_cache: return self.user_cache[normalized_name]
 
-        user = None
-        # Buscar usuario existente por nombre normalizado
-        for u in Usuario.objects.filter(rol=Usuario.Rol.ESTUDIANTE):
-            if normalize_name(u.nombre) == normalized_name:
-                user = u
-                break
-        
+        # Buscar usuario existente por nombre (índice construido una sola vez)
+        coincidencia = self._indice(Usuario.Rol.ESTUDIANTE).match(full_name, fuzzy=False, subset=False)
+        if coincidencia.ambiguous:
+            self.stdout.write(self.style.WARNING(
+                f"  -> Nombre ambiguo '{full_name}': {', '.join(u.nombre for u in coincidencia.candidates)}"
+            ))
+        user = coincidencia.value
+
         if not user:
             # Si no existe, crear el Usuario y su perfil de Student
             email_base = normalize_name(full_name).replace(' ', '.')
@@ -100,6 +88,7 @@ class Command(BaseCommand):
                 rol=Usuario.Rol.ESTUDIANTE
             )
             Student.objects.create(usuario=user)
+            self._indice(Usuario.Rol.ESTUDIANTE).add(user.nombre, user)
             self.stdout.write(f"  -> Creado Estudiante: {full_name} (ID: {user.id})")
         
         self.user_cache[normalized_name] = user
@@ -109,13 +98,9 @@ class Command(BaseCommand):
         normalized_name = normalize_name(full_name)
         if normalized_name in self.user_cache: return self.user_cache[normalized_name]
 
-        user = None
-        # Buscar usuario existente por nombre normalizado
-        for u in Usuario.objects.filter(rol=Usuario.Rol.DOCENTE):
-            if normalize_name(u.nombre) == normalized_name:
-                user = u
-                break
-        
+        # Buscar usuario existente por nombre (índice construido una sola vez)
+        user = self._indice(Usuario.Rol.DOCENTE).find(full_name, fuzzy=False, subset=False)
+
         if not user:
             self.stdout.write(self.style.WARNING(f"  -> ADVERTENCIA: Docente '{full_name}' no encontrado. Se buscará en todos los usuarios para crear o se omitirá."))
             # Si el docente no existe como tal, intentar encontrarlo como Usuario o crear uno.
@@ -126,6 +111,7 @@ class Command(BaseCommand):
                 defaults={'email': email, 'rol': Usuario.Rol.DOCENTE}
             )
             if created:
+                self._indice(Usuario.Rol.DOCENTE).add(user.nombre, user)
                 self.stdout.write(f"  -> Creado Docente: {full_name} (ID: {user.id})")
             else:
                 self.stdout.write(f"  -> Encontrado Usuario para Docente: {full_name} (ID: {user.id})")
@@ -150,11 +136,6 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS("Iniciando la asignación de estudiantes a materias de agrupaciones y teóricas..."))
         self._setup_log_file()
-        
-        self.client = self._get_authenticated_client()
-        if not self.client:
-            self._close_log_file()
-            return
 
         self.stdout.write("Precargando usuarios y niveles de grado en caché...")
         for user in Usuario.objects.all():
@@ -177,6 +158,7 @@ class Command(BaseCommand):
             self._close_log_file()
             return
 
+        pendientes = []
         for item in agrupaciones_data:
             total_procesados += 1
             record = item.get("fields", item) # Manejar si 'fields' no está anidado
@@ -214,16 +196,13 @@ class Command(BaseCommand):
             if created_clase:
                 self.stdout.write(f"    -> Creada Clase de Agrupación: {clase_nombre} (ID: {clase.id})")
 
-            enroll_vars = {"studentId": str(student_user.id), "claseId": str(clase.id), "docenteId": str(teacher_user.id)}
-            result = self._run_graphql_request(ENROLL_STUDENT_MUTATION, enroll_vars)
-            
-            if result and result.get('data', {}).get('enrollStudentInClass'):
-                self.stdout.write(self.style.SUCCESS(f"    -> Éxito: '{estudiante_nombre}' inscrito en '{clase_nombre}'"))
-                self.log_writer.writerow(['asignaciones_completas.json', 'AGRUPACION', estudiante_nombre, docente_nombre, clase_nombre, "EXITO", ""])
-                total_enrollments_exitosos += 1
-            else:
-                self.log_writer.writerow(['asignaciones_completas.json', 'AGRUPACION', estudiante_nombre, docente_nombre, clase_nombre, "FALLO", f"Mutación GraphQL falló: {result.get('errors', 'Error desconocido')}"])
-        
+            pendientes.append((
+                {"estudiante_id": student_user.id, "clase_id": clase.id, "docente_id": teacher_user.id},
+                ['asignaciones_completas.json', 'AGRUPACION', estudiante_nombre, docente_nombre, clase_nombre],
+            ))
+
+        total_enrollments_exitosos += self._inscribir(pendientes)
+
         # --- Procesar REPORTE_DOCENTES_HORARIOS_0858.json (Teóricas) ---
         self.stdout.write(self.style.HTTP_INFO(f"\n--- Procesando: {JSON_TEORICAS_PATH} (Materias Teóricas) ---"))
         try:
@@ -235,6 +214,10 @@ class Command(BaseCommand):
             return
         
         processed_classes = set() # Para evitar procesar la misma clase/horario múltiples veces
+        alumnos_por_nivel = {}
+        for student in Student.objects.filter(grade_level__isnull=False).select_related('usuario'):
+            alumnos_por_nivel.setdefault(student.grade_level_id, []).append(student.usuario)
+        pendientes = []
 
         for item in teoricas_data:
             total_procesados += 1
@@ -293,26 +276,17 @@ class Command(BaseCommand):
                 self.stdout.write(f"    -> Creada Clase Teórica: {clase_nombre} ({curso} {paralelo}) (ID: {clase.id})")
             
             # --- Inscribir a todos los estudiantes de ese GradeLevel a esta Clase ---
-            students_in_grade_level = Student.objects.filter(grade_level=grade_level)
-            self.stdout.write(f"    -> Inscribiendo {students_in_grade_level.count()} estudiantes de '{curso} {paralelo}' a '{clase_nombre}'")
-
-            for student in students_in_grade_level:
-                student_user = student.usuario
-                enroll_vars = {"studentId": str(student_user.id), "claseId": str(clase.id)}
-                if teacher_user:
-                    enroll_vars["docenteId"] = str(teacher_user.id)
-                else:
-                    enroll_vars["docenteId"] = None # Docente opcional en la mutación
-
-                result = self._run_graphql_request(ENROLL_STUDENT_MUTATION, enroll_vars)
-
-                if result and result.get('data', {}).get('enrollStudentInClass'):
-                    self.stdout.write(self.style.SUCCESS(f"      -> Éxito: '{student_user.nombre}' inscrito en '{clase_nombre}'"))
-                    self.log_writer.writerow([os.path.basename(JSON_TEORICAS_PATH), 'TEORICA', student_user.nombre, docente_nombre, clase_nombre, "EXITO", ""])
-                    total_enrollments_exitosos += 1
-                else:
-                    error_msg = result.get('errors', 'Error desconocido')
-                    self.log_writer.writerow([os.path.basename(JSON_TEORICAS_PATH), 'TEORICA', student_user.nombre, docente_nombre, clase_nombre, "FALLO", f"Mutación GraphQL falló: {error_msg}"])
+            students_in_grade_level = alumnos_por_nivel.get(grade_level.id, [])
+            self.stdout.write(f"    -> Inscribiendo {len(students_in_grade_level)} estudiantes de '{curso} {paralelo}' a '{clase_nombre}'")
+
+            for student_user in students_in_grade_level:
+                pendientes.append((
+                    # Sin docente, la inscripción hereda el docente base de la clase
+                    {"estudiante_id": student_user.id, "clase_id": clase.id, "docente_id": teacher_user.id if teacher_user else None},
+                    [os.path.basename(JSON_TEORICAS_PATH), 'TEORICA', student_user.nombre, docente_nombre, clase_nombre],
+                ))
+
+        total_enrollments_exitosos += self._inscribir(pendientes)
 
         self._close_log_file()
         self.stdout.write(self.style.SUCCESS(f"\n--- Proceso Finalizado ---"))
@@ -5,8 +5,7 @@ import unicodedata
 import re
 import csv
 from django.core.management.base import BaseCommand
-from django.test import Client
-from django.contrib.auth.models import User
+from classes import cargas
 from users.models import Usuario
 from classes.models import Clase, Subject
 
@@ -14,16 +13,6 @@ from classes.models import Clase, Subject
 JSON_DIR = "/usr/src/base_de_datos_json/normalized/Instrumento_Agrupaciones"
 ACTION_LOG_FILE = "assignment_final_log.csv" # Nuevo archivo de log
 
-ENROLL_STUDENT_MUTATION = """
-mutation EnrollStudent($studentId: ID!, $claseId: ID!, $docenteId: ID) {
-  enrollStudentInClass(studentUsuarioId: $studentId, claseId: $claseId, docenteUsuarioId: $docenteId) {
-    enrollment {
-      id
-    }
-  }
-}
-"""
-
 def normalize_name(name):
     if not name: return ""
     name = str(name)
@@ -48,33 +37,19 @@ class Command(BaseCommand):
     def _close_log_file(self):
         if self.log_file: self.log_file.close()
 
-    def _get_authenticated_client(self):
-        client = Client()
-        user = User.objects.filter(is_superuser=True).first()
-        if not user: user = User.objects.first()
-        if not user:
-            self.stdout.write(self.style.ERROR("No se encontró ningún usuario para la autenticación."))
-            return None
-        client.force_login(user)
-        self.stdout.write(self.style.SUCCESS(f"Cliente autenticado como: {user.username}"))
-        return client
-
-    def _run_graphql_request(self, client, query, variables=None):
-        payload = {'query': query}
-        if variables: payload['variables'] = variables
-        try:
-            response = client.post("/graphql/", json.dumps(payload), content_type='application/json', HTTP_HOST='localhost')
-            if response.status_code != 200:
-                self.log_writer.writerow(['N/A', '', '', '', 'FALLO_HTTP', f"Status: {response.status_code}"])
-                return None
-            json_response = response.json()
-            if 'errors' in json_response:
-                self.log_writer.writerow(['N/A', '', '', '', 'FALLO_GRAPHQL', json_response['errors']])
-                return None
-            return json_response
-        except Exception as e:
-            self.log_writer.writerow(['N/A', '', '', '', 'FALLO_PETICION', str(e)])
-            return None
+    def _inscribir(self, pendientes):
+        """Inscribe las filas del archivo en un solo lote (classes/cargas.inscribir) y las registra en el log."""
+        resultado = cargas.inscribir([fila for fila, _ in pendientes])
+        errores = dict(resultado.errores)
+        for indice, (_, columnas) in enumerate(pendientes):
+            if indice in errores:
+                self.log_writer.writerow([*columnas, "FALLO", errores[indice]])
+            else:
+                self.log_writer.writerow([*columnas, "EXITO", ""])
+        self.stdout.write(self.style.SUCCESS(
+            f"  -> {len(pendientes) - len(errores)} inscripciones aplicadas, {len(errores)} fallidas"
+        ))
+        return len(pendientes) - len(errores)
 
     def _find_user(self, normalized_name):
         return self.user_cache.get(normalized_name)
@@ -82,11 +57,6 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS("Iniciando la asignación final con los JSON corregidos..."))
         self._setup_log_file()
-        
-        client = self._get_authenticated_client()
-        if not client:
-            self._close_log_file()
-            return
 
         json_files = [f for f in os.listdir(JSON_DIR) if f.endswith('_CORREGIDO.json')]
         
@@ -105,6 +75,7 @@ class Command(BaseCommand):
             with open(file_path, 'r', encoding='utf-8') as f:
                 asignaciones = json.load(f)
 
+            pendientes = []
             for item in asignaciones:
                 total_asignaciones += 1
                 record = item.get("fields", {})
@@ -141,21 +112,13 @@ class Command(BaseCommand):
                     defaults=clase_defaults
                 )
 
-                enroll_vars = {"studentId": str(student_user.id), "claseId": str(clase.id)}
-                if teacher_user:
-                    enroll_vars["docenteId"] = str(teacher_user.id)
-                else: 
-                    # El ID del docente puede ser nulo en GraphQL
-                    enroll_vars["docenteId"] = None
-                
-                result = self._run_graphql_request(client, ENROLL_STUDENT_MUTATION, enroll_vars)
-                
-                if result and result.get('data', {}).get('enrollStudentInClass'):
-                    self.stdout.write(self.style.SUCCESS(f"  -> Éxito: '{estudiante_nombre}' en '{clase_nombre}'"))
-                    self.log_writer.writerow([file_name, estudiante_nombre, docente_nombre, clase_nombre, "EXITO", ""])
-                    total_exitosas += 1
-                else:
-                    self.log_writer.writerow([file_name, estudiante_nombre, docente_nombre, clase_nombre, "FALLO", "Mutación GraphQL falló"])
+                pendientes.append((
+                    # Sin docente, la inscripción hereda el docente base de la clase
+                    {"estudiante_id": student_user.id, "clase_id": clase.id, "docente_id": teacher_user.id if teacher_user else None},
+                    [file_name, estudiante_nombre, docente_nombre, clase_nombre],
+                ))
+
+            total_exitosas += self._inscribir(pendientes)
 
         self._close_log_file()
         self.stdout.write(self.style.SUCCESS(f"\n--- Proceso Finalizado ---"))
@@ -0,0 +1,67 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from classes.models import Asistencia, CalificacionParcial, Clase
+
+
+class Command(BaseCommand):
+    help = (
+        "Muestra el plan de ejecución y el tiempo medio de las consultas habituales "
+        "sobre CalificacionParcial y Asistencia (curso+materia+quimestre, y "
+        "clase+rango de fechas). Sirve para comparar antes/después de los índices "
+        "por ciclo o del particionado (particionar_calificaciones)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ciclo", help="Ciclo lectivo a consultar (por defecto, el más reciente).")
+        parser.add_argument("--repeticiones", type=int, default=20)
+
+    def handle(self, *args, **options):
+        ciclo = options["ciclo"] or (
+            CalificacionParcial.objects.exclude(ciclo_lectivo="")
+            .order_by("-ciclo_lectivo").values_list("ciclo_lectivo", flat=True).first()
+        )
+        muestra = CalificacionParcial.objects.filter(ciclo_lectivo=ciclo).order_by().values(
+            "subject_id", "quimestre", "student__grade_level_id"
+        ).first()
+        clase = Clase.objects.filter(ciclo_lectivo=ciclo).order_by("pk").first() if ciclo else None
+        if not muestra:
+            self.stdout.write(self.style.WARNING("No hay calificaciones para medir."))
+            return
+
+        filtros_curso = dict(
+            subject_id=muestra["subject_id"],
+            quimestre=muestra["quimestre"],
+            student__grade_level_id=muestra["student__grade_level_id"],
+        )
+        consultas = {
+            "Notas de un curso (todos los años)": CalificacionParcial.objects.filter(**filtros_curso),
+            "Notas de un curso (ciclo actual)": CalificacionParcial.objects.filter(ciclo_lectivo=ciclo, **filtros_curso),
+        }
+        if clase:
+            fechas = Asistencia.objects.filter(inscripcion__clase=clase).order_by("fecha").values_list("fecha", flat=True)
+            desde, hasta = fechas.first(), fechas.last()
+            if desde:
+                consultas["Ausencias de una clase por rango de fechas"] = Asistencia.objects.filter(
+                    inscripcion__clase=clase, estado="Ausente", fecha__range=(desde, hasta),
+                )
+
+        self.stdout.write(f"Motor: {connection.vendor} — ciclo {ciclo}\n")
+        for titulo, qs in consultas.items():
+            qs = qs.order_by().values_list("pk", flat=True)
+            inicio = time.perf_counter()
+            for _ in range(options["repeticiones"]):
+                filas = len(list(qs))
+            media_ms = (time.perf_counter() - inicio) * 1000 / options["repeticiones"]
+
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{titulo}: {filas} filas, {media_ms:.2f} ms"))
+            self.stdout.write(qs.explain(**self._opciones_explain()))
+            self.stdout.write("")
+
+    @staticmethod
+    def _opciones_explain():
+        if connection.vendor == "postgresql":
+            return {"analyze": True, "buffers": True}
+        return {}
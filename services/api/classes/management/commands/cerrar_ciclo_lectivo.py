@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from classes.archivo_ciclos import cerrar_ciclo
+
+
+class Command(BaseCommand):
+    help = (
+        "Cierra un ciclo lectivo: congela los promedios finales en ResumenAnualMateria, "
+        "archiva el detalle en ARCHIVO_CICLOS_DIR y lo borra de las tablas de producción. "
+        "Ver classes/archivo_ciclos.py."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("ciclo", help="Ciclo lectivo a cerrar, p. ej. 2024-2025.")
+        parser.add_argument("--forzar", action="store_true", help="Permite cerrar el año lectivo activo.")
+
+    def handle(self, *args, **options):
+        try:
+            cierre = cerrar_ciclo(options["ciclo"], forzar=options["forzar"])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        for clave, total in cierre.conteos.items():
+            self.stdout.write(f"  {clave}: {total}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Ciclo {cierre.ciclo_lectivo} cerrado; archivo en {cierre.directorio}."
+        ))
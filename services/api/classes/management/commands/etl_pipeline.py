@@ -0,0 +1,100 @@
+"""
+Management command: etl_pipeline
+================================
+ETL por etapas de los CSVs normalizados de base_de_datos_json/normalizado/
+(ver classes/etl.py). Cada etapa hace carga masiva y deja un punto de
+control; una ejecución interrumpida se reanuda desde la etapa que falló.
+
+Uso:
+  python manage.py etl_pipeline
+  python manage.py etl_pipeline --csv-dir base_de_datos_json/normalizado --ciclo 2025-2026
+  python manage.py etl_pipeline --resume                # continúa la última ejecución sin terminar
+  python manage.py etl_pipeline --stage estudiantes     # repite solo esa etapa (repetible)
+  python manage.py etl_pipeline --dry-run
+"""
+import os
+import time
+from contextlib import nullcontext
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from classes.etl import ETAPAS, PipelineETL, firma_fuentes
+from classes.models import EtlEjecucion
+
+
+class Command(BaseCommand):
+    help = (
+        "ETL por etapas (extraer → staging → carga masiva) con puntos de control, "
+        "--resume y --stage. Ver classes/etl.py."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--csv-dir', default='base_de_datos_json/normalizado',
+                            help='Directorio con los CSVs normalizados')
+        parser.add_argument('--ciclo', default='2025-2026')
+        parser.add_argument('--stage', action='append', choices=ETAPAS, dest='etapas',
+                            help='Ejecuta solo esta etapa sobre la última ejecución (repetible)')
+        parser.add_argument('--resume', action='store_true',
+                            help='Continúa la última ejecución sin terminar, omitiendo las etapas completadas')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Ejecuta todo y revierte al final')
+
+    def handle(self, *args, **opts):
+        csv_dir = os.path.abspath(opts['csv_dir'])
+        if not os.path.isdir(csv_dir):
+            raise CommandError(f'No existe: {csv_dir}')
+        dry = opts['dry_run']
+        if dry:
+            self.stdout.write(self.style.WARNING('--- DRY RUN (sin escritura) ---'))
+
+        t0 = time.perf_counter()
+        with transaction.atomic() if dry else nullcontext():
+            ejecucion = self._ejecucion(csv_dir, opts['ciclo'], opts['etapas'], opts['resume'])
+            self.stdout.write(f'ETL #{ejecucion.pk} {ejecucion.ciclo_lectivo} ← {csv_dir}')
+            pipeline = PipelineETL(ejecucion, informar=self._informar)
+            try:
+                ejecutadas = pipeline.ejecutar(opts['etapas'], reanudar=opts['resume'])
+            except Exception as exc:
+                raise CommandError(
+                    f'{exc}\nLas etapas completadas quedan guardadas; corrija y ejecute con --resume.'
+                ) from exc
+            if dry:
+                transaction.set_rollback(True)
+
+        if not ejecutadas:
+            self.stdout.write('Nada pendiente: todas las etapas estaban completadas.')
+        total = time.perf_counter() - t0
+        self.stdout.write(self.style.SUCCESS(f'Total: {total:.2f}s ({len(ejecutadas)} etapas)'))
+        if dry:
+            self.stdout.write(self.style.WARNING('(DRY RUN — ningún cambio guardado)'))
+
+    def _ejecucion(self, csv_dir, ciclo, etapas, reanudar):
+        firma = firma_fuentes(csv_dir)
+        if not (etapas or reanudar):
+            return EtlEjecucion.objects.create(fuente=csv_dir, ciclo_lectivo=ciclo, firma=firma)
+
+        previas = EtlEjecucion.objects.filter(fuente=csv_dir, ciclo_lectivo=ciclo)
+        if reanudar:
+            previas = previas.filter(finalizada__isnull=True)
+        ejecucion = previas.first()
+        if ejecucion is None:
+            if reanudar:
+                raise CommandError(f'No hay una ejecución sin terminar para {csv_dir} ({ciclo}).')
+            return EtlEjecucion.objects.create(fuente=csv_dir, ciclo_lectivo=ciclo, firma=firma)
+
+        if ejecucion.firma != firma:
+            if reanudar or 'extraer' not in etapas:
+                raise CommandError(
+                    f'Los CSVs cambiaron desde la ejecución #{ejecucion.pk}: '
+                    'ejecute sin --resume o incluya --stage extraer.'
+                )
+            ejecucion.firma = firma
+            ejecucion.save(update_fields=['firma'])
+        return ejecucion
+
+    def _informar(self, etapa):
+        conteos = ', '.join(f'{k}={v}' for k, v in etapa.conteos.items() if k != 'avisos')
+        self.stdout.write(f'  ✓ {etapa.nombre:<20} {etapa.segundos:>8.2f}s  {conteos}')
+        for aviso in etapa.conteos.get('avisos', [])[:5]:
+            self.stdout.write(self.style.WARNING(f'      ⚠ {aviso}'))
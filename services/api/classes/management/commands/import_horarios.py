@@ -5,6 +5,7 @@ from django.core.management.base import BaseCommand
 from teachers.models import Teacher
 from subjects.models import Subject
 from classes.models import Clase, GradeLevel
+from classes.horarios import Bloque, detectar_conflictos, dia_indice, parsear_rango
 from django.db import transaction
 
 # Function to clean and normalize teacher names
@@ -89,6 +90,19 @@ def find_best_match_teacher_by_parts(cleaned_name_from_json, all_teachers):
     return None, potential_matches
 
 
+def schedule_block(fields, teacher, grade_level, pk):
+    """Block for double-booking detection, or None if the day or time range is unreadable."""
+    dia = dia_indice(fields.get('dia', ''))
+    rango = parsear_rango(fields.get('hora', ''))
+    if dia is None or rango is None:
+        return None
+    return Bloque(
+        dia, *rango,
+        docente=teacher.pk, aula=(fields.get('aula') or '').strip(), curso=grade_level.pk,
+        ref=f"pk={pk} {teacher.full_name}",
+    )
+
+
 class Command(BaseCommand):
     help = 'Assigns schedules to teachers based on the provided JSON file.'
 
@@ -112,6 +126,7 @@ class Command(BaseCommand):
             return
 
         all_teachers = list(Teacher.objects.all())
+        blocks = []
 
         with transaction.atomic():
             for entry in horarios_data:
@@ -180,6 +195,7 @@ class Command(BaseCommand):
                                 unmatched_teachers.add(teacher_name)
                                 continue
                             
+                            blocks.append(schedule_block(fields, teacher, grade_level, entry.get('pk')))
                             try:
                                 clase_name = f"{subject.name} ({grade_level})"
                                 schedule = f"{fields.get('dia', '')}: {fields.get('hora', '')}"
@@ -229,6 +245,7 @@ class Command(BaseCommand):
                     continue
                 
                 subject, _ = Subject.objects.get_or_create(name=subject_name)
+                blocks.append(schedule_block(fields, teacher, grade_level, entry.get('pk')))
 
                 try:
                     clase_name = f"{subject.name} ({grade_level})"
@@ -251,6 +268,10 @@ class Command(BaseCommand):
                     self.stdout.write(self.style.ERROR(msg))
                     inconsistencies.append(msg)
 
+        # Double bookings of a teacher, room or grade level
+        for conflict in detectar_conflictos(b for b in blocks if b):
+            inconsistencies.append(f"Schedule conflict: {conflict}")
+
         if inconsistencies:
             with open(log_file_path, 'w') as log_file:
                 for line in inconsistencies:
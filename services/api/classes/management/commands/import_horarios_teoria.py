@@ -8,6 +8,7 @@ from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 from django.core.management.base import BaseCommand
 from django.db import transaction
 
+from classes.horarios import Bloque, a_minutos, detectar_conflictos, dia_indice
 from classes.models import Clase, Enrollment, GradeLevel, Horario
 from students.models import Student
 from subjects.models import Subject
@@ -44,6 +45,7 @@ class Summary:
     horarios_rows_processed: int = 0
     horarios_rows_skipped_agrupacion: int = 0
     horarios_rows_skipped_bad_grade: int = 0
+    conflictos: int = 0
 
 
 def _parse_time_range(raw: str) -> Optional[Tuple[Any, Any]]:
@@ -78,7 +80,7 @@ class Command(BaseCommand):
         ciclo: str = opts['ciclo']
         dry: bool = opts['dry_run']
 
-        subj_aliases, teacher_aliases = load_aliases(base_dir)
+        subj_aliases, teacher_aliases, _student_aliases = load_aliases(base_dir)
 
         logs_dir = os.path.join(base_dir, 'etl_logs')
         os.makedirs(logs_dir, exist_ok=True)
@@ -126,6 +128,9 @@ class Command(BaseCommand):
         # Track teacher per (subject_norm, grade_level_id)
         teacher_seen: Dict[Tuple[str, int], int] = {}
 
+        # One block per (clase, dia, hora_inicio), same key as the Horario upsert
+        bloques: Dict[Tuple[int, str, Any], Bloque] = {}
+
         with transaction.atomic():
             for row in horarios_data:
                 fields = row.get('fields', {}) or {}
@@ -222,6 +227,15 @@ class Command(BaseCommand):
                         # Keep first-seen teacher to avoid duplicating enrollments.
                         docente_u = Usuario.objects.filter(id=prev).first() or docente_u
 
+                if dia and time_range:
+                    bloques[(clase.id, dia, hora_inicio)] = Bloque(
+                        dia_indice(dia), a_minutos(hora_inicio), a_minutos(hora_fin),
+                        docente=docente_u.id if docente_u else None,
+                        aula=(fields.get('aula') or '').strip(),
+                        curso=grade_level.id,
+                        ref=f"pk={row.get('pk')} {subject.name} ({grade_level})",
+                    )
+
                 # Enroll all students in that GradeLevel
                 students_qs = Student.objects.filter(active=True, grade_level=grade_level).exclude(usuario__isnull=True)
                 for st in students_qs.select_related('usuario'):
@@ -244,6 +258,10 @@ class Command(BaseCommand):
                         if updates:
                             enr.save(update_fields=updates)
 
+            # Double bookings of a teacher, room or grade level (reported, not blocked)
+            conflictos = [str(c) for c in detectar_conflictos(bloques.values())]
+            summary.conflictos = len(conflictos)
+
             if dry:
                 raise Exception(f"Dry-run. Summary={summary}")
 
@@ -255,11 +273,13 @@ class Command(BaseCommand):
 
         _write_list(os.path.join(logs_dir, 'unmatched_teachers_horarios_teoria.txt'), unmatched_teachers)
         _write_list(os.path.join(logs_dir, 'multi_teacher_conflicts_teoria.txt'), multi_teacher_conflicts)
+        _write_list(os.path.join(logs_dir, 'conflictos_horarios_teoria.txt'), conflictos)
 
         self.stdout.write(self.style.SUCCESS(
             f"OK import_horarios_teoria (ciclo={ciclo}). subjects_created={summary.subjects_created}, "
             f"clases_created={summary.clases_created}, horarios_created={summary.horarios_created}, "
             f"enrollments_created={summary.enrollments_created}, "
             f"rows_processed={summary.horarios_rows_processed}, rows_skipped_agrup={summary.horarios_rows_skipped_agrupacion}, "
-            f"rows_skipped_bad_grade={summary.horarios_rows_skipped_bad_grade}."
+            f"rows_skipped_bad_grade={summary.horarios_rows_skipped_bad_grade}, "
+            f"conflictos={summary.conflictos}."
         ))
\ No newline at end of file
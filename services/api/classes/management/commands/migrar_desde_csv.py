@@ -21,6 +21,9 @@ Uso:
   docker compose exec web python manage.py migrar_desde_csv
   docker compose exec web python manage.py migrar_desde_csv --dry-run
   docker compose exec web python manage.py migrar_desde_csv --csv-dir base_de_datos_json/normalizado --ciclo 2025-2026
+
+Para cargas completas usar `etl_pipeline` (mismas fuentes, carga masiva por
+etapas con puntos de control y --resume; ver classes/etl.py).
 """
 
 import csv
@@ -39,6 +42,7 @@ from students.models import Student
 from teachers.models import Teacher
 from subjects.models import Subject
 from classes.models import Clase, Enrollment, GradeLevel
+from utils.name_index import NameIndex
 
 logger = logging.getLogger(__name__)
 
@@ -106,8 +110,8 @@ class Command(BaseCommand):
         self.errors: List[str] = []
 
         # caches en memoria (nombre_norm → obj)
-        self._docentes_by_norm: Dict[str, Usuario] = {}
-        self._estudiantes_by_norm: Dict[str, Usuario] = {}
+        self._docentes = NameIndex()
+        self._estudiantes = NameIndex()
         self._subjects_by_norm: Dict[str, Subject] = {}
         self._gradelevels: Dict[Tuple, GradeLevel] = {}  # (level_code, section) → GL
 
@@ -223,7 +227,7 @@ class Command(BaseCommand):
                 Teacher.objects.get_or_create(usuario=usuario)
 
             if usuario:
-                self._docentes_by_norm[_norm(nombre_completo)] = usuario
+                self._docentes.add(nombre_completo, usuario)
 
             self._ok('docente', action)
             if action == 'created':
@@ -294,7 +298,7 @@ class Command(BaseCommand):
                         usuario.rol = Usuario.Rol.ESTUDIANTE
                         usuario.save()
 
-                self._estudiantes_by_norm[_norm(nombre_completo)] = usuario
+                self._estudiantes.add(nombre_completo, usuario)
 
             self._ok('estudiante', action)
             if action == 'created':
@@ -334,13 +338,13 @@ class Command(BaseCommand):
             '6o':'6','7o':'7','8o':'8','9o':'9','10o':'10','11o':'11',
         }
 
-        for norm_key, (ap, nm, curso_id, paralelo_id) in seen.items():
+        for ap, nm, curso_id, paralelo_id in seen.values():
+            nombre_completo = _nombre_completo(ap, nm)
+
             # Skip if already loaded
-            if norm_key in self._estudiantes_by_norm:
+            if nombre_completo in self._estudiantes:
                 continue
 
-            nombre_completo = _nombre_completo(ap, nm)
-
             # Try DB lookup by name
             usuario = None
             action = 'created'
@@ -384,7 +388,7 @@ class Command(BaseCommand):
                         except GradeLevel.DoesNotExist:
                             pass
 
-                self._estudiantes_by_norm[norm_key] = usuario
+                self._estudiantes.add(nombre_completo, usuario)
 
             self._ok('estudiante_asig', action)
             if action == 'created':
@@ -611,35 +615,26 @@ class Command(BaseCommand):
     # Helper: buscar Usuario estudiante por nombre normalizado
     # ─────────────────────────────────────────────────────────────────────────
 
-    def _find_estudiante(self, apellidos: str, nombres: str) -> Optional[Usuario]:
-        nombre_completo = _nombre_completo(apellidos, nombres)
-        norm = _norm(nombre_completo)
+    def _coincidencia(self, indice: NameIndex, nombre: str) -> Optional[Usuario]:
+        """Exacta → subconjunto de tokens → difusa; los nombres ambiguos se reportan y no se asignan."""
+        coincidencia = indice.match(nombre)
+        if coincidencia.ambiguous:
+            self._err(f'Nombre ambiguo "{nombre}": ' + ', '.join(u.nombre for u in coincidencia.candidates[:5]))
+        return coincidencia.value
 
-        # Búsqueda exacta
-        u = self._estudiantes_by_norm.get(norm)
+    def _find_estudiante(self, apellidos: str, nombres: str) -> Optional[Usuario]:
+        u = self._coincidencia(self._estudiantes, _nombre_completo(apellidos, nombres))
         if u:
             return u
 
-        # Búsqueda parcial: apellidos
-        norm_apellidos = _norm(apellidos)
-        for key, usuario in self._estudiantes_by_norm.items():
-            if norm_apellidos and norm_apellidos in key:
-                return usuario
-
-        return None
+        # Solo apellidos, si identifican a un único estudiante
+        por_apellidos = self._estudiantes.candidates(apellidos)
+        return por_apellidos[0] if len(por_apellidos) == 1 else None
 
     def _find_docente(self, nombre_raw: str) -> Optional[Usuario]:
         if not nombre_raw:
             return None
-        norm = _norm(nombre_raw)
-        u = self._docentes_by_norm.get(norm)
-        if u:
-            return u
-        # Búsqueda parcial
-        for key, usuario in self._docentes_by_norm.items():
-            if norm and norm in key:
-                return usuario
-        return None
+        return self._coincidencia(self._docentes, nombre_raw)
 
     def _get_or_create_clase(
         self,
@@ -865,9 +860,7 @@ class Command(BaseCommand):
     # ─────────────────────────────────────────────────────────────────────────
 
     def _refresh_docente_cache(self):
-        self._docentes_by_norm = {}
-        for u in Usuario.objects.filter(rol='DOCENTE'):
-            self._docentes_by_norm[_norm(u.nombre)] = u
+        self._docentes = NameIndex((u.nombre, u) for u in Usuario.objects.filter(rol='DOCENTE'))
 
     def _find_docente_by_short_name(self, nombre_corto: str) -> Optional[Usuario]:
         """Busca docente por nombre parcial (ej: 'Jorge Arias' → 'Jorge Arias' en DB)."""
@@ -875,16 +868,15 @@ class Command(BaseCommand):
             return None
         # Quitar puntos finales / abreviaturas de título
         nombre_corto = nombre_corto.strip().rstrip('.')
-        parts = [_norm(w) for w in nombre_corto.split() if len(w) > 2]
+        parts = [w for w in nombre_corto.split() if len(w) > 2]
         if not parts:
             return None
-        # Buscar en cache: todos los tokens deben aparecer en la key
-        for norm_key, u in self._docentes_by_norm.items():
-            if all(p in norm_key for p in parts):
-                return u
-        # Intento con el apellido solamente (primer token largo)
-        last = parts[-1]
-        matches = [u for k, u in self._docentes_by_norm.items() if last in k]
+        # Todos los tokens deben aparecer en el nombre del docente
+        matches = self._docentes.candidates(' '.join(parts))
+        if len(matches) == 1:
+            return matches[0]
+        # Intento con el apellido solamente (último token largo)
+        matches = self._docentes.candidates(parts[-1])
         if len(matches) == 1:
             return matches[0]
         return None
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from classes import particiones
+
+
+class Command(BaseCommand):
+    help = (
+        "Particiona CalificacionParcial por ciclo lectivo (PostgreSQL) o crea la "
+        "partición de un ciclo nuevo. Ver classes/particiones.py."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ciclo", help="Crea (si falta) la partición de este ciclo, p. ej. 2026-2027.")
+        parser.add_argument("--revertir", action="store_true", help="Vuelve a una tabla sin particiones.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("El particionado declarativo solo está disponible en PostgreSQL.")
+
+        with transaction.atomic():
+            if options["revertir"]:
+                hecho = particiones.desparticionar()
+                self.stdout.write(self.style.SUCCESS(
+                    "Tabla sin particiones." if hecho else "La tabla no estaba particionada."
+                ))
+                return
+
+            if particiones.particionar():
+                self.stdout.write(self.style.SUCCESS(f"{particiones.TABLA} particionada por ciclo lectivo."))
+            if options["ciclo"]:
+                try:
+                    particiones.crear_particion(options["ciclo"])
+                except ValueError as e:
+                    raise CommandError(str(e))
+                self.stdout.write(self.style.SUCCESS(
+                    f"Partición {particiones.nombre_particion(options['ciclo'])} lista."
+                ))
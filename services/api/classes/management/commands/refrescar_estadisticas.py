@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from classes.estadisticas import refrescar_estadisticas
+
+
+class Command(BaseCommand):
+    help = (
+        "Refresca las estadísticas institucionales materializadas "
+        "(asistencia por clase y PromedioCache). Por defecto es incremental."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--completo",
+            action="store_true",
+            help="Recalcula los promedios de todos los estudiantes, no solo los modificados.",
+        )
+
+    def handle(self, *args, **options):
+        resultado = refrescar_estadisticas(completo=options["completo"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Estadísticas actualizadas: {resultado['clases']} clases, "
+            f"{resultado['estudiantes']} estudiantes."
+        ))
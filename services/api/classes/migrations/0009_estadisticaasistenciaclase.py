@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classes', '0008_justificacionausencia_recuperacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstadisticaAsistenciaClase',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Registros de asistencia')),
+                ('presentes', models.PositiveIntegerField(default=0)),
+                ('ausentes', models.PositiveIntegerField(default=0)),
+                ('justificados', models.PositiveIntegerField(default=0)),
+                ('tasa', models.DecimalField(decimal_places=2, default=0, max_digits=5, verbose_name='% Asistencia')),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+                ('clase', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='estadistica_asistencia', to='classes.clase', verbose_name='Clase')),
+            ],
+            options={
+                'verbose_name': 'Asistencia por Clase (Estadística)',
+                'verbose_name_plural': 'Asistencia por Clase (Estadísticas)',
+                'indexes': [models.Index(fields=['tasa'], name='classes_est_tasa_3a21c5_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:57
+
+from django.db import migrations, models
+
+
+def rellenar_ciclo(apps, schema_editor):
+    """
+    Ciclo de cada calificación: el de la clase más reciente de la materia en la
+    que está inscrito el estudiante; si no hay inscripción, el de su fecha de registro.
+    """
+    from django.db.models import OuterRef, Subquery, Value
+    from django.db.models.functions import Coalesce
+
+    CalificacionParcial = apps.get_model('classes', 'CalificacionParcial')
+    Enrollment = apps.get_model('classes', 'Enrollment')
+
+    ciclo_inscripcion = Subquery(
+        Enrollment.objects
+        .filter(estudiante__student_profile=OuterRef('student_id'), clase__subject_id=OuterRef('subject_id'))
+        .order_by('-clase__ciclo_lectivo')
+        .values('clase__ciclo_lectivo')[:1]
+    )
+    CalificacionParcial.objects.filter(ciclo_lectivo='').update(
+        ciclo_lectivo=Coalesce(ciclo_inscripcion, Value(''))
+    )
+    sin_ciclo = CalificacionParcial.objects.filter(ciclo_lectivo='')
+    for fecha in sin_ciclo.order_by().values_list('fecha_registro', flat=True).distinct():
+        inicio = fecha.year if fecha.month >= 9 else fecha.year - 1
+        sin_ciclo.filter(fecha_registro=fecha).update(ciclo_lectivo=f'{inicio}-{inicio + 1}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classes', '0010_sincronizacion_incremental'),
+        ('students', '0004_student_representante_usuario'),
+        ('subjects', '0001_initial'),
+        ('teachers', '0005_seed_funciones'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='calificacionparcial',
+            name='ciclo_lectivo',
+            field=models.CharField(blank=True, default='', max_length=100, verbose_name='Ciclo lectivo'),
+        ),
+        migrations.RunPython(rellenar_ciclo, migrations.RunPython.noop),
+        # Una calificación por ciclo: la misma clave que la tabla particionada (0012)
+        migrations.AlterUniqueTogether(
+            name='calificacionparcial',
+            unique_together={('student', 'subject', 'parcial', 'quimestre', 'tipo_aporte', 'ciclo_lectivo')},
+        ),
+        migrations.AddIndex(
+            model_name='asistencia',
+            index=models.Index(fields=['inscripcion', 'estado', 'fecha'], name='asistencia_insc_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='calificacionparcial',
+            index=models.Index(fields=['subject', 'quimestre', 'parcial', 'student'], name='calif_materia_periodo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='calificacionparcial',
+            index=models.Index(fields=['ciclo_lectivo', 'subject', 'quimestre'], name='calif_ciclo_materia_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations
+
+
+def particionar(apps, schema_editor):
+    from classes import particiones
+    if particiones.habilitado(schema_editor.connection):
+        particiones.particionar(schema_editor.connection)
+
+
+def desparticionar(apps, schema_editor):
+    from classes import particiones
+    particiones.desparticionar(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+    """
+    Particionado opcional de CalificacionParcial por ciclo lectivo (solo
+    PostgreSQL con CLASSES_PARTICIONAR_CALIFICACIONES=True); ver classes/particiones.py.
+    """
+
+    dependencies = [
+        ('classes', '0011_ciclo_calificaciones_indices'),
+    ]
+
+    operations = [
+        migrations.RunPython(particionar, desparticionar),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classes', '0012_particionar_calificaciones'),
+        ('students', '0004_student_representante_usuario'),
+        ('subjects', '0001_initial'),
+        ('users', '0002_alter_usuario_rol_notificacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CierreCicloLectivo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ciclo_lectivo', models.CharField(max_length=100, unique=True, verbose_name='Ciclo lectivo')),
+                ('cerrado_en', models.DateTimeField(auto_now_add=True, verbose_name='Cerrado en')),
+                ('directorio', models.CharField(max_length=500, verbose_name='Directorio del archivo')),
+                ('conteos', models.JSONField(default=dict, verbose_name='Registros archivados por modelo')),
+                ('cerrado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='cierres_ciclo', to='users.usuario', verbose_name='Cerrado por')),
+            ],
+            options={
+                'verbose_name': 'Cierre de Ciclo Lectivo',
+                'verbose_name_plural': 'Cierres de Ciclo Lectivo',
+                'ordering': ['-ciclo_lectivo'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumenAnualMateria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ciclo_lectivo', models.CharField(max_length=100, verbose_name='Ciclo lectivo')),
+                ('promedio_q1', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('promedio_q2', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('promedio_anual', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('asistencias_total', models.PositiveIntegerField(default=0)),
+                ('ausencias', models.PositiveIntegerField(default=0)),
+                ('justificados', models.PositiveIntegerField(default=0)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_anuales', to='students.student')),
+                ('subject', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_anuales', to='subjects.subject', verbose_name='Materia')),
+            ],
+            options={
+                'verbose_name': 'Resumen Anual por Materia',
+                'verbose_name_plural': 'Resúmenes Anuales por Materia',
+                'indexes': [models.Index(fields=['student', 'ciclo_lectivo'], name='classes_res_student_efd12e_idx')],
+                'unique_together': {('student', 'subject', 'ciclo_lectivo')},
+            },
+        ),
+    ]
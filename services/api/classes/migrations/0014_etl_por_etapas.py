@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classes', '0013_cierre_ciclo_lectivo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EtlEjecucion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fuente', models.CharField(max_length=500, verbose_name='Directorio de CSVs')),
+                ('ciclo_lectivo', models.CharField(max_length=100, verbose_name='Ciclo lectivo')),
+                ('firma', models.CharField(max_length=64, verbose_name='Huella de las fuentes')),
+                ('iniciada', models.DateTimeField(auto_now_add=True, verbose_name='Iniciada')),
+                ('finalizada', models.DateTimeField(blank=True, null=True, verbose_name='Finalizada')),
+            ],
+            options={
+                'verbose_name': 'Ejecución ETL',
+                'verbose_name_plural': 'Ejecuciones ETL',
+                'ordering': ['-iniciada'],
+            },
+        ),
+        migrations.CreateModel(
+            name='EtlEtapa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=50, verbose_name='Etapa')),
+                ('estado', models.CharField(choices=[('COMPLETADA', 'Completada'), ('FALLIDA', 'Fallida')], max_length=20)),
+                ('inicio', models.DateTimeField(verbose_name='Inicio')),
+                ('fin', models.DateTimeField(verbose_name='Fin')),
+                ('segundos', models.FloatField(default=0, verbose_name='Duración (s)')),
+                ('conteos', models.JSONField(default=dict, verbose_name='Conteos')),
+                ('error', models.TextField(blank=True, verbose_name='Error')),
+                ('ejecucion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='etapas', to='classes.etlejecucion')),
+            ],
+            options={
+                'verbose_name': 'Etapa ETL',
+                'verbose_name_plural': 'Etapas ETL',
+                'ordering': ['ejecucion', 'inicio'],
+                'unique_together': {('ejecucion', 'nombre')},
+            },
+        ),
+        migrations.CreateModel(
+            name='EtlRegistro',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entidad', models.CharField(max_length=30, verbose_name='Entidad')),
+                ('clave', models.CharField(max_length=255, verbose_name='Clave natural')),
+                ('datos', models.JSONField(default=dict)),
+                ('objeto_id', models.PositiveBigIntegerField(blank=True, null=True, verbose_name='ID resuelto')),
+                ('ejecucion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='registros', to='classes.etlejecucion')),
+            ],
+            options={
+                'verbose_name': 'Registro de staging ETL',
+                'verbose_name_plural': 'Registros de staging ETL',
+                'unique_together': {('ejecucion', 'entidad', 'clave')},
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classes', '0014_etl_por_etapas'),
+        ('students', '0004_student_representante_usuario'),
+        ('subjects', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['student', '-date', '-id'], name='activity_estudiante_fecha_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classes', '0015_indice_actividades_fecha'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registroeliminado',
+            name='ambito',
+            field=models.PositiveBigIntegerField(blank=True, null=True, verbose_name='Ámbito'),
+        ),
+        migrations.AddIndex(
+            model_name='registroeliminado',
+            index=models.Index(fields=['modelo', 'ambito', 'eliminado'], name='classes_reg_modelo_9d9833_idx'),
+        ),
+    ]
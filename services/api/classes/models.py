@@ -273,6 +273,10 @@ class Activity(models.Model):
         verbose_name = "Actividad"
         verbose_name_plural = "Actividades"
         unique_together = ['student', 'subject', 'class_number']
+        indexes = [
+            # Carpetas e informes paginados por cursor (date, id)
+            models.Index(fields=['student', '-date', '-id'], name='activity_estudiante_fecha_idx'),
+        ]
     
     def __str__(self):
         return f"{self.student.name} - {self.subject} - Clase #{self.class_number}"
@@ -403,12 +407,16 @@ class Asistencia(models.Model):
     fecha = models.DateField()
     estado = models.CharField(max_length=20, choices=Estado.choices)
     observacion = models.TextField(blank=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         verbose_name = 'Asistencia'
         verbose_name_plural = 'Asistencias'
         ordering = ['-fecha', 'id']
         unique_together = [('inscripcion', 'fecha')]
+        indexes = [
+            models.Index(fields=['inscripcion', 'estado', 'fecha'], name='asistencia_insc_estado_idx'),
+        ]
 
     def __str__(self):
         return f"{self.inscripcion.estudiante.nombre} - {self.fecha} - {self.estado}"
@@ -449,6 +457,16 @@ class TipoAporte(models.Model):
         return f"{self.nombre} (Peso: {self.peso})"
 
 
+# El año lectivo (régimen Sierra) empieza en septiembre
+MES_INICIO_CICLO = 9
+
+
+def ciclo_de_fecha(fecha):
+    """Ciclo lectivo 'AAAA-AAAA' al que pertenece una fecha."""
+    inicio = fecha.year if fecha.month >= MES_INICIO_CICLO else fecha.year - 1
+    return f"{inicio}-{inicio + 1}"
+
+
 class CalificacionParcial(models.Model):
     """
     MODELO CENTRAL UNIFICADO DE CALIFICACIONES
@@ -511,10 +529,18 @@ class CalificacionParcial(models.Model):
         auto_now_add=True, 
         verbose_name="Fecha de Registro"
     )
-    fecha_actualizacion = models.DateField(
-        auto_now=True, 
+    fecha_actualizacion = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
         verbose_name="Última Actualización"
     )
+    # Año lectivo de la calificación (se deriva de la inscripción al guardar)
+    ciclo_lectivo = models.CharField(
+        max_length=100,
+        blank=True,
+        default='',
+        verbose_name="Ciclo lectivo"
+    )
     observaciones = models.TextField(
         blank=True, 
         verbose_name="Observaciones"
@@ -530,16 +556,38 @@ class CalificacionParcial(models.Model):
     class Meta:
         verbose_name = "Calificación Parcial"
         verbose_name_plural = "Calificaciones Parciales"
-        unique_together = ['student', 'subject', 'parcial', 'quimestre', 'tipo_aporte']
+        # Igual que la restricción de la tabla particionada (classes/particiones.py)
+        unique_together = ['student', 'subject', 'parcial', 'quimestre', 'tipo_aporte', 'ciclo_lectivo']
         ordering = ['-fecha_actualizacion', 'student__usuario__nombre']
         indexes = [
             models.Index(fields=['student', 'subject', 'parcial']),
             models.Index(fields=['student', 'quimestre']),
             models.Index(fields=['parcial', 'quimestre']),
+            # Notas de una materia por quimestre/parcial para todo un curso
+            models.Index(fields=['subject', 'quimestre', 'parcial', 'student'], name='calif_materia_periodo_idx'),
+            models.Index(fields=['ciclo_lectivo', 'subject', 'quimestre'], name='calif_ciclo_materia_idx'),
         ]
     
     def __str__(self):
         return f"{self.student.name} - {self.subject} - {self.get_parcial_display()} - {self.tipo_aporte.nombre}: {self.calificacion}"
+
+    def save(self, *args, **kwargs):
+        if not self.ciclo_lectivo:
+            self.ciclo_lectivo = self.ciclo_para(self.student_id, self.subject_id)
+        super().save(*args, **kwargs)
+
+    @staticmethod
+    def ciclo_para(student_id, subject_id, fecha=None):
+        """Ciclo de la inscripción del estudiante en la materia, o el de la fecha."""
+        from datetime import date
+        ciclo = (
+            Enrollment.objects
+            .filter(estudiante__student_profile=student_id, clase__subject_id=subject_id)
+            .order_by('-clase__ciclo_lectivo')
+            .values_list('clase__ciclo_lectivo', flat=True)
+            .first()
+        )
+        return ciclo or ciclo_de_fecha(fecha or date.today())
     
     def get_escala_cualitativa(self):
         """
@@ -831,6 +879,183 @@ class PromedioCache(models.Model):
     def __str__(self):
         return f"{self.student.name} - {self.tipo_promedio}: {self.promedio}"
 
+
+class EstadisticaAsistenciaClase(models.Model):
+    """
+    Tasa de asistencia materializada por clase.
+    Se refresca por la tarea programada refrescar_estadisticas_institucionales.
+    """
+    clase = models.OneToOneField(
+        Clase,
+        on_delete=models.CASCADE,
+        related_name='estadistica_asistencia',
+        verbose_name="Clase"
+    )
+    total = models.PositiveIntegerField(default=0, verbose_name="Registros de asistencia")
+    presentes = models.PositiveIntegerField(default=0)
+    ausentes = models.PositiveIntegerField(default=0)
+    justificados = models.PositiveIntegerField(default=0)
+    tasa = models.DecimalField(max_digits=5, decimal_places=2, default=0, verbose_name="% Asistencia")
+    actualizado = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Asistencia por Clase (Estadística)"
+        verbose_name_plural = "Asistencia por Clase (Estadísticas)"
+        indexes = [
+            models.Index(fields=['tasa']),
+        ]
+
+    def __str__(self):
+        return f"{self.clase.name}: {self.tasa}%"
+
+
+class RegistroEliminado(models.Model):
+    """
+    Tombstone de registros borrados, para la sincronización incremental
+    (?since=) de la app móvil. Se purgan tras RETENCION_DIAS.
+    """
+    RETENCION_DIAS = 90
+
+    modelo = models.CharField(max_length=50, verbose_name="Modelo")
+    objeto_id = models.PositiveBigIntegerField(verbose_name="ID del registro")
+    # Id del dueño del registro (estudiante, inscripción, clase o deber según
+    # classes.signals.MODELOS_SINCRONIZADOS), para filtrar igual que el listado
+    ambito = models.PositiveBigIntegerField(null=True, blank=True, verbose_name="Ámbito")
+    eliminado = models.DateTimeField(auto_now_add=True, verbose_name="Eliminado")
+
+    class Meta:
+        verbose_name = "Registro Eliminado"
+        verbose_name_plural = "Registros Eliminados"
+        indexes = [
+            models.Index(fields=['modelo', 'eliminado']),
+            models.Index(fields=['modelo', 'ambito', 'eliminado']),
+        ]
+
+    def __str__(self):
+        return f"{self.modelo}#{self.objeto_id} ({self.eliminado:%Y-%m-%d %H:%M})"
+
+
+class CierreCicloLectivo(models.Model):
+    """
+    Registro del cierre de un ciclo lectivo (classes/archivo_ciclos.py): el
+    detalle del ciclo se archivó en disco y solo queda ResumenAnualMateria.
+    """
+    ciclo_lectivo = models.CharField(max_length=100, unique=True, verbose_name="Ciclo lectivo")
+    cerrado_en = models.DateTimeField(auto_now_add=True, verbose_name="Cerrado en")
+    cerrado_por = models.ForeignKey(
+        Usuario, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='cierres_ciclo', verbose_name="Cerrado por"
+    )
+    directorio = models.CharField(max_length=500, verbose_name="Directorio del archivo")
+    conteos = models.JSONField(default=dict, verbose_name="Registros archivados por modelo")
+
+    class Meta:
+        verbose_name = "Cierre de Ciclo Lectivo"
+        verbose_name_plural = "Cierres de Ciclo Lectivo"
+        ordering = ['-ciclo_lectivo']
+
+    def __str__(self):
+        return f"Cierre {self.ciclo_lectivo}"
+
+
+class ResumenAnualMateria(models.Model):
+    """
+    Promedios finales y asistencia de un estudiante en un ciclo cerrado.
+    La fila con subject NULL guarda el promedio general y la asistencia total.
+    """
+    student = models.ForeignKey(
+        'students.Student',
+        on_delete=models.CASCADE,
+        related_name='resumenes_anuales'
+    )
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name='resumenes_anuales', verbose_name="Materia", blank=True, null=True)
+    ciclo_lectivo = models.CharField(max_length=100, verbose_name="Ciclo lectivo")
+    promedio_q1 = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    promedio_q2 = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    promedio_anual = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    asistencias_total = models.PositiveIntegerField(default=0)
+    ausencias = models.PositiveIntegerField(default=0)
+    justificados = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Resumen Anual por Materia"
+        verbose_name_plural = "Resúmenes Anuales por Materia"
+        unique_together = ['student', 'subject', 'ciclo_lectivo']
+        indexes = [
+            models.Index(fields=['student', 'ciclo_lectivo']),
+        ]
+
+    def __str__(self):
+        materia = self.subject.name if self.subject else 'General'
+        return f"{self.student} - {materia} ({self.ciclo_lectivo}): {self.promedio_anual}"
+
+
+# ============================================
+# ETL POR ETAPAS (classes/etl.py)
+# ============================================
+
+class EtlEjecucion(models.Model):
+    """Una ejecución del ETL por etapas sobre un directorio de CSVs normalizados."""
+    fuente = models.CharField(max_length=500, verbose_name="Directorio de CSVs")
+    ciclo_lectivo = models.CharField(max_length=100, verbose_name="Ciclo lectivo")
+    firma = models.CharField(max_length=64, verbose_name="Huella de las fuentes")
+    iniciada = models.DateTimeField(auto_now_add=True, verbose_name="Iniciada")
+    finalizada = models.DateTimeField(null=True, blank=True, verbose_name="Finalizada")
+
+    class Meta:
+        verbose_name = "Ejecución ETL"
+        verbose_name_plural = "Ejecuciones ETL"
+        ordering = ['-iniciada']
+
+    def __str__(self):
+        return f"ETL #{self.pk} {self.ciclo_lectivo} ({self.fuente})"
+
+
+class EtlEtapa(models.Model):
+    """Punto de control de una etapa: una etapa COMPLETADA no se repite al reanudar."""
+
+    class Estado(models.TextChoices):
+        COMPLETADA = 'COMPLETADA', 'Completada'
+        FALLIDA = 'FALLIDA', 'Fallida'
+
+    ejecucion = models.ForeignKey(EtlEjecucion, on_delete=models.CASCADE, related_name='etapas')
+    nombre = models.CharField(max_length=50, verbose_name="Etapa")
+    estado = models.CharField(max_length=20, choices=Estado.choices)
+    inicio = models.DateTimeField(verbose_name="Inicio")
+    fin = models.DateTimeField(verbose_name="Fin")
+    segundos = models.FloatField(default=0, verbose_name="Duración (s)")
+    conteos = models.JSONField(default=dict, verbose_name="Conteos")
+    error = models.TextField(blank=True, verbose_name="Error")
+
+    class Meta:
+        verbose_name = "Etapa ETL"
+        verbose_name_plural = "Etapas ETL"
+        unique_together = ['ejecucion', 'nombre']
+        ordering = ['ejecucion', 'inicio']
+
+    def __str__(self):
+        return f"{self.ejecucion_id}:{self.nombre} {self.estado}"
+
+
+class EtlRegistro(models.Model):
+    """
+    Fila normalizada del área de staging: una entidad (docente, estudiante,
+    materia, ...) por clave natural, con el id resuelto en la base una vez cargada.
+    """
+    ejecucion = models.ForeignKey(EtlEjecucion, on_delete=models.CASCADE, related_name='registros')
+    entidad = models.CharField(max_length=30, verbose_name="Entidad")
+    clave = models.CharField(max_length=255, verbose_name="Clave natural")
+    datos = models.JSONField(default=dict)
+    objeto_id = models.PositiveBigIntegerField(null=True, blank=True, verbose_name="ID resuelto")
+
+    class Meta:
+        verbose_name = "Registro de staging ETL"
+        verbose_name_plural = "Registros de staging ETL"
+        unique_together = ['ejecucion', 'entidad', 'clave']
+
+    def __str__(self):
+        return f"{self.entidad}:{self.clave}"
+
 # ============================================
 # SIGNALS PARA ACTUALIZACIÓN AUTOMÁTICA
 # ============================================
@@ -912,6 +1137,7 @@ class Deber(models.Model):
     estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='activo')
 
     estudiantes_especificos = models.ManyToManyField(Usuario, related_name='deberes_asignados', blank=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True, db_index=True)
     
     class Meta:
         verbose_name_plural = "Deberes"
@@ -924,6 +1150,11 @@ class Deber(models.Model):
     
     def entregas_completadas(self):
         return self.entregas.filter(estado__in=['entregado', 'revisado', 'tarde']).count()
+
+    def total_estudiantes(self):
+        if self.clase_id is None:
+            return self.estudiantes_especificos.count()
+        return self.clase.enrollments.filter(estado=Enrollment.Estado.ACTIVO).count()
     
     def porcentaje_entrega(self):
         total = self.total_estudiantes()
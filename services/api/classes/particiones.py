@@ -0,0 +1,199 @@
+"""
+Particionado declarativo (PostgreSQL) de CalificacionParcial por ciclo lectivo.
+
+Opcional: se activa con settings.CLASSES_PARTICIONAR_CALIFICACIONES y solo en
+PostgreSQL. La tabla classes_calificacionparcial pasa a ser una tabla
+particionada por LIST (ciclo_lectivo) con una partición por ciclo y una
+partición DEFAULT; las consultas que filtran por ciclo_lectivo leen solo su
+partición (partition pruning).
+
+Restricciones de PostgreSQL que condicionan el diseño:
+  - La clave primaria y los UNIQUE deben incluir la columna de partición, así
+    que quedan (id, ciclo_lectivo) y (student, subject, parcial, quimestre,
+    tipo_aporte, ciclo_lectivo). Django sigue usando id como pk: ninguna tabla
+    referencia a CalificacionParcial con una FK. El unique_together del modelo
+    usa la misma clave (migración 0011), así que sin particionado se comporta igual.
+  - Asistencia no se particiona: JustificacionAusencia la referencia con una
+    FK, que exige un UNIQUE solo sobre id.
+
+Uso: migración 0012 (si el setting está activo al migrar) o
+`manage.py particionar_calificaciones` para activarlo después o crear la
+partición de un ciclo nuevo.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection as conexion_por_defecto
+
+TABLA = 'classes_calificacionparcial'
+TABLA_ANTERIOR = f'{TABLA}_sin_particion'
+SECUENCIA = f'{TABLA}_part_id_seq'
+UNICA = 'calif_unica_por_ciclo'
+
+
+def habilitado(connection=None):
+    connection = connection or conexion_por_defecto
+    return (
+        connection.vendor == 'postgresql'
+        and getattr(settings, 'CLASSES_PARTICIONAR_CALIFICACIONES', False)
+    )
+
+
+def nombre_particion(ciclo):
+    return f"{TABLA}_{re.sub(r'[^0-9a-z]+', '_', ciclo.lower()).strip('_')}"
+
+
+def esta_particionada(connection=None):
+    connection = connection or conexion_por_defecto
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+            "WHERE c.relname = %s",
+            [TABLA],
+        )
+        return cursor.fetchone() is not None
+
+
+def ciclo_valido(ciclo):
+    """El ciclo va como literal en el DDL de la partición: solo letras, dígitos, _ y -."""
+    return isinstance(ciclo, str) and re.fullmatch(r'[\w\-]+', ciclo) is not None
+
+
+def validar_ciclo(ciclo):
+    if not ciclo_valido(ciclo):
+        raise ValueError(f'Ciclo lectivo inválido: {ciclo!r}')
+
+
+def sql_crear_particion(ciclo):
+    validar_ciclo(ciclo)
+    return (
+        f"CREATE TABLE IF NOT EXISTS {nombre_particion(ciclo)} "
+        f"PARTITION OF {TABLA} FOR VALUES IN ('{ciclo}')"
+    )
+
+
+def crear_particion(ciclo, connection=None):
+    """
+    Crea la partición de un ciclo. Si la partición DEFAULT ya tiene filas de ese
+    ciclo, se mueven a la nueva partición.
+    """
+    connection = connection or conexion_por_defecto
+    validar_ciclo(ciclo)
+    default = f'{TABLA}_default'
+    with connection.cursor() as cursor:
+        cursor.execute(f"CREATE TEMP TABLE _calif_mover ON COMMIT DROP AS SELECT * FROM {default} WHERE ciclo_lectivo = %s", [ciclo])
+        cursor.execute(f"DELETE FROM {default} WHERE ciclo_lectivo = %s", [ciclo])
+        cursor.execute(sql_crear_particion(ciclo))
+        cursor.execute(f"INSERT INTO {TABLA} SELECT * FROM _calif_mover")
+
+
+def eliminar_particion(ciclo, connection=None):
+    """Elimina la partición (ya vacía) de un ciclo archivado; True si existía."""
+    connection = connection or conexion_por_defecto
+    if not esta_particionada(connection):
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s)", [nombre_particion(ciclo)])
+        if cursor.fetchone()[0] is None:
+            return False
+        cursor.execute(f"DROP TABLE {nombre_particion(ciclo)}")
+    return True
+
+
+def _definiciones(cursor):
+    """Índices (no únicos) y FKs actuales de la tabla, para recrearlos."""
+    cursor.execute(
+        "SELECT indexdef FROM pg_indexes i "
+        "JOIN pg_class c ON c.relname = i.indexname "
+        "JOIN pg_index x ON x.indexrelid = c.oid "
+        "WHERE i.tablename = %s AND NOT x.indisunique",
+        [TABLA],
+    )
+    indices = [fila[0] for fila in cursor.fetchall()]
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = %s::regclass AND contype = 'f'",
+        [TABLA],
+    )
+    fks = cursor.fetchall()
+    return indices, fks
+
+
+def particionar(connection=None):
+    """
+    Convierte classes_calificacionparcial en tabla particionada por ciclo.
+    Idempotente; debe ejecutarse dentro de una transacción (las migraciones lo son).
+    """
+    connection = connection or conexion_por_defecto
+    if esta_particionada(connection):
+        return False
+
+    with connection.cursor() as cursor:
+        indices, fks = _definiciones(cursor)
+        cursor.execute(f"SELECT DISTINCT ciclo_lectivo FROM {TABLA} WHERE ciclo_lectivo <> ''")
+        # Las filas con un ciclo que no puede ir en el DDL quedan en la partición DEFAULT
+        ciclos = [fila[0] for fila in cursor.fetchall() if ciclo_valido(fila[0])]
+
+        cursor.execute(f"ALTER TABLE {TABLA} RENAME TO {TABLA_ANTERIOR}")
+        cursor.execute(
+            f"CREATE TABLE {TABLA} (LIKE {TABLA_ANTERIOR} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+            f"PARTITION BY LIST (ciclo_lectivo)"
+        )
+        # El id deja de ser IDENTITY (no soportado en tablas particionadas antes de PG 17)
+        cursor.execute(f"CREATE SEQUENCE {SECUENCIA} OWNED BY {TABLA}.id")
+        cursor.execute(f"ALTER TABLE {TABLA} ALTER COLUMN id SET DEFAULT nextval('{SECUENCIA}')")
+        cursor.execute(f"CREATE TABLE {TABLA}_default PARTITION OF {TABLA} DEFAULT")
+        for ciclo in ciclos:
+            cursor.execute(sql_crear_particion(ciclo))
+
+        cursor.execute(f"INSERT INTO {TABLA} SELECT * FROM {TABLA_ANTERIOR}")
+        cursor.execute(f"SELECT setval('{SECUENCIA}', COALESCE((SELECT MAX(id) FROM {TABLA}), 0) + 1, false)")
+        # Se elimina antes de crear claves e índices: sus nombres quedan libres
+        cursor.execute(f"DROP TABLE {TABLA_ANTERIOR}")
+
+        cursor.execute(f"ALTER TABLE {TABLA} ADD PRIMARY KEY (id, ciclo_lectivo)")
+        cursor.execute(
+            f"ALTER TABLE {TABLA} ADD CONSTRAINT {UNICA} UNIQUE "
+            f"(student_id, subject_id, parcial, quimestre, tipo_aporte_id, ciclo_lectivo)"
+        )
+        # Mismos nombres de índices y FKs que generó Django: las migraciones
+        # futuras (RemoveIndex, AlterField) siguen funcionando.
+        for definicion in indices:
+            cursor.execute(definicion)
+        for nombre, definicion in fks:
+            cursor.execute(f"ALTER TABLE {TABLA} ADD CONSTRAINT {nombre} {definicion}")
+    return True
+
+
+def desparticionar(connection=None):
+    """Vuelve a una tabla normal con los mismos datos (reversa de particionar)."""
+    connection = connection or conexion_por_defecto
+    if not esta_particionada(connection):
+        return False
+
+    with connection.cursor() as cursor:
+        indices, fks = _definiciones(cursor)
+        cursor.execute(f"ALTER TABLE {TABLA} RENAME TO {TABLA_ANTERIOR}")
+        cursor.execute(
+            f"CREATE TABLE {TABLA} (LIKE {TABLA_ANTERIOR} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        )
+        cursor.execute(f"ALTER TABLE {TABLA} ALTER COLUMN id DROP DEFAULT")
+        cursor.execute(f"ALTER TABLE {TABLA} ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY")
+        cursor.execute(f"INSERT INTO {TABLA} SELECT * FROM {TABLA_ANTERIOR}")
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence('{TABLA}', 'id'), "
+            f"COALESCE((SELECT MAX(id) FROM {TABLA}), 0) + 1, false)"
+        )
+        cursor.execute(f"DROP TABLE {TABLA_ANTERIOR} CASCADE")
+
+        cursor.execute(f"ALTER TABLE {TABLA} ADD PRIMARY KEY (id)")
+        cursor.execute(
+            f"ALTER TABLE {TABLA} ADD UNIQUE (student_id, subject_id, parcial, quimestre, tipo_aporte_id, ciclo_lectivo)"
+        )
+        for definicion in indices:
+            cursor.execute(definicion)
+        for nombre, definicion in fks:
+            cursor.execute(f"ALTER TABLE {TABLA} ADD CONSTRAINT {nombre} {definicion}")
+    return True
@@ -0,0 +1,126 @@
+"""
+Registro de la clase por lotes: pase de lista y nota rápida para todo el curso.
+
+Los wizards del docente (wizard_clase_diaria, wizard_notas) guardaban fila por
+fila con update_or_create; cada nota disparaba además las señales de
+CalificacionParcial (promedio del quimestre + alerta WhatsApp, invalidación de
+la libreta). Aquí cada tabla se escribe con un solo upsert (bulk_create con
+update_conflicts) y el trabajo derivado se hace una vez por clase, tras el
+commit:
+
+- asistencia → invalida la libreta de los estudiantes
+- notas      → invalida la libreta, refresca PromedioCache de esos estudiantes,
+               evalúa las alertas de bajo rendimiento (promedio < 7) e
+               invalida las estadísticas anuales del ciclo
+
+bulk_create no emite post_save, así que las señales por fila no se ejecutan.
+"""
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+
+from classes.estadisticas import (
+    invalidar_estadisticas_anuales, invalidar_libreta, promedios_quimestre, refrescar_promedios,
+)
+from classes.models import Asistencia, CalificacionParcial, Enrollment, ciclo_de_fecha
+
+logger = logging.getLogger(__name__)
+
+LOTE = 500
+
+UMBRAL_ALERTA = 7
+
+
+def registrar_asistencia(clase, fecha, estados):
+    """
+    Upsert de la asistencia del día para las inscripciones activas de `clase`.
+    `estados` es {enrollment_id: (estado, observacion)}; se ignoran las
+    inscripciones que no son de la clase. Retorna el número de filas escritas.
+    """
+    activas = dict(
+        Enrollment.objects.filter(clase=clase, estado='ACTIVO', id__in=list(estados))
+        .values_list('id', 'estudiante_id')
+    )
+    filas = [
+        Asistencia(inscripcion_id=enr_id, fecha=fecha, estado=estado, observacion=obs)
+        for enr_id, (estado, obs) in estados.items() if enr_id in activas
+    ]
+    with transaction.atomic():
+        Asistencia.objects.bulk_create(
+            filas,
+            batch_size=LOTE,
+            update_conflicts=True,
+            unique_fields=['inscripcion', 'fecha'],
+            update_fields=['estado', 'observacion', 'fecha_actualizacion'],
+        )
+        usuarios = set(activas.values())
+        transaction.on_commit(lambda: _invalidar_libretas(usuarios))
+    return len(filas)
+
+
+def registrar_notas(clase, tipo_aporte, quimestre, parcial, notas, registrado_por=None):
+    """
+    Upsert de una nota por estudiante (`notas` = {student_id: Decimal}) en la
+    materia de `clase`. Solo se guardan estudiantes con inscripción activa en
+    la clase. La clave incluye el ciclo de la clase: la nota de un año nuevo
+    no pisa la del anterior. Retorna el número de notas escritas.
+    """
+    inscritos = set(
+        Enrollment.objects.filter(clase=clase, estado='ACTIVO', estudiante__student_profile__in=list(notas))
+        .values_list('estudiante__student_profile', flat=True)
+    )
+    ciclo = clase.ciclo_lectivo or ciclo_de_fecha(timezone.localdate())
+    filas = [
+        CalificacionParcial(
+            student_id=student_id, subject_id=clase.subject_id, parcial=parcial,
+            quimestre=quimestre, tipo_aporte=tipo_aporte, calificacion=nota,
+            ciclo_lectivo=ciclo, registrado_por=registrado_por,
+        )
+        for student_id, nota in notas.items() if student_id in inscritos
+    ]
+    with transaction.atomic():
+        CalificacionParcial.objects.bulk_create(
+            filas,
+            batch_size=LOTE,
+            update_conflicts=True,
+            unique_fields=['student', 'subject', 'parcial', 'quimestre', 'tipo_aporte', 'ciclo_lectivo'],
+            update_fields=['calificacion', 'registrado_por', 'fecha_actualizacion'],
+        )
+        student_ids = sorted(inscritos & set(notas))
+        transaction.on_commit(lambda: despues_de_notas(student_ids, clase.subject_id, quimestre, ciclo))
+        transaction.on_commit(lambda: invalidar_estadisticas_anuales(ciclo))
+    return len(filas)
+
+
+def _invalidar_libretas(usuario_ids):
+    from students.models import Student
+    invalidar_libreta(*Student.objects.filter(usuario_id__in=usuario_ids).values_list('id', flat=True))
+
+
+def despues_de_notas(student_ids, subject_id, quimestre, ciclo):
+    """
+    Trabajo derivado de un lote de notas: libreta, PromedioCache y alertas. La
+    alerta usa solo el promedio del ciclo en que se registraron las notas.
+    """
+    if not student_ids:
+        return
+    invalidar_libreta(*student_ids)
+    refrescar_promedios(student_ids=student_ids)
+    try:
+        from students.models import Student
+        from subjects.models import Subject
+        from utils.notifications import NotificacionWhatsApp
+
+        promedios = promedios_quimestre(
+            student_id__in=student_ids, subject_id=subject_id, quimestre=quimestre,
+            ciclo_lectivo=ciclo,
+        )
+        bajos = [s for (s, _m, _q), prom in promedios.items() if 0 < prom < UMBRAL_ALERTA]
+        if not bajos:
+            return
+        materia = Subject.objects.get(pk=subject_id)
+        for student in Student.objects.filter(pk__in=bajos).select_related('usuario'):
+            NotificacionWhatsApp.enviar_alerta_bajo_rendimiento(student, materia)
+    except Exception as exc:
+        logger.error(f'Alertas de bajo rendimiento por lote: {exc}')
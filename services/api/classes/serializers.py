@@ -53,9 +53,9 @@ class CalificacionParcialSerializer(serializers.ModelSerializer):
         model = CalificacionParcial
         fields = [
             'id', 'student', 'subject', 'materia_nombre', 'tipo_aporte', 'tipo_aporte_nombre',
-            'parcial', 'quimestre', 'calificacion', 'created_at',
+            'parcial', 'quimestre', 'calificacion', 'fecha_registro',
         ]
-        read_only_fields = ['id', 'created_at', 'materia_nombre', 'tipo_aporte_nombre']
+        read_only_fields = ['id', 'fecha_registro', 'materia_nombre', 'tipo_aporte_nombre']
 
 # ─── Asistencia ───────────────────────────────────────────────────────────────
 
@@ -85,8 +85,21 @@ class ActivitySerializer(serializers.ModelSerializer):
 # ─── Deber / DeberEntrega ─────────────────────────────────────────────────────
 
 class DeberSerializer(serializers.ModelSerializer):
-    entregas_completadas = serializers.IntegerField(read_only=True)
-    porcentaje_entrega = serializers.FloatField(read_only=True)
+    # Usan las anotaciones de DeberViewSet (n_entregas / n_estudiantes) si existen
+    entregas_completadas = serializers.SerializerMethodField()
+    porcentaje_entrega = serializers.SerializerMethodField()
+
+    def get_entregas_completadas(self, obj):
+        n = getattr(obj, 'n_entregas', None)
+        return obj.entregas_completadas() if n is None else n
+
+    def get_porcentaje_entrega(self, obj):
+        total = getattr(obj, 'n_estudiantes', None)
+        if total is None:
+            total = obj.total_estudiantes()
+        if not total:
+            return 0
+        return round(self.get_entregas_completadas(obj) / total * 100, 1)
 
     class Meta:
         model = Deber
@@ -97,6 +110,21 @@ class DeberSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'fecha_asignacion', 'entregas_completadas', 'porcentaje_entrega']
 
+class DeberEstudianteSerializer(serializers.ModelSerializer):
+    """Deber anotado por classes.deberes.deberes_estudiante (sin consultas extra)."""
+    materia = serializers.CharField(source='clase.subject.name', read_only=True, default=None)
+    entrega_estado = serializers.CharField(read_only=True)
+    entrega_calificacion = serializers.DecimalField(max_digits=5, decimal_places=2, read_only=True)
+    estado_estudiante = serializers.CharField(read_only=True)
+
+    class Meta:
+        model = Deber
+        fields = [
+            'id', 'titulo', 'fecha_entrega', 'clase', 'materia', 'puntos_totales',
+            'entrega_estado', 'entrega_calificacion', 'estado_estudiante',
+        ]
+        read_only_fields = fields
+
 class DeberEntregaSerializer(serializers.ModelSerializer):
     deber_titulo = serializers.CharField(source='deber.titulo', read_only=True)
     estudiante_nombre = serializers.CharField(source='estudiante.nombre', read_only=True)
@@ -3,11 +3,16 @@ Señales Django para disparar notificaciones WhatsApp automáticamente.
 
 - CalificacionParcial post_save  → alerta si promedio quimestre < 7
 - DeberEntrega post_save         → notifica al estudiante cuando se califica su entrega
+- Deber / DeberEntrega escritura → invalida las estadísticas de deberes del docente
+- Borrado de registros sincronizados con la app móvil → RegistroEliminado (tombstone)
+- CalificacionParcial / Asistencia escritura → invalida la libreta cacheada del estudiante
+- CalificacionParcial / Enrollment escritura → invalida las estadísticas anuales del ciclo
 """
 
 import logging
+import threading
 
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
 from django.dispatch import receiver
 
 logger = logging.getLogger(__name__)
@@ -109,3 +114,123 @@ def notificar_calificacion_deber(sender, instance, created, **kwargs):
             NotificacionWhatsApp.notificar_calificacion_deber(instance)
     except Exception as exc:
         logger.error(f'Signal notificar_calificacion_deber error: {exc}')
+
+
+# ─── Invalidación de estadísticas de deberes del docente ─────────────────────
+
+def _invalidar_deberes_docente(deber):
+    from classes.deberes import invalidar_estadisticas_docente
+    docente_clase = deber.clase.docente_base_id if deber.clase_id else None
+    invalidar_estadisticas_docente(deber.teacher_id, docente_clase)
+
+
+@receiver(post_save, sender='classes.Deber')
+@receiver(post_delete, sender='classes.Deber')
+def invalidar_estadisticas_deber(sender, instance, **kwargs):
+    _invalidar_deberes_docente(instance)
+
+
+@receiver(post_save, sender='classes.DeberEntrega')
+@receiver(post_delete, sender='classes.DeberEntrega')
+def invalidar_estadisticas_entrega(sender, instance, **kwargs):
+    try:
+        _invalidar_deberes_docente(instance.deber)
+    except Exception as exc:
+        # En borrados en cascada el deber puede no existir ya
+        logger.debug(f'Signal invalidar_estadisticas_entrega: {exc}')
+
+
+@receiver(m2m_changed, sender='classes.Deber_estudiantes_especificos')
+def invalidar_estadisticas_asignacion(sender, instance, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear') and hasattr(instance, 'teacher_id'):
+        _invalidar_deberes_docente(instance)
+
+
+# ─── Tombstones para la sincronización incremental (?since=) ─────────────────
+
+# Modelo → campo que se guarda como RegistroEliminado.ambito (filtro de ?since=)
+MODELOS_SINCRONIZADOS = {
+    'classes.CalificacionParcial': 'student_id',
+    'classes.Asistencia': 'inscripcion_id',
+    'classes.Deber': 'clase_id',
+    'classes.DeberEntrega': 'deber_id',
+}
+
+# Borrados en curso por hilo: id(origin) → {'origen', 'pendientes', 'filas'}
+_borrados = threading.local()
+
+
+def _lote_borrado(origin):
+    lotes = _borrados.__dict__.setdefault('lotes', {})
+    return lotes.setdefault(id(origin), {'origen': origin, 'pendientes': set(), 'filas': []})
+
+
+def anotar_eliminado(sender, instance, origin=None, **kwargs):
+    # El Collector emite todos los pre_delete antes de borrar: se sabe cuántos tombstones esperar
+    _lote_borrado(origin)['pendientes'].add((sender._meta.label, instance.pk))
+
+
+def registrar_eliminado(sender, instance, origin=None, **kwargs):
+    """
+    Acumula el tombstone y lo escribe con un solo bulk_create cuando llega el
+    último post_delete del borrado (un QuerySet.delete o una cascada).
+    """
+    from classes.models import RegistroEliminado
+
+    lote = _lote_borrado(origin)
+    lote['pendientes'].discard((sender._meta.label, instance.pk))
+    lote['filas'].append(RegistroEliminado(
+        modelo=sender._meta.label, objeto_id=instance.pk,
+        ambito=getattr(instance, MODELOS_SINCRONIZADOS[sender._meta.label]),
+    ))
+    if not lote['pendientes']:
+        del _borrados.lotes[id(origin)]
+        RegistroEliminado.objects.bulk_create(lote['filas'], batch_size=500)
+
+
+for _modelo in MODELOS_SINCRONIZADOS:
+    pre_delete.connect(anotar_eliminado, sender=_modelo, dispatch_uid=f'tombstone-pre:{_modelo}')
+    post_delete.connect(registrar_eliminado, sender=_modelo, dispatch_uid=f'tombstone:{_modelo}')
+
+
+# ─── Invalidación de la libreta cacheada (libreta_estudiante_api) ────────────
+
+@receiver(post_save, sender='classes.CalificacionParcial')
+@receiver(post_delete, sender='classes.CalificacionParcial')
+def invalidar_libreta_calificacion(sender, instance, **kwargs):
+    from classes.estadisticas import invalidar_libreta
+    invalidar_libreta(instance.student_id)
+
+
+@receiver(post_save, sender='classes.Asistencia')
+@receiver(post_delete, sender='classes.Asistencia')
+def invalidar_libreta_asistencia(sender, instance, **kwargs):
+    from classes.estadisticas import invalidar_libreta
+    from students.models import Student
+    try:
+        usuario_id = instance.inscripcion.estudiante_id
+    except Exception:
+        # Borrado en cascada de la inscripción
+        return
+    invalidar_libreta(*Student.objects.filter(usuario_id=usuario_id).values_list('id', flat=True))
+
+
+# ─── Invalidación de las estadísticas anuales (informe final) ────────────────
+
+@receiver(post_save, sender='classes.CalificacionParcial')
+@receiver(post_delete, sender='classes.CalificacionParcial')
+def invalidar_anuales_calificacion(sender, instance, **kwargs):
+    from classes.estadisticas import invalidar_estadisticas_anuales
+    invalidar_estadisticas_anuales(instance.ciclo_lectivo)
+
+
+@receiver(post_save, sender='classes.Enrollment')
+@receiver(post_delete, sender='classes.Enrollment')
+def invalidar_anuales_inscripcion(sender, instance, **kwargs):
+    from classes.estadisticas import invalidar_estadisticas_anuales
+    try:
+        ciclo = instance.clase.ciclo_lectivo
+    except Exception:
+        # Borrado en cascada de la clase
+        return
+    invalidar_estadisticas_anuales(ciclo)
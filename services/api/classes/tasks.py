@@ -30,3 +30,20 @@ def verificar_rendimiento_semanal():
                     estudiante.parent_email,
                     nombre,
                 )
+
+
+@shared_task
+def refrescar_estadisticas_institucionales(completo=False):
+    from classes.estadisticas import refrescar_estadisticas
+    return refrescar_estadisticas(completo=completo)
+
+
+@shared_task
+def purgar_registros_eliminados():
+    """Borra tombstones de sincronización más antiguos que RegistroEliminado.RETENCION_DIAS."""
+    from datetime import timedelta
+    from django.utils import timezone
+    from classes.models import RegistroEliminado
+    limite = timezone.now() - timedelta(days=RegistroEliminado.RETENCION_DIAS)
+    borrados, _ = RegistroEliminado.objects.filter(eliminado__lt=limite).delete()
+    return borrados
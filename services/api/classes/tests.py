@@ -1,6 +1,12 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
 from django.test import TestCase
+from django.utils import timezone
 
 from utils.etl_normalization import canonical_subject_name, map_grade_level, norm_key
+from utils.name_index import NameIndex
 
 
 class ETLNormalizationTests(TestCase):
@@ -20,3 +26,1133 @@ class ETLNormalizationTests(TestCase):
     def test_canonical_subject_respects_aliases(self):
         aliases = {norm_key('Lenguaje Musica'): 'Lenguaje musical'}
         self.assertEqual(canonical_subject_name('Lenguaje Musica', aliases), 'Lenguaje musical')
+
+
+class NameIndexTests(TestCase):
+    def setUp(self):
+        self.indice = NameIndex([
+            ('Pérez López Ana María', 1),
+            ('Pérez López Juan', 2),
+            ('De la Torre Gonzalez Luis Miguel', 3),
+            ('Arias Jorge', 4),
+        ])
+
+    def test_exacto_sin_orden_acentos_ni_particulas(self):
+        match = self.indice.match('ana maria PEREZ lopez')
+        self.assertEqual((match.value, match.method), (1, 'exact'))
+        self.assertEqual(self.indice.find('Torre González, Luis Miguel'), 3)
+        self.assertIn('Jorge Arias', self.indice)
+
+    def test_subconjunto_y_ambiguedad(self):
+        self.assertEqual(self.indice.match('Luis Torre').method, 'subset')
+        self.assertEqual(self.indice.find('Ana Pérez'), 1)
+        match = self.indice.match('Pérez López')
+        self.assertTrue(match.ambiguous)
+        self.assertEqual(sorted(match.candidates), [1, 2])
+        self.assertEqual(self.indice.candidates('arias'), [4])
+
+    def test_solo_exacto(self):
+        self.assertIsNone(self.indice.find('Ana Pérez', fuzzy=False, subset=False))
+        self.assertFalse(self.indice.match('Pérez López', fuzzy=False, subset=False).ambiguous)
+        self.assertEqual(self.indice.find('López Pérez Juan', fuzzy=False, subset=False), 2)
+
+    def test_difuso_acotado(self):
+        match = self.indice.match('Perez Lopes Juan')
+        self.assertEqual((match.value, match.method), (2, 'fuzzy'))
+        self.assertIsNone(self.indice.find('Perez Lopes Juan', fuzzy=False))
+        self.assertIsNone(self.indice.find('Carlos Mendoza'))
+
+
+class LimpiezaTests(TestCase):
+    def test_columnas_y_digito_verificador(self):
+        import pandas as pd
+        from utils import limpieza
+        cedulas = limpieza.cedula(pd.Series(['171234567.0', '1712345678', '17-1234567-2', None, 'abc']))
+        self.assertEqual(list(cedulas), ['0171234567', '1712345678', '1712345672', '', 'abc'])
+        validas = limpieza.cedula_valida(['1710034065', '1710034066', '0926687856', ''])
+        self.assertEqual(list(validas), [True, False, True, False])
+        self.assertEqual(list(limpieza.celular(['987654321', '09-8765-4321.0'])), ['0987654321', '0987654321'])
+        malos = limpieza.invalidos(pd.Series(['a@b.ec', 'sin-arroba', '']), limpieza.email_valido(['a@b.ec', 'sin-arroba', '']))
+        self.assertEqual(list(malos), [False, True, False])
+
+    def test_importar_estudiantes_anota_email_y_cedula_invalidos(self):
+        import pandas as pd
+        from setup.importar import _personas, importar_estudiantes
+        from users.models import Usuario
+        df = pd.DataFrame({
+            'Nombre': ['Pérez  Ana', 'Mora Luis', ''],
+            'Correo': ['ANA@Correo.ec', 'luis@', 'x@y.ec'],
+            'Cedula': ['926687856.0', '1710034066', ''],
+        })
+        errores = []
+        datos = _personas(df, errores, nombre=('nombre',))
+        self.assertEqual(list(datos['email']), ['ana@correo.ec', ''])
+        self.assertEqual(len(errores), 2)
+        self.assertIn('email "luis@"', errores[0])
+        self.assertIn('dígito verificador', errores[1])
+
+        creados, _, errores = importar_estudiantes(df.iloc[:1])
+        self.assertEqual((creados, errores), (1, []))
+        ana = Usuario.objects.get(cedula='0926687856')
+        self.assertEqual((ana.nombre, ana.email), ('Pérez Ana', 'ana@correo.ec'))
+
+
+class EstadisticasInstitucionalesTests(TestCase):
+    def setUp(self):
+        from classes.factories import EnrollmentFactory
+        from students.models import Student
+        self.enrollment = EnrollmentFactory()
+        self.student, _ = Student.objects.get_or_create(usuario=self.enrollment.estudiante)
+        self.subject = self.enrollment.clase.subject
+
+    def _calificar(self, parcial, tipo, nota, quimestre='Q1'):
+        from classes.models import CalificacionParcial
+        with patch('utils.notifications.NotificacionWhatsApp'):
+            return CalificacionParcial.objects.create(
+                student=self.student, subject=self.subject, parcial=parcial,
+                quimestre=quimestre, tipo_aporte=tipo, calificacion=nota,
+            )
+
+    def test_promedios_quimestre_coincide_con_calculo_individual(self):
+        from classes.estadisticas import promedios_quimestre
+        from classes.models import CalificacionParcial, TipoAporte
+        deber = TipoAporte.objects.create(nombre='Deber', codigo='EST_DEB', peso=1)
+        examen = TipoAporte.objects.create(nombre='Examen', codigo='EST_EXA', peso=3)
+        for parcial, (nota_deber, nota_examen) in (('1P', (6, 9)), ('2P', (8, 7))):
+            self._calificar(parcial, deber, nota_deber)
+            self._calificar(parcial, examen, nota_examen)
+
+        resultado = promedios_quimestre(student_id=self.student.id)
+        esperado = CalificacionParcial.calcular_promedio_quimestre(self.student, self.subject, 'Q1')
+        self.assertEqual(resultado[(self.student.id, self.subject.id, 'Q1')], esperado)
+
+    def test_refrescar_promedios_materializa_cache(self):
+        from classes.estadisticas import refrescar_promedios
+        from classes.models import PromedioCache, TipoAporte
+        tipo = TipoAporte.objects.create(nombre='Lección', codigo='EST_LEC', peso=1)
+        self._calificar('1P', tipo, 5)
+        PromedioCache.objects.all().delete()
+
+        self.assertEqual(refrescar_promedios(), 1)
+        cache = PromedioCache.objects.get(student=self.student, tipo_promedio='quimestre', quimestre='Q1')
+        self.assertEqual(cache.promedio, Decimal('5.00'))
+
+    def test_refresco_incremental_recalcula_tras_borrar_notas(self):
+        from classes.estadisticas import refrescar_promedios
+        from classes.models import PromedioCache, TipoAporte
+        from subjects.factories import SubjectFactory
+        tipo = TipoAporte.objects.create(nombre='Lección', codigo='EST_BOR', peso=1)
+        self._calificar('1P', tipo, 9)
+        otra = self.subject
+        self.subject = SubjectFactory()
+        borrada = self._calificar('1P', tipo, 5)
+        self.subject = otra
+        refrescar_promedios()
+        desde = timezone.now()
+
+        borrada.delete()
+        PromedioCache.objects.filter(student=self.student, tipo_promedio='general').update(promedio=Decimal('7.00'))
+        self.assertEqual(refrescar_promedios(desde=desde), 1)
+        self.assertEqual(
+            set(PromedioCache.objects.filter(student=self.student).values_list('subject_id', flat=True)),
+            {self.subject.id, None},
+        )
+        general = PromedioCache.objects.get(student=self.student, tipo_promedio='general')
+        self.assertEqual(general.promedio, Decimal('9.00'))
+
+    def test_refrescar_asistencia_clases(self):
+        from classes.estadisticas import refrescar_asistencia_clases
+        from classes.models import Asistencia, EstadisticaAsistenciaClase
+        estados = [Asistencia.Estado.PRESENTE] * 3 + [Asistencia.Estado.AUSENTE]
+        for i, estado in enumerate(estados):
+            Asistencia.objects.create(
+                inscripcion=self.enrollment, fecha=date.today() - timedelta(days=i), estado=estado,
+            )
+
+        refrescar_asistencia_clases()
+        refrescar_asistencia_clases()  # idempotente
+
+        stats = EstadisticaAsistenciaClase.objects.get(clase=self.enrollment.clase)
+        self.assertEqual(stats.total, 4)
+        self.assertEqual(stats.ausentes, 1)
+        self.assertEqual(stats.tasa, Decimal('75.00'))
+
+    def test_reporte_directivo_limita_en_riesgo(self):
+        from django.contrib.auth.models import User
+        from django.urls import reverse
+        from classes.factories import EnrollmentFactory
+        from classes.models import PromedioCache
+        from teachers import views
+        for i in range(4):
+            student = EnrollmentFactory(clase=self.enrollment.clase).estudiante.student_profile
+            PromedioCache.objects.create(
+                student=student, subject=self.subject, quimestre='Q1',
+                tipo_promedio='quimestre', promedio=Decimal(f'{3 + i}.00'),
+            )
+        auth_user = User.objects.create_user('director_riesgo', 'director_riesgo@test.com', 'x', is_staff=True)
+        self.client.force_login(auth_user)
+        with patch.object(views, 'MAX_EN_RIESGO', 2):
+            respuesta = self.client.get(reverse('teachers:reportes_directivos'))
+        self.assertEqual([r['promedio'] for r in respuesta.context['en_riesgo']], [Decimal('3.00'), Decimal('4.00')])
+        self.assertEqual(respuesta.context['total_en_riesgo'], 4)
+
+    def test_estadisticas_anuales_por_clase(self):
+        from classes.estadisticas import estadisticas_anuales_por_clase
+        from classes.factories import EnrollmentFactory
+        from classes.models import Enrollment, TipoAporte
+        tipo = TipoAporte.objects.create(nombre='Prueba', codigo='EST_PRU', peso=1)
+        self._calificar('1P', tipo, 8, quimestre='Q1')
+        self._calificar('3P', tipo, 6, quimestre='Q2')
+        EnrollmentFactory(clase=self.enrollment.clase, estado=Enrollment.Estado.RETIRADO)
+
+        conteos = estadisticas_anuales_por_clase([self.enrollment.clase_id])[self.enrollment.clase_id]
+        self.assertEqual(conteos['n_asignados'], 1)
+        self.assertEqual(conteos['n_retirados'], 1)
+        self.assertEqual(conteos['n_con_notas'], 1)
+        self.assertEqual(conteos['n_aprobados'], 1)
+
+    def test_estadisticas_anuales_docente_por_ciclo_e_invalidadas_al_calificar(self):
+        from django.core.cache import cache
+        from classes.estadisticas import estadisticas_anuales_docente
+        from classes.models import TipoAporte
+        cache.clear()
+        clase = self.enrollment.clase
+        docente = self.enrollment.docente
+        clase.docente_base = docente
+        clase.save()
+        tipo = TipoAporte.objects.create(nombre='Anual', codigo='EST_ANU', peso=1)
+
+        self.assertEqual(estadisticas_anuales_docente(docente, '2024-2025'), [])
+        antes = estadisticas_anuales_docente(docente, clase.ciclo_lectivo)
+        self.assertEqual((antes[0]['n_asignados'], antes[0]['n_aprobados']), ('1', '0'))
+
+        self._calificar('1P', tipo, 9)
+        despues = estadisticas_anuales_docente(docente, clase.ciclo_lectivo)
+        self.assertEqual((despues[0]['n_aprobados'], despues[0]['pct_avance']), ('1', '100%'))
+
+
+class ResumenDeberesEstudianteTests(TestCase):
+    def setUp(self):
+        from classes.factories import EnrollmentFactory
+        from classes.models import Deber
+        self.enrollment = EnrollmentFactory()
+        self.usuario = self.enrollment.estudiante
+        clase = self.enrollment.clase
+        docente = clase.docente_base or self.usuario
+        ahora = timezone.now()
+        self.vencido = Deber.objects.create(titulo='Vencido', fecha_entrega=ahora - timedelta(days=1),
+                                            teacher=docente, clase=clase)
+        self.proximo = Deber.objects.create(titulo='Próximo', fecha_entrega=ahora + timedelta(days=1),
+                                            teacher=docente, clase=clase)
+        self.pendiente = Deber.objects.create(titulo='Pendiente', fecha_entrega=ahora + timedelta(days=10),
+                                              teacher=docente, clase=clase)
+        self.entregado = Deber.objects.create(titulo='Entregado', fecha_entrega=ahora - timedelta(days=2),
+                                              teacher=docente, clase=clase, puntos_totales=10)
+
+    def test_clasifica_deberes_por_estado(self):
+        from classes.deberes import resumen_deberes_estudiante
+        from classes.models import DeberEntrega
+        DeberEntrega.objects.create(deber=self.entregado, estudiante=self.usuario,
+                                    estado='revisado', calificacion=8)
+
+        resumen = resumen_deberes_estudiante(self.usuario)
+        self.assertEqual(resumen['vencidos'], [self.vencido])
+        self.assertEqual(resumen['proximos'], [self.proximo])
+        self.assertEqual(resumen['pendientes'], [self.pendiente])
+        self.assertEqual(resumen['entregados'], [self.entregado])
+        self.assertEqual(resumen['promedio_general'], 8.0)
+        self.assertEqual(resumen['promedios_materias'][0]['porcentaje'], 80.0)
+
+    def test_no_duplica_deber_asignado_por_clase_y_directo(self):
+        from classes.deberes import deberes_estudiante
+        self.pendiente.estudiantes_especificos.add(self.usuario)
+        titulos = list(deberes_estudiante(self.usuario).values_list('titulo', flat=True))
+        self.assertEqual(titulos.count('Pendiente'), 1)
+
+
+class EstadisticasDeberesDocenteTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from classes.factories import EnrollmentFactory
+        from classes.models import Deber
+        cache.clear()
+        self.enrollment = EnrollmentFactory()
+        self.clase = self.enrollment.clase
+        self.docente = self.clase.docente_base
+        self.deber = Deber.objects.create(titulo='Tarea', fecha_entrega=timezone.now() + timedelta(days=2),
+                                          teacher=self.docente, clase=self.clase)
+
+    def test_tasa_de_entrega_por_clase(self):
+        from classes.deberes import estadisticas_deberes_docente
+        from classes.models import DeberEntrega
+        DeberEntrega.objects.create(deber=self.deber, estudiante=self.enrollment.estudiante,
+                                    estado='revisado', calificacion=9)
+
+        estadisticas = estadisticas_deberes_docente(self.docente)
+        fila = next(c for c in estadisticas['clases'] if c['clase_id'] == self.clase.id)
+        self.assertEqual(fila['estudiantes'], 1)
+        self.assertEqual(fila['tasa_entrega'], 100.0)
+        self.assertEqual(fila['promedio'], 9.0)
+        self.assertEqual(estadisticas['total_estudiantes'], 1)
+
+    def test_cache_se_invalida_al_crear_deber(self):
+        from classes.deberes import estadisticas_deberes_docente
+        from classes.models import Deber
+        self.assertEqual(estadisticas_deberes_docente(self.docente)['total_deberes'], 1)
+        Deber.objects.create(titulo='Otra', fecha_entrega=timezone.now(), teacher=self.docente, clase=self.clase)
+        self.assertEqual(estadisticas_deberes_docente(self.docente)['total_deberes'], 2)
+
+
+class ApiConsultaOptimizadaTests(TestCase):
+    def setUp(self):
+        from django.contrib.auth.models import User
+        from rest_framework.test import APIClient
+        from classes.factories import EnrollmentFactory
+        self.enrollments = [EnrollmentFactory() for _ in range(3)]
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('api_test', 'api@test.com', 'x'))
+
+    def test_listado_paginado_por_cursor_sin_n_mas_1(self):
+        with self.assertNumQueries(1):
+            r = self.client.get('/classes/api/v1/enrollments/?page_size=2')
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(len(r.json()['results']), 2)
+        self.assertIn('clase', r.json()['results'][0])
+        r = self.client.get(r.json()['next'])
+        self.assertEqual(len(r.json()['results']), 1)
+
+    def test_proyeccion_de_campos(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as ctx:
+            r = self.client.get('/classes/api/v1/enrollments/?fields=id,estado')
+        self.assertEqual(set(r.json()['results'][0]), {'id', 'estado'})
+        self.assertNotIn('JOIN', ctx.captured_queries[0]['sql'])
+
+    def test_deberes_con_porcentaje_anotado(self):
+        from classes.models import Deber, DeberEntrega
+        e = self.enrollments[0]
+        deber = Deber.objects.create(titulo='T', fecha_entrega=timezone.now(),
+                                     teacher=e.clase.docente_base, clase=e.clase)
+        DeberEntrega.objects.create(deber=deber, estudiante=e.estudiante, estado='revisado')
+        # 3 consultas de firma (ETag) + 1 para el listado, sin importar las filas
+        with self.assertNumQueries(4):
+            r = self.client.get('/classes/api/v1/deberes/?fields=id,entregas_completadas,porcentaje_entrega')
+        self.assertEqual(r.json()['results'][0], {'id': deber.id, 'entregas_completadas': 1, 'porcentaje_entrega': 100.0})
+
+    def test_deber_sin_clase_cuenta_estudiantes_especificos(self):
+        from classes.models import Deber, DeberEntrega
+        e = self.enrollments[0]
+        deber = Deber.objects.create(titulo='Individual', fecha_entrega=timezone.now(),
+                                     teacher=e.clase.docente_base, clase=None)
+        deber.estudiantes_especificos.set([x.estudiante for x in self.enrollments[:2]])
+        DeberEntrega.objects.create(deber=deber, estudiante=e.estudiante, estado='revisado')
+        r = self.client.get('/classes/api/v1/deberes/?fields=id,entregas_completadas,porcentaje_entrega')
+        self.assertEqual(r.json()['results'][0], {'id': deber.id, 'entregas_completadas': 1, 'porcentaje_entrega': 50.0})
+
+
+class ApiSincronizacionTests(TestCase):
+    def setUp(self):
+        from django.contrib.auth.models import User
+        from rest_framework.test import APIClient
+        from classes.factories import EnrollmentFactory
+        from classes.models import Asistencia
+        self.enrollment = EnrollmentFactory()
+        self.asistencia = Asistencia.objects.create(
+            inscripcion=self.enrollment, fecha=date(2025, 9, 1), estado=Asistencia.Estado.PRESENTE,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('sync_test', 'sync@test.com', 'x'))
+
+    def test_etag_devuelve_304_si_no_hay_cambios(self):
+        url = '/classes/api/v1/asistencia/'
+        r = self.client.get(url)
+        etag = r['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.asistencia.estado = 'Ausente'
+        self.asistencia.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_since_devuelve_cambios_y_eliminados(self):
+        from classes.models import Asistencia
+        hace_un_dia = (timezone.now() - timedelta(days=1)).isoformat()
+        cursor = self.client.get('/classes/api/v1/asistencia/', {'since': hace_un_dia}).json()['cursor']
+        nueva = Asistencia.objects.create(
+            inscripcion=self.enrollment, fecha=date(2025, 9, 2), estado=Asistencia.Estado.AUSENTE,
+        )
+        borrada_id = self.asistencia.pk
+        self.asistencia.delete()
+
+        r = self.client.get('/classes/api/v1/asistencia/', {'since': cursor})
+        self.assertEqual([c['id'] for c in r.json()['cambios']], [nueva.pk])
+        self.assertEqual(r.json()['eliminados'], [borrada_id])
+
+    def test_tombstones_en_un_insert_y_acotados_al_filtro(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from classes.factories import EnrollmentFactory
+        from classes.models import Asistencia, RegistroEliminado
+        ajena = EnrollmentFactory()
+        for dia in (2, 3, 4):
+            Asistencia.objects.create(inscripcion=self.enrollment, fecha=date(2025, 9, dia), estado='Presente')
+        otra = Asistencia.objects.create(inscripcion=ajena, fecha=date(2025, 9, 1), estado='Presente')
+        cursor = (timezone.now() - timedelta(minutes=5)).isoformat()
+        propias = set(Asistencia.objects.filter(inscripcion=self.enrollment).values_list('pk', flat=True))
+
+        with CaptureQueriesContext(connection) as ctx:
+            Asistencia.objects.filter(inscripcion=self.enrollment).delete()
+        inserts = [q for q in ctx.captured_queries if q['sql'].startswith('INSERT') and 'registroeliminado' in q['sql']]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(RegistroEliminado.objects.filter(ambito=self.enrollment.pk).count(), 4)
+        otra_id = otra.pk
+        otra.delete()
+
+        for params in ({'inscripcion': self.enrollment.pk}, {'student': self.enrollment.estudiante_id}):
+            r = self.client.get('/classes/api/v1/asistencia/', {'since': cursor, **params})
+            self.assertEqual(set(r.json()['eliminados']), propias, params)
+        r = self.client.get('/classes/api/v1/asistencia/', {'since': cursor})
+        self.assertEqual(set(r.json()['eliminados']), propias | {otra_id})
+
+    def test_since_incluye_margen_de_solape(self):
+        from classes.models import Asistencia
+        cursor = timezone.now().isoformat()
+        Asistencia.objects.filter(pk=self.asistencia.pk).update(fecha_actualizacion=timezone.now() - timedelta(seconds=5))
+        r = self.client.get('/classes/api/v1/asistencia/', {'since': cursor})
+        self.assertEqual([c['id'] for c in r.json()['cambios']], [self.asistencia.pk])
+
+    def test_since_invalido_o_expirado(self):
+        self.assertEqual(self.client.get('/classes/api/v1/asistencia/?since=ayer').status_code, 400)
+        self.assertEqual(self.client.get('/classes/api/v1/asistencia/?since=2000-01-01T00:00:00').status_code, 410)
+
+
+class LibretaEstudianteTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from classes.factories import EnrollmentFactory
+        from classes.models import TipoAporte
+        from students.models import Student
+        cache.clear()
+        self.enrollment = EnrollmentFactory()
+        self.student, _ = Student.objects.get_or_create(usuario=self.enrollment.estudiante)
+        self.subject = self.enrollment.clase.subject
+        self.deber = TipoAporte.objects.create(nombre='Deber', codigo='LIB_DEB', peso=1)
+        self.examen = TipoAporte.objects.create(nombre='Examen', codigo='LIB_EXA', peso=3)
+
+    def _calificar(self, tipo, nota, parcial='1P'):
+        from classes.models import CalificacionParcial
+        with patch('utils.notifications.NotificacionWhatsApp'):
+            return CalificacionParcial.objects.create(
+                student=self.student, subject=self.subject, parcial=parcial,
+                quimestre='Q1', tipo_aporte=tipo, calificacion=nota,
+            )
+
+    def test_libreta_y_promedios_solo_del_ciclo_activo(self):
+        from classes.estadisticas import libreta_estudiante, refrescar_promedios
+        from classes.models import CalificacionParcial, PromedioCache
+        self._calificar(self.deber, 9)
+        with patch('utils.notifications.NotificacionWhatsApp'):
+            CalificacionParcial.objects.create(
+                student=self.student, subject=self.subject, parcial='1P', quimestre='Q1',
+                tipo_aporte=self.deber, calificacion=3, ciclo_lectivo='2024-2025',
+            )
+        datos, _etag, _ultimo = libreta_estudiante(self.student.id)
+        self.assertEqual(datos['promedio_general'], 9.0)
+        self.assertEqual([n['calificacion'] for n in datos['materias'][self.subject.name]], [9.0])
+        refrescar_promedios(student_ids=[self.student.id])
+        general = PromedioCache.objects.get(student=self.student, tipo_promedio='general')
+        self.assertEqual(general.promedio, Decimal('9.00'))
+
+    def test_promedio_general_ponderado(self):
+        from classes.estadisticas import libreta_estudiante
+        from classes.models import CalificacionParcial
+        self._calificar(self.deber, 6)
+        self._calificar(self.examen, 9)
+        datos, _etag, _ultimo = libreta_estudiante(self.student.id)
+        esperado = CalificacionParcial.calcular_promedio_general(self.student)
+        self.assertEqual(datos['promedio_general'], float(esperado))
+        self.assertEqual(datos['promedio_general'], 8.25)
+
+    def test_cache_invalidado_por_asistencia(self):
+        from classes.estadisticas import libreta_estudiante
+        from classes.models import Asistencia
+        self.assertEqual(libreta_estudiante(self.student.id)[0]['asistencia']['total'], 0)
+        with self.assertNumQueries(0):
+            libreta_estudiante(self.student.id)
+        Asistencia.objects.create(inscripcion=self.enrollment, fecha=date(2025, 9, 1),
+                                  estado=Asistencia.Estado.PRESENTE)
+        asistencia = libreta_estudiante(self.student.id)[0]['asistencia']
+        self.assertEqual((asistencia['total'], asistencia['presentes'], asistencia['porcentaje']), (1, 1, 100.0))
+
+    def test_estudiante_inexistente(self):
+        from classes.estadisticas import libreta_estudiante
+        self.assertIsNone(libreta_estudiante(999999))
+
+
+class CicloCalificacionTests(TestCase):
+    def setUp(self):
+        from classes.factories import EnrollmentFactory
+        from classes.models import TipoAporte
+        from students.models import Student
+        self.enrollment = EnrollmentFactory(clase__ciclo_lectivo='2024-2025')
+        self.student, _ = Student.objects.get_or_create(usuario=self.enrollment.estudiante)
+        self.tipo = TipoAporte.objects.create(nombre='Lección', codigo='CIC_LEC', peso=1)
+
+    def test_ciclo_derivado_de_la_inscripcion(self):
+        from classes.models import CalificacionParcial
+        with patch('utils.notifications.NotificacionWhatsApp'):
+            calificacion = CalificacionParcial.objects.create(
+                student=self.student, subject=self.enrollment.clase.subject, parcial='1P',
+                quimestre='Q1', tipo_aporte=self.tipo, calificacion=8,
+            )
+        self.assertEqual(calificacion.ciclo_lectivo, '2024-2025')
+
+    def test_ciclo_por_fecha_sin_inscripcion(self):
+        from classes.models import CalificacionParcial, ciclo_de_fecha
+        self.assertEqual(ciclo_de_fecha(date(2025, 9, 1)), '2025-2026')
+        self.assertEqual(ciclo_de_fecha(date(2026, 7, 15)), '2025-2026')
+        self.assertEqual(
+            CalificacionParcial.ciclo_para(self.student.pk, None, fecha=date(2026, 2, 1)),
+            '2025-2026',
+        )
+
+    def test_notas_de_dos_ciclos_en_la_misma_materia(self):
+        from django.contrib.auth.models import User
+        from classes.factories import ClaseFactory, EnrollmentFactory
+        from classes.models import CalificacionParcial
+        auth_user = User.objects.create_user('docente_ciclos', 'docente_ciclos@test.com', 'x', is_staff=True)
+        nueva = ClaseFactory(subject=self.enrollment.clase.subject, ciclo_lectivo='2025-2026',
+                             docente_base=auth_user.usuario)
+        EnrollmentFactory(clase=nueva, estudiante=self.enrollment.estudiante)
+        with patch('utils.notifications.NotificacionWhatsApp'):
+            CalificacionParcial.objects.create(
+                student=self.student, subject=nueva.subject, parcial='1P',
+                quimestre='Q1', tipo_aporte=self.tipo, calificacion=8, ciclo_lectivo='2024-2025',
+            )
+            self.client.force_login(auth_user)
+            self.client.post(f'/docente/clase/{nueva.pk}/calificaciones/?q=Q1&p=1P',
+                             {f'nota_{self.student.pk}_{self.tipo.pk}': '9'})
+        notas = dict(
+            CalificacionParcial.objects.filter(student=self.student, tipo_aporte=self.tipo)
+            .values_list('ciclo_lectivo', 'calificacion')
+        )
+        self.assertEqual(notas, {'2024-2025': Decimal('8.00'), '2025-2026': Decimal('9.00')})
+
+    def test_benchmark_muestra_planes(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from classes.models import Asistencia, CalificacionParcial
+        with patch('utils.notifications.NotificacionWhatsApp'):
+            CalificacionParcial.objects.create(
+                student=self.student, subject=self.enrollment.clase.subject, parcial='1P',
+                quimestre='Q1', tipo_aporte=self.tipo, calificacion=8,
+            )
+        Asistencia.objects.create(inscripcion=self.enrollment, fecha=date(2024, 10, 1), estado='Ausente')
+        salida = StringIO()
+        call_command('benchmark_calificaciones', repeticiones=1, stdout=salida)
+        texto = salida.getvalue()
+        self.assertIn('ciclo 2024-2025', texto)
+        self.assertIn('Ausencias de una clase', texto)
+
+
+class ParticionesTests(TestCase):
+    def test_ddl_de_particion_rechaza_ciclos_invalidos(self):
+        from classes.particiones import sql_crear_particion
+        self.assertIn("FOR VALUES IN ('2025-2026')", sql_crear_particion('2025-2026'))
+        for ciclo in ["2025'); DROP TABLE classes_clase; --", '2025 2026', '', None]:
+            with self.assertRaises(ValueError):
+                sql_crear_particion(ciclo)
+
+
+class CierreCicloLectivoTests(TestCase):
+    def setUp(self):
+        import shutil
+        import tempfile
+        from django.core.cache import cache
+        from django.test import override_settings
+        from classes.factories import ClaseFactory, EnrollmentFactory
+        from classes.models import Asistencia, CalificacionParcial, TipoAporte
+        from students.models import Student
+        cache.clear()
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio, ignore_errors=True)
+        ajustes = override_settings(ARCHIVO_CICLOS_DIR=directorio)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        self.anterior = EnrollmentFactory(clase__ciclo_lectivo='2024-2025')
+        self.actual = EnrollmentFactory(
+            estudiante=self.anterior.estudiante,
+            clase=ClaseFactory(ciclo_lectivo='2025-2026', subject=self.anterior.clase.subject),
+        )
+        self.student, _ = Student.objects.get_or_create(usuario=self.anterior.estudiante)
+        self.subject = self.anterior.clase.subject
+        tipo = TipoAporte.objects.create(nombre='Lección', codigo='CIE_LEC', peso=1)
+        with patch('utils.notifications.NotificacionWhatsApp'):
+            for parcial, quimestre, nota, ciclo in [
+                ('1P', 'Q1', 8, '2024-2025'), ('3P', 'Q2', 6, '2024-2025'), ('2P', 'Q1', 9, '2025-2026'),
+            ]:
+                CalificacionParcial.objects.create(
+                    student=self.student, subject=self.subject, parcial=parcial, quimestre=quimestre,
+                    tipo_aporte=tipo, calificacion=nota, ciclo_lectivo=ciclo,
+                )
+        Asistencia.objects.create(inscripcion=self.anterior, fecha=date(2024, 10, 1), estado='Presente')
+        Asistencia.objects.create(inscripcion=self.anterior, fecha=date(2024, 10, 2), estado='Ausente')
+        Asistencia.objects.create(inscripcion=self.actual, fecha=date(2025, 10, 1), estado='Presente')
+
+    def test_cierre_resume_archiva_y_deja_solo_el_ciclo_activo(self):
+        from classes.archivo_ciclos import cerrar_ciclo, leer_archivo
+        from classes.models import (
+            Asistencia, CalificacionParcial, PromedioCache, RegistroEliminado, ResumenAnualMateria,
+        )
+        cierre = cerrar_ciclo('2024-2025')
+        self.assertEqual(cierre.conteos['calificaciones'], 2)
+        self.assertEqual(cierre.conteos['asistencias'], 2)
+
+        self.assertEqual(list(CalificacionParcial.objects.values_list('ciclo_lectivo', flat=True)), ['2025-2026'])
+        self.assertEqual(Asistencia.objects.get().inscripcion, self.actual)
+        self.assertEqual(RegistroEliminado.objects.filter(modelo='classes.CalificacionParcial').count(), 2)
+        # La caché de promedios queda solo con el ciclo activo
+        general = PromedioCache.objects.get(student=self.student, tipo_promedio='general')
+        self.assertEqual(general.promedio, Decimal('9.00'))
+
+        materia = ResumenAnualMateria.objects.get(student=self.student, subject=self.subject, ciclo_lectivo='2024-2025')
+        self.assertEqual((materia.promedio_q1, materia.promedio_q2, materia.promedio_anual),
+                         (Decimal('8.00'), Decimal('6.00'), Decimal('7.00')))
+        self.assertEqual((materia.asistencias_total, materia.ausencias), (2, 1))
+        self.assertEqual({f['calificacion'] for f in leer_archivo('2024-2025', 'calificaciones')}, {'8.00', '6.00'})
+
+    def test_cierre_invalida_estadisticas_y_dashboards_tras_commit(self):
+        from classes.archivo_ciclos import cerrar_ciclo
+        with patch('classes.estadisticas.invalidar_estadisticas_anuales') as anuales, \
+                patch('classes.archivo_ciclos.invalidar_dominio') as dominio:
+            with self.captureOnCommitCallbacks() as callbacks:
+                cerrar_ciclo('2024-2025')
+            dominio.assert_not_called()
+            for callback in callbacks:
+                callback()
+        anuales.assert_called_with('2024-2025')
+        dominio.assert_called_once_with('dashboards')
+
+    def test_calificaciones_archivadas_por_estudiante(self):
+        from classes.archivo_ciclos import cerrar_ciclo, leer_archivo, leer_archivo_de
+        from classes.factories import EnrollmentFactory
+        from classes.models import CalificacionParcial, TipoAporte
+        otro = EnrollmentFactory(clase=self.anterior.clase).estudiante.student_profile
+        with patch('utils.notifications.NotificacionWhatsApp'):
+            CalificacionParcial.objects.create(
+                student=otro, subject=self.subject, parcial='1P', quimestre='Q1',
+                tipo_aporte=TipoAporte.objects.get(codigo='CIE_LEC'), calificacion=5, ciclo_lectivo='2024-2025',
+            )
+        cerrar_ciclo('2024-2025')
+        self.assertEqual(len(list(leer_archivo('2024-2025', 'calificaciones'))), 3)
+        propias = leer_archivo_de('2024-2025', 'calificaciones', self.student.id)
+        self.assertEqual({f['calificacion'] for f in propias}, {'8.00', '6.00'})
+        self.assertEqual([f['calificacion'] for f in leer_archivo_de('2024-2025', 'calificaciones', otro.id)], ['5.00'])
+        self.assertEqual(leer_archivo_de('2024-2025', 'calificaciones', 999999), [])
+
+    def test_libreta_historica_por_api(self):
+        from django.contrib.auth.models import User
+        from rest_framework.test import APIClient
+        from classes.archivo_ciclos import cerrar_ciclo
+        cerrar_ciclo('2024-2025')
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('cierre_test', 'cierre@test.com', 'x'))
+        url = f'/teachers/api/v1/libreta/{self.student.id}/'
+
+        response = client.get(url, {'ciclo': '2024-2025'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['promedio_general'], 7.0)
+        self.assertEqual(len(response.data['materias'][self.subject.name]), 2)
+        self.assertEqual(response.data['asistencia']['porcentaje'], 50.0)
+        with self.assertNumQueries(0):
+            etag = client.get(url, {'ciclo': '2024-2025'})['ETag']
+        self.assertEqual(client.get(url, {'ciclo': '2024-2025'}, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.assertEqual(client.get(url, {'ciclo': '2025-2026'}).status_code, 404)
+        self.assertEqual(client.get(url).data['promedio_general'], 9.0)
+
+    def test_rechaza_ciclo_activo_y_cierre_repetido(self):
+        from io import StringIO
+        from django.core.management import CommandError, call_command
+        from classes.archivo_ciclos import cerrar_ciclo
+        from setup.models import ConfiguracionInstitucion
+        ConfiguracionInstitucion.objects.update_or_create(pk=1, defaults={'anio_lectivo': '2025-2026'})
+        with self.assertRaises(ValueError):
+            cerrar_ciclo('2025-2026')
+        call_command('cerrar_ciclo_lectivo', '2024-2025', stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command('cerrar_ciclo_lectivo', '2024-2025', stdout=StringIO())
+
+
+class CacheDominiosTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+
+    def test_etiquetas_y_dominios_invalidan_por_version(self):
+        from utils.cache import clave, invalidar_dominio, invalidar_etiquetas, obtener
+        calculos = []
+
+        def calcular(valor):
+            calculos.append(valor)
+            return valor
+
+        self.assertEqual(obtener('calificaciones', ('x', 1), lambda: calcular(1), etiquetas=('estudiante:1',)), 1)
+        self.assertEqual(obtener('calificaciones', ('x', 2), lambda: calcular(2), etiquetas=('estudiante:2',)), 2)
+        obtener('calificaciones', ('x', 1), lambda: calcular(1), etiquetas=('estudiante:1',))
+        self.assertEqual(calculos, [1, 2])
+
+        # La etiqueta de un estudiante no toca la entrada del otro
+        invalidar_etiquetas('estudiante:1')
+        obtener('calificaciones', ('x', 1), lambda: calcular(1), etiquetas=('estudiante:1',))
+        obtener('calificaciones', ('x', 2), lambda: calcular(2), etiquetas=('estudiante:2',))
+        self.assertEqual(calculos, [1, 2, 1])
+
+        anterior = clave('calificaciones', 'x', 2, etiquetas=('estudiante:2',))
+        invalidar_dominio('calificaciones')
+        self.assertNotEqual(clave('calificaciones', 'x', 2, etiquetas=('estudiante:2',)), anterior)
+        with self.assertRaises(ValueError):
+            clave('inexistente', 'x')
+
+    def test_contador_desalojado_no_recupera_versiones_viejas(self):
+        from django.core.cache import cache
+        from utils.cache import clave
+        anterior = clave('malla', 'grid')
+        cache.delete('ns:malla')
+        self.assertNotEqual(clave('malla', 'grid'), anterior)
+
+    def test_guardar_modelo_invalida_su_dominio(self):
+        from classes.estadisticas import libreta_estudiante
+        from classes.factories import EnrollmentFactory
+        from classes.models import TipoAporte
+        from students.models import Student
+        from utils.cache import clave
+        student, _ = Student.objects.get_or_create(usuario=EnrollmentFactory().estudiante)
+        tipo = TipoAporte.objects.create(nombre='Prueba', codigo='CACHE_PRU', peso=1)
+        libreta_estudiante(student.id)
+        malla = clave('malla', 'grid')
+        with self.assertNumQueries(0):
+            libreta_estudiante(student.id)
+
+        # Cambiar un peso invalida todas las libretas, no la malla
+        tipo.peso = 2
+        tipo.save()
+        with self.assertNumQueries(4):
+            libreta_estudiante(student.id)
+        self.assertEqual(clave('malla', 'grid'), malla)
+
+
+class EtlPipelineTests(TestCase):
+    CSVS = {
+        'docente': 'id,nombre_completo,cedula,correo_institucional,correo_personal,celular\n'
+                   '1,ARIAS LÓPEZ JORGE,1700000001,jorge@test.ec,,0999\n'
+                   '2,MORA VEGA ANA,,,,\n'
+                   '3,MORÁ VEGA ANA,1700000002,,,\n',
+        'curso': 'id,anio\n1,1o\n',
+        'paralelo': 'id,letra\n1,A\n',
+        'estudiante': 'apellidos,nombres,cedula,correo\nPAZ RUIZ,LUIS,0500000001,\n',
+        'matricula': 'cedula_estudiante,curso_id,paralelo_id\n0500000001,1,1\n',
+        'info_medica': 'cedula_estudiante,alergias_condiciones,tiene_necesidad_educativa,detalle_necesidad\n'
+                       '0500000001,Polen,No,\n',
+        'instrumento': 'id,nombre\n1,Violín\n',
+        'agrupacion': 'id,nombre\n1,Orquesta Prueba\n',
+        'asignacion_instrumento': 'apellidos_estudiante,nombres_estudiante,instrumento_id,docente_id,curso_id,paralelo_id\n'
+                                  'PAZ RUIZ,LUIS,1,1,1,1\nSOTO DÍAZ,MARÍA,1,1,1,1\n',
+        'asignacion_agrupacion': 'apellidos_estudiante,nombres_estudiante,agrupacion_id,curso_id,paralelo_id\n'
+                                 'PAZ RUIZ,LUIS,1,1,1\nSOTO DÍAZ,MARÍA,1,1,1\n',
+    }
+
+    def setUp(self):
+        import os
+        import shutil
+        import tempfile
+        self.csv_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.csv_dir, ignore_errors=True)
+        for nombre, contenido in self.CSVS.items():
+            with open(os.path.join(self.csv_dir, f'{nombre}.csv'), 'w', encoding='utf-8') as f:
+                f.write(contenido)
+
+    def _etl(self, *args):
+        from io import StringIO
+        from django.core.management import call_command
+        salida = StringIO()
+        call_command('etl_pipeline', '--csv-dir', self.csv_dir, *args, stdout=salida)
+        return salida.getvalue()
+
+    def _totales(self):
+        from classes.models import Clase, Enrollment
+        from students.models import Student
+        from teachers.models import Teacher
+        from users.models import Usuario
+        return (
+            Usuario.objects.count(), Teacher.objects.count(), Student.objects.count(),
+            Clase.objects.count(), Enrollment.objects.count(),
+        )
+
+    def test_carga_completa_e_idempotente(self):
+        from classes.models import Clase, Enrollment, EtlEjecucion
+        from students.models import Student
+        self._etl()
+        ejecucion = EtlEjecucion.objects.get()
+        self.assertIsNotNone(ejecucion.finalizada)
+        self.assertEqual(ejecucion.etapas.filter(estado='COMPLETADA').count(), 9)
+
+        # Las dos variantes de 'MORA VEGA ANA' son un solo docente
+        self.assertEqual(self._totales(), (4, 2, 2, 2, 4))
+        luis = Student.objects.get(usuario__cedula='0500000001')
+        self.assertEqual((luis.grade_level.level, luis.grade_level.section), ('1', 'A'))
+        self.assertIn('Alergias: Polen', luis.notes)
+        self.assertTrue(luis.registration_code)
+        maria = Student.objects.get(usuario__nombre='SOTO DÍAZ MARÍA')
+        self.assertEqual(maria.grade_level_id, luis.grade_level_id)
+
+        violin = Clase.objects.get(subject__name='Violín')
+        self.assertEqual(violin.docente_base.nombre, 'ARIAS LÓPEZ JORGE')
+        orquesta = Clase.objects.get(subject__name='Orquesta Prueba')
+        self.assertEqual(orquesta.docente_base_id, violin.docente_base_id)
+        self.assertFalse(Enrollment.objects.filter(docente=None).exists())
+
+        totales = self._totales()
+        self._etl()
+        self.assertEqual(self._totales(), totales)
+
+    def test_docente_existente_por_cedula_pasa_a_rol_docente(self):
+        from users.models import Usuario
+        previo = Usuario.objects.create(nombre='Jorge Arias', cedula='1700000001', rol=Usuario.Rol.PENDIENTE)
+        self._etl('--stage', 'docentes')
+        previo.refresh_from_db()
+        self.assertEqual(previo.rol, Usuario.Rol.DOCENTE)
+        self.assertTrue(hasattr(previo, 'teacher_profile'))
+
+    def test_reanuda_desde_la_etapa_fallida(self):
+        import re
+        from django.core.management.base import CommandError
+        from classes.etl import PipelineETL
+        from classes.models import EtlEjecucion
+        with patch.object(PipelineETL, '_etapa_inscripciones', side_effect=RuntimeError('caída')):
+            with self.assertRaises(CommandError):
+                self._etl()
+        ejecucion = EtlEjecucion.objects.get()
+        estados = dict(ejecucion.etapas.values_list('nombre', 'estado'))
+        self.assertEqual(estados['clases'], 'COMPLETADA')
+        self.assertEqual(estados['inscripciones'], 'FALLIDA')
+        self.assertIsNone(ejecucion.finalizada)
+
+        salida = self._etl('--resume')
+        self.assertIsNone(re.search(r'✓ docentes\s', salida))
+        self.assertIn('inscripciones', salida)
+        self.assertEqual(EtlEjecucion.objects.count(), 1)
+        self.assertEqual(self._totales(), (4, 2, 2, 2, 4))
+
+    def test_stage_y_dry_run(self):
+        import os
+        from django.core.management.base import CommandError
+        from classes.models import EtlEjecucion
+        self._etl('--dry-run')
+        self.assertEqual(self._totales(), (0, 0, 0, 0, 0))
+        self.assertFalse(EtlEjecucion.objects.exists())
+
+        salida = self._etl('--stage', 'docentes')
+        self.assertIn('extraer', salida)
+        self.assertEqual(self._totales()[:2], (2, 2))
+
+        # Con los CSVs modificados, --stage exige volver a extraer
+        with open(os.path.join(self.csv_dir, 'curso.csv'), 'a', encoding='utf-8') as f:
+            f.write('2,2o\n')
+        with self.assertRaises(CommandError):
+            self._etl('--stage', 'grados')
+        self._etl('--stage', 'extraer', '--stage', 'grados')
+        self.assertEqual(EtlEjecucion.objects.count(), 1)
+
+
+class CargasMasivasTests(TestCase):
+    def test_estudiantes_idempotente_con_malla(self):
+        from classes.cargas import cargar_estudiantes
+        from classes.models import Enrollment, GradeLevel, MallaCurricular
+        from subjects.factories import SubjectFactory
+        from users.models import Usuario
+        nivel = GradeLevel.objects.create(level='1', section='A')
+        MallaCurricular.objects.create(nivel=nivel, subject=SubjectFactory(), obligatoria=True)
+        pendiente = Usuario.objects.create(nombre='Ana', email='ana@test.ec', rol=Usuario.Rol.PENDIENTE)
+        filas = [
+            {'nombre': 'ANA PAZ', 'email': 'ana@test.ec', 'cedula': '0100000001', 'grade_level_id': nivel.pk},
+            {'nombre': 'LUIS SOTO', 'cedula': '0100000002', 'grade_level_id': str(nivel.pk), 'parent_name': 'Rosa'},
+            {'nombre': 'LUIS SOTO', 'cedula': '0100000002'},
+        ]
+
+        resultado = cargar_estudiantes(filas)
+        self.assertEqual((resultado.creados, resultado.actualizados, resultado.errores), (1, 1, []))
+        ana, luis, luis_otra_vez = resultado.objetos
+        self.assertEqual(ana.usuario_id, pendiente.pk)
+        self.assertEqual(Usuario.objects.get(pk=pendiente.pk).rol, Usuario.Rol.ESTUDIANTE)
+        self.assertEqual(luis.pk, luis_otra_vez.pk)
+        self.assertTrue(luis.registration_code)
+        self.assertEqual(luis.parent_name, 'Rosa')
+        self.assertEqual(Enrollment.objects.filter(clase__grade_level=nivel).count(), 2)
+
+        totales = (Usuario.objects.count(), Enrollment.objects.count())
+        resultado = cargar_estudiantes(filas)
+        self.assertEqual(resultado.creados, 0)
+        self.assertEqual((Usuario.objects.count(), Enrollment.objects.count()), totales)
+
+    def test_inscribir_reporta_filas_invalidas(self):
+        from classes.cargas import inscribir
+        from classes.factories import ClaseFactory
+        from users.factories import UsuarioFactory
+        from users.models import Usuario
+        clase = ClaseFactory()
+        sin_docente = ClaseFactory(docente_base=None)
+        alumno = UsuarioFactory(rol=Usuario.Rol.ESTUDIANTE)
+
+        resultado = inscribir([
+            {'estudiante_id': alumno.pk, 'clase_id': clase.pk},
+            {'estudiante_id': clase.docente_base_id, 'clase_id': clase.pk},
+            {'estudiante_id': alumno.pk, 'clase_id': sin_docente.pk, 'tipo_materia': 'INSTRUMENTO'},
+            {'estudiante_id': alumno.pk, 'clase_id': clase.pk},
+        ])
+        self.assertEqual(resultado.creados, 1)
+        self.assertEqual([i for i, _ in resultado.errores], [1, 2])
+        self.assertIsNone(resultado.objetos[1])
+        self.assertEqual(resultado.objetos[0].docente_id, clase.docente_base_id)
+        self.assertIs(resultado.objetos[0], resultado.objetos[3])
+
+    def test_mutaciones_bulk(self):
+        from types import SimpleNamespace
+        from django.contrib.auth.models import AnonymousUser, User
+        from classes.factories import ClaseFactory
+        from classes.models import Enrollment
+        from config.schema import schema
+        clase = ClaseFactory()
+        staff = SimpleNamespace(user=User.objects.create_user('admin', is_staff=True))
+
+        resultado = schema.execute(
+            'mutation($items: [StudentInput!]!) { bulkCreateStudents(items: $items) '
+            '{ created students { usuario { id } } errors { index message } } }',
+            variables={'items': [{'nombre': f'ALUMNO {i}', 'cedula': f'09000000{i:02d}'} for i in range(20)]},
+            context_value=staff,
+        )
+        self.assertIsNone(resultado.errors)
+        datos = resultado.data['bulkCreateStudents']
+        self.assertEqual(datos['created'], 20)
+        ids = [s['usuario']['id'] for s in datos['students']]
+
+        resultado = schema.execute(
+            'mutation($items: [EnrollmentInput!]!) { bulkEnroll(items: $items) '
+            '{ created errors { index } } }',
+            variables={'items': [{'estudianteId': i, 'claseId': clase.pk} for i in ids] + [{'estudianteId': 0, 'claseId': clase.pk}]},
+            context_value=staff,
+        )
+        self.assertEqual(resultado.data['bulkEnroll'], {'created': 20, 'errors': [{'index': 20}]})
+        self.assertEqual(Enrollment.objects.filter(clase=clase).count(), 20)
+
+        resultado = schema.execute(
+            'mutation { bulkEnroll(items: []) { created } }',
+            context_value=SimpleNamespace(user=AnonymousUser()),
+        )
+        self.assertIsNotNone(resultado.errors)
+
+
+class RegistroClaseTests(TestCase):
+    def setUp(self):
+        from classes.factories import ClaseFactory, EnrollmentFactory
+        self.clase = ClaseFactory()
+        self.enrollments = [EnrollmentFactory(clase=self.clase) for _ in range(3)]
+        self.ajena = EnrollmentFactory()
+        self.students = [e.estudiante.student_profile for e in self.enrollments]
+
+    def test_asistencia_un_upsert_por_clase(self):
+        from classes.models import Asistencia
+        from classes.registro_clase import registrar_asistencia
+        hoy = date.today()
+        estados = {e.id: ('Presente', '') for e in self.enrollments}
+        estados[self.ajena.id] = ('Ausente', '')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(registrar_asistencia(self.clase, hoy, estados), 3)
+        estados[self.enrollments[0].id] = ('Ausente', 'Llegó tarde')
+        with self.assertNumQueries(4):
+            registrar_asistencia(self.clase, hoy, estados)
+        self.assertEqual(Asistencia.objects.filter(fecha=hoy).count(), 3)
+        primera = Asistencia.objects.get(inscripcion=self.enrollments[0], fecha=hoy)
+        self.assertEqual((primera.estado, primera.observacion), ('Ausente', 'Llegó tarde'))
+
+    def test_notas_upsert_y_alertas_tras_commit(self):
+        from classes.models import CalificacionParcial, PromedioCache, TipoAporte
+        from classes.registro_clase import registrar_notas
+        tipo = TipoAporte.objects.create(nombre='Rápida', codigo='REG_RAP', peso=1)
+        notas = {s.id: Decimal('8') for s in self.students}
+        notas[self.students[0].id] = Decimal('5')
+        notas[self.ajena.estudiante.student_profile.id] = Decimal('3')
+        with patch('utils.notifications.NotificacionWhatsApp') as whatsapp:
+            with self.captureOnCommitCallbacks() as callbacks:
+                self.assertEqual(registrar_notas(self.clase, tipo, 'Q1', '1P', notas), 3)
+            whatsapp.enviar_alerta_bajo_rendimiento.assert_not_called()
+            for callback in callbacks:
+                callback()
+            registrar_notas(self.clase, tipo, 'Q1', '1P', {self.students[0].id: Decimal('9')})
+
+        self.assertEqual(whatsapp.enviar_alerta_bajo_rendimiento.call_count, 1)
+        alertado, materia = whatsapp.enviar_alerta_bajo_rendimiento.call_args.args
+        self.assertEqual((alertado, materia), (self.students[0], self.clase.subject))
+        self.assertEqual(CalificacionParcial.objects.filter(tipo_aporte=tipo).count(), 3)
+        nota = CalificacionParcial.objects.get(student=self.students[0], tipo_aporte=tipo)
+        self.assertEqual((nota.calificacion, nota.ciclo_lectivo), (Decimal('9'), self.clase.ciclo_lectivo))
+        cache = PromedioCache.objects.get(student=self.students[1], tipo_promedio='quimestre', quimestre='Q1')
+        self.assertEqual(cache.promedio, Decimal('8.00'))
+
+    def test_nota_rapida_de_un_ciclo_nuevo_no_pisa_la_del_anterior(self):
+        from classes.factories import ClaseFactory, EnrollmentFactory
+        from classes.models import CalificacionParcial, TipoAporte
+        from classes.registro_clase import registrar_notas
+        tipo = TipoAporte.objects.create(nombre='Rápida', codigo='REG_CICLO', peso=1)
+        student = self.students[0]
+        siguiente = ClaseFactory(subject=self.clase.subject, ciclo_lectivo='2026-2027')
+        EnrollmentFactory(clase=siguiente, estudiante=self.enrollments[0].estudiante)
+        with patch('utils.notifications.NotificacionWhatsApp'):
+            registrar_notas(self.clase, tipo, 'Q1', '1P', {student.id: Decimal('6')})
+            registrar_notas(siguiente, tipo, 'Q1', '1P', {student.id: Decimal('9')})
+            registrar_notas(siguiente, tipo, 'Q1', '1P', {student.id: Decimal('10')})
+        notas = dict(
+            CalificacionParcial.objects.filter(student=student, tipo_aporte=tipo)
+            .values_list('ciclo_lectivo', 'calificacion')
+        )
+        self.assertEqual(notas, {self.clase.ciclo_lectivo: Decimal('6.00'), '2026-2027': Decimal('10.00')})
+
+    def test_alerta_solo_con_notas_del_ciclo_de_la_clase(self):
+        from classes.factories import ClaseFactory, EnrollmentFactory
+        from classes.models import TipoAporte
+        from classes.registro_clase import registrar_notas
+        tipo = TipoAporte.objects.create(nombre='Rápida', codigo='REG_ALERTA', peso=1)
+        student = self.students[0]
+        siguiente = ClaseFactory(subject=self.clase.subject, ciclo_lectivo='2026-2027')
+        EnrollmentFactory(clase=siguiente, estudiante=self.enrollments[0].estudiante)
+        with patch('utils.notifications.NotificacionWhatsApp') as whatsapp:
+            registrar_notas(self.clase, tipo, 'Q1', '1P', {student.id: Decimal('2')})
+            with self.captureOnCommitCallbacks(execute=True):
+                registrar_notas(siguiente, tipo, 'Q1', '1P', {student.id: Decimal('9')})
+        whatsapp.enviar_alerta_bajo_rendimiento.assert_not_called()
+
+
+class HorariosTests(TestCase):
+    def test_parseo_y_conflictos(self):
+        from classes.horarios import Bloque, IndiceIntervalos, dia_indice, parsear_rango
+        self.assertEqual(dia_indice('MIÉRCOLES'), 2)
+        self.assertEqual(parsear_rango('07:30 a 08:15'), (450, 495))
+        self.assertIsNone(parsear_rango('08:15 a 07:30'))
+        indice = IndiceIntervalos([
+            Bloque(0, 420, 600, docente=1, ref='largo'),
+            Bloque(0, 450, 495, docente=1, aula='Aula 1', ref='a'),
+            Bloque(0, 495, 540, docente=2, aula='aula 1', ref='b'),  # contiguo: no se cruza
+            Bloque(0, 550, 580, docente=1, ref='c'),
+            Bloque(1, 450, 495, docente=1, ref='otro día'),
+        ])
+        cruces = {(c.recurso, c.a.ref, c.b.ref) for c in indice.conflictos()}
+        self.assertEqual(cruces, {(('docente', 1), 'largo', 'a'), (('docente', 1), 'largo', 'c')})
+        self.assertEqual([b.ref for b in indice.ocupados(('aula', 'aula 1'), 0, 480, 500)], ['a', 'b'])
+
+    def test_grillas_una_consulta_y_cache(self):
+        from datetime import time
+        from classes.factories import EnrollmentFactory
+        from classes.horarios import grilla_docente, grilla_estudiante
+        from classes.models import Horario
+        enrollment = EnrollmentFactory()
+        clase = enrollment.clase
+        clase.docente_base = enrollment.docente
+        clase.save()
+        Horario.objects.create(clase=clase, dia_semana='Martes', hora_inicio=time(9), hora_fin=time(10))
+        Horario.objects.create(clase=clase, dia_semana='Martes', hora_inicio=time(7), hora_fin=time(8))
+
+        with self.assertNumQueries(1):
+            grilla = grilla_estudiante(enrollment.estudiante_id)
+        self.assertEqual([b['hora_inicio'] for b in grilla['Martes']], [time(7), time(9)])
+        self.assertEqual(grilla['Martes'][0]['clase']['name'], clase.name)
+        with self.assertNumQueries(0):
+            grilla_estudiante(enrollment.estudiante_id)
+
+        Horario.objects.create(clase=clase, dia_semana='Lunes', hora_inicio=time(8), hora_fin=time(9))
+        self.assertEqual(len(grilla_docente(clase.docente_base_id)['Lunes']), 1)
+        self.assertEqual(len(grilla_estudiante(enrollment.estudiante_id)['Lunes']), 1)
+
+
+class GrillaNotasTests(TestCase):
+    def setUp(self):
+        from classes.factories import ClaseFactory, EnrollmentFactory
+        from classes.models import CalificacionParcial, TipoAporte
+        self.clase = ClaseFactory()
+        self.students = [EnrollmentFactory(clase=self.clase).estudiante.student_profile for _ in range(3)]
+        self.deber = TipoAporte.objects.create(nombre='Deber', codigo='GRI_DEB', peso=1, orden=1)
+        self.examen = TipoAporte.objects.create(nombre='Examen', codigo='GRI_EXA', peso=3, orden=2)
+        notas = [(0, self.deber, 6), (0, self.examen, 9), (1, self.deber, 0), (1, self.examen, 7)]
+        with patch('utils.notifications.NotificacionWhatsApp'):
+            for i, tipo, nota in notas:
+                CalificacionParcial.objects.create(
+                    student=self.students[i], subject=self.clase.subject, parcial='1P',
+                    quimestre='Q1', tipo_aporte=tipo, calificacion=nota,
+                )
+
+    def test_grilla_una_consulta_igual_al_promedio_del_modelo(self):
+        from classes.grilla_notas import grilla_notas
+        from classes.models import CalificacionParcial
+        ids = [s.id for s in self.students]
+        with self.assertNumQueries(1):
+            grilla = grilla_notas(ids, self.clase.subject_id, 'Q1', '1P', tipos=[self.deber, self.examen])
+        self.assertEqual(grilla.celdas(ids[0]), [Decimal('6'), Decimal('9')])
+        self.assertEqual(grilla.celdas(ids[1]), [Decimal('0'), Decimal('7')])
+        self.assertEqual(grilla.celdas(ids[2]), [None, None])
+        for student in self.students:
+            self.assertEqual(
+                grilla.promedio(student.id),
+                CalificacionParcial.calcular_promedio_parcial(student, self.clase.subject, '1P'),
+            )
+
+    def test_export_csv_de_la_grilla(self):
+        import csv
+        import io
+        from django.contrib.auth.models import User
+        from django.urls import reverse
+        from classes.models import TipoAporte
+        TipoAporte.objects.exclude(pk__in=[self.deber.pk, self.examen.pk]).update(activo=False)
+        auth_user = User.objects.create_user('docente_grilla', 'docente_grilla@test.com', 'x', is_staff=True)
+        self.clase.docente_base = auth_user.usuario
+        self.clase.save()
+        self.client.force_login(auth_user)
+        url = reverse('teachers:export_calificaciones_csv', args=[self.clase.id])
+        respuesta = self.client.get(url, {'quimestre': 'Q1', 'parcial': '1P'})
+        filas = list(csv.reader(io.StringIO(respuesta.content.decode('utf-8-sig'))))
+        self.assertEqual(filas[0], ['Estudiante', 'Deber', 'Examen', 'Promedio'])
+        por_nombre = {f[0]: f[1:] for f in filas[1:]}
+        self.assertEqual(por_nombre[self.students[0].name], ['6.0', '9.0', '8.25'])
+        self.assertEqual(por_nombre[self.students[2].name], ['', '', '0.0'])
+
+    def test_grillas_solo_con_notas_del_ciclo_de_la_clase(self):
+        import csv
+        import io
+        from django.contrib.auth.models import User
+        from django.urls import reverse
+        from classes.models import CalificacionParcial, TipoAporte
+        TipoAporte.objects.exclude(pk__in=[self.deber.pk, self.examen.pk]).update(activo=False)
+        with patch('utils.notifications.NotificacionWhatsApp'):
+            for student, tipo, nota in [(self.students[0], self.deber, 2), (self.students[2], self.examen, 5)]:
+                CalificacionParcial.objects.create(
+                    student=student, subject=self.clase.subject, parcial='1P', quimestre='Q1',
+                    tipo_aporte=tipo, calificacion=nota, ciclo_lectivo='2024-2025',
+                )
+        auth_user = User.objects.create_user('docente_ciclo_grilla', 'docente_ciclo_grilla@test.com', 'x', is_staff=True)
+        self.clase.docente_base = auth_user.usuario
+        self.clase.save()
+        self.client.force_login(auth_user)
+
+        respuesta = self.client.get(reverse('teachers:export_calificaciones_csv', args=[self.clase.id]),
+                                    {'quimestre': 'Q1', 'parcial': '1P'})
+        por_nombre = {f[0]: f[1:] for f in csv.reader(io.StringIO(respuesta.content.decode('utf-8-sig')))}
+        self.assertEqual(por_nombre[self.students[0].name], ['6.0', '9.0', '8.25'])
+        self.assertEqual(por_nombre[self.students[2].name], ['', '', '0.0'])
+
+        respuesta = self.client.get(f'/docente/clase/{self.clase.pk}/calificaciones/?q=Q1&p=1P')
+        filas = {f['student'].pk: f for f in respuesta.context['filas']}
+        self.assertEqual([nota for _tipo, nota in filas[self.students[0].pk]['celdas']], [Decimal('6'), Decimal('9')])
+        self.assertEqual(filas[self.students[2].pk]['promedio'], Decimal('0.00'))
+
+        respuesta = self.client.get(reverse('teachers:calificaciones_detalladas'),
+                                    {'subject': self.clase.subject_id, 'quimestre': 'Q1', 'parcial': '1P'})
+        promedios = {d['estudiante'].pk: d['promedio'] for d in respuesta.context['datos_tabla']}
+        self.assertEqual(promedios[self.students[0].pk], Decimal('8.25'))
@@ -1,5 +1,4 @@
 import json
-from collections import defaultdict
 
 from django.contrib import messages, admin
 from django.contrib.auth.decorators import login_required
@@ -10,7 +9,8 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.views.decorators.http import require_POST
 
 from classes.forms import EnrollStudentForm
-from classes.models import Clase, Enrollment, GradeLevel, Horario, Asistencia, JustificacionAusencia, Recuperacion
+from classes.horarios import DIAS_LECTIVOS, grilla_docente, grilla_estudiante
+from classes.models import Clase, Enrollment, GradeLevel, Asistencia, JustificacionAusencia, Recuperacion
 from users.models import Usuario
 
 @staff_member_required
@@ -178,7 +178,7 @@ def api_asignar_docente(request):
 
 # ─── MÓDULO 2: HORARIO ────────────────────────────────────────────────────────
 
-DIAS_ORDEN = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado']
+DIAS_ORDEN = list(DIAS_LECTIVOS)
 
 @login_required
 def horario_docente_view(request):
@@ -186,12 +186,7 @@ def horario_docente_view(request):
         usuario = request.user.usuario
     except Exception:
         return redirect('users:login')
-    clases = Clase.objects.filter(docente_base=usuario, active=True).prefetch_related('horarios', 'subject')
-    horario_grid = defaultdict(list)
-    for clase in clases:
-        for h in clase.horarios.all():
-            horario_grid[h.dia_semana].append({'clase': clase, 'hora_inicio': h.hora_inicio, 'hora_fin': h.hora_fin})
-    horario_dict = {dia: sorted(horario_grid[dia], key=lambda x: x['hora_inicio']) for dia in DIAS_ORDEN}
+    horario_dict = grilla_docente(usuario.id)
     return render(request, 'classes/horario.html', {'horario': horario_dict, 'dias': DIAS_ORDEN, 'vista': 'docente'})
 
 
@@ -201,12 +196,7 @@ def horario_estudiante_view(request):
         usuario = request.user.usuario
     except Exception:
         return redirect('users:login')
-    enrollments = Enrollment.objects.filter(estudiante=usuario, estado='ACTIVO').select_related('clase__subject')
-    horario_grid = defaultdict(list)
-    for enr in enrollments:
-        for h in enr.clase.horarios.all():
-            horario_grid[h.dia_semana].append({'clase': enr.clase, 'hora_inicio': h.hora_inicio, 'hora_fin': h.hora_fin})
-    horario_dict = {dia: sorted(horario_grid[dia], key=lambda x: x['hora_inicio']) for dia in DIAS_ORDEN}
+    horario_dict = grilla_estudiante(usuario.id)
     return render(request, 'classes/horario.html', {'horario': horario_dict, 'dias': DIAS_ORDEN, 'vista': 'estudiante'})
 
 
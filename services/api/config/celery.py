@@ -18,4 +18,12 @@ app.conf.beat_schedule = {
         'task': 'classes.tasks.verificar_rendimiento_semanal',
         'schedule': crontab(day_of_week='monday', hour=8),  # Lunes 8am
     },
+    'estadisticas-institucionales': {
+        'task': 'classes.tasks.refrescar_estadisticas_institucionales',
+        'schedule': crontab(minute='*/30'),  # Cada 30 minutos (incremental)
+    },
+    'purgar-registros-eliminados': {
+        'task': 'classes.tasks.purgar_registros_eliminados',
+        'schedule': crontab(day_of_week='sunday', hour=3),  # Domingo 3am
+    },
 }
\ No newline at end of file
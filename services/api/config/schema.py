@@ -4,6 +4,7 @@ from users.models import Usuario
 from students.models import Student
 from teachers.models import Teacher
 from subjects.models import Subject
+from classes import cargas
 from classes.models import GradeLevel, Clase, Enrollment
 
 class UsuarioType(DjangoObjectType):
@@ -493,6 +494,172 @@ class CreateClase(graphene.Mutation):
 
         return CreateClase(clase=clase)
 
+# ─── Mutaciones masivas ──────────────────────────────────────────────────────
+# Cada una aplica la lista completa en una transacción (classes/cargas.py).
+# Las filas inválidas se omiten y se devuelven en `errors` con su índice.
+
+class ErrorCargaType(graphene.ObjectType):
+    index = graphene.Int()
+    message = graphene.String()
+
+
+class SubjectInput(graphene.InputObjectType):
+    name = graphene.String(required=True)
+    description = graphene.String()
+    tipo_materia = graphene.String()
+
+
+class GradeLevelInput(graphene.InputObjectType):
+    level = graphene.String(required=True)
+    section = graphene.String(required=True)
+
+
+class TeacherInput(graphene.InputObjectType):
+    nombre = graphene.String(required=True)
+    email = graphene.String()
+    phone = graphene.String()
+    cedula = graphene.String()
+    specialization = graphene.String()
+
+
+class StudentInput(graphene.InputObjectType):
+    nombre = graphene.String(required=True)
+    email = graphene.String()
+    phone = graphene.String()
+    cedula = graphene.String()
+    grade_level_id = graphene.ID()
+    parent_name = graphene.String()
+    parent_phone = graphene.String()
+
+
+class ClaseInput(graphene.InputObjectType):
+    name = graphene.String(required=True)
+    subject_id = graphene.ID(required=True)
+    ciclo_lectivo = graphene.String(required=True)
+    docente_base_id = graphene.ID()
+    description = graphene.String()
+
+
+class DocenteBaseInput(graphene.InputObjectType):
+    clase_id = graphene.ID(required=True)
+    docente_id = graphene.ID(required=True)
+
+
+class EnrollmentInput(graphene.InputObjectType):
+    estudiante_id = graphene.ID(required=True)
+    clase_id = graphene.ID(required=True)
+    docente_id = graphene.ID()
+    tipo_materia = graphene.String()
+
+
+def _carga_masiva(info, funcion, items):
+    user = info.context.user
+    if not (user.is_authenticated and user.is_staff):
+        raise Exception("Bulk mutations require a staff user")
+    resultado = funcion([dict(item) for item in items])
+    return dict(
+        created=resultado.creados,
+        updated=resultado.actualizados,
+        errors=[ErrorCargaType(index=i, message=m) for i, m in resultado.errores],
+    ), [o for o in resultado.objetos if o is not None]
+
+
+class BulkCreateSubjects(graphene.Mutation):
+    class Arguments:
+        items = graphene.List(graphene.NonNull(SubjectInput), required=True)
+
+    subjects = graphene.List(SubjectType)
+    created = graphene.Int()
+    updated = graphene.Int()
+    errors = graphene.List(ErrorCargaType)
+
+    def mutate(root, info, items):
+        resumen, objetos = _carga_masiva(info, cargas.cargar_materias, items)
+        return BulkCreateSubjects(subjects=objetos, **resumen)
+
+
+class BulkCreateGradeLevels(graphene.Mutation):
+    class Arguments:
+        items = graphene.List(graphene.NonNull(GradeLevelInput), required=True)
+
+    grade_levels = graphene.List(GradeLevelType)
+    created = graphene.Int()
+    updated = graphene.Int()
+    errors = graphene.List(ErrorCargaType)
+
+    def mutate(root, info, items):
+        resumen, objetos = _carga_masiva(info, cargas.cargar_grados, items)
+        return BulkCreateGradeLevels(grade_levels=objetos, **resumen)
+
+
+class BulkUpsertTeachers(graphene.Mutation):
+    class Arguments:
+        items = graphene.List(graphene.NonNull(TeacherInput), required=True)
+
+    teachers = graphene.List(TeacherType)
+    created = graphene.Int()
+    updated = graphene.Int()
+    errors = graphene.List(ErrorCargaType)
+
+    def mutate(root, info, items):
+        resumen, objetos = _carga_masiva(info, cargas.cargar_docentes, items)
+        return BulkUpsertTeachers(teachers=objetos, **resumen)
+
+
+class BulkCreateStudents(graphene.Mutation):
+    class Arguments:
+        items = graphene.List(graphene.NonNull(StudentInput), required=True)
+
+    students = graphene.List(StudentType)
+    created = graphene.Int()
+    updated = graphene.Int()
+    errors = graphene.List(ErrorCargaType)
+
+    def mutate(root, info, items):
+        resumen, objetos = _carga_masiva(info, cargas.cargar_estudiantes, items)
+        return BulkCreateStudents(students=objetos, **resumen)
+
+
+class BulkCreateClases(graphene.Mutation):
+    class Arguments:
+        items = graphene.List(graphene.NonNull(ClaseInput), required=True)
+
+    clases = graphene.List(ClaseType)
+    created = graphene.Int()
+    updated = graphene.Int()
+    errors = graphene.List(ErrorCargaType)
+
+    def mutate(root, info, items):
+        resumen, objetos = _carga_masiva(info, cargas.cargar_clases, items)
+        return BulkCreateClases(clases=objetos, **resumen)
+
+
+class BulkAssignDocenteBase(graphene.Mutation):
+    class Arguments:
+        items = graphene.List(graphene.NonNull(DocenteBaseInput), required=True)
+
+    clases = graphene.List(ClaseType)
+    created = graphene.Int()
+    updated = graphene.Int()
+    errors = graphene.List(ErrorCargaType)
+
+    def mutate(root, info, items):
+        resumen, objetos = _carga_masiva(info, cargas.asignar_docentes_base, items)
+        return BulkAssignDocenteBase(clases=objetos, **resumen)
+
+
+class BulkEnroll(graphene.Mutation):
+    class Arguments:
+        items = graphene.List(graphene.NonNull(EnrollmentInput), required=True)
+
+    enrollments = graphene.List(EnrollmentType)
+    created = graphene.Int()
+    updated = graphene.Int()
+    errors = graphene.List(ErrorCargaType)
+
+    def mutate(root, info, items):
+        resumen, objetos = _carga_masiva(info, cargas.inscribir, items)
+        return BulkEnroll(enrollments=objetos, **resumen)
 
 from users.graphql.schema import UserMutations
 class Mutation(UserMutations,graphene.ObjectType):
@@ -506,5 +673,13 @@ class Mutation(UserMutations,graphene.ObjectType):
     create_or_update_usuario_teacher = CreateOrUpdateUsuarioTeacher.Field()
     create_or_update_usuario_student = CreateOrUpdateUsuarioStudent.Field()
 
+    bulk_create_subjects = BulkCreateSubjects.Field()
+    bulk_create_grade_levels = BulkCreateGradeLevels.Field()
+    bulk_upsert_teachers = BulkUpsertTeachers.Field()
+    bulk_create_students = BulkCreateStudents.Field()
+    bulk_create_clases = BulkCreateClases.Field()
+    bulk_assign_docente_base = BulkAssignDocenteBase.Field()
+    bulk_enroll = BulkEnroll.Field()
+
 
 schema = graphene.Schema(query=Query, mutation=Mutation)
@@ -82,6 +82,27 @@ GRAPHENE = {
 
 OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY', '')
 
+# Agente IA (ver agente/llm.py): backend 'openai' o 'fake' (pruebas / desarrollo sin clave)
+AGENTE_LLM_BACKEND = os.environ.get('AGENTE_LLM_BACKEND', 'openai')
+AGENTE_LLM_MODELO = os.environ.get('AGENTE_LLM_MODELO', 'gpt-4o')
+AGENTE_LLM_CACHE_TTL = int(os.environ.get('AGENTE_LLM_CACHE_TTL', str(60 * 60 * 24 * 14)))
+AGENTE_LLM_CONCURRENCIA = int(os.environ.get('AGENTE_LLM_CONCURRENCIA', '4'))
+AGENTE_LLM_TAMANO_GRUPO = int(os.environ.get('AGENTE_LLM_TAMANO_GRUPO', '5'))
+
+# Análisis de documentos de matrícula (ver matriculas/analisis_documentos.py)
+MATRICULAS_ANALIZADOR = os.environ.get('MATRICULAS_ANALIZADOR', 'openai')
+MATRICULAS_ANALISIS_CONCURRENCIA = int(os.environ.get('MATRICULAS_ANALISIS_CONCURRENCIA', '4'))
+MATRICULAS_MINIATURA_LADO = int(os.environ.get('MATRICULAS_MINIATURA_LADO', '1024'))
+
+# Envíos concurrentes al Google Form de informes (ver informes/forms_submitter.py)
+INFORMES_FORMS_CONCURRENCIA = int(os.environ.get('INFORMES_FORMS_CONCURRENCIA', '4'))
+
+# Particionado de CalificacionParcial por ciclo lectivo, solo PostgreSQL (ver classes/particiones.py)
+CLASSES_PARTICIONAR_CALIFICACIONES = os.environ.get('CLASSES_PARTICIONAR_CALIFICACIONES', 'False').lower() == 'true'
+
+# Archivo en frío de ciclos lectivos cerrados (ver classes/archivo_ciclos.py)
+ARCHIVO_CICLOS_DIR = os.environ.get('ARCHIVO_CICLOS_DIR', str(BASE_DIR / 'archivo_ciclos'))
+
 REST_FRAMEWORK = {
     # Solo TokenAuthentication en los defaults para evitar que SessionAuthentication
     # fuerce validación CSRF en requests de browser con cookie de sesión existente.
@@ -92,6 +113,9 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # Listados paginados por cursor (?cursor=..., ?page_size=); ver utils/api.py
+    'DEFAULT_PAGINATION_CLASS': 'utils.api.PaginacionCursor',
+    'PAGE_SIZE': 50,
 }
 
 MIDDLEWARE = [
@@ -236,6 +260,56 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'America/Guayaquil'
 
+# Caché compartida entre workers (base 1 de Redis; la 0 es del broker).
+# Por defecto solo se usa Redis si está configurado (REDIS_HOST o CACHE_URL);
+# si no, locmem: una caché por proceso, p. ej. en desarrollo sin Redis.
+# CACHE_BACKEND=redis|locmem fuerza uno u otro.
+# Espacios de nombres por dominio e invalidación: ver utils/cache.py
+REDIS_CONFIGURADO = bool(os.environ.get('REDIS_HOST') or os.environ.get('CACHE_URL'))
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'redis' if REDIS_CONFIGURADO else 'locmem')
+_REDIS_AUTH = f":{os.environ['REDIS_PASSWORD']}@" if os.environ.get('REDIS_PASSWORD') else ''
+if CACHE_BACKEND == 'locmem':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+        'sessions': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'sessions',
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('CACHE_URL', f'redis://{_REDIS_AUTH}{REDIS_HOST}:{REDIS_PORT}/1'),
+            'KEY_PREFIX': 'sga',
+            'TIMEOUT': int(os.environ.get('CACHE_TIMEOUT', '300')),
+        },
+        # Base propia: vaciar la caché de datos no cierra sesiones
+        'sessions': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('SESSION_CACHE_URL', f'redis://{_REDIS_AUTH}{REDIS_HOST}:{REDIS_PORT}/2'),
+            'KEY_PREFIX': 'sga',
+        },
+    }
+
+# Almacén de sesiones (SESSION_BACKEND):
+# - cache (por defecto con Redis): solo Redis, base propia; los pasos de los
+#   wizards no escriben en la base de datos. Una sesión se pierde si Redis la
+#   desaloja o se reinicia sin persistencia.
+# - cached_db: lee de Redis y escribe también en django_session.
+# - db (por defecto sin Redis): motor de base de datos de Django; con locmem
+#   cada proceso tendría sus propias sesiones.
+# El estado de cada wizard ocupa una sola clave (ver teachers/wizard.py).
+SESSION_BACKEND = os.environ.get('SESSION_BACKEND', 'cache' if CACHE_BACKEND == 'redis' else 'db')
+SESSION_ENGINE = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+}[SESSION_BACKEND]
+SESSION_CACHE_ALIAS = 'sessions'
+
 #Evolution Api WhatsApp
 EVOLUTION_API_URL = os.environ.get('EVOLUTION_API_URL', '')
 EVOLUTION_API_KEY = os.environ.get('EVOLUTION_API_KEY', '')
@@ -248,6 +322,16 @@ if 'test' in os.sys.argv or 'pytest' in os.sys.argv[0] or os.environ.get('TEST_D
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': '/tmp/test_db.sqlite3',  # File-based for better isolation than :memory:
     }
+    # Caché local en pruebas: sin Redis y aislada por proceso
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+        'sessions': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'sessions',
+        },
+    }
 
 # Disable password hashers for faster tests
 PASSWORD_HASHERS = [
@@ -10,6 +10,7 @@ from users.models import Usuario
 from teachers.models import Teacher
 from students.models import Student
 from classes.models import Clase, Enrollment, GradeLevel, CalificacionParcial, Asistencia, TipoAporte
+from classes.grilla_notas import grilla_notas, tipos_activos
 from subjects.models import Subject
 
 
@@ -109,6 +110,20 @@ def clase_detail(request, pk):
 
 # ─── Calificaciones ───────────────────────────────────────────────────────────
 
+def _filas_grilla(enrollments, grilla):
+    """Una fila por inscripción: notas alineadas con los tipos de aporte y promedio."""
+    filas = []
+    for enr in enrollments:
+        student = getattr(enr.estudiante, 'student_profile', None)
+        filas.append({
+            'enr': enr,
+            'student': student,
+            'celdas': list(zip(grilla.tipos, grilla.celdas(student.pk))) if student else [],
+            'promedio': grilla.promedio(student.pk) if student else None,
+        })
+    return filas
+
+
 @docente_required
 def calificaciones(request, pk):
     usuario, teacher = _require_docente(request)
@@ -121,21 +136,15 @@ def calificaciones(request, pk):
         clase=clase, estado='ACTIVO'
     ).select_related('estudiante', 'estudiante__student_profile').order_by('estudiante__nombre')
 
-    tipos_aporte = TipoAporte.objects.filter(activo=True).order_by('orden', 'nombre')
+    tipos_aporte = tipos_activos()
 
-    # Cargar notas existentes para este quimestre/parcial
+    # Notas existentes de este quimestre/parcial: toda la grilla en una consulta
     student_ids = [e.estudiante.student_profile.pk for e in enrollments
                    if hasattr(e.estudiante, 'student_profile')]
-
-    califs_existentes = {}
-    for cal in CalificacionParcial.objects.filter(
-        student__in=student_ids,
-        subject=clase.subject,
-        quimestre=quimestre,
-        parcial=parcial,
-    ).select_related('student', 'tipo_aporte'):
-        key = (cal.student.pk, cal.tipo_aporte.pk)
-        califs_existentes[key] = cal
+    grilla = grilla_notas(
+        student_ids, clase.subject_id, quimestre, parcial, tipos=tipos_aporte,
+        ciclo_lectivo=clase.ciclo_lectivo,
+    )
 
     if request.method == 'POST':
         with transaction.atomic():
@@ -158,6 +167,7 @@ def calificaciones(request, pk):
                                 quimestre=quimestre,
                                 parcial=parcial,
                                 tipo_aporte=tipo,
+                                ciclo_lectivo=clase.ciclo_lectivo,
                                 defaults={
                                     'calificacion': nota,
                                     'registrado_por': teacher,
@@ -174,7 +184,7 @@ def calificaciones(request, pk):
         clase_pk=pk,
         enrollments=enrollments,
         tipos_aporte=tipos_aporte,
-        califs=califs_existentes,
+        filas=_filas_grilla(enrollments, grilla),
         quimestre=quimestre,
         parcial=parcial,
         quimestre_choices=CalificacionParcial.QUIMESTRE_CHOICES,
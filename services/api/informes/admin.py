@@ -28,8 +28,8 @@ class RegistroEnvioWhatsappAdmin(admin.ModelAdmin):
 
 @admin.register(SubmisionFormulario)
 class SubmisionFormularioAdmin(admin.ModelAdmin):
-    list_display = ['docente', 'materia', 'curso_nombre', 'exito', 'veces_enviado', 'enviado_en']
-    list_filter = ['exito']
+    list_display = ['docente', 'materia', 'curso_nombre', 'estado', 'exito', 'intentos', 'veces_enviado', 'enviado_en']
+    list_filter = ['estado', 'exito']
     search_fields = ['docente__nombre', 'curso_nombre']
     readonly_fields = ['enviado_en', 'ultimo_envio']
 
@@ -1,9 +1,33 @@
 """
 Envío de informes docentes al Google Form institucional.
 Porta la lógica de /api/submit-forms y /api/submissions/:id/resend-form de server.js.
+
+Las peticiones reutilizan conexiones: cada hilo tiene su requests.Session con
+un pool HTTP, y enviar_submisiones procesa la cola con concurrencia acotada
+(settings.INFORMES_FORMS_CONCURRENCIA).
 """
-import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
+from django.conf import settings
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+
+_local = threading.local()
+
+
+def _sesion() -> requests.Session:
+    """Session HTTP del hilo actual (requests.Session no es thread-safe)."""
+    sesion = getattr(_local, 'sesion', None)
+    if sesion is None:
+        sesion = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4)
+        sesion.mount('https://', adapter)
+        sesion.mount('http://', adapter)
+        _local.sesion = sesion
+    return sesion
 
 
 def submit_form(submission: dict, form_url: str, form_fields: list) -> dict:
@@ -62,11 +86,10 @@ def submit_form(submission: dict, form_url: str, form_fields: list) -> dict:
     params['fvv'] = '1'
     params['draftResponse'] = '[]'
     params['pageHistory'] = '0'
-    import random
     params['fbzx'] = str(int(random.random() * 1e16))
 
     try:
-        response = requests.post(
+        response = _sesion().post(
             target_url,
             data=params,
             headers={'Content-Type': 'application/x-www-form-urlencoded'},
@@ -99,3 +122,54 @@ def build_form_text(contenidos: str, dificultades: list, acciones: str) -> str:
         'No aplica' if not dificultades else acciones,
     ])
     return '\n'.join(lines)
+
+
+def datos_submision(sub) -> dict:
+    """Datos de envío de un SubmisionFormulario guardado."""
+    return {
+        'dropdown_option': sub.curso_nombre,
+        'docente': sub.docente_nombre or (sub.docente.nombre if sub.docente else ''),
+        'materia': sub.materia_nombre or (sub.materia.name if sub.materia else ''),
+        'contenidos': sub.contenidos,
+        'acciones': sub.acciones,
+        'dificultades': sub.dificultades_json or [],
+        'form_text': build_form_text(sub.contenidos, sub.dificultades_json or [], sub.acciones),
+    }
+
+
+def enviar_submisiones(submisiones, concurrencia=None) -> list:
+    """
+    Envía una lista de SubmisionFormulario en paralelo y guarda el resultado de
+    todas con un solo bulk_update. Retorna la lista de resultados de submit_form
+    en el mismo orden.
+
+    Cada envío exitoso suma veces_enviado; el estado queda 'enviado' o
+    'fallido', así un reintento procesa solo lo que faltó.
+    """
+    from .models import SubmisionFormulario
+
+    submisiones = list(submisiones)
+    if not submisiones:
+        return []
+    concurrencia = concurrencia or getattr(settings, 'INFORMES_FORMS_CONCURRENCIA', 4)
+
+    def enviar(sub):
+        return submit_form(datos_submision(sub), sub.form_url, sub.form_fields_json)
+
+    with ThreadPoolExecutor(max_workers=concurrencia) as executor:
+        resultados = list(executor.map(enviar, submisiones))
+
+    ahora = timezone.now()
+    for sub, result in zip(submisiones, resultados):
+        exito = result.get('success', False)
+        sub.intentos += 1
+        sub.ultimo_envio = ahora
+        sub.estado = 'enviado' if exito else 'fallido'
+        sub.error = '' if exito else (result.get('error') or f"HTTP {result.get('status_code', '')}".strip())
+        if exito:
+            sub.exito = True
+            sub.veces_enviado += 1
+    SubmisionFormulario.objects.bulk_update(
+        submisiones, ['intentos', 'ultimo_envio', 'estado', 'error', 'exito', 'veces_enviado']
+    )
+    return resultados
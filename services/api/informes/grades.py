@@ -43,6 +43,7 @@ def get_grades_parcial(grade_level_id: int, subject_id: int, parcial: str,
             subject_id=subject_id,
             parcial=parcial,
             quimestre=quimestre,
+            ciclo_lectivo=ciclo,
         ).select_related('tipo_aporte')
 
         if not cals.exists():
@@ -99,7 +100,7 @@ def get_grades_quimestre(grade_level_id: int, subject_id: int, quimestre_code: s
         for parc in parciales_del_q:
             cals = CalificacionParcial.objects.filter(
                 student=st, subject_id=subject_id,
-                parcial=parc, quimestre=quimestre,
+                parcial=parc, quimestre=quimestre, ciclo_lectivo=ciclo,
             ).select_related('tipo_aporte')
             if cals.exists():
                 pesos = sum(float(c.tipo_aporte.peso) for c in cals)
@@ -117,7 +118,7 @@ def get_grades_quimestre(grade_level_id: int, subject_id: int, quimestre_code: s
         # Nota de examen quimestral (tipo_aporte llamado 'Examen' o similar)
         examen_cal = CalificacionParcial.objects.filter(
             student=st, subject_id=subject_id,
-            quimestre=quimestre,
+            quimestre=quimestre, ciclo_lectivo=ciclo,
             tipo_aporte__nombre__icontains='examen',
         ).first()
         examen_nota = float(examen_cal.calificacion) if examen_cal else None
@@ -283,3 +284,117 @@ def get_grades(grade_level_id: int, subject_id: int, periodo: str,
     elif periodo in ('A1', 'A2', 'A3', 'A4'):
         return get_grades_asistencia(grade_level_id, subject_id, periodo, ciclo)
     return []
+
+
+
+# ── Notas en lote (envío de formularios) ─────────────────────────────────────
+def _promedio_parcial_lote(aportes, student_id, subject_id, parcial, ignorar_sin_peso=False):
+    quimestre = 'Q1' if parcial in ('1P', '2P') else 'Q2'
+    cals = aportes.get((student_id, subject_id, quimestre, parcial))
+    if not cals:
+        return None
+    pesos = sum(p for _, p in cals)
+    if not pesos:
+        return None if ignorar_sin_peso else 0.0
+    return round(sum(c * p for c, p in cals) / pesos, 2)
+
+
+def _nota_quimestre_lote(aportes, examenes, student_id, subject_id, quimestre_code):
+    quimestre = 'Q1' if quimestre_code == '1Q' else 'Q2'
+    parciales_del_q = ('1P', '2P') if quimestre == 'Q1' else ('3P', '4P')
+    promedios = [
+        p for p in (
+            _promedio_parcial_lote(aportes, student_id, subject_id, parc, ignorar_sin_peso=True)
+            for parc in parciales_del_q
+        )
+        if p is not None
+    ]
+    if not promedios:
+        return None
+    prom_parciales = round(sum(promedios) / len(promedios), 2)
+    examen = examenes.get((student_id, subject_id, quimestre))
+    if examen is None:
+        return prom_parciales
+    return round(prom_parciales * 0.7 + examen * 0.3, 2)
+
+
+def _nota_periodo_lote(aportes, examenes, periodo, student_id, subject_id):
+    if periodo in ('1P', '2P', '3P', '4P'):
+        return _promedio_parcial_lote(aportes, student_id, subject_id, periodo)
+    if periodo in ('1Q', '2Q'):
+        return _nota_quimestre_lote(aportes, examenes, student_id, subject_id, periodo)
+    q1 = _nota_quimestre_lote(aportes, examenes, student_id, subject_id, '1Q')
+    q2 = _nota_quimestre_lote(aportes, examenes, student_id, subject_id, '2Q')
+    if q1 is None and q2 is None:
+        return None
+    prom_q = round((q1 + q2) / 2, 2) if q1 is not None and q2 is not None else (q1 if q1 is not None else q2)
+    return round(prom_q * 0.8, 2)
+
+
+def notas_por_curso(pares, periodo: str, ciclo: str = '2025-2026') -> dict:
+    """
+    Notas de varios (grade_level_id, subject_id) en una sola pasada: una consulta
+    de estudiantes y una de calificaciones para todos los pares, con el mismo
+    cálculo que get_grades_parcial / _quimestre / _anual.
+
+    Retorna {(grade_level_id, subject_id): [{'student_id', 'nombre', 'nota', 'estado'}]}.
+    Los períodos de asistencia (A1-A4) no tienen nota: se delegan a get_grades.
+    """
+    from classes.models import CalificacionParcial
+    from students.models import Student
+
+    pares = {(int(gl), int(subj)) for gl, subj in pares}
+    if periodo not in ('1P', '2P', '3P', '4P', '1Q', '2Q', 'Anual'):
+        return {
+            (gl, subj): [
+                {'student_id': s['student_id'], 'nombre': s['nombre'],
+                 'nota': s.get('nota'), 'estado': s['estado']}
+                for s in get_grades(gl, subj, periodo, ciclo)
+            ]
+            for gl, subj in pares
+        }
+
+    grade_levels = {gl for gl, _ in pares}
+    subjects = {subj for _, subj in pares}
+
+    estudiantes = list(
+        Student.objects
+        .filter(grade_level_id__in=grade_levels, active=True)
+        .values_list('pk', 'grade_level_id', 'usuario__nombre')
+    )
+    # (student_id, subject_id, quimestre, parcial) → [(calificacion, peso)]
+    aportes = {}
+    # (student_id, subject_id, quimestre) → nota del examen más reciente
+    examenes = {}
+    filas = (
+        CalificacionParcial.objects
+        .filter(student__grade_level_id__in=grade_levels, student__active=True,
+                subject_id__in=subjects, ciclo_lectivo=ciclo)
+        .order_by('-fecha_actualizacion')
+        .values_list('student_id', 'subject_id', 'quimestre', 'parcial',
+                     'calificacion', 'tipo_aporte__peso', 'tipo_aporte__nombre')
+    )
+    for student_id, subject_id, quimestre, parcial, calificacion, peso, nombre_aporte in filas:
+        aportes.setdefault((student_id, subject_id, quimestre, parcial), []).append(
+            (float(calificacion), float(peso))
+        )
+        if 'examen' in (nombre_aporte or '').lower():
+            examenes.setdefault((student_id, subject_id, quimestre), float(calificacion))
+
+    resultado = {}
+    for gl, subj in pares:
+        notas = []
+        for student_id, grade_level_id, nombre in estudiantes:
+            if grade_level_id != gl:
+                continue
+            nota = _nota_periodo_lote(aportes, examenes, periodo, student_id, subj)
+            if nota is None:
+                continue
+            notas.append({
+                'student_id': student_id,
+                'nombre': nombre or '—',
+                'nota': nota,
+                'estado': 'DIFICULTAD' if nota < 7 else 'APROBADO',
+            })
+        resultado[(gl, subj)] = notas
+    return resultado
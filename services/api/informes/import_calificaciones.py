@@ -74,26 +74,31 @@ def _columnas_clase(fila):
     return [(nombre, valor) for nombre, valor in fila.items() if re.match(r'(?i)^clase\b', nombre)]
 
 
-def match_estudiantes(filas_hoja, enrollments):
+def indice_estudiantes(enrollments):
+    """NameIndex (utils.name_index) de los Enrollment por nombre del estudiante."""
+    from utils.name_index import NameIndex
+    return NameIndex((enr.estudiante.nombre, enr) for enr in enrollments if enr.estudiante)
+
+
+def match_estudiantes(filas_hoja, enrollments, ambiguos=None):
     """Empareja cada fila (Apellidos+Nombres) contra los Enrollment de la Clase.
 
+    `enrollments` puede ser la lista de Enrollment o un índice ya construido con
+    indice_estudiantes(). Los nombres que coinciden con varios estudiantes quedan
+    sin pareja y se agregan a `ambiguos` si se pasa una lista.
     Devuelve lista de tuplas (fila, enrollment_o_None).
     """
-    candidatos = {_normalizar(enr.estudiante.nombre): enr for enr in enrollments if enr.estudiante}
+    from utils.name_index import NameIndex
+    indice = enrollments if isinstance(enrollments, NameIndex) else indice_estudiantes(enrollments)
 
     parejas = []
     for fila in filas_hoja:
         apellidos = (fila.get('Apellidos') or '').strip()
         nombres = (fila.get('Nombres') or '').strip()
-        clave = _normalizar(f'{apellidos} {nombres}')
-        enr = candidatos.get(clave) or candidatos.get(_normalizar(f'{nombres} {apellidos}'))
-        if not enr:
-            tokens = set(clave.split())
-            for clave_candidato, candidato in candidatos.items():
-                if tokens and tokens.issubset(set(clave_candidato.split())):
-                    enr = candidato
-                    break
-        parejas.append((fila, enr))
+        coincidencia = indice.match(f'{apellidos} {nombres}')
+        if coincidencia.ambiguous and ambiguos is not None:
+            ambiguos.append(f'{apellidos} {nombres}'.strip())
+        parejas.append((fila, coincidencia.value))
     return parejas
 
 
@@ -103,7 +108,7 @@ def importar_calificaciones(clase, parsed, dry_run=True):
     `clase`: instancia de classes.models.Clase (define subject y enrollments destino).
     `parsed`: dict devuelto por parse_workbook().
     Devuelve un resumen: {estudiantes_emparejados, estudiantes_sin_match, notas_creadas,
-    notas_actualizadas, telefonos_actualizados, sin_match: [nombres]}.
+    notas_actualizadas, telefonos_actualizados, sin_match: [nombres], ambiguos: [nombres]}.
     """
     import contextlib
     from django.db import transaction
@@ -111,13 +116,14 @@ def importar_calificaciones(clase, parsed, dry_run=True):
     from classes.models import CalificacionParcial, Enrollment, TipoAporte
     from classes.signals import alerta_bajo_rendimiento
 
-    enrollments = list(
+    enrollments = indice_estudiantes(
         Enrollment.objects.filter(clase=clase, estado='ACTIVO').select_related('estudiante')
     )
 
     resumen = {
         'estudiantes_emparejados': 0,
         'sin_match': [],
+        'ambiguos': [],
         'notas_creadas': 0,
         'notas_actualizadas': 0,
         'telefonos_actualizados': 0,
@@ -149,13 +155,13 @@ def importar_calificaciones(clase, parsed, dry_run=True):
         if dry_run:
             existe = CalificacionParcial.objects.filter(
                 student=student, subject=clase.subject, parcial=parcial,
-                quimestre=quimestre, tipo_aporte=tipo_aporte,
+                quimestre=quimestre, tipo_aporte=tipo_aporte, ciclo_lectivo=clase.ciclo_lectivo,
             ).exists()
             resumen['notas_actualizadas' if existe else 'notas_creadas'] += 1
             return
         _, created = CalificacionParcial.objects.update_or_create(
             student=student, subject=clase.subject, parcial=parcial,
-            quimestre=quimestre, tipo_aporte=tipo_aporte,
+            quimestre=quimestre, tipo_aporte=tipo_aporte, ciclo_lectivo=clase.ciclo_lectivo,
             defaults={'calificacion': nota},
         )
         resumen['notas_creadas' if created else 'notas_actualizadas'] += 1
@@ -177,7 +183,7 @@ def importar_calificaciones(clase, parsed, dry_run=True):
                 if not filas:
                     continue
                 quimestre = 'Q1' if sheet_key in ('1P', '2P') else 'Q2'
-                parejas = match_estudiantes(filas, enrollments)
+                parejas = match_estudiantes(filas, enrollments, resumen['ambiguos'])
                 for fila, enr in parejas:
                     nombre_fila = f"{fila.get('Apellidos', '')} {fila.get('Nombres', '')}".strip()
                     if not enr:
@@ -234,4 +240,5 @@ def importar_calificaciones(clase, parsed, dry_run=True):
         if not dry_run:
             post_save.connect(alerta_bajo_rendimiento, sender=CalificacionParcial)
 
+    resumen['ambiguos'] = list(dict.fromkeys(resumen['ambiguos']))
     return resumen
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:54
+
+from django.db import migrations, models
+
+
+def marcar_historial(apps, schema_editor):
+    """Los registros previos ya se intentaron enviar: no deben volver a la cola."""
+    SubmisionFormulario = apps.get_model('informes', 'SubmisionFormulario')
+    SubmisionFormulario.objects.filter(exito=True).update(estado='enviado', intentos=1)
+    SubmisionFormulario.objects.filter(exito=False).update(estado='fallido', intentos=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('informes', '0001_initial'),
+        ('subjects', '0001_initial'),
+        ('users', '0002_alter_usuario_rol_notificacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submisionformulario',
+            name='docente_nombre',
+            field=models.CharField(blank=True, max_length=200, verbose_name='Docente (texto)'),
+        ),
+        migrations.AddField(
+            model_name='submisionformulario',
+            name='estado',
+            field=models.CharField(choices=[('pendiente', 'Pendiente'), ('enviado', 'Enviado'), ('fallido', 'Fallido')], default='pendiente', max_length=20, verbose_name='Estado'),
+        ),
+        migrations.AddField(
+            model_name='submisionformulario',
+            name='intentos',
+            field=models.PositiveIntegerField(default=0, verbose_name='Intentos'),
+        ),
+        migrations.AddField(
+            model_name='submisionformulario',
+            name='lote',
+            field=models.UUIDField(blank=True, db_index=True, null=True, verbose_name='Lote de envío'),
+        ),
+        migrations.AddField(
+            model_name='submisionformulario',
+            name='materia_nombre',
+            field=models.CharField(blank=True, max_length=200, verbose_name='Materia (texto)'),
+        ),
+        migrations.AddIndex(
+            model_name='submisionformulario',
+            index=models.Index(fields=['estado'], name='informes_su_estado_ce9161_idx'),
+        ),
+        migrations.RunPython(marcar_historial, migrations.RunPython.noop),
+    ]
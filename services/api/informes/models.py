@@ -128,7 +128,13 @@ class RegistroEnvioWhatsapp(models.Model):
 
 
 class SubmisionFormulario(models.Model):
-    """Historial de envíos al Google Form de informes docentes."""
+    """
+    Historial de envíos al Google Form de informes docentes. También es la cola
+    de envío: los registros 'pendiente' o 'fallido' los procesa
+    informes.tasks.enviar_formularios.
+    """
+
+    ESTADO_CHOICES = RegistroEnvioWhatsapp.ESTADO_CHOICES
 
     docente = models.ForeignKey(
         'users.Usuario',
@@ -147,6 +153,9 @@ class SubmisionFormulario(models.Model):
         verbose_name='Materia',
     )
     curso_nombre = models.CharField(max_length=200, verbose_name='Curso')
+    # Textos tal como se envían al formulario (pueden diferir de docente/materia)
+    docente_nombre = models.CharField(max_length=200, blank=True, verbose_name='Docente (texto)')
+    materia_nombre = models.CharField(max_length=200, blank=True, verbose_name='Materia (texto)')
     contenidos = models.TextField(blank=True, verbose_name='Contenidos trabajados')
     acciones = models.TextField(blank=True, verbose_name='Acciones correctivas')
     dificultades_json = models.JSONField(default=list, verbose_name='Estudiantes con dificultades')
@@ -154,6 +163,9 @@ class SubmisionFormulario(models.Model):
     form_fields_json = models.JSONField(default=list, verbose_name='Campos del formulario')
     exito = models.BooleanField(default=False, verbose_name='Éxito')
     error = models.TextField(blank=True, verbose_name='Error')
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='pendiente', verbose_name='Estado')
+    lote = models.UUIDField(null=True, blank=True, db_index=True, verbose_name='Lote de envío')
+    intentos = models.PositiveIntegerField(default=0, verbose_name='Intentos')
     veces_enviado = models.PositiveIntegerField(default=1, verbose_name='Veces enviado')
     enviado_en = models.DateTimeField(auto_now_add=True)
     ultimo_envio = models.DateTimeField(auto_now=True)
@@ -162,6 +174,9 @@ class SubmisionFormulario(models.Model):
         verbose_name = 'Submisión de Formulario'
         verbose_name_plural = 'Submisiones de Formularios'
         ordering = ['-enviado_en']
+        indexes = [
+            models.Index(fields=['estado']),
+        ]
 
     def __str__(self):
         return f"{self.docente} — {self.materia} — {self.curso_nombre}"
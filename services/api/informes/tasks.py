@@ -0,0 +1,34 @@
+"""
+Celery tasks de informes: cola de envío de informes docentes al Google Form.
+"""
+import logging
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+MAX_INTENTOS_FORMULARIO = 5
+
+
+@shared_task
+def enviar_formularios(submision_ids=None):
+    """
+    Envía los SubmisionFormulario pendientes o fallidos indicados (o todos los
+    de la cola con menos de MAX_INTENTOS_FORMULARIO intentos). Los ya enviados
+    se omiten, así que relanzar la tarea reanuda un lote interrumpido.
+    """
+    from .forms_submitter import enviar_submisiones
+    from .models import SubmisionFormulario
+
+    cola = (
+        SubmisionFormulario.objects
+        .filter(estado__in=['pendiente', 'fallido'], intentos__lt=MAX_INTENTOS_FORMULARIO)
+        .select_related('docente', 'materia')
+        .order_by('pk')
+    )
+    if submision_ids is not None:
+        cola = cola.filter(pk__in=submision_ids)
+
+    resultados = enviar_submisiones(cola)
+    enviados = sum(1 for r in resultados if r.get('success'))
+    logger.info(f'enviar_formularios: {enviados}/{len(resultados)} formularios enviados')
+    return enviados
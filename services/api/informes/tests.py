@@ -0,0 +1,132 @@
+from unittest.mock import MagicMock, patch
+
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from informes.grades import get_grades, notas_por_curso
+from informes.models import SubmisionFormulario
+
+
+class NotasPorCursoTests(TestCase):
+    def setUp(self):
+        from classes.factories import GradeLevelFactory
+        from classes.models import CalificacionParcial, TipoAporte
+        from students.models import Student
+        from subjects.factories import SubjectFactory
+        from users.factories import UsuarioFactory
+
+        self.grade_level = GradeLevelFactory()
+        self.subject = SubjectFactory()
+        leccion = TipoAporte.objects.create(nombre='Lección', codigo='INF_LEC', peso=2)
+        examen = TipoAporte.objects.create(nombre='Examen quimestral', codigo='INF_EX', peso=1)
+        notas = [
+            {('1P', leccion): 5, ('2P', leccion): 6, ('2P', examen): 8},
+            {('1P', leccion): 9, ('3P', leccion): 8, ('4P', examen): 7},
+        ]
+        with patch('utils.notifications.NotificacionWhatsApp'):
+            for filas in notas:
+                usuario = UsuarioFactory(rol='ESTUDIANTE')
+                student, _ = Student.objects.get_or_create(usuario=usuario)
+                student.grade_level = self.grade_level
+                student.save()
+                for (parcial, tipo), nota in filas.items():
+                    CalificacionParcial.objects.create(
+                        student=student, subject=self.subject, parcial=parcial,
+                        quimestre='Q1' if parcial in ('1P', '2P') else 'Q2',
+                        tipo_aporte=tipo, calificacion=nota,
+                    )
+
+    def test_coincide_con_get_grades(self):
+        par = (self.grade_level.pk, self.subject.pk)
+        for periodo in ('1P', '2P', '1Q', '2Q', 'Anual'):
+            esperado = {
+                s['student_id']: (s['nota'], s['estado'])
+                for s in get_grades(*par, periodo)
+            }
+            with self.assertNumQueries(2):
+                lote = notas_por_curso([par], periodo)
+            obtenido = {s['student_id']: (s['nota'], s['estado']) for s in lote[par]}
+            self.assertEqual(obtenido, esperado, periodo)
+
+    def test_ignora_notas_de_otro_ciclo(self):
+        from classes.models import CalificacionParcial
+        par = (self.grade_level.pk, self.subject.pk)
+        antes = {s['student_id']: s['nota'] for s in notas_por_curso([par], '1P')[par]}
+        nota = CalificacionParcial.objects.filter(parcial='1P').first()
+        CalificacionParcial.objects.filter(pk=nota.pk).update(ciclo_lectivo='2024-2025')
+
+        lote = {s['student_id']: s['nota'] for s in notas_por_curso([par], '1P')[par]}
+        self.assertNotIn(nota.student_id, lote)
+        self.assertEqual(lote, {k: v for k, v in antes.items() if k != nota.student_id})
+        self.assertEqual(lote, {s['student_id']: s['nota'] for s in get_grades(*par, '1P')})
+        self.assertEqual(notas_por_curso([par], '1P', ciclo='2024-2025')[par][0]['student_id'], nota.student_id)
+
+
+class SubmitFormsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.respuesta = MagicMock(status_code=302)
+        self.sesion = MagicMock()
+        self.sesion.post.return_value = self.respuesta
+        patcher = patch('informes.forms_submitter._sesion', return_value=self.sesion)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _enviar(self, **extra):
+        return self.client.post('/api/informes/forms/submit/', {
+            'formUrl': 'https://docs.google.com/forms/d/abc/viewform',
+            'submissions': [
+                {'dropdown_option': f'{i}° A', 'materia': 'Piano', 'docente': 'Ana',
+                 'contenidos': 'Escalas', 'dificultades': []}
+                for i in range(3)
+            ],
+            **extra,
+        }, format='json')
+
+    def test_encola_lote_y_envia_en_segundo_plano(self):
+        from informes.tasks import enviar_formularios
+        with patch('informes.tasks.enviar_formularios.delay') as delay:
+            response = self._enviar()
+        self.assertEqual(response.status_code, 202)
+        ids = delay.call_args.args[0]
+        self.assertEqual(len(ids), 3)
+        self.assertEqual(
+            set(SubmisionFormulario.objects.filter(lote=response.data['lote']).values_list('estado', flat=True)),
+            {'pendiente'},
+        )
+
+        self.assertEqual(enviar_formularios(ids), 3)
+        self.assertEqual(self.sesion.post.call_count, 3)
+        # Relanzar la tarea no reenvía lo ya enviado
+        self.assertEqual(enviar_formularios(ids), 0)
+        self.assertEqual(self.sesion.post.call_count, 3)
+        sub = SubmisionFormulario.objects.get(pk=ids[0])
+        self.assertEqual((sub.estado, sub.intentos, sub.veces_enviado), ('enviado', 1, 1))
+
+    def test_sin_broker_envia_en_la_peticion(self):
+        from kombu.exceptions import OperationalError
+        with patch('informes.tasks.enviar_formularios.delay', side_effect=OperationalError('sin conexión')), \
+                self.assertLogs('informes.views', 'WARNING'):
+            response = self._enviar()
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.data['encolado'])
+        self.assertEqual(self.sesion.post.call_count, 3)
+
+    def test_sincrono_y_reintento_de_fallidos(self):
+        self.respuesta.status_code = 500
+        response = self._enviar(sincrono=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(any(r['success'] for r in response.data['results']))
+        self.assertEqual(SubmisionFormulario.objects.filter(estado='fallido').count(), 3)
+
+        self.respuesta.status_code = 302
+        response = self.client.post('/api/informes/forms/retry/', {
+            'lote': response.data['lote'], 'sincrono': True,
+        }, format='json')
+        self.assertEqual(response.data, {'total': 3, 'encolado': False, 'enviados': 3})
+
+        sub = SubmisionFormulario.objects.first()
+        response = self.client.post(f'/api/informes/submissions/{sub.pk}/resend/')
+        self.assertTrue(response.data['success'])
+        sub.refresh_from_db()
+        self.assertEqual((sub.intentos, sub.veces_enviado), (3, 2))
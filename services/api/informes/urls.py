@@ -26,6 +26,7 @@ urlpatterns = [
 
     # Formularios Google
     path('forms/submit/', views.submit_forms, name='informes-forms-submit'),
+    path('forms/retry/', views.forms_retry, name='informes-forms-retry'),
     path('submissions/', views.submissions_list, name='informes-submissions'),
     path('submissions/<int:pk>/resend/', views.submission_resend, name='informes-submission-resend'),
     path('submissions/<int:pk>/mark-wa-sent/', views.submission_mark_wa_sent, name='informes-submission-mark-wa-sent'),
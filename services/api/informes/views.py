@@ -1,5 +1,8 @@
+import logging
 import time
+import uuid
 from django.conf import settings
+from kombu.exceptions import OperationalError
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
@@ -14,12 +17,14 @@ from .models import (
     SesionClase, RecomendacionEstudiante,
     RegistroEnvioWhatsapp, SubmisionFormulario, ConfiguracionWhatsapp,
 )
-from .grades import get_grades
+from .grades import get_grades, notas_por_curso
 from .whatsapp import (
     create_instance, get_instance_status, send_text,
     normalize_phone, build_parent_message,
 )
-from .forms_submitter import submit_form, build_form_text
+from .forms_submitter import enviar_submisiones
+
+logger = logging.getLogger(__name__)
 
 
 # ── Grados disponibles ────────────────────────────────────────────────────────
@@ -352,16 +357,37 @@ def wa_send_grades(request):
 
 # ── Formularios Google ────────────────────────────────────────────────────────
 
+def _encolar_formularios(submisiones, sincrono=False):
+    """
+    Envía las submisiones en segundo plano (informes.tasks.enviar_formularios);
+    si se pide sincrono o no hay broker disponible, las envía en esta petición.
+    Retorna True si quedaron encoladas.
+    """
+    if not sincrono:
+        try:
+            from .tasks import enviar_formularios
+            enviar_formularios.delay([s.pk for s in submisiones])
+            return True
+        except (OperationalError, ConnectionError) as e:
+            logger.warning('Broker no disponible, envío síncrono de %d formularios: %s', len(submisiones), e)
+    enviar_submisiones(submisiones)
+    return False
+
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def submit_forms(request):
     """
-    Envía informes docentes al Google Form.
+    Encola informes docentes para enviarlos al Google Form.
     Body:
       submissions: [{ grade_level_id, subject_id, docente_id, contenidos, acciones,
                       dropdown_option, periodo, ciclo }]
       form_url: str
       form_fields: [{ entryId, mapping }]
+      sincrono: bool (opcional) — enviar dentro de la petición y esperar el resultado
+
+    Responde 202 con el lote encolado (consultar con /submissions/?lote=<id>),
+    o 200 con los resultados si el envío fue síncrono.
     """
     submissions = request.data.get('submissions', [])
     form_url = request.data.get('form_url', '').strip()
@@ -373,79 +399,103 @@ def submit_forms(request):
     if not form_url:
         return Response({'error': 'Falta form_url / formUrl'}, status=400)
 
-    results = []
+    # Dificultades desde la BD (si no se proveen): una pasada por (período, ciclo)
+    # para todos los (grade_level, subject) del lote.
+    pares_por_periodo = {}
+    for sub in submissions:
+        if sub.get('dificultades') is None and sub.get('grade_level_id') and sub.get('subject_id'):
+            clave = (sub.get('periodo', '2Q'), sub.get('ciclo', '2025-2026'))
+            pares_por_periodo.setdefault(clave, set()).add((int(sub['grade_level_id']), int(sub['subject_id'])))
+    notas = {}
+    for (periodo, ciclo), pares in pares_por_periodo.items():
+        for (gl, subj), estudiantes in notas_por_curso(pares, periodo, ciclo).items():
+            notas[(periodo, ciclo, gl, subj)] = estudiantes
+
+    docentes = Usuario.objects.in_bulk({int(s['docente_id']) for s in submissions if s.get('docente_id')})
+    materias = Subject.objects.in_bulk({int(s['subject_id']) for s in submissions if s.get('subject_id')})
+
+    lote = uuid.uuid4()
+    nuevas = []
     for sub in submissions:
-        # Calcular dificultades desde la BD si no se proveen
         dificultades = sub.get('dificultades')
         if dificultades is None and sub.get('grade_level_id') and sub.get('subject_id'):
-            students_data = get_grades(
-                int(sub['grade_level_id']), int(sub['subject_id']),
-                sub.get('periodo', '2Q'), sub.get('ciclo', '2025-2026'),
-            )
+            clave = (sub.get('periodo', '2Q'), sub.get('ciclo', '2025-2026'),
+                     int(sub['grade_level_id']), int(sub['subject_id']))
             dificultades = [
                 {'nombre': s['nombre'], 'nota': s['nota']}
-                for s in students_data
+                for s in notas.get(clave, [])
                 if s.get('estado') == 'DIFICULTAD'
             ]
+        nuevas.append(SubmisionFormulario(
+            docente=docentes.get(int(sub['docente_id'])) if sub.get('docente_id') else None,
+            materia=materias.get(int(sub['subject_id'])) if sub.get('subject_id') else None,
+            curso_nombre=sub.get('dropdown_option', ''),
+            docente_nombre=sub.get('docente', ''),
+            materia_nombre=sub.get('materia', ''),
+            contenidos=sub.get('contenidos', ''),
+            acciones=sub.get('acciones', ''),
+            dificultades_json=dificultades or [],
+            form_url=form_url,
+            form_fields_json=form_fields,
+            estado='pendiente',
+            lote=lote,
+            veces_enviado=0,
+        ))
+    nuevas = SubmisionFormulario.objects.bulk_create(nuevas)
+
+    encolado = _encolar_formularios(nuevas, sincrono=bool(request.data.get('sincrono')))
+
+    results = [{
+        'id': s.pk,
+        'label': f"{s.materia_nombre} — {s.curso_nombre}",
+        'estado': s.estado,
+        'success': s.estado == 'enviado',
+        'error': s.error,
+    } for s in nuevas]
+    return Response(
+        {'lote': str(lote), 'encolado': encolado, 'results': results},
+        status=202 if encolado else 200,
+    )
 
-        contenidos = sub.get('contenidos', '')
-        acciones = sub.get('acciones', '')
-        form_text = build_form_text(contenidos, dificultades or [], acciones)
-
-        submission_data = {
-            'dropdown_option': sub.get('dropdown_option', ''),
-            'docente': sub.get('docente', ''),
-            'materia': sub.get('materia', ''),
-            'contenidos': contenidos,
-            'acciones': acciones,
-            'dificultades': dificultades or [],
-            'form_text': form_text,
-        }
 
-        result = submit_form(submission_data, form_url, form_fields)
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def forms_retry(request):
+    """
+    Reintenta los envíos pendientes o fallidos (opcionalmente de un lote).
+    Body: lote (uuid, opcional), sincrono (bool, opcional)
+    """
+    from .tasks import MAX_INTENTOS_FORMULARIO
 
-        # Guardar historial
+    cola = SubmisionFormulario.objects.filter(
+        estado__in=['pendiente', 'fallido'], intentos__lt=MAX_INTENTOS_FORMULARIO,
+    ).select_related('docente', 'materia')
+    if request.data.get('lote'):
         try:
-            docente_usuario = (
-                Usuario.objects.get(pk=sub['docente_id'])
-                if sub.get('docente_id') else None
-            )
-            subject_obj = (
-                Subject.objects.get(pk=sub['subject_id'])
-                if sub.get('subject_id') else None
-            )
-            SubmisionFormulario.objects.create(
-                docente=docente_usuario,
-                materia=subject_obj,
-                curso_nombre=sub.get('dropdown_option', ''),
-                contenidos=contenidos,
-                acciones=acciones,
-                dificultades_json=dificultades or [],
-                form_url=form_url,
-                form_fields_json=form_fields,
-                exito=result.get('success', False),
-                error=result.get('error', ''),
-            )
-        except Exception:
-            pass
+            cola = cola.filter(lote=uuid.UUID(str(request.data['lote'])))
+        except ValueError:
+            return Response({'error': 'lote inválido'}, status=400)
+    cola = list(cola)
 
-        label = f"{sub.get('materia', '')} — {sub.get('dropdown_option', '')}"
-        results.append({
-            'label': label,
-            'success': result.get('success', False),
-            'error': result.get('error', ''),
-        })
-
-        time.sleep(0.8)
-
-    return Response({'results': results})
+    encolado = _encolar_formularios(cola, sincrono=bool(request.data.get('sincrono'))) if cola else False
+    return Response({
+        'total': len(cola),
+        'encolado': encolado,
+        'enviados': 0 if encolado else sum(1 for s in cola if s.estado == 'enviado'),
+    })
 
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def submissions_list(request):
     """Historial de envíos a formularios."""
-    qs = SubmisionFormulario.objects.select_related('docente', 'materia').order_by('-enviado_en')[:200]
+    qs = SubmisionFormulario.objects.select_related('docente', 'materia').order_by('-enviado_en')
+    if request.query_params.get('lote'):
+        try:
+            qs = qs.filter(lote=uuid.UUID(request.query_params['lote']))
+        except ValueError:
+            return Response({'error': 'lote inválido'}, status=400)
+    qs = qs[:200]
     data = []
     for s in qs:
         tutor = s.docente
@@ -469,6 +519,9 @@ def submissions_list(request):
             'lastFormSentAt': None,
             'exito': s.exito,
             'error': s.error,
+            'estado': s.estado,
+            'intentos': s.intentos,
+            'lote': str(s.lote) if s.lote else None,
         })
     return Response({'submissions': data})
 
@@ -478,29 +531,14 @@ def submissions_list(request):
 def submission_resend(request, pk):
     """Reenvía una submisión guardada al formulario."""
     try:
-        sub = SubmisionFormulario.objects.get(pk=pk)
+        sub = SubmisionFormulario.objects.select_related('docente', 'materia').get(pk=pk)
     except SubmisionFormulario.DoesNotExist:
         return Response({'success': False, 'error': 'No encontrado'}, status=404)
 
     if not sub.form_url:
         return Response({'success': False, 'error': 'Sin URL de formulario guardada'}, status=400)
 
-    submission_data = {
-        'dropdown_option': sub.curso_nombre,
-        'docente': sub.docente.nombre if sub.docente else '',
-        'materia': sub.materia.name if sub.materia else '',
-        'contenidos': sub.contenidos,
-        'acciones': sub.acciones,
-        'dificultades': sub.dificultades_json,
-        'form_text': build_form_text(sub.contenidos, sub.dificultades_json, sub.acciones),
-    }
-
-    result = submit_form(submission_data, sub.form_url, sub.form_fields_json)
-    if result.get('success'):
-        sub.veces_enviado += 1
-        sub.exito = True
-        sub.save(update_fields=['veces_enviado', 'exito'])
-
+    result = enviar_submisiones([sub])[0]
     return Response(result)
 
 
@@ -615,7 +653,7 @@ def recomendacion_upsert(request):
 def submission_mark_wa_sent(request, pk):
     """Marca una submisión como enviada por WhatsApp."""
     try:
-        sub = SubmisionFormulario.objects.get(pk=pk)
+        sub = SubmisionFormulario.objects.select_related('docente', 'materia').get(pk=pk)
     except SubmisionFormulario.DoesNotExist:
         return Response({'success': False, 'error': 'No encontrado'}, status=404)
 
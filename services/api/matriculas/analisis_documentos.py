@@ -0,0 +1,267 @@
+"""
+Matrículas — Análisis de documentos con IA
+
+  - huella_archivo(archivo): sha256 del contenido, leído por bloques
+  - miniatura(archivo, huella): JPEG normalizado (orientación EXIF, RGB, lado
+    máximo MATRICULAS_MINIATURA_LADO) que se genera una sola vez por contenido
+    en matriculas/miniaturas/<huella>.jpg
+  - analizar_documentos(documentos): analiza los documentos en paralelo con un
+    pool acotado (MATRICULAS_ANALISIS_CONCURRENCIA) y reutiliza el resultado de
+    archivos idénticos ya analizados (misma huella y tipo)
+  - Analizadores: 'openai' (producción) y 'fake' (pruebas / desarrollo sin
+    clave), seleccionados con settings.MATRICULAS_ANALIZADOR
+
+Los hilos solo leen archivos y llaman al analizador; todas las escrituras en
+la base de datos las hace quien llama, en bloque.
+"""
+import base64
+import hashlib
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+
+logger = logging.getLogger(__name__)
+
+CARPETA_MINIATURAS = 'matriculas/miniaturas'
+
+SIN_ANALIZADOR = {'valido': True, 'observacion': 'Revisión IA no configurada (sin API key).', 'confianza': 0.0}
+
+PROMPTS = {
+    'CEDULA': (
+        "Eres un asistente de revisión documental para un conservatorio de música en Ecuador. "
+        "Analiza esta imagen y determina si es una copia válida de cédula de identidad o acta de nacimiento. "
+        "Verifica: 1) Que el documento sea legible, 2) Que los datos (nombre, número) sean visibles, "
+        "3) Que no esté vencido o cortado. "
+        "Responde en formato: VÁLIDO o NOVEDAD, seguido de una explicación breve en español."
+    ),
+    'CERT_EDUCACION': (
+        "Eres un asistente de revisión documental para un conservatorio de música en Ecuador. "
+        "Analiza esta imagen y determina si es un certificado válido de aprobación de educación regular "
+        "(escuela o colegio). Verifica: 1) Legibilidad, 2) Nombre del estudiante visible, "
+        "3) Año lectivo y institución mencionados, 4) Firma o sello institucional. "
+        "Responde en formato: VÁLIDO o NOVEDAD, seguido de una explicación breve en español."
+    ),
+    'CERT_CONSERVATORIO': (
+        "Eres un asistente de revisión documental para un conservatorio de música en Ecuador. "
+        "Analiza esta imagen y determina si es un certificado válido de un conservatorio de música. "
+        "Verifica: 1) Legibilidad, 2) Nombre del estudiante, 3) Institución y año, 4) Firma o sello. "
+        "Responde en formato: VÁLIDO o NOVEDAD, seguido de una explicación breve en español."
+    ),
+    'FOTO_CARNET': (
+        "Eres un asistente de revisión documental para un conservatorio de música en Ecuador. "
+        "Analiza esta imagen y determina si es una foto carnet válida. "
+        "Verifica: 1) Fondo claro (preferentemente blanco), 2) Rostro visible y centrado, "
+        "3) Buena iluminación, 4) Foto reciente (no demasiado informal). "
+        "Responde en formato: VÁLIDO o NOVEDAD, seguido de una explicación breve en español."
+    ),
+}
+PROMPT_GENERICO = "Analiza si este documento es válido. Responde VÁLIDO o NOVEDAD con una explicación."
+
+
+def es_imagen(nombre):
+    return nombre.lower().endswith(('.jpg', '.jpeg', '.png', '.webp'))
+
+
+# ─── ANALIZADORES ───────────────────────────────────────────────────────────
+
+class OpenAIAnalizador:
+    def __init__(self):
+        api_key = getattr(settings, 'OPENAI_API_KEY', '')
+        if not api_key:
+            raise ValueError('OPENAI_API_KEY no configurada')
+        from openai import OpenAI
+        self.client = OpenAI(api_key=api_key)
+
+    def analizar(self, tipo_doc, imagen_jpeg):
+        """imagen_jpeg: bytes de la miniatura, o None si el archivo no es una imagen (PDF)."""
+        prompt = PROMPTS.get(tipo_doc, PROMPT_GENERICO)
+        if imagen_jpeg is not None:
+            b64 = base64.b64encode(imagen_jpeg).decode('utf-8')
+            content = [
+                {"type": "text", "text": prompt},
+                {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{b64}", "detail": "low"}},
+            ]
+        else:
+            # PDF: analizamos solo con texto descriptivo
+            content = [
+                {"type": "text", "text": (
+                    prompt + "\n\nNota: El archivo es un PDF, no se puede previsualizar directamente. "
+                    "Marca como VÁLIDO asumiendo que el usuario lo revisará manualmente, "
+                    "pero indica que no se pudo verificar el contenido visualmente."
+                )}
+            ]
+
+        response = self.client.chat.completions.create(
+            model="gpt-4o",
+            messages=[{"role": "user", "content": content}],
+            max_tokens=200,
+        )
+        text = response.choices[0].message.content.strip()
+        valido = text.upper().startswith('VÁLIDO') or text.upper().startswith('VALIDO')
+        return {'valido': valido, 'observacion': text, 'confianza': 0.9 if valido else 0.7}
+
+
+class FakeAnalizador:
+    """Resultado determinista sin red; cuenta las llamadas realizadas."""
+
+    llamadas = 0
+
+    def analizar(self, tipo_doc, imagen_jpeg):
+        type(self).llamadas += 1
+        detalle = f'imagen {len(imagen_jpeg)} bytes' if imagen_jpeg is not None else 'PDF'
+        return {'valido': True, 'observacion': f'VÁLIDO [simulado] {tipo_doc} ({detalle})', 'confianza': 1.0}
+
+
+ANALIZADORES = {
+    'openai': OpenAIAnalizador,
+    'fake': FakeAnalizador,
+}
+
+
+def get_analizador():
+    nombre = getattr(settings, 'MATRICULAS_ANALIZADOR', 'openai')
+    return ANALIZADORES[nombre]()
+
+
+# ─── ARCHIVOS ───────────────────────────────────────────────────────────────
+
+def huella_archivo(archivo):
+    """sha256 del contenido de un FieldFile, sin cargarlo entero en memoria."""
+    sha = hashlib.sha256()
+    with archivo.open('rb') as f:
+        for bloque in f.chunks():
+            sha.update(bloque)
+    return sha.hexdigest()
+
+
+def miniatura(archivo, huella):
+    """
+    Bytes JPEG de la imagen reducida. Se guarda en el storage del archivo bajo
+    la huella del contenido, así que re-subidas idénticas no se reprocesan.
+    """
+    from PIL import Image, ImageOps
+
+    storage = archivo.storage
+    ruta = f'{CARPETA_MINIATURAS}/{huella}.jpg'
+    if storage.exists(ruta):
+        with storage.open(ruta, 'rb') as f:
+            return f.read()
+
+    lado = getattr(settings, 'MATRICULAS_MINIATURA_LADO', 1024)
+    with archivo.open('rb') as f:
+        imagen = Image.open(f)
+        imagen.draft('RGB', (lado, lado))  # decodificación reducida de JPEG
+        imagen = ImageOps.exif_transpose(imagen).convert('RGB')
+        imagen.thumbnail((lado, lado))
+
+    salida = io.BytesIO()
+    imagen.save(salida, format='JPEG', quality=80, optimize=True)
+    contenido = salida.getvalue()
+    storage.save(ruta, ContentFile(contenido))
+    return contenido
+
+
+# ─── PIPELINE ───────────────────────────────────────────────────────────────
+
+def _error(observacion):
+    return {'valido': False, 'observacion': observacion, 'confianza': 0.0, 'error': True}
+
+
+def _huella(doc):
+    if not doc.archivo or not doc.archivo.storage.exists(doc.archivo.name):
+        return None
+    return huella_archivo(doc.archivo)
+
+
+def _analizar(analizador, doc, huella):
+    try:
+        imagen = miniatura(doc.archivo, huella) if es_imagen(doc.archivo.name) else None
+    except Exception as exc:
+        logger.warning('No se pudo leer la imagen del documento %s: %s', doc.pk, exc)
+        return _error('No se pudo abrir la imagen; el archivo parece dañado.')
+    try:
+        return analizador.analizar(doc.tipo, imagen)
+    except Exception as exc:
+        logger.exception("Error en análisis IA de documento: %s", exc)
+        return {'valido': True, 'observacion': f'No se pudo analizar automáticamente: {exc}', 'confianza': 0.0}
+
+
+def analizar_documentos(documentos, analizador=None, concurrencia=None):
+    """
+    Analiza una lista de DocumentoMatricula y actualiza en memoria hash_contenido,
+    estado_ia, observacion_ia y confianza_ia (el guardado queda a cargo de quien
+    llama, p. ej. con bulk_update).
+
+    1. Calcula en paralelo la huella de cada archivo.
+    2. Reutiliza el resultado de documentos ya analizados con la misma huella y
+       tipo (solo análisis reales, con confianza > 0).
+    3. Analiza en paralelo, una vez por contenido, los que quedan.
+    """
+    from .models import DocumentoMatricula
+
+    concurrencia = concurrencia or getattr(settings, 'MATRICULAS_ANALISIS_CONCURRENCIA', 4)
+
+    with ThreadPoolExecutor(max_workers=concurrencia) as executor:
+        huellas = list(executor.map(_huella, documentos))
+
+        resultados = {}
+        for doc, huella in zip(documentos, huellas):
+            if huella is None:
+                resultados[doc.pk] = _error('Archivo no encontrado en el servidor.')
+
+        pendientes = {}
+        for doc, huella in zip(documentos, huellas):
+            if huella is not None:
+                doc.hash_contenido = huella
+                pendientes.setdefault((huella, doc.tipo), []).append(doc)
+
+        previos = (
+            DocumentoMatricula.objects
+            .filter(
+                hash_contenido__in={h for h, _ in pendientes},
+                estado_ia__in=[DocumentoMatricula.EstadoIA.VALIDO, DocumentoMatricula.EstadoIA.NOVEDAD],
+                # Sin analizador o con error el resultado queda con confianza 0: no se reutiliza
+                confianza_ia__gt=0,
+            )
+            .exclude(pk__in=[d.pk for d in documentos])
+            .order_by('uploaded_at')
+            .values('hash_contenido', 'tipo', 'estado_ia', 'observacion_ia', 'confianza_ia')
+        )
+        reutilizados = {}
+        for previo in previos:
+            reutilizados[(previo['hash_contenido'], previo['tipo'])] = {
+                'valido': previo['estado_ia'] == DocumentoMatricula.EstadoIA.VALIDO,
+                'observacion': previo['observacion_ia'],
+                'confianza': previo['confianza_ia'],
+            }
+
+        por_analizar = [(clave, docs[0]) for clave, docs in pendientes.items() if clave not in reutilizados]
+        if por_analizar:
+            try:
+                analizador = analizador or get_analizador()
+            except ValueError:
+                analizador = None
+            if analizador is None:
+                nuevos = [SIN_ANALIZADOR] * len(por_analizar)
+            else:
+                nuevos = executor.map(lambda item: _analizar(analizador, item[1], item[0][0]), por_analizar)
+            reutilizados.update(zip((clave for clave, _ in por_analizar), nuevos))
+
+    for clave, docs in pendientes.items():
+        for doc in docs:
+            resultados[doc.pk] = reutilizados[clave]
+
+    for doc in documentos:
+        resultado = resultados[doc.pk]
+        if resultado.get('error'):
+            doc.estado_ia = DocumentoMatricula.EstadoIA.ERROR
+        elif resultado['valido']:
+            doc.estado_ia = DocumentoMatricula.EstadoIA.VALIDO
+        else:
+            doc.estado_ia = DocumentoMatricula.EstadoIA.NOVEDAD
+        doc.observacion_ia = resultado['observacion']
+        doc.confianza_ia = resultado['confianza']
+    return documentos
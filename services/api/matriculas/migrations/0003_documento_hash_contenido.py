@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matriculas', '0002_solicitud_docente'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documentomatricula',
+            name='hash_contenido',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+    ]
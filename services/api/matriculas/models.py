@@ -151,6 +151,8 @@ class DocumentoMatricula(models.Model):
     estado_ia = models.CharField(max_length=12, choices=EstadoIA.choices, default=EstadoIA.PENDIENTE)
     observacion_ia = models.TextField(blank=True, default='')
     confianza_ia = models.FloatField(null=True, blank=True)
+    # sha256 del archivo: re-subidas idénticas reutilizan el análisis previo
+    hash_contenido = models.CharField(max_length=64, blank=True, default='', db_index=True)
 
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
@@ -0,0 +1,103 @@
+import io
+import shutil
+import tempfile
+from datetime import date
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+
+from matriculas import analisis_documentos
+from matriculas.models import DocumentoMatricula, SolicitudMatricula
+from matriculas.tasks import analizar_documentos_solicitud
+
+MEDIA_PRUEBAS = tempfile.mkdtemp()
+
+
+def _imagen(color='white', tamano=(3000, 2000)):
+    from PIL import Image
+    salida = io.BytesIO()
+    Image.new('RGB', tamano, color).save(salida, format='JPEG')
+    return salida.getvalue()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_PRUEBAS, MATRICULAS_ANALIZADOR='fake', MATRICULAS_MINIATURA_LADO=512)
+class AnalisisDocumentosTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_PRUEBAS, ignore_errors=True)
+
+    def setUp(self):
+        analisis_documentos.FakeAnalizador.llamadas = 0
+
+    def _solicitud(self, *documentos):
+        solicitud = SolicitudMatricula.objects.create(
+            anio_solicitado=1, nombre_completo='Ana Pérez', cedula='0102030405',
+            fecha_nacimiento=date(2015, 3, 1), email_representante='rep@example.com',
+            phone_representante='0999999999', ciclo_lectivo='2025-2026',
+        )
+        for tipo, nombre, contenido in documentos:
+            DocumentoMatricula.objects.create(
+                solicitud=solicitud, tipo=tipo, nombre_original=nombre,
+                archivo=SimpleUploadedFile(nombre, contenido),
+            )
+        return solicitud
+
+    def test_analiza_miniatura_y_reutiliza_resubidas(self):
+        foto = _imagen()
+        solicitud = self._solicitud(
+            ('FOTO_CARNET', 'foto.jpg', foto),
+            ('CEDULA', 'cedula.pdf', b'%PDF-1.4 prueba'),
+        )
+        analizar_documentos_solicitud(solicitud.pk)
+
+        docs = {d.tipo: d for d in solicitud.documentos.all()}
+        self.assertEqual({d.estado_ia for d in docs.values()}, {DocumentoMatricula.EstadoIA.VALIDO})
+        self.assertEqual(len(docs['FOTO_CARNET'].hash_contenido), 64)
+        self.assertIn('PDF', docs['CEDULA'].observacion_ia)
+        self.assertEqual(analisis_documentos.FakeAnalizador.llamadas, 2)
+
+        # La miniatura se reduce al lado máximo configurado
+        from PIL import Image
+        miniatura = analisis_documentos.miniatura(docs['FOTO_CARNET'].archivo, docs['FOTO_CARNET'].hash_contenido)
+        self.assertEqual(max(Image.open(io.BytesIO(miniatura)).size), 512)
+
+        solicitud.refresh_from_db()
+        self.assertEqual(solicitud.estado, SolicitudMatricula.Estado.EN_REVISION)
+
+        # Otra solicitud con la misma foto no vuelve a llamar al analizador
+        otra = self._solicitud(('FOTO_CARNET', 'foto_de_nuevo.jpg', foto))
+        analizar_documentos_solicitud(otra.pk)
+        self.assertEqual(analisis_documentos.FakeAnalizador.llamadas, 2)
+        self.assertEqual(otra.documentos.get().estado_ia, DocumentoMatricula.EstadoIA.VALIDO)
+
+    def test_no_reutiliza_resultados_sin_analizador(self):
+        from unittest.mock import patch
+        foto = _imagen('blue', (400, 600))
+        primera = self._solicitud(('FOTO_CARNET', 'foto.jpg', foto))
+        with patch.object(analisis_documentos, 'get_analizador', side_effect=ValueError('sin API key')):
+            analizar_documentos_solicitud(primera.pk)
+        self.assertEqual(primera.documentos.get().confianza_ia, 0.0)
+
+        otra = self._solicitud(('FOTO_CARNET', 'foto_otra_vez.jpg', foto))
+        analizar_documentos_solicitud(otra.pk)
+        self.assertEqual(analisis_documentos.FakeAnalizador.llamadas, 1)
+        self.assertEqual(otra.documentos.get().confianza_ia, 1.0)
+
+    def test_archivo_faltante_o_danado_marca_error(self):
+        solicitud = self._solicitud(
+            ('CEDULA', 'cedula.jpg', b'no es una imagen'),
+            ('FOTO_CARNET', 'foto.jpg', _imagen('gray', (400, 600))),
+        )
+        faltante = solicitud.documentos.get(tipo='FOTO_CARNET')
+        faltante.archivo.delete(save=False)
+        faltante.archivo.name = 'matriculas/documentos/no-existe.jpg'
+        faltante.save()
+
+        analizar_documentos_solicitud(solicitud.pk)
+
+        estados = dict(solicitud.documentos.values_list('tipo', 'estado_ia'))
+        self.assertEqual(estados, {'CEDULA': 'ERROR', 'FOTO_CARNET': 'ERROR'})
+        solicitud.refresh_from_db()
+        self.assertTrue(solicitud.tiene_novedades_ia)
+        self.assertEqual(solicitud.estado, SolicitudMatricula.Estado.NOVEDAD)
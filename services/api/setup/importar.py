@@ -18,6 +18,7 @@ from users.models import Usuario
 from teachers.models import Teacher
 from students.models import Student
 from informes.models import ConfiguracionWhatsapp
+from utils import limpieza
 
 
 # ── Columnas esperadas por entidad ───────────────────────────────────────────
@@ -84,6 +85,41 @@ def _col(row, *keys):
     return ''
 
 
+def _columna(df, *keys):
+    """Como _col, pero para la columna completa: texto limpio ('' si falta)."""
+    columnas = {}
+    for col in df.columns:
+        columnas.setdefault(_norm(col), col)
+    for k in keys:
+        if _norm(k) in columnas:
+            return limpieza.texto(df[columnas[_norm(k)]])
+    return pd.Series('', index=df.index, dtype=object)
+
+
+def _personas(df, errores, **columnas):
+    """
+    Columnas de personas limpias de una vez: nombre, email y cédula (más las
+    que se pidan). Los emails mal formados se descartan y las cédulas que no
+    superan el dígito verificador se importan igual; ambos casos se anotan en
+    `errores`.
+    """
+    datos = pd.DataFrame({
+        'nombre': _columna(df, *columnas.pop('nombre')),
+        'email': limpieza.email(_columna(df, 'email', 'correo', 'mail')),
+        'cedula': limpieza.cedula(_columna(df, 'cedula', 'ci', 'identificacion', *columnas.pop('cedula', ()))),
+        **{campo: _columna(df, *claves) for campo, claves in columnas.items()},
+    })
+    con_nombre = datos['nombre'] != ''
+    malos = limpieza.invalidos(datos['email'], limpieza.email_valido(datos['email'])) & con_nombre
+    for i, fila in datos[malos].iterrows():
+        errores.append(f'Fila {i+2} ({fila.nombre}): email "{fila.email}" no válido, se importa sin email')
+    datos.loc[malos, 'email'] = ''
+    malas = limpieza.invalidos(datos['cedula'], limpieza.cedula_valida(datos['cedula'])) & con_nombre
+    for i, fila in datos[malas].iterrows():
+        errores.append(f'Fila {i+2} ({fila.nombre}): cédula "{fila.cedula}" no supera el dígito verificador')
+    return datos[con_nombre]
+
+
 def sheet_url_to_csv_url(url):
     """Convierte URL de Google Sheets a URL de exportación CSV."""
     m = re.search(r'/d/([a-zA-Z0-9_-]+)', url)
@@ -204,15 +240,21 @@ def importar_niveles(df):
 
 def importar_docentes(df):
     creados, actualizados, errores = 0, 0, []
-    for i, row in df.iterrows():
-        nombre = _col(row, 'nombre', 'name', 'docente', 'apellido_nombre', 'apellidos_nombres')
-        if not nombre:
-            continue
-        email = _col(row, 'email', 'correo', 'mail') or None
-        cedula = _col(row, 'cedula', 'ci', 'identificacion', 'id') or None
-        phone = _col(row, 'telefono', 'phone', 'celular', 'movil') or ''
-        especialidad = _col(row, 'especialidad', 'specialization', 'instrumento', 'materia_docente') or ''
-        password = _col(row, 'password', 'contrasena', 'clave') or 'Docente2025!'
+    datos = _personas(
+        df, errores,
+        nombre=('nombre', 'name', 'docente', 'apellido_nombre', 'apellidos_nombres'),
+        cedula=('id',),
+        phone=('telefono', 'phone', 'celular', 'movil'),
+        especialidad=('especialidad', 'specialization', 'instrumento', 'materia_docente'),
+        password=('password', 'contrasena', 'clave'),
+    )
+    for i, fila in datos.iterrows():
+        nombre = fila.nombre
+        email = fila.email or None
+        cedula = fila.cedula or None
+        phone = fila.phone
+        especialidad = fila.especialidad
+        password = fila.password or 'Docente2025!'
 
         try:
             with transaction.atomic():
@@ -275,17 +317,24 @@ def importar_estudiantes(df):
     creados, actualizados, errores = 0, 0, []
     LEVEL_MAP = {str(v): str(v) for v in range(1, 12)}
 
-    for i, row in df.iterrows():
-        nombre = _col(row, 'nombre', 'apellido_nombre', 'apellidos_nombres', 'alumno', 'estudiante')
-        if not nombre:
-            continue
-        email = _col(row, 'email', 'correo') or None
-        cedula = _col(row, 'cedula', 'ci', 'identificacion') or None
-        phone = _col(row, 'telefono', 'celular') or ''
-        parent_name = _col(row, 'representante', 'nombre_representante', 'padre', 'madre', 'rep') or ''
-        parent_phone = _col(row, 'telefono_representante', 'tel_rep', 'celular_rep', 'whatsapp') or ''
-        nivel_raw = _col(row, 'nivel', 'grado', 'curso', 'level') or ''
-        paralelo = _col(row, 'paralelo', 'seccion', 'section') or ''
+    datos = _personas(
+        df, errores,
+        nombre=('nombre', 'apellido_nombre', 'apellidos_nombres', 'alumno', 'estudiante'),
+        phone=('telefono', 'celular'),
+        parent_name=('representante', 'nombre_representante', 'padre', 'madre', 'rep'),
+        parent_phone=('telefono_representante', 'tel_rep', 'celular_rep', 'whatsapp'),
+        nivel=('nivel', 'grado', 'curso', 'level'),
+        paralelo=('paralelo', 'seccion', 'section'),
+    )
+    for i, fila in datos.iterrows():
+        nombre = fila.nombre
+        email = fila.email or None
+        cedula = fila.cedula or None
+        phone = fila.phone
+        parent_name = fila.parent_name
+        parent_phone = fila.parent_phone
+        nivel_raw = fila.nivel
+        paralelo = fila.paralelo
 
         # Buscar GradeLevel
         grade_level = None
@@ -321,11 +370,14 @@ def importar_estudiantes(df):
                         nombre=nombre, rol='ESTUDIANTE',
                         email=email, phone=phone, cedula=cedula,
                     )
-                    Student.objects.create(
+                    # La señal de Usuario ya crea el perfil de estudiante
+                    Student.objects.update_or_create(
                         usuario=usuario,
-                        grade_level=grade_level,
-                        parent_name=parent_name,
-                        parent_phone=parent_phone,
+                        defaults={
+                            'grade_level': grade_level,
+                            'parent_name': parent_name,
+                            'parent_phone': parent_phone,
+                        },
                     )
                     # auth.User
                     base = (cedula or (email.split('@')[0] if email else nombre.lower().replace(' ', '_')))[:28]
@@ -399,9 +451,9 @@ def importar_clases(df):
 def importar_matriculas(df):
     creados, actualizados, errores = 0, 0, []
 
-    for i, row in df.iterrows():
-        cedula = _col(row, 'cedula_estudiante', 'cedula', 'ci_estudiante', 'ci')
-        clase_str = _col(row, 'nombre_clase', 'clase', 'class', 'asignatura')
+    cedulas = limpieza.cedula(_columna(df, 'cedula_estudiante', 'cedula', 'ci_estudiante', 'ci'))
+    clases = _columna(df, 'nombre_clase', 'clase', 'class', 'asignatura')
+    for i, cedula, clase_str in zip(df.index, cedulas, clases):
 
         if not cedula or not clase_str:
             errores.append(f'Fila {i+2}: cedula y nombre_clase son obligatorios')
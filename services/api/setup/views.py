@@ -16,6 +16,7 @@ from users.models import Usuario
 from teachers.models import Teacher
 from students.models import Student
 from informes.models import ConfiguracionWhatsapp
+from utils.cache import obtener as obtener_cache
 
 # Todos los niveles del conservatorio en orden
 NIVELES_CHOICES = GradeLevel.LEVEL_CHOICES  # lista de (value, label)
@@ -442,6 +443,14 @@ def _pensum_progress():
     return set(niveles_con_malla)
 
 
+def _pensum_grid():
+    """({nivel_value: [subject_pk]}, niveles configurados); cacheado en el dominio 'malla'."""
+    grid = {}
+    for nivel, subject_id in MallaCurricular.objects.values_list('nivel__level', 'subject_id'):
+        grid.setdefault(nivel, set()).add(subject_id)
+    return {k: list(v) for k, v in grid.items()}, _pensum_progress()
+
+
 def _get_or_create_grade(level_value):
     """Obtiene o crea el GradeLevel base (sección 'Único') para un nivel."""
     gl, _ = GradeLevel.objects.get_or_create(
@@ -458,13 +467,7 @@ def pensum_home(request):
     niveles = [(v, l) for v, l in NIVELES_CHOICES]
     subjects = Subject.objects.all().order_by('tipo_materia', 'name')
 
-    # Construir grid: nivel_value → set(subject_pk)
-    grid = {}
-    for entry in MallaCurricular.objects.select_related('nivel', 'subject').all():
-        key = entry.nivel.level
-        grid.setdefault(key, set()).add(entry.subject_id)
-
-    niveles_completos = _pensum_progress()
+    grid, niveles_completos = obtener_cache('malla', ('pensum_grid',), _pensum_grid)
     total_niveles = len(NIVELES_CHOICES)
     configurados = len(niveles_completos)
 
@@ -472,7 +475,7 @@ def pensum_home(request):
         'section': 'home',
         'niveles': niveles,
         'subjects': subjects,
-        'grid': {k: list(v) for k, v in grid.items()},
+        'grid': grid,
         'niveles_completos': niveles_completos,
         'total_niveles': total_niveles,
         'configurados': configurados,
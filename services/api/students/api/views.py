@@ -1,7 +1,8 @@
 from rest_framework import viewsets
 from students.models import Student
 from students.serializers import StudentSerializer
+from utils.api import ConsultaOptimizadaMixin
 
-class StudentViewSet(viewsets.ReadOnlyModelViewSet):
+class StudentViewSet(ConsultaOptimizadaMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Student.objects.all().select_related('usuario', 'grade_level', 'teacher__usuario') # Prefetch related data
     serializer_class = StudentSerializer
\ No newline at end of file
@@ -6,9 +6,10 @@ from teachers.models import Teacher
 from teachers.serializers import TeacherSerializer
 from classes.models import CalificacionParcial, Asistencia, Enrollment
 from classes.serializers import CalificacionParcialSerializer
+from utils.api import ConsultaOptimizadaMixin, marcar_cabeceras, respuesta_condicional
 
 
-class TeacherViewSet(viewsets.ModelViewSet):
+class TeacherViewSet(ConsultaOptimizadaMixin, viewsets.ModelViewSet):
     queryset = Teacher.objects.all().select_related('usuario')
     serializer_class = TeacherSerializer
 
@@ -23,53 +24,31 @@ class TeacherViewSet(viewsets.ModelViewSet):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def libreta_estudiante_api(request, student_id):
-    """Return a student's complete grade report grouped by subject and parcial."""
-    from students.models import Student
-    try:
-        student = Student.objects.select_related('usuario').get(pk=student_id)
-    except Student.DoesNotExist:
-        return Response({'detail': 'Estudiante no encontrado.'}, status=404)
-
-    calificaciones = CalificacionParcial.objects.filter(
-        student=student
-    ).select_related('subject', 'tipo_aporte').order_by('subject__name', 'quimestre', 'parcial')
-
-    asistencias = Asistencia.objects.filter(
-        inscripcion__estudiante=student.usuario
-    ).select_related('inscripcion__clase__subject').order_by('-fecha')
-
-    # Group grades by subject → quimestre → parcial
-    materias: dict = {}
-    for c in calificaciones:
-        sname = c.subject.name if c.subject else 'Sin materia'
-        materias.setdefault(sname, []).append({
-            'id': c.id,
-            'parcial': c.parcial,
-            'quimestre': c.quimestre,
-            'tipo_aporte': c.tipo_aporte.nombre if c.tipo_aporte else '',
-            'calificacion': float(c.calificacion),
-        })
-
-    promedio_general = None
-    all_vals = [float(c.calificacion) for c in calificaciones]
-    if all_vals:
-        promedio_general = round(sum(all_vals) / len(all_vals), 2)
-
-    total_asist = asistencias.count()
-    presentes = asistencias.filter(estado='Presente').count()
-    ausentes = asistencias.filter(estado='Ausente').count()
-    justificados = asistencias.filter(estado='Justificado').count()
-
-    return Response({
-        'student_id': student.id,
-        'nombre': student.usuario.nombre if student.usuario else '',
-        'promedio_general': promedio_general,
-        'materias': materias,
-        'asistencia': {
-            'total': total_asist,
-            'presentes': presentes,
-            'ausentes': ausentes,
-            'justificados': justificados,
-            'porcentaje': round(presentes / total_asist * 100, 1) if total_asist else 0,
-        },
-    })
\ No newline at end of file
+    """
+    Return a student's complete grade report grouped by subject and parcial.
+
+    Cached per student (classes.estadisticas.libreta_estudiante) and invalidated
+    when the student's grades or attendance change; supports ETag / 304.
+    With ?ciclo=AAAA-AAAA returns the read-only report card of a closed
+    (archived) academic year (classes.archivo_ciclos.libreta_historica).
+    """
+    ciclo = request.query_params.get('ciclo')
+    if ciclo:
+        from classes.archivo_ciclos import libreta_historica
+        try:
+            libreta = libreta_historica(student_id, ciclo)
+        except ValueError:
+            libreta = None
+        if libreta is None:
+            return Response({'detail': 'No hay libreta archivada para ese ciclo.'}, status=404)
+    else:
+        from classes.estadisticas import libreta_estudiante
+        libreta = libreta_estudiante(student_id)
+        if libreta is None:
+            return Response({'detail': 'Estudiante no encontrado.'}, status=404)
+
+    datos, etag, ultimo = libreta
+    no_modificado = respuesta_condicional(request, etag, ultimo)
+    if no_modificado is not None:
+        return no_modificado
+    return marcar_cabeceras(Response(datos), etag, ultimo)
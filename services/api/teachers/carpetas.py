@@ -0,0 +1,94 @@
+"""
+Carpetas e informes de clases del docente, agregados en la base de datos.
+
+Las vistas cargaban todas las Activity de los estudiantes del docente y las
+agrupaban en Python; con años de clases individuales (instrumento) la página
+crecía sin límite. Ahora:
+
+- carpetas por materia y por estudiante: conteos con values().annotate()
+- clases de una carpeta: solo al abrirla, en páginas por cursor
+- informes: páginas por cursor (keyset) sobre (date, id) descendente
+
+El cursor es 'AAAA-MM-DD.id' de la última fila mostrada; la página siguiente
+filtra (date, id) < cursor, así que no usa OFFSET y es estable aunque se
+registren clases nuevas mientras se navega.
+"""
+from datetime import date
+
+from django.db.models import Count, F, Max, Q
+
+from classes.models import Activity
+
+PAGINA = 30
+
+SIN_MATERIA = 0
+
+
+def actividades_docente(teacher, solo_activos=True):
+    """
+    Clases registradas de los estudiantes del docente. Las carpetas muestran
+    solo estudiantes activos; los informes (solo_activos=False) incluyen
+    también a los retirados.
+    """
+    actividades = Activity.objects.filter(student__teacher=teacher)
+    if solo_activos:
+        actividades = actividades.filter(student__active=True)
+    return actividades
+
+
+def filtrar_materia(actividades, materia_id):
+    if materia_id == SIN_MATERIA:
+        return actividades.filter(subject__isnull=True)
+    return actividades.filter(subject_id=materia_id)
+
+
+def carpetas_por_materia(actividades):
+    """[{subject_id, subject__name, estudiantes, clases}] ordenado por materia."""
+    return list(
+        actividades.order_by()
+        .values('subject_id', 'subject__name')
+        .annotate(estudiantes=Count('student', distinct=True), clases=Count('id'))
+        .order_by('subject__name')
+    )
+
+
+def carpetas_por_estudiante(actividades):
+    """[{student_id, nombre, clases, ultima}] de una materia, ordenado por nombre."""
+    return list(
+        actividades.order_by()
+        .values('student_id', nombre=F('student__usuario__nombre'))
+        .annotate(clases=Count('id'), ultima=Max('date'))
+        .order_by('nombre', 'student_id')
+    )
+
+
+# ── Paginación por cursor ────────────────────────────────────────────────────
+
+def codificar_cursor(activity):
+    return f'{activity.date.isoformat()}.{activity.pk}'
+
+
+def decodificar_cursor(cursor):
+    """'2025-03-10.42' → (date(2025, 3, 10), 42); None si es inválido."""
+    try:
+        fecha, pk = str(cursor).rsplit('.', 1)
+        return date.fromisoformat(fecha), int(pk)
+    except (TypeError, ValueError):
+        return None
+
+
+def pagina(actividades, cursor=None, tamano=PAGINA):
+    """
+    Una página de `actividades` ordenadas por (date, id) descendente.
+    Retorna (filas, cursor_siguiente); cursor_siguiente es None en la última.
+    """
+    actividades = actividades.order_by('-date', '-id')
+    posicion = decodificar_cursor(cursor) if cursor else None
+    if posicion:
+        fecha, pk = posicion
+        actividades = actividades.filter(Q(date__lt=fecha) | Q(date=fecha, id__lt=pk))
+    filas = list(actividades[:tamano + 1])
+    if len(filas) > tamano:
+        filas = filas[:tamano]
+        return filas, codificar_cursor(filas[-1])
+    return filas, None
@@ -126,3 +126,262 @@ class TestTeacherMethods:
         usuario = UsuarioFactory(rol=Usuario.Rol.DOCENTE)
         teacher, _ = Teacher.objects.get_or_create(usuario=usuario)
         assert teacher.get_total_classes() == 0
+
+
+class TestEstadoWizard:
+    """Tests para el estado compacto de los wizards (teachers/wizard.py)."""
+
+    def _request(self):
+        from django.contrib.sessions.backends.cache import SessionStore
+        from django.test import RequestFactory
+        request = RequestFactory().get('/')
+        request.session = SessionStore()
+        return request
+
+    def test_una_sola_clave_y_limpieza(self):
+        """Test que los campos se guardan bajo una clave y limpiar() borra también el formato anterior."""
+        from teachers.wizard import EstadoWizard
+        request = self._request()
+        request.session['wiz_notas_quimestre'] = 'Q2'
+        estado = EstadoWizard(request, 'wiz_notas')
+        estado.actualizar(clase_id=3, quimestre='Q1')
+        estado.actualizar(parcial='1P')
+        assert list(request.session.keys()) == ['wiz_notas_quimestre', 'wiz_notas']
+        assert EstadoWizard(request, 'wiz_notas').get('quimestre') == 'Q1'
+        assert 'parcial' in estado and estado['clase_id'] == 3
+        estado.limpiar()
+        assert list(request.session.keys()) == []
+
+    def test_caduca_con_ttl(self):
+        """Test que un estado vencido se descarta al leerlo."""
+        from teachers.wizard import EstadoWizard
+        request = self._request()
+        EstadoWizard(request, 'wiz_if', ttl=-1).actualizar(anio_lectivo='2025-2026')
+        estado = EstadoWizard(request, 'wiz_if')
+        assert estado.get('anio_lectivo') is None
+        assert 'wiz_if' not in request.session
+
+    @pytest.mark.django_db
+    def test_wizard_notas_guarda_estado_compacto(self, client):
+        """Test que los pasos del wizard de notas escriben una sola clave de sesión."""
+        from django.contrib.auth.models import User
+        from django.urls import reverse
+        from classes.factories import ClaseFactory
+        auth_user = User.objects.create_user('docente_wizard', 'docente_wizard@test.com', 'x', is_staff=True)
+        clase = ClaseFactory(docente_base=auth_user.usuario)
+        client.force_login(auth_user)
+        url = reverse('teachers:wizard_notas')
+        client.post(f'{url}?paso=1', {'clase_id': clase.id})
+        client.post(f'{url}?paso=2', {'quimestre': 'Q1', 'parcial': '2P'})
+        session = client.session
+        assert not [k for k in session.keys() if k.startswith('wiz_notas_')]
+        assert session['wiz_notas']['d'] == {'clase_id': clase.id, 'quimestre': 'Q1', 'parcial': '2P'}
+
+    @pytest.mark.django_db
+    def test_wizard_notas_guarda_el_curso_en_lote(self, client):
+        """Test que el último paso guarda las notas del curso y cuenta las inválidas."""
+        from decimal import Decimal
+        from unittest.mock import patch
+        from django.contrib.auth.models import User
+        from django.urls import reverse
+        from classes.factories import ClaseFactory, EnrollmentFactory
+        from classes.models import CalificacionParcial, TipoAporte
+        auth_user = User.objects.create_user('docente_lote', 'docente_lote@test.com', 'x', is_staff=True)
+        clase = ClaseFactory(docente_base=auth_user.usuario)
+        students = [EnrollmentFactory(clase=clase).estudiante.student_profile for _ in range(2)]
+        tipo = TipoAporte.objects.create(nombre='Lote', codigo='WIZ_LOTE', peso=1)
+        client.force_login(auth_user)
+        url = reverse('teachers:wizard_notas')
+        client.post(f'{url}?paso=1', {'clase_id': clase.id})
+        client.post(f'{url}?paso=2', {'quimestre': 'Q1', 'parcial': '1P'})
+        client.post(f'{url}?paso=3', {'aporte_id': tipo.id})
+        with patch('utils.notifications.NotificacionWhatsApp'):
+            client.post(f'{url}?paso=4', {
+                f'nota_{students[0].id}': '12', f'nota_{students[1].id}': '7.5', 'nota_999999': '8',
+            })
+        notas = dict(CalificacionParcial.objects.filter(tipo_aporte=tipo).values_list('student_id', 'calificacion'))
+        assert notas == {students[0].id: Decimal('10'), students[1].id: Decimal('7.5')}
+        assert 'wiz_notas' not in client.session
+
+
+    @pytest.mark.django_db
+    def test_wizard_clase_diaria_paso_2_guarda_asistencia_y_conserva_estado(self, client):
+        """Test que el paso 2 guarda la asistencia del curso sin perder el estado del wizard."""
+        from django.contrib.auth.models import User
+        from django.urls import reverse
+        from classes.factories import ClaseFactory, EnrollmentFactory
+        from classes.models import Asistencia
+        auth_user = User.objects.create_user('docente_diaria', 'docente_diaria@test.com', 'x', is_staff=True)
+        clase = ClaseFactory(docente_base=auth_user.usuario)
+        presente, ausente = [EnrollmentFactory(clase=clase) for _ in range(2)]
+        client.force_login(auth_user)
+        url = reverse('teachers:wizard_clase_diaria')
+        client.post(f'{url}?paso=1', {'clase_id': clase.id})
+        response = client.post(f'{url}?paso=2', {
+            f'asist_{ausente.id}': 'Ausente', f'obs_{ausente.id}': 'Enfermo', f'asist_{presente.id}': 'Otro',
+        })
+        assert response.status_code == 302 and response.url.endswith('?paso=3')
+        estados = dict(Asistencia.objects.values_list('inscripcion_id', 'estado'))
+        assert estados == {presente.id: 'Presente', ausente.id: 'Ausente'}
+        assert client.session['wiz_clase']['d']['clase_id'] == clase.id
+        assert client.session['wiz_clase']['d']['asist_ok'] is True
+
+
+@pytest.mark.django_db
+class TestCarpetasInformes:
+    """Tests para carpetas e informes agregados y paginados (teachers/carpetas.py)."""
+
+    def _docente_con_clases(self, client, n_clases=5):
+        from datetime import date, timedelta
+        from django.contrib.auth.models import User
+        from classes.factories import ClaseFactory, EnrollmentFactory
+        from classes.models import Activity
+        auth_user = User.objects.create_user('docente_carpetas', 'docente_carpetas@test.com', 'x', is_staff=True)
+        teacher = auth_user.usuario.teacher_profile
+        clase = ClaseFactory(docente_base=auth_user.usuario)
+        students = [EnrollmentFactory(clase=clase).estudiante.student_profile for _ in range(2)]
+        for student in students:
+            student.teacher = teacher
+            student.save()
+        hoy = date(2025, 3, 10)
+        for i in range(n_clases):
+            # Dos clases por día para que el cursor tenga que desempatar por id
+            Activity.objects.create(student=students[0], clase=clase, subject=clase.subject, date=hoy - timedelta(days=i // 2))
+        Activity.objects.create(student=students[1], clase=clase, subject=clase.subject, date=hoy)
+        client.force_login(auth_user)
+        return teacher, clase, students
+
+    def test_pagina_por_cursor_recorre_todo_sin_repetir(self, client):
+        """Test que las páginas por cursor cubren todas las clases en orden (date, id) descendente."""
+        from teachers import carpetas
+        teacher, _clase, _students = self._docente_con_clases(client)
+        actividades = carpetas.actividades_docente(teacher)
+        vistas, cursor = [], None
+        while True:
+            filas, cursor = carpetas.pagina(actividades, cursor, tamano=2)
+            vistas += [(a.date, a.id) for a in filas]
+            if cursor is None:
+                break
+        assert vistas == sorted(actividades.values_list('date', 'id'), reverse=True)
+        assert carpetas.decodificar_cursor('no-es-cursor') is None
+
+    def test_carpetas_agregadas_por_materia_y_estudiante(self, client):
+        """Test que carpetas e informes muestran conteos agregados y clases paginadas."""
+        from django.urls import reverse
+        _teacher, clase, students = self._docente_con_clases(client)
+        url = reverse('teachers:carpetas')
+        materias = client.get(url).context['carpetas']
+        assert materias == [{
+            'subject_id': clase.subject_id, 'subject__name': clase.subject.name, 'estudiantes': 2, 'clases': 6,
+        }]
+        por_estudiante = client.get(url, {'materia': clase.subject_id}).context['carpetas']
+        assert {c['student_id']: c['clases'] for c in por_estudiante} == {students[0].id: 5, students[1].id: 1}
+        respuesta = client.get(url, {'materia': clase.subject_id, 'estudiante': students[0].id})
+        assert respuesta.context['nivel'] == 'clases'
+        assert len(respuesta.context['activities']) == 5
+        assert respuesta.context['siguiente_cursor'] is None
+        informes = client.get(reverse('teachers:informes'), {'student': students[0].id})
+        assert [a.student_id for a in informes.context['activities']] == [students[0].id] * 5
+
+    def test_informes_incluyen_retirados_y_estudiante_invalido(self, client):
+        """Test que los informes mantienen a los estudiantes inactivos y que ?estudiante= no numérico no falla."""
+        from django.urls import reverse
+        _teacher, clase, students = self._docente_con_clases(client)
+        students[1].active = False
+        students[1].save()
+        informes = client.get(reverse('teachers:informes')).context['activities']
+        assert {a.student_id for a in informes} == {students[0].id, students[1].id}
+        carpetas = client.get(reverse('teachers:carpetas'), {'materia': clase.subject_id}).context['carpetas']
+        assert [c['student_id'] for c in carpetas] == [students[0].id]
+        respuesta = client.get(reverse('teachers:carpetas'), {'materia': clase.subject_id, 'estudiante': 'abc'})
+        assert respuesta.status_code == 200
+        assert respuesta.context['nivel'] == 'estudiantes'
+
+    def test_lista_por_tipo_usa_inscripciones_precargadas(self, client, django_assert_max_num_queries):
+        """Test que la lista de clases por tipo no consulta las inscripciones por clase."""
+        from django.contrib.auth.models import User
+        from django.urls import reverse
+        from classes.factories import ClaseFactory, EnrollmentFactory
+        from classes.models import Enrollment
+        auth_user = User.objects.create_user('docente_tipo', 'docente_tipo@test.com', 'x', is_staff=True)
+        for _ in range(3):
+            clase = ClaseFactory(docente_base=auth_user.usuario, subject__tipo_materia='TEORIA')
+            EnrollmentFactory(clase=clase)
+            EnrollmentFactory(clase=clase, estado='RETIRADO')
+        client.force_login(auth_user)
+        respuesta = client.get(reverse('teachers:teoria_list'))
+        assert respuesta.context['total_classes_in_type'] == 3
+        assert respuesta.context['total_students_in_type'] == 3
+        assert all(len(c.inscripciones_activas) == 1 for c in respuesta.context['clases'])
+        with django_assert_max_num_queries(12):
+            client.get(reverse('teachers:teoria_list'))
+
+
+@pytest.mark.django_db
+class TestGrillaCalificaciones:
+    """Tests para las vistas de notas sobre la grilla (classes/grilla_notas.py)."""
+
+    def _curso(self, client, n_estudiantes):
+        from decimal import Decimal
+        from unittest.mock import patch
+        from django.contrib.auth.models import User
+        from classes.factories import ClaseFactory, EnrollmentFactory
+        from classes.models import CalificacionParcial, TipoAporte
+        auth_user = User.objects.create_user('docente_grilla_v', 'docente_grilla_v@test.com', 'x', is_staff=True)
+        clase = ClaseFactory(docente_base=auth_user.usuario)
+        auth_user.usuario.teacher_profile.subjects.add(clase.subject)
+        tipos = [TipoAporte.objects.create(nombre=f'Aporte {i}', codigo=f'GRV_{i}', peso=1) for i in range(4)]
+        students = [EnrollmentFactory(clase=clase).estudiante.student_profile for _ in range(n_estudiantes)]
+        with patch('utils.notifications.NotificacionWhatsApp'):
+            for student in students:
+                CalificacionParcial.objects.create(
+                    student=student, subject=clase.subject, parcial='1P', quimestre='Q1',
+                    tipo_aporte=tipos[0], calificacion=Decimal('8'),
+                )
+        client.force_login(auth_user)
+        return clase, tipos, students
+
+    def test_detalladas_no_consulta_por_celda(self, client, django_assert_max_num_queries):
+        """Test que la vista detallada arma la grilla sin consultas por estudiante y aporte."""
+        from decimal import Decimal
+        from django.urls import reverse
+        from setup.models import ConfiguracionInstitucion
+        clase, tipos, students = self._curso(client, 6)
+        ConfiguracionInstitucion.get()
+        url = reverse('teachers:calificaciones_detalladas')
+        with django_assert_max_num_queries(16):
+            respuesta = client.get(url, {'subject': clase.subject_id, 'parcial': '1P'})
+        fila = respuesta.context['datos_tabla'][0]
+        assert fila['aportes'][tipos[0].codigo] == Decimal('8')
+        assert fila['aportes'][tipos[1].codigo] == 0
+        assert fila['promedio'] == Decimal('8.00')
+
+    def test_detalladas_selector_de_quimestre(self, client):
+        """Test que la vista detallada permite elegir el quimestre y guarda la nota en él."""
+        import json
+        from django.urls import reverse
+        from classes.models import CalificacionParcial
+        clase, tipos, students = self._curso(client, 1)
+        respuesta = client.get(reverse('teachers:calificaciones_detalladas'),
+                               {'subject': clase.subject_id, 'quimestre': 'Q2', 'parcial': '3P'})
+        html = respuesta.content.decode()
+        assert '<select name="quimestre"' in html
+        assert '<option value="Q2" selected>' in html
+        assert 'data-quimestre="Q2"' in html
+        respuesta = client.post(reverse('teachers:guardar_calificacion_parcial'), json.dumps({
+            'student_id': students[0].id, 'tipo_aporte_id': tipos[1].id, 'parcial': '3P',
+            'quimestre': 'Q2', 'subject': clase.subject_id, 'calificacion': 9,
+        }), content_type='application/json')
+        assert respuesta.json()['success']
+        nota = CalificacionParcial.objects.get(student=students[0], tipo_aporte=tipos[1])
+        assert (nota.parcial, nota.quimestre) == ('3P', 'Q2')
+
+    def test_panel_docente_muestra_notas_y_promedio(self, client):
+        """Test que el panel de calificaciones del docente muestra la grilla con su promedio."""
+        from django.urls import reverse
+        clase, tipos, students = self._curso(client, 2)
+        respuesta = client.get(reverse('docente:calificaciones', args=[clase.id]), {'q': 'Q1', 'p': '1P'})
+        assert respuesta.status_code == 200
+        fila = respuesta.context['filas'][0]
+        assert [nota for _tipo, nota in fila['celdas']][:2] == [8, None]
+        assert f'name="nota_{students[0].pk}_{tipos[0].pk}"' in respuesta.content.decode()
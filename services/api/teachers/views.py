@@ -14,7 +14,8 @@ from datetime import datetime, date, timedelta
 from urllib.parse import quote
 from django.contrib.auth.models import User
 from django.db import IntegrityError
-from datetime import date, timedelta, timezone
+from datetime import date, timedelta
+from django.utils import timezone
 from decimal import Decimal
 
 # Importar decorador de users
@@ -37,12 +38,18 @@ from classes.models import (
     TipoAporte,
     GradeLevel,
 )
+from classes.deberes import estadisticas_deberes_docente, resumen_deberes_estudiante
+from classes.estadisticas import ciclo_activo
+from classes.grilla_notas import grilla_notas, tipos_activos
+from classes.registro_clase import registrar_asistencia, registrar_notas
 
 from students.forms import StudentForm
 
 
 
 from .forms import DeberForm, DeberEntregaForm, CalificacionForm, TeacherProfileForm
+from . import carpetas
+from .wizard import EstadoWizard
 
 # ============================================
 # DASHBOARD DOCENTE
@@ -441,6 +448,7 @@ def _guardar_calificaciones(request, teacher):
                             parcial=parcial,
                             quimestre=quimestre,
                             tipo_aporte=tipo_aporte,
+                            ciclo_lectivo=CalificacionParcial.ciclo_para(student.pk, subject_obj.pk),
                             defaults={'calificacion': nota, 'observaciones': observaciones_completas, 'registrado_por': teacher}
                         )
                         calificaciones_guardadas += 1
@@ -544,6 +552,7 @@ def _guardar_unificado(request, teacher):
                         parcial=parcial,
                         quimestre=quimestre,
                         tipo_aporte=tipo_aporte,
+                        ciclo_lectivo=CalificacionParcial.ciclo_para(student.pk, subject_obj.pk),
                         defaults={'calificacion': nota, 'observaciones': observaciones_completas, 'registrado_por': teacher}
                     )
                     calificaciones_guardadas += 1
@@ -986,28 +995,34 @@ def clases_dashboard_view(request):
 def _subject_type_list_context(request, subject_type_param, subject_type_display_name, template_name):
     teacher = request.user.teacher_profile
     
-    # Obtener todas las Clases del docente para este tipo de materia
-    clases_qs = _teacher_clases_qs(teacher).filter(
-        subject__tipo_materia=subject_type_param
-    ).prefetch_related(
-        'enrollments__estudiante' # Prefetch para optimizar
-    ).order_by('subject__name', 'name')
-
-    clases_con_enrollments = []
-    for clase in clases_qs:
-        # Obtenemos solo las inscripciones activas para esta clase
-        active_enrollments = clase.enrollments.filter(estado='ACTIVO')
-        clases_con_enrollments.append({
-            'clase': clase,
-            'enrollments': active_enrollments
-        })
+    # Clases del docente para este tipo de materia, con sus inscripciones
+    # activas precargadas en una consulta (clase.inscripciones_activas)
+    clases = list(
+        _teacher_clases_qs(teacher).filter(
+            subject__tipo_materia=subject_type_param
+        ).select_related('subject').prefetch_related(
+            Prefetch(
+                'enrollments',
+                queryset=Enrollment.objects.filter(estado='ACTIVO').select_related('estudiante'),
+                to_attr='inscripciones_activas',
+            )
+        ).order_by('subject__name', 'name')
+    )
 
-    total_classes_in_type = len(clases_con_enrollments)
-    total_students_in_type = Enrollment.objects.filter(clase__in=clases_qs, estado='ACTIVO').values('estudiante').distinct().count()
+    clases_con_enrollments = [
+        {'clase': clase, 'enrollments': clase.inscripciones_activas}
+        for clase in clases
+    ]
+
+    total_classes_in_type = len(clases)
+    total_students_in_type = len({
+        enr.estudiante_id for clase in clases for enr in clase.inscripciones_activas
+    })
 
     context = {
         'teacher': teacher,
         'subject_type_display_name': subject_type_display_name,
+        'clases': clases,
         'clases_con_enrollments': clases_con_enrollments,
         'total_students_in_type': total_students_in_type,
         'total_classes_in_type': total_classes_in_type,
@@ -1121,11 +1136,11 @@ def activity_delete_view(request, activity_id):
 
 @teacher_required
 def informes_view(request):
-    """Ver informes"""
+    """Ver informes (páginas por cursor, ver teachers/carpetas.py)"""
     teacher = request.user.teacher_profile
-    activities = Activity.objects.filter(
-        student__teacher=teacher
-    ).select_related('student').order_by('-date')
+    activities = carpetas.actividades_docente(teacher, solo_activos=False).select_related(
+        'student__usuario', 'subject'
+    )
     
     student_id = request.GET.get('student')
     subject = request.GET.get('subject')
@@ -1135,14 +1150,18 @@ def informes_view(request):
     if student_id:
         activities = activities.filter(student_id=student_id)
     if subject:
-        activities = activities.filter(subject=subject)
+        activities = activities.filter(
+            subject_id=subject) if subject.isdigit() else activities.filter(subject__name=subject)
     if date_from:
         activities = activities.filter(date__gte=date_from)
     if date_to:
         activities = activities.filter(date__lte=date_to)
     
+    activities, siguiente = carpetas.pagina(activities, request.GET.get('cursor'))
+    
     return render(request, 'teachers/informes.html', {
         'activities': activities,
+        'siguiente_cursor': siguiente,
         'students': _get_teacher_students(teacher),
         'selected_student': student_id,
         'selected_subject': subject,
@@ -1153,50 +1172,42 @@ def informes_view(request):
 
 @teacher_required
 def carpetas_view(request):
-    """Vista para ver carpetas organizadas por Materia → Estudiante → Clases"""
+    """
+    Carpetas Materia → Estudiante → Clases. Cada nivel se carga al abrirlo:
+    materias y estudiantes con conteos agregados, clases en páginas por cursor.
+    """
     teacher = request.user.teacher_profile
+    activities = carpetas.actividades_docente(teacher)
     
-    activities = Activity.objects.filter(
-        student__teacher=teacher,
-        student__active=True
-    ).select_related('student', 'student__usuario').order_by('subject', 'student__usuario__nombre', 'class_number')
-    
-    folders_by_subject = {}
-    
-    for activity in activities:
-        subject = activity.subject
-        
-        if subject not in folders_by_subject:
-            folders_by_subject[subject] = {
-                'student_count': 0,
-                'total_classes': 0,
-                'students': {}
-            }
-        
-        student_id = activity.student.id
-        if student_id not in folders_by_subject[subject]['students']:
-            folders_by_subject[subject]['students'][student_id] = {
-                'student': activity.student,
-                'class_count': 0,
-                'activities': []
-            }
-            folders_by_subject[subject]['student_count'] += 1
-        
-        folders_by_subject[subject]['students'][student_id]['activities'].append(activity)
-        folders_by_subject[subject]['students'][student_id]['class_count'] += 1
-        folders_by_subject[subject]['total_classes'] += 1
+    try:
+        materia_id = int(request.GET['materia'])
+    except (KeyError, ValueError):
+        return render(request, 'teachers/carpetas.html', {
+            'nivel': 'materias',
+            'carpetas': carpetas.carpetas_por_materia(activities),
+        })
     
-    for subject in folders_by_subject:
-        folders_by_subject[subject]['students'] = list(
-            folders_by_subject[subject]['students'].values()
-        )
-        folders_by_subject[subject]['students'].sort(
-            key=lambda x: x['student'].name
-        )
+    if materia_id == carpetas.SIN_MATERIA:
+        materia = None
+    else:
+        materia = get_object_or_404(Subject, id=materia_id)
+    activities = carpetas.filtrar_materia(activities, materia_id)
     
-    return render(request, 'teachers/carpetas.html', {
-        'folders_by_subject': folders_by_subject
-    })
+    contexto = {'materia': materia, 'materia_id': materia_id}
+    try:
+        student_id = int(request.GET['estudiante'])
+    except (KeyError, ValueError):
+        contexto.update(nivel='estudiantes', carpetas=carpetas.carpetas_por_estudiante(activities))
+        return render(request, 'teachers/carpetas.html', contexto)
+    
+    student = get_object_or_404(Student.objects.select_related('usuario'), id=student_id, teacher=teacher)
+    activities, siguiente = carpetas.pagina(
+        activities.filter(student=student), request.GET.get('cursor')
+    )
+    contexto.update(
+        nivel='clases', student=student, activities=activities, siguiente_cursor=siguiente,
+    )
+    return render(request, 'teachers/carpetas.html', contexto)
 
 
 @teacher_required
@@ -1257,47 +1268,41 @@ def calificaciones_detalladas_view(request):
     student_id = request.GET.get('student')
     subject = request.GET.get('subject')
     parcial = request.GET.get('parcial', '1P')
+    quimestre = request.GET.get('quimestre', 'Q1')
     
     # Obtener estudiantes y tipos de aportes
     estudiantes = _get_teacher_students(teacher)
-    from classes.models import TipoAporte, CalificacionParcial
-    tipos_aportes = TipoAporte.objects.filter(activo=True)
+    tipos_aportes = tipos_activos()
 
     # Filtrar estudiantes si es necesario
     if student_id:
         estudiantes = estudiantes.filter(id=student_id)
 
     subjects_qs = _get_teacher_subjects(teacher)
-    default_subject = subjects_qs.first()
+    if not subject:
+        default_subject = subjects_qs.first()
+        subject_id = default_subject.id if default_subject else None
+    else:
+        subject_id = subject
+
+    # Toda la grilla (estudiantes × aportes) y los promedios en una consulta
+    estudiantes = list(estudiantes)
+    grilla = grilla_notas(
+        [e.id for e in estudiantes], subject_id, quimestre, parcial, tipos=tipos_aportes,
+        ciclo_lectivo=ciclo_activo(),
+    )
 
     # Preparar datos para la tabla
     datos_tabla = []
     for estudiante in estudiantes:
-        fila = {
+        datos_tabla.append({
             'estudiante': estudiante,
-            'aportes': {},
-            'promedio': 0
-        }
-
-        # Obtener calificaciones de cada aporte
-        for tipo in tipos_aportes:
-            calif = CalificacionParcial.objects.filter(
-                student=estudiante,
-                subject=subject or default_subject,
-                parcial=parcial,
-                tipo_aporte=tipo
-            ).first()
-
-            fila['aportes'][tipo.codigo] = calif.calificacion if calif else 0
-
-        # Calcular promedio
-        fila['promedio'] = CalificacionParcial.calcular_promedio_parcial(
-            estudiante,
-            subject or default_subject,
-            parcial
-        )
-
-        datos_tabla.append(fila)
+            'aportes': {
+                tipo.codigo: nota or 0
+                for tipo, nota in zip(tipos_aportes, grilla.celdas(estudiante.id))
+            },
+            'promedio': grilla.promedio(estudiante.id),
+        })
 
     # Estadísticas
     total_estudiantes = len(datos_tabla)
@@ -1310,6 +1315,7 @@ def calificaciones_detalladas_view(request):
         'datos_tabla': datos_tabla,
         'tipos_aportes': tipos_aportes,
         'parcial_actual': parcial,
+        'quimestre_actual': quimestre,
         'subject_actual': subject,
         'estudiantes_lista': estudiantes,
         'materias': subjects_qs,
@@ -1337,9 +1343,11 @@ def guardar_calificacion_parcial(request):
         try:
             calif, created = CalificacionParcial.objects.update_or_create(
                 student_id=data['student_id'],
-                subject=data['subject'],
+                subject_id=data['subject'],
                 parcial=data['parcial'],
+                quimestre=data.get('quimestre', 'Q1'),
                 tipo_aporte_id=data['tipo_aporte_id'],
+                ciclo_lectivo=CalificacionParcial.ciclo_para(data['student_id'], data['subject']),
                 defaults={'calificacion': data['calificacion']}
             )
             
@@ -1793,78 +1801,34 @@ def dashboard_profesor(request):
     ).select_related('estudiante', 'deber').order_by('-fecha_entrega')[:10]
     
     # Deberes próximos a vencer (próximos 7 días)
-    fecha_limite = timezone.now() + timedelta(days=7)
+    ahora = timezone.now()
+    fecha_limite = ahora + timedelta(days=7)
     deberes_proximos = Deber.objects.filter(
         teacher=teacher_instance.usuario, # Use teacher
         estado='activo',
-        fecha_entrega__gte=timezone.now(),
+        fecha_entrega__gte=ahora,
         fecha_entrega__lte=fecha_limite
     ).order_by('fecha_entrega')[:5]
     
-    # Estadísticas por materia
-    # Filter Clases by docente_base (which is a Usuario)
-    estadisticas_materias = Clase.objects.filter(
-        docente_base=teacher_instance.usuario
-    ).annotate(
-        total_deberes=Count('deberes'),
-        deberes_activos_count=Count('deberes', filter=Q(deberes__estado='activo'))
-    ).order_by('-total_deberes')[:5]
-    
-    # Promedio de calificaciones por materia
-    promedios_materias = []
-    for materia in estadisticas_materias:
-        promedio = DeberEntrega.objects.filter(
-            deber__clase__subject=materia.subject, # Use materia.subject
-            calificacion__isnull=False
-        ).aggregate(Avg('calificacion'))['calificacion__avg']
-        
-        promedios_materias.append({
-            'materia': materia,
-            'promedio': round(promedio, 2) if promedio else 0
-        })
-    
-    # Gráfico de entregas por estado
-    estados_entregas = DeberEntrega.objects.filter(
-        deber__teacher=teacher_instance.usuario # Use deber__teacher
-    ).values('estado').annotate(total=Count('id'))
-    
-    deberes = Deber.objects.filter(teacher=teacher_instance.usuario) # Use teacher
-    total_deberes = deberes.count()
-
-    deberes_activos = deberes.filter(estado='activo').count()
-
-    # total_estudiantes needs to be re-evaluated.
-    # It should be the count of unique students that have any homework assigned by this teacher
-    # either directly through estudiantes_especificos or indirectly through clases taught by this teacher
-    assigned_students_direct = Deber.objects.filter(
-        teacher=teacher_instance.usuario
-    ).values_list('estudiantes_especificos', flat=True)
-    
-    assigned_students_via_clase = Deber.objects.filter(
-        clase__docente_base=teacher_instance.usuario
-    ).values_list('clase__enrollments__estudiante', flat=True)
-
-    # Combine and count unique Usuarios
-    all_assigned_usuarios_ids = list(set(list(assigned_students_direct) + list(assigned_students_via_clase)))
-    total_estudiantes = len(all_assigned_usuarios_ids)
-
+    # Estadísticas agregadas (cacheadas por docente, ver classes.deberes)
+    estadisticas = estadisticas_deberes_docente(teacher_instance.usuario)
+    estadisticas_materias = estadisticas['clases'][:5]
+    promedios_materias = [
+        {'materia': clase, 'promedio': clase['promedio']}
+        for clase in estadisticas_materias
+    ]
 
-    entregas_pendientes = DeberEntrega.objects.filter(
-        deber__teacher=teacher_instance.usuario, # Use deber__teacher
-        estado='pendiente' # Changed from 'entregado' as per typical understanding of 'pending'
-    ).count()
-    
     context = {
-        'total_deberes': total_deberes,
-        'deberes_activos': deberes_activos,
-        'total_estudiantes': total_estudiantes,
-        'entregas_pendientes': entregas_pendientes,
+        'total_deberes': estadisticas['total_deberes'],
+        'deberes_activos': estadisticas['deberes_activos'],
+        'total_estudiantes': estadisticas['total_estudiantes'],
+        'entregas_pendientes': estadisticas['entregas_pendientes'],
         'deberes_recientes': deberes_recientes,
         'entregas_recientes': entregas_recientes,
         'deberes_proximos': deberes_proximos,
         'estadisticas_materias': estadisticas_materias,
         'promedios_materias': promedios_materias,
-        'estados_entregas': estados_entregas,
+        'estados_entregas': estadisticas['estados_entregas'],
     }
     
     return render(request, 'teachers/dashboard_profesor.html', context)
@@ -1884,99 +1848,38 @@ def dashboard_estudiante(request):
         messages.error(request, 'No se encontró el perfil de estudiante para este usuario.')
         return redirect('home')
 
-    # Obtener todos los deberes del estudiante
-    todos_deberes = Deber.objects.filter(
-        Q(estudiantes_especificos=student_profile.usuario) | # Deberes asignados directamente al Usuario
-        Q(clase__enrollments__estudiante=student_profile.usuario), # Deberes asignados a Clases en las que está inscrito el Usuario
-        estado='activo'
-    ).distinct()
-    
-    # Deberes pendientes (no entregados y no vencidos)
-    deberes_pendientes = []
-    deberes_vencidos = []
-    deberes_proximos = []
-    
-    for deber in todos_deberes:
-        entrega = DeberEntrega.objects.filter(
-            deber=deber,
-            estudiante=student_profile.usuario # Use student_profile.usuario
-        ).first()
-        
-        if not entrega or entrega.estado == 'pendiente':
-            if deber.esta_vencido():
-                deberes_vencidos.append(deber)
-            else:
-                deberes_pendientes.append(deber)
-                # Próximos 3 días
-                # Assuming deber.dias_restantes() exists and works correctly
-                if hasattr(deber, 'dias_restantes') and deber.dias_restantes() is not None and deber.dias_restantes() <= 3:
-                    deberes_proximos.append(deber)
-    
-    # Estadísticas
-    total_deberes = todos_deberes.count()
-    total_pendientes = len(deberes_pendientes)
-    total_vencidos = len(deberes_vencidos)
-    
+    usuario = student_profile.usuario
+    # Deberes anotados con el estado de la entrega en una sola consulta
+    resumen = resumen_deberes_estudiante(usuario)
+    deberes_proximos = resumen['proximos']
+    deberes_pendientes = deberes_proximos + resumen['pendientes']
+    deberes_pendientes.sort(key=lambda d: d.fecha_entrega)
+
     # Entregas realizadas
-    mis_entregas = DeberEntrega.objects.filter(
-        estudiante=student_profile.usuario, # Use student_profile.usuario
+    entregas_qs = DeberEntrega.objects.filter(
+        estudiante=usuario,
         estado__in=['entregado', 'revisado', 'tarde']
-    ).select_related('deber', 'deber__clase__subject').order_by('-fecha_entrega')[:10]
-    
-    total_entregados = mis_entregas.count()
-    
+    )
+    mis_entregas = entregas_qs.select_related('deber', 'deber__clase__subject').order_by('-fecha_entrega')[:10]
+
     # Calificaciones recientes
     calificaciones_recientes = DeberEntrega.objects.filter(
-        estudiante=student_profile.usuario, # Use student_profile.usuario
+        estudiante=usuario,
         estado='revisado',
         calificacion__isnull=False
     ).select_related('deber', 'deber__clase__subject').order_by('-fecha_actualizacion')[:5]
-    
-    # Promedio general
-    promedio_general = DeberEntrega.objects.filter(
-        estudiante=student_profile.usuario, # Use student_profile.usuario
-        calificacion__isnull=False
-    ).aggregate(Avg('calificacion'))['calificacion__avg']
-    
-    # Estadísticas por materia
-    materias_stats = {}
-    for entrega in DeberEntrega.objects.filter(
-        estudiante=student_profile.usuario, # Use student_profile.usuario
-        calificacion__isnull=False
-    ).select_related('deber__clase__subject'):
-        materia_nombre = entrega.deber.clase.subject.name
-        if materia_nombre not in materias_stats:
-            materias_stats[materia_nombre] = {
-                'calificaciones': [],
-                'total_puntos': 0,
-                'puntos_obtenidos': 0
-            }
-        materias_stats[materia_nombre]['calificaciones'].append(float(entrega.calificacion))
-        materias_stats[materia_nombre]['total_puntos'] += float(entrega.deber.puntos_totales)
-        materias_stats[materia_nombre]['puntos_obtenidos'] += float(entrega.calificacion)
-    
-    # Calcular promedios por materia
-    promedios_materias = []
-    for materia, stats in materias_stats.items():
-        promedio = sum(stats['calificaciones']) / len(stats['calificaciones'])
-        porcentaje = (stats['puntos_obtenidos'] / stats['total_puntos']) * 100 if stats['total_puntos'] > 0 else 0
-        promedios_materias.append({
-            'materia': materia,
-            'promedio': round(promedio, 2),
-            'porcentaje': round(porcentaje, 1)
-        })
-    
+
     context = {
-        'total_deberes': total_deberes,
-        'total_pendientes': total_pendientes,
-        'total_entregados': total_entregados,
-        'total_vencidos': total_vencidos,
+        'total_deberes': sum(len(resumen[k]) for k in ('pendientes', 'proximos', 'vencidos', 'entregados')),
+        'total_pendientes': len(deberes_pendientes),
+        'total_entregados': entregas_qs.count(),
+        'total_vencidos': len(resumen['vencidos']),
         'deberes_pendientes': deberes_pendientes[:5],
         'deberes_proximos': deberes_proximos,
         'mis_entregas': mis_entregas,
         'calificaciones_recientes': calificaciones_recientes,
-        'promedio_general': round(promedio_general, 2) if promedio_general else 0,
-        'promedios_materias': promedios_materias,
+        'promedio_general': resumen['promedio_general'],
+        'promedios_materias': resumen['promedios_materias'],
     }
     
     return render(request, 'teachers/dashboard_estudiante.html', context)
@@ -2316,7 +2219,7 @@ def wizard_aporte(request):
     1. Clase  2. Estudiante + Período  3. Tipo de aporte  4. Nota  5. Confirmar
     """
     paso = int(request.GET.get('paso', 1))
-    SK = 'wiz_aporte'
+    estado = EstadoWizard(request, 'wiz_aporte')
     teacher = request.user.teacher_profile
     teacher_usuario = teacher.usuario
 
@@ -2328,7 +2231,7 @@ def wizard_aporte(request):
                 messages.error(request, 'Selecciona una clase.')
                 return redirect(f"{request.path}?paso=1")
             get_object_or_404(Clase, id=clase_id, docente_base=teacher_usuario)
-            request.session[f'{SK}_clase_id'] = int(clase_id)
+            estado.actualizar(clase_id=int(clase_id))
             return redirect(f"{request.path}?paso=2")
 
         elif paso == 2:
@@ -2341,9 +2244,7 @@ def wizard_aporte(request):
             if quimestre not in ('Q1', 'Q2') or parcial not in ('1P', '2P', '3P', '4P'):
                 messages.error(request, 'Selecciona quimestre y parcial válidos.')
                 return redirect(f"{request.path}?paso=2")
-            request.session[f'{SK}_student_id'] = int(student_id)
-            request.session[f'{SK}_quimestre']  = quimestre
-            request.session[f'{SK}_parcial']    = parcial
+            estado.actualizar(student_id=int(student_id), quimestre=quimestre, parcial=parcial)
             return redirect(f"{request.path}?paso=3")
 
         elif paso == 3:
@@ -2365,13 +2266,13 @@ def wizard_aporte(request):
                     codigo=codigo,
                     defaults={'nombre': nombre, 'peso': peso_val, 'activo': True}
                 )
-                request.session[f'{SK}_aporte_id'] = tipo_aporte.id
+                estado.actualizar(aporte_id=tipo_aporte.id)
             else:
                 aporte_id = request.POST.get('aporte_id', '').strip()
                 if not aporte_id:
                     messages.error(request, 'Selecciona un tipo de aporte.')
                     return redirect(f"{request.path}?paso=3")
-                request.session[f'{SK}_aporte_id'] = int(aporte_id)
+                estado.actualizar(aporte_id=int(aporte_id))
             return redirect(f"{request.path}?paso=4")
 
         elif paso == 4:
@@ -2383,18 +2284,17 @@ def wizard_aporte(request):
             except Exception:
                 messages.error(request, 'Ingresa una nota válida entre 0 y 10.')
                 return redirect(f"{request.path}?paso=4")
-            request.session[f'{SK}_nota']         = str(nota_val)
-            request.session[f'{SK}_observaciones'] = observaciones
+            estado.actualizar(nota=str(nota_val), observaciones=observaciones)
             return redirect(f"{request.path}?paso=5")
 
         elif paso == 5:
-            clase_id      = request.session.get(f'{SK}_clase_id')
-            student_id    = request.session.get(f'{SK}_student_id')
-            quimestre     = request.session.get(f'{SK}_quimestre')
-            parcial       = request.session.get(f'{SK}_parcial')
-            aporte_id     = request.session.get(f'{SK}_aporte_id')
-            nota          = request.session.get(f'{SK}_nota')
-            observaciones = request.session.get(f'{SK}_observaciones', '')
+            clase_id      = estado.get('clase_id')
+            student_id    = estado.get('student_id')
+            quimestre     = estado.get('quimestre')
+            parcial       = estado.get('parcial')
+            aporte_id     = estado.get('aporte_id')
+            nota          = estado.get('nota')
+            observaciones = estado.get('observaciones', '')
             if not all([clase_id, student_id, quimestre, parcial, aporte_id, nota]):
                 messages.error(request, 'Sesión expirada. Empieza de nuevo.')
                 return redirect(f"{request.path}?paso=1")
@@ -2408,6 +2308,7 @@ def wizard_aporte(request):
                     parcial=parcial,
                     quimestre=quimestre,
                     tipo_aporte=tipo_aporte,
+                    ciclo_lectivo=clase.ciclo_lectivo,
                     defaults={
                         'calificacion': Decimal(nota),
                         'observaciones': observaciones,
@@ -2420,8 +2321,7 @@ def wizard_aporte(request):
             except Exception as e:
                 messages.error(request, f'Error al guardar: {e}')
                 return redirect(f"{request.path}?paso=5")
-            for k in ['clase_id','student_id','quimestre','parcial','aporte_id','nota','observaciones']:
-                request.session.pop(f'{SK}_{k}', None)
+            estado.limpiar()
             return redirect('teachers:calificaciones_detalladas')
 
     # ── GET: armar contexto por paso ──────────────────────────────────────
@@ -2433,7 +2333,7 @@ def wizard_aporte(request):
         ).select_related('subject', 'grade_level').order_by('subject__name')
 
     elif paso == 2:
-        clase_id = request.session.get(f'{SK}_clase_id')
+        clase_id = estado.get('clase_id')
         if not clase_id:
             return redirect(f"{request.path}?paso=1")
         clase = get_object_or_404(Clase, id=clase_id)
@@ -2458,55 +2358,61 @@ def wizard_aporte(request):
         })
 
     elif paso == 3:
-        if not request.session.get(f'{SK}_student_id'):
+        if not estado.get('student_id'):
             return redirect(f"{request.path}?paso=2")
-        clase_id   = request.session.get(f'{SK}_clase_id')
-        student_id = request.session.get(f'{SK}_student_id')
+        clase_id   = estado.get('clase_id')
+        student_id = estado.get('student_id')
         clase      = get_object_or_404(Clase, id=clase_id)
         student    = get_object_or_404(Student, id=student_id)
         ctx.update({
             'clase': clase,
             'student': student,
-            'quimestre': request.session.get(f'{SK}_quimestre'),
-            'parcial':   request.session.get(f'{SK}_parcial'),
+            'quimestre': estado.get('quimestre'),
+            'parcial':   estado.get('parcial'),
             'aportes':   TipoAporte.objects.filter(activo=True).order_by('orden','nombre'),
         })
 
     elif paso == 4:
-        if not request.session.get(f'{SK}_aporte_id'):
+        if not estado.get('aporte_id'):
             return redirect(f"{request.path}?paso=3")
-        tipo_aporte = get_object_or_404(TipoAporte, id=request.session[f'{SK}_aporte_id'])
-        student     = get_object_or_404(Student, id=request.session[f'{SK}_student_id'])
+        tipo_aporte = get_object_or_404(TipoAporte, id=estado['aporte_id'])
+        student     = get_object_or_404(Student, id=estado['student_id'])
         ctx.update({
             'tipo_aporte': tipo_aporte,
             'student': student,
-            'nota_actual': request.session.get(f'{SK}_nota', ''),
-            'observaciones': request.session.get(f'{SK}_observaciones', ''),
+            'nota_actual': estado.get('nota', ''),
+            'observaciones': estado.get('observaciones', ''),
         })
 
     elif paso == 5:
-        clase_id   = request.session.get(f'{SK}_clase_id')
-        student_id = request.session.get(f'{SK}_student_id')
-        aporte_id  = request.session.get(f'{SK}_aporte_id')
+        clase_id   = estado.get('clase_id')
+        student_id = estado.get('student_id')
+        aporte_id  = estado.get('aporte_id')
         if not all([clase_id, student_id, aporte_id]):
             return redirect(f"{request.path}?paso=1")
         ctx.update({
             'clase':        get_object_or_404(Clase, id=clase_id),
             'student':      get_object_or_404(Student, id=student_id),
             'tipo_aporte':  get_object_or_404(TipoAporte, id=aporte_id),
-            'quimestre':    request.session.get(f'{SK}_quimestre'),
-            'parcial':      request.session.get(f'{SK}_parcial'),
-            'nota':         request.session.get(f'{SK}_nota'),
-            'observaciones':request.session.get(f'{SK}_observaciones',''),
+            'quimestre':    estado.get('quimestre'),
+            'parcial':      estado.get('parcial'),
+            'nota':         estado.get('nota'),
+            'observaciones':estado.get('observaciones', ''),
             'quimestre_label': dict(CalificacionParcial.QUIMESTRE_CHOICES).get(
-                                   request.session.get(f'{SK}_quimestre',''), ''),
+                                   estado.get('quimestre', ''), ''),
             'parcial_label':   dict(CalificacionParcial.PARCIAL_CHOICES).get(
-                                   request.session.get(f'{SK}_parcial',''), ''),
+                                   estado.get('parcial', ''), ''),
         })
 
     return render(request, 'teachers/wizard_aporte.html', ctx)
 
 
+def _nota_rapida(valor):
+    """Nota de la carga rápida, acotada a 0-10 (Decimal inválido → excepción)."""
+    nota = Decimal(valor.strip())
+    return min(max(nota, Decimal('0')), Decimal('10'))
+
+
 # ============================================
 # WIZARD: PASAR NOTAS GLOBAL
 # ============================================
@@ -2516,7 +2422,7 @@ def wizard_aporte(request):
 def wizard_notas(request):
     """Wizard 4 pasos para ingresar notas a todos los estudiantes de una clase."""
     paso = int(request.GET.get('paso', 1))
-    SK = 'wiz_notas'
+    estado = EstadoWizard(request, 'wiz_notas')
     teacher = request.user.teacher_profile
     teacher_usuario = teacher.usuario
 
@@ -2527,7 +2433,7 @@ def wizard_notas(request):
                 messages.error(request, 'Selecciona una clase.')
                 return redirect(f"{request.path}?paso=1")
             clase = get_object_or_404(Clase, id=clase_id, docente_base=teacher_usuario)
-            request.session[f'{SK}_clase_id'] = clase.id
+            estado.actualizar(clase_id=clase.id)
             return redirect(f"{request.path}?paso=2")
 
         elif paso == 2:
@@ -2536,8 +2442,7 @@ def wizard_notas(request):
             if quimestre not in ('Q1', 'Q2') or parcial not in ('1P', '2P', '3P', '4P'):
                 messages.error(request, 'Selecciona quimestre y parcial válidos.')
                 return redirect(f"{request.path}?paso=2")
-            request.session[f'{SK}_quimestre'] = quimestre
-            request.session[f'{SK}_parcial']   = parcial
+            estado.actualizar(quimestre=quimestre, parcial=parcial)
             return redirect(f"{request.path}?paso=3")
 
         elif paso == 3:
@@ -2546,46 +2451,33 @@ def wizard_notas(request):
                 messages.error(request, 'Selecciona un tipo de aporte.')
                 return redirect(f"{request.path}?paso=3")
             get_object_or_404(TipoAporte, id=aporte_id, activo=True)
-            request.session[f'{SK}_aporte_id'] = int(aporte_id)
+            estado.actualizar(aporte_id=int(aporte_id))
             return redirect(f"{request.path}?paso=4")
 
         elif paso == 4:
-            clase_id   = request.session.get(f'{SK}_clase_id')
-            quimestre  = request.session.get(f'{SK}_quimestre')
-            parcial    = request.session.get(f'{SK}_parcial')
-            aporte_id  = request.session.get(f'{SK}_aporte_id')
+            clase_id   = estado.get('clase_id')
+            quimestre  = estado.get('quimestre')
+            parcial    = estado.get('parcial')
+            aporte_id  = estado.get('aporte_id')
             if not all([clase_id, quimestre, parcial, aporte_id]):
                 messages.error(request, 'Sesión expirada. Empieza de nuevo.')
                 return redirect(f"{request.path}?paso=1")
 
             clase      = get_object_or_404(Clase, id=clase_id)
             tipo_aporte = get_object_or_404(TipoAporte, id=aporte_id)
-            subject    = clase.subject
-            guardados  = 0
+            notas      = {}
             errores    = 0
 
             for key, valor in request.POST.items():
                 if key.startswith('nota_'):
                     try:
-                        student_id = int(key.split('_', 1)[1])
-                        nota = Decimal(valor.strip() or '0')
-                        if nota < 0: nota = Decimal('0')
-                        if nota > 10: nota = Decimal('10')
-                        student = get_object_or_404(Student, id=student_id)
-                        CalificacionParcial.objects.update_or_create(
-                            student=student,
-                            subject=subject,
-                            parcial=parcial,
-                            quimestre=quimestre,
-                            tipo_aporte=tipo_aporte,
-                            defaults={'calificacion': nota, 'registrado_por': teacher}
-                        )
-                        guardados += 1
+                        notas[int(key.split('_', 1)[1])] = _nota_rapida(valor or '0')
                     except Exception:
                         errores += 1
 
-            for k in ['clase_id', 'quimestre', 'parcial', 'aporte_id']:
-                request.session.pop(f'{SK}_{k}', None)
+            guardados = registrar_notas(clase, tipo_aporte, quimestre, parcial, notas, registrado_por=teacher)
+            errores += len(notas) - guardados
+            estado.limpiar()
 
             if errores:
                 messages.warning(request, f'{guardados} notas guardadas, {errores} con error.')
@@ -2602,7 +2494,7 @@ def wizard_notas(request):
         ).select_related('subject', 'grade_level').order_by('subject__name')
 
     elif paso == 2:
-        clase_id = request.session.get(f'{SK}_clase_id')
+        clase_id = estado.get('clase_id')
         if not clase_id:
             return redirect(f"{request.path}?paso=1")
         ctx['clase'] = get_object_or_404(Clase, id=clase_id)
@@ -2610,21 +2502,21 @@ def wizard_notas(request):
         ctx['parcial_choices']   = CalificacionParcial.PARCIAL_CHOICES
 
     elif paso == 3:
-        if not request.session.get(f'{SK}_quimestre'):
+        if not estado.get('quimestre'):
             return redirect(f"{request.path}?paso=2")
         ctx['aportes'] = TipoAporte.objects.filter(activo=True).order_by('orden', 'nombre')
-        ctx['quimestre'] = request.session.get(f'{SK}_quimestre')
-        ctx['parcial']   = request.session.get(f'{SK}_parcial')
+        ctx['quimestre'] = estado.get('quimestre')
+        ctx['parcial']   = estado.get('parcial')
 
     elif paso == 4:
-        clase_id  = request.session.get(f'{SK}_clase_id')
-        aporte_id = request.session.get(f'{SK}_aporte_id')
+        clase_id  = estado.get('clase_id')
+        aporte_id = estado.get('aporte_id')
         if not clase_id or not aporte_id:
             return redirect(f"{request.path}?paso=3")
         clase        = get_object_or_404(Clase, id=clase_id)
         tipo_aporte  = get_object_or_404(TipoAporte, id=aporte_id)
-        quimestre    = request.session.get(f'{SK}_quimestre')
-        parcial      = request.session.get(f'{SK}_parcial')
+        quimestre    = estado.get('quimestre')
+        parcial      = estado.get('parcial')
 
         enrollments = Enrollment.objects.filter(
             clase=clase, estado='ACTIVO'
@@ -2678,7 +2570,7 @@ def wizard_clase_diaria(request):
     4. Confirmar y guardar
     """
     paso = int(request.GET.get('paso', 1))
-    SK = 'wiz_clase'
+    estado = EstadoWizard(request, 'wiz_clase')
     teacher = request.user.teacher_profile
     teacher_usuario = teacher.usuario
     hoy = date.today()
@@ -2691,30 +2583,26 @@ def wizard_clase_diaria(request):
                 messages.error(request, 'Selecciona una clase.')
                 return redirect(f"{request.path}?paso=1")
             get_object_or_404(Clase, id=clase_id, docente_base=teacher_usuario)
-            request.session[f'{SK}_clase_id'] = int(clase_id)
-            request.session[f'{SK}_fecha'] = str(hoy)
+            estado.actualizar(clase_id=int(clase_id), fecha=str(hoy))
             return redirect(f"{request.path}?paso=2")
 
         elif paso == 2:
-            clase_id = request.session.get(f'{SK}_clase_id')
+            clase_id = estado.get('clase_id')
             if not clase_id:
                 return redirect(f"{request.path}?paso=1")
             clase = get_object_or_404(Clase, id=clase_id)
-            fecha_str = request.session.get(f'{SK}_fecha', str(hoy))
+            fecha_str = estado.get('fecha', str(hoy))
             fecha = date.fromisoformat(fecha_str)
 
-            enrollments = Enrollment.objects.filter(clase=clase, estado='ACTIVO')
-            for enr in enrollments:
-                estado = request.POST.get(f'asist_{enr.id}', 'Presente')
-                obs    = request.POST.get(f'obs_{enr.id}', '').strip()
-                if estado not in ('Presente', 'Ausente', 'Justificado'):
-                    estado = 'Presente'
-                Asistencia.objects.update_or_create(
-                    inscripcion=enr,
-                    fecha=fecha,
-                    defaults={'estado': estado, 'observacion': obs}
-                )
-            request.session[f'{SK}_asist_ok'] = True
+            estados = {}
+            for enr_id in Enrollment.objects.filter(clase=clase, estado='ACTIVO').values_list('id', flat=True):
+                valor = request.POST.get(f'asist_{enr_id}', 'Presente')
+                obs   = request.POST.get(f'obs_{enr_id}', '').strip()
+                if valor not in ('Presente', 'Ausente', 'Justificado'):
+                    valor = 'Presente'
+                estados[enr_id] = (valor, obs)
+            registrar_asistencia(clase, fecha, estados)
+            estado.actualizar(asist_ok=True)
             return redirect(f"{request.path}?paso=3")
 
         elif paso == 3:
@@ -2727,40 +2615,28 @@ def wizard_clase_diaria(request):
                 if not aporte_id or quimestre not in ('Q1','Q2') or parcial not in ('1P','2P','3P','4P'):
                     messages.error(request, 'Selecciona aporte, quimestre y parcial.')
                     return redirect(f"{request.path}?paso=3")
-                request.session[f'{SK}_aporte_id'] = int(aporte_id)
-                request.session[f'{SK}_quimestre'] = quimestre
-                request.session[f'{SK}_parcial']   = parcial
+                estado.actualizar(aporte_id=int(aporte_id), quimestre=quimestre, parcial=parcial)
 
                 # Guardar notas de cada estudiante
-                clase_id = request.session.get(f'{SK}_clase_id')
+                clase_id = estado.get('clase_id')
                 clase    = get_object_or_404(Clase, id=clase_id)
                 tipo_aporte = get_object_or_404(TipoAporte, id=aporte_id)
-                enrollments = Enrollment.objects.filter(
-                    clase=clase, estado='ACTIVO'
-                ).select_related('estudiante__student_profile')
-                for enr in enrollments:
-                    nota_str = request.POST.get(f'nota_{enr.id}', '').strip()
+                notas = {}
+                inscripciones = Enrollment.objects.filter(
+                    clase=clase, estado='ACTIVO', estudiante__student_profile__isnull=False,
+                ).values_list('id', 'estudiante__student_profile')
+                for enr_id, student_id in inscripciones:
+                    nota_str = request.POST.get(f'nota_{enr_id}', '').strip()
                     if nota_str:
                         try:
-                            nota = Decimal(nota_str)
-                            if nota < 0: nota = Decimal('0')
-                            if nota > 10: nota = Decimal('10')
-                            student = enr.estudiante.student_profile
-                            CalificacionParcial.objects.update_or_create(
-                                student=student,
-                                subject=clase.subject,
-                                parcial=parcial,
-                                quimestre=quimestre,
-                                tipo_aporte=tipo_aporte,
-                                defaults={'calificacion': nota, 'registrado_por': teacher}
-                            )
+                            notas[student_id] = _nota_rapida(nota_str)
                         except Exception:
                             pass
+                registrar_notas(clase, tipo_aporte, quimestre, parcial, notas, registrado_por=teacher)
             return redirect(f"{request.path}?paso=4")
 
         elif paso == 4:
-            for k in ['clase_id','fecha','asist_ok','aporte_id','quimestre','parcial']:
-                request.session.pop(f'{SK}_{k}', None)
+            estado.limpiar()
             messages.success(request, 'Clase del día registrada correctamente.')
             return redirect('teachers:teacher_dashboard')
 
@@ -2773,7 +2649,7 @@ def wizard_clase_diaria(request):
         ).select_related('subject', 'grade_level').order_by('subject__name')
 
     elif paso == 2:
-        clase_id = request.session.get(f'{SK}_clase_id')
+        clase_id = estado.get('clase_id')
         if not clase_id:
             return redirect(f"{request.path}?paso=1")
         clase = get_object_or_404(Clase, id=clase_id)
@@ -2781,7 +2657,7 @@ def wizard_clase_diaria(request):
             clase=clase, estado='ACTIVO'
         ).select_related('estudiante')
         # Asistencias previas del día
-        fecha = date.fromisoformat(request.session.get(f'{SK}_fecha', str(hoy)))
+        fecha = date.fromisoformat(estado.get('fecha', str(hoy)))
         asist_prev = {
             a.inscripcion_id: a
             for a in Asistencia.objects.filter(
@@ -2800,7 +2676,7 @@ def wizard_clase_diaria(request):
         ctx.update({'clase': clase, 'filas': filas, 'fecha': fecha})
 
     elif paso == 3:
-        clase_id = request.session.get(f'{SK}_clase_id')
+        clase_id = estado.get('clase_id')
         if not clase_id:
             return redirect(f"{request.path}?paso=1")
         clase = get_object_or_404(Clase, id=clase_id)
@@ -2808,7 +2684,7 @@ def wizard_clase_diaria(request):
             clase=clase, estado='ACTIVO'
         ).select_related('estudiante')
         # Contar asistencia ya registrada
-        fecha = date.fromisoformat(request.session.get(f'{SK}_fecha', str(hoy)))
+        fecha = date.fromisoformat(estado.get('fecha', str(hoy)))
         resumen_asist = Asistencia.objects.filter(
             inscripcion__clase=clase, fecha=fecha
         ).values('estado').annotate(total=Count('id'))
@@ -2822,10 +2698,10 @@ def wizard_clase_diaria(request):
         })
 
     elif paso == 4:
-        clase_id = request.session.get(f'{SK}_clase_id')
+        clase_id = estado.get('clase_id')
         if clase_id:
             clase = get_object_or_404(Clase, id=clase_id)
-            fecha = date.fromisoformat(request.session.get(f'{SK}_fecha', str(hoy)))
+            fecha = date.fromisoformat(estado.get('fecha', str(hoy)))
             resumen = Asistencia.objects.filter(
                 inscripcion__clase=clase, fecha=fecha
             ).values('estado').annotate(total=Count('id'))
@@ -2857,44 +2733,10 @@ def _anio_lectivo_actual():
     return f'{hoy.year}-{hoy.year + 1}' if hoy.month >= 8 else f'{hoy.year - 1}-{hoy.year}'
 
 
-def _calcular_estadisticas_anuales(teacher_usuario):
+def _calcular_estadisticas_anuales(teacher_usuario, anio_lectivo=None):
     """Estadísticas del año lectivo completo (Q1 + Q2) por asignatura del docente."""
-    clases = Clase.objects.filter(docente_base=teacher_usuario, active=True).select_related('subject')
-    estadisticas = []
-    for c in clases:
-        if not c.subject:
-            continue
-        enrollments_activos = list(c.enrollments.filter(estado='ACTIVO').select_related('estudiante'))
-        n_asignados = len(enrollments_activos)
-        n_retirados = c.enrollments.filter(estado='RETIRADO').count()
-        n_aprobados = 0
-        n_supletorio = 0
-        n_con_notas = 0
-        for enr in enrollments_activos:
-            student = getattr(enr.estudiante, 'student_profile', None) if enr.estudiante else None
-            if not student:
-                continue
-            prom_q1 = CalificacionParcial.calcular_promedio_quimestre(student, c.subject, 'Q1')
-            prom_q2 = CalificacionParcial.calcular_promedio_quimestre(student, c.subject, 'Q2')
-            promedios = [float(p) for p in (prom_q1, prom_q2) if p and p > 0]
-            if not promedios:
-                continue
-            n_con_notas += 1
-            promedio_anual = sum(promedios) / len(promedios)
-            if promedio_anual >= 7:
-                n_aprobados += 1
-            elif promedio_anual >= 4:
-                n_supletorio += 1
-        pct_avance = round(n_con_notas / n_asignados * 100) if n_asignados else 0
-        estadisticas.append({
-            'asignatura': c.subject.name,
-            'n_asignados': str(n_asignados),
-            'n_aprobados': str(n_aprobados),
-            'n_retirados': str(n_retirados),
-            'n_supletorio': str(n_supletorio),
-            'pct_avance': f'{pct_avance}%',
-        })
-    return estadisticas
+    from classes.estadisticas import estadisticas_anuales_docente
+    return estadisticas_anuales_docente(teacher_usuario, anio_lectivo or _anio_lectivo_actual())
 
 
 @login_required
@@ -2905,7 +2747,7 @@ def wizard_informe_final(request):
     1. Año lectivo y fechas  2. Director  3. Estadísticas  4. Narrativa  5. Exportar
     """
     paso = int(request.GET.get('paso', 1))
-    SK = _IF_SK
+    estado = EstadoWizard(request, _IF_SK)
     teacher = request.user.teacher_profile
     teacher_usuario = teacher.usuario
 
@@ -2919,10 +2761,10 @@ def wizard_informe_final(request):
             if not anio_lectivo or not fecha_informe:
                 messages.error(request, 'Ingresa el año lectivo y la fecha del informe.')
                 return redirect(f"{request.path}?paso=1")
-            request.session[f'{SK}_anio_lectivo'] = anio_lectivo
-            request.session[f'{SK}_fecha_informe'] = fecha_informe
-            request.session[f'{SK}_fecha_firma'] = fecha_firma
-            request.session[f'{SK}_fecha_aprobacion'] = fecha_aprobacion
+            estado.actualizar(
+                anio_lectivo=anio_lectivo, fecha_informe=fecha_informe,
+                fecha_firma=fecha_firma, fecha_aprobacion=fecha_aprobacion,
+            )
             return redirect(f"{request.path}?paso=2")
 
         elif paso == 2:
@@ -2934,11 +2776,10 @@ def wizard_informe_final(request):
             if not director_id or not director_nombre:
                 messages.error(request, 'Busca y selecciona un director de área.')
                 return redirect(f"{request.path}?paso=2")
-            request.session[f'{SK}_director_id'] = director_id
-            request.session[f'{SK}_director_nombre'] = director_nombre
-            request.session[f'{SK}_director_area'] = director_area
-            request.session[f'{SK}_director_telefono'] = director_telefono
-            request.session[f'{SK}_director_correo'] = director_correo
+            estado.actualizar(
+                director_id=director_id, director_nombre=director_nombre, director_area=director_area,
+                director_telefono=director_telefono, director_correo=director_correo,
+            )
             return redirect(f"{request.path}?paso=3")
 
         elif paso == 3:
@@ -2962,12 +2803,11 @@ def wizard_informe_final(request):
             if not estadisticas:
                 messages.error(request, 'Agrega al menos una asignatura.')
                 return redirect(f"{request.path}?paso=3")
-            request.session[f'{SK}_estadisticas'] = json.dumps(estadisticas)
+            estado.actualizar(estadisticas=estadisticas)
             return redirect(f"{request.path}?paso=4")
 
         elif paso == 4:
-            for field in _IF_NARRATIVE_FIELDS:
-                request.session[f'{SK}_{field}'] = request.POST.get(field, '').strip()
+            estado.actualizar(**{field: request.POST.get(field, '').strip() for field in _IF_NARRATIVE_FIELDS})
             return redirect(f"{request.path}?paso=5")
 
     # ── GET ──────────────────────────────────────────────────────────────────
@@ -2975,39 +2815,41 @@ def wizard_informe_final(request):
 
     if paso == 1:
         ctx['today'] = date.today().strftime('%Y-%m-%d')
-        ctx['anio_lectivo_sel'] = request.session.get(f'{SK}_anio_lectivo', '') or _anio_lectivo_actual()
-        ctx['fecha_informe_sel'] = request.session.get(f'{SK}_fecha_informe', '')
-        ctx['fecha_firma_sel'] = request.session.get(f'{SK}_fecha_firma', '')
-        ctx['fecha_aprobacion_sel'] = request.session.get(f'{SK}_fecha_aprobacion', '')
+        ctx['anio_lectivo_sel'] = estado.get('anio_lectivo', '') or _anio_lectivo_actual()
+        ctx['fecha_informe_sel'] = estado.get('fecha_informe', '')
+        ctx['fecha_firma_sel'] = estado.get('fecha_firma', '')
+        ctx['fecha_aprobacion_sel'] = estado.get('fecha_aprobacion', '')
 
     elif paso == 2:
-        ctx['director_id_sel'] = request.session.get(f'{SK}_director_id', '')
-        ctx['director_nombre_sel'] = request.session.get(f'{SK}_director_nombre', '')
-        ctx['director_area_sel'] = request.session.get(f'{SK}_director_area', '')
-        ctx['director_telefono_sel'] = request.session.get(f'{SK}_director_telefono', '')
-        ctx['director_correo_sel'] = request.session.get(f'{SK}_director_correo', '')
+        ctx['director_id_sel'] = estado.get('director_id', '')
+        ctx['director_nombre_sel'] = estado.get('director_nombre', '')
+        ctx['director_area_sel'] = estado.get('director_area', '')
+        ctx['director_telefono_sel'] = estado.get('director_telefono', '')
+        ctx['director_correo_sel'] = estado.get('director_correo', '')
 
     elif paso == 3:
-        saved = request.session.get(f'{SK}_estadisticas')
+        saved = estado.get('estadisticas')
         if saved:
-            ctx['estadisticas'] = json.loads(saved)
+            ctx['estadisticas'] = saved
         else:
-            ctx['estadisticas'] = _calcular_estadisticas_anuales(teacher_usuario)
+            ctx['estadisticas'] = _calcular_estadisticas_anuales(
+                teacher_usuario, estado.get('anio_lectivo'),
+            )
 
     elif paso == 4:
         for field in _IF_NARRATIVE_FIELDS:
-            ctx[field] = request.session.get(f'{SK}_{field}', '')
-        ctx['anio_lectivo'] = request.session.get(f'{SK}_anio_lectivo', '')
+            ctx[field] = estado.get(field, '')
+        ctx['anio_lectivo'] = estado.get('anio_lectivo', '')
         ctx['docente_nombre'] = teacher_usuario.nombre
-        ctx['estadisticas_json'] = request.session.get(f'{SK}_estadisticas', '[]')
+        ctx['estadisticas_json'] = json.dumps(estado.get('estadisticas', []))
 
     elif paso == 5:
         ctx['docente_nombre'] = teacher_usuario.nombre
-        ctx['anio_lectivo'] = request.session.get(f'{SK}_anio_lectivo', '')
-        ctx['fecha_informe'] = request.session.get(f'{SK}_fecha_informe', '')
-        ctx['director_nombre'] = request.session.get(f'{SK}_director_nombre', '')
-        ctx['estadisticas'] = json.loads(request.session.get(f'{SK}_estadisticas', '[]'))
-        ctx['antecedentes'] = request.session.get(f'{SK}_antecedentes', '')
+        ctx['anio_lectivo'] = estado.get('anio_lectivo', '')
+        ctx['fecha_informe'] = estado.get('fecha_informe', '')
+        ctx['director_nombre'] = estado.get('director_nombre', '')
+        ctx['estadisticas'] = estado.get('estadisticas', [])
+        ctx['antecedentes'] = estado.get('antecedentes', '')
 
     return render(request, 'teachers/wizard_informe_final.html', ctx)
 
@@ -3018,32 +2860,36 @@ def export_informe_final(request):
     """Genera y descarga el DOCX del informe final relleno con los datos de sesión."""
     from docxtpl import DocxTemplate
 
-    SK = _IF_SK
+    estado = EstadoWizard(request, _IF_SK)
     teacher = request.user.teacher_profile
     teacher_usuario = teacher.usuario
 
-    estadisticas = json.loads(request.session.get(f'{SK}_estadisticas', '[]'))
+    estadisticas = estado.get('estadisticas', [])
+    if not estadisticas:
+        estadisticas = _calcular_estadisticas_anuales(
+            teacher_usuario, estado.get('anio_lectivo'),
+        )
 
     context = {
-        'fecha_informe': request.session.get(f'{SK}_fecha_informe', ''),
+        'fecha_informe': estado.get('fecha_informe', ''),
         'docente_nombre': teacher_usuario.nombre or '',
         'docente_telefono': teacher_usuario.phone or '',
         'docente_correo': teacher_usuario.email or '',
-        'director_nombre': request.session.get(f'{SK}_director_nombre', ''),
-        'director_telefono': request.session.get(f'{SK}_director_telefono', ''),
-        'director_correo': request.session.get(f'{SK}_director_correo', ''),
-        'antecedentes': request.session.get(f'{SK}_antecedentes', ''),
-        'alcance': request.session.get(f'{SK}_alcance', ''),
-        'desarrollo': request.session.get(f'{SK}_desarrollo', ''),
-        'metodos': request.session.get(f'{SK}_metodos', ''),
-        'destrezas': request.session.get(f'{SK}_destrezas', ''),
-        'tematicas': request.session.get(f'{SK}_tematicas', ''),
-        'dificultades_pedagogicas': request.session.get(f'{SK}_dificultades_pedagogicas', ''),
-        'actividades_estrategias': request.session.get(f'{SK}_actividades_estrategias', ''),
-        'conclusiones': request.session.get(f'{SK}_conclusiones', ''),
-        'recomendaciones': request.session.get(f'{SK}_recomendaciones', ''),
-        'fecha_firma': request.session.get(f'{SK}_fecha_firma', ''),
-        'fecha_aprobacion': request.session.get(f'{SK}_fecha_aprobacion', ''),
+        'director_nombre': estado.get('director_nombre', ''),
+        'director_telefono': estado.get('director_telefono', ''),
+        'director_correo': estado.get('director_correo', ''),
+        'antecedentes': estado.get('antecedentes', ''),
+        'alcance': estado.get('alcance', ''),
+        'desarrollo': estado.get('desarrollo', ''),
+        'metodos': estado.get('metodos', ''),
+        'destrezas': estado.get('destrezas', ''),
+        'tematicas': estado.get('tematicas', ''),
+        'dificultades_pedagogicas': estado.get('dificultades_pedagogicas', ''),
+        'actividades_estrategias': estado.get('actividades_estrategias', ''),
+        'conclusiones': estado.get('conclusiones', ''),
+        'recomendaciones': estado.get('recomendaciones', ''),
+        'fecha_firma': estado.get('fecha_firma', ''),
+        'fecha_aprobacion': estado.get('fecha_aprobacion', ''),
         'estadisticas': estadisticas,
     }
 
@@ -3135,8 +2981,15 @@ import csv as csv_module
 
 @teacher_required
 def export_calificaciones_csv(request, clase_id):
+    """
+    Todas las notas de la clase en filas; con ?parcial=1P(&quimestre=Q1) exporta
+    la grilla del parcial (estudiantes × aportes + promedio ponderado).
+    """
     from classes.models import Clase, CalificacionParcial, Enrollment
     clase = get_object_or_404(Clase, pk=clase_id, docente_base=request.user.usuario)
+    parcial = request.GET.get('parcial')
+    if parcial:
+        return _export_grilla_csv(clase, request.GET.get('quimestre', 'Q1'), parcial)
     response = HttpResponse(content_type='text/csv; charset=utf-8')
     response['Content-Disposition'] = f'attachment; filename="calificaciones_{clase.id}.csv"'
     response.write('﻿')
@@ -3150,6 +3003,33 @@ def export_calificaciones_csv(request, clase_id):
     return response
 
 
+def _export_grilla_csv(clase, quimestre, parcial):
+    from students.models import Student
+    estudiantes = list(
+        Student.objects.filter(
+            usuario__enrollments_as_student__clase=clase,
+            usuario__enrollments_as_student__estado='ACTIVO',
+        ).select_related('usuario').order_by('usuario__nombre').distinct()
+    )
+    grilla = grilla_notas(
+        [s.id for s in estudiantes], clase.subject_id, quimestre, parcial, ciclo_lectivo=clase.ciclo_lectivo,
+    )
+    response = HttpResponse(content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = (
+        f'attachment; filename="calificaciones_{clase.id}_{quimestre}_{parcial}.csv"'
+    )
+    response.write('﻿')
+    writer = csv_module.writer(response)
+    writer.writerow(['Estudiante', *[t.nombre for t in grilla.tipos], 'Promedio'])
+    for s in estudiantes:
+        writer.writerow([
+            s.name,
+            *['' if nota is None else float(nota) for nota in grilla.celdas(s.id)],
+            float(grilla.promedio(s.id)),
+        ])
+    return response
+
+
 @teacher_required
 def export_asistencia_csv(request, clase_id):
     from classes.models import Clase, Asistencia, Enrollment
@@ -3199,51 +3079,96 @@ def boletin_pdf_view(request, student_id, quimestre='Q1'):
 
 # ─── MÓDULO 10: REPORTES DIRECTIVOS ──────────────────────────────────────────
 
+MAX_EN_RIESGO = 50
+
+
 @login_required
 def reportes_directivos_view(request):
-    from django.db.models import Avg, Count, Q
-    from classes.models import CalificacionParcial, Asistencia, Enrollment, Clase
-    from subjects.models import Subject
+    """
+    Reporte institucional sobre la capa materializada (PromedioCache y
+    EstadisticaAsistenciaClase): cubre todas las clases y materias con un
+    número fijo de consultas. Filtros: quimestre, grade_level y docente.
+    """
+    from django.db.models import Avg, Count, Exists, Max, OuterRef
+    from classes.models import Clase, EstadisticaAsistenciaClase, Enrollment, GradeLevel, PromedioCache
+    from users.models import Usuario
 
     quimestre = request.GET.get('quimestre', 'Q1')
+    grade_level_id = request.GET.get('grade_level') or None
+    docente_id = request.GET.get('docente') or None
+
+    clases = Clase.objects.filter(active=True)
+    if grade_level_id:
+        clases = clases.filter(grade_level_id=grade_level_id)
+    if docente_id:
+        clases = clases.filter(docente_base_id=docente_id)
+
+    # Promedios ponderados por estudiante/materia (tipo 'quimestre')
+    promedios = PromedioCache.objects.filter(tipo_promedio='quimestre', promedio__gt=0)
+    if grade_level_id or docente_id:
+        promedios = promedios.filter(Exists(
+            Enrollment.objects.filter(
+                estudiante=OuterRef('student__usuario'),
+                clase__subject=OuterRef('subject'),
+                clase__in=clases,
+            )
+        ))
 
     # Promedio por materia
     promedios_materia = (
-        CalificacionParcial.objects.filter(quimestre=quimestre)
+        promedios.filter(quimestre=quimestre)
         .values('subject__name')
-        .annotate(promedio=Avg('calificacion'), total=Count('id'))
-        .order_by('-promedio')[:10]
+        .annotate(promedio=Avg('promedio'), total=Count('id'))
+        .order_by('-promedio')
     )
 
     # Tasa de asistencia por clase
-    clases_stats = []
-    for clase in Clase.objects.filter(active=True).select_related('subject')[:15]:
-        total = Asistencia.objects.filter(inscripcion__clase=clase).count()
-        presentes = Asistencia.objects.filter(inscripcion__clase=clase, estado='PRESENTE').count()
-        tasa = round(presentes / total * 100, 1) if total else 0
-        clases_stats.append({'clase': clase.name, 'tasa': tasa, 'total': total})
-    clases_stats.sort(key=lambda x: x['tasa'])
-
-    # Estudiantes en riesgo (promedio < 7)
+    clases_stats = [
+        {'clase': e['clase__name'], 'tasa': float(e['tasa']), 'total': e['total']}
+        for e in (
+            EstadisticaAsistenciaClase.objects.filter(clase__in=clases)
+            .values('clase__name', 'tasa', 'total')
+            .order_by('tasa', 'clase__name')
+        )
+    ]
+
+    # Estudiantes en riesgo (promedio ponderado < 7): los MAX_EN_RIESGO más bajos
+    en_riesgo_qs = promedios.filter(quimestre=quimestre, promedio__lt=7)
+    total_en_riesgo = en_riesgo_qs.count()
     en_riesgo = (
-        CalificacionParcial.objects.filter(quimestre=quimestre)
-        .values('student__usuario__nombre', 'subject__name')
-        .annotate(promedio=Avg('calificacion'))
-        .filter(promedio__lt=7)
-        .order_by('promedio')[:20]
+        en_riesgo_qs
+        .values('student__usuario__nombre', 'subject__name', 'promedio')
+        .order_by('promedio', 'student__usuario__nombre')[:MAX_EN_RIESGO]
     )
 
     # Comparativa Q1 vs Q2
-    comparativa = (
-        CalificacionParcial.objects
-        .values('quimestre')
-        .annotate(promedio=Avg('calificacion'))
-    )
+    comparativa = promedios.values('quimestre').annotate(promedio=Avg('promedio'))
+
+    actualizado = EstadisticaAsistenciaClase.objects.aggregate(ultimo=Max('actualizado'))['ultimo']
+
+    # Estadísticas anuales del docente seleccionado (mismo cálculo del informe final)
+    estadisticas_docente = []
+    if docente_id:
+        docente = Usuario.objects.filter(pk=docente_id, rol=Usuario.Rol.DOCENTE).first()
+        if docente:
+            estadisticas_docente = _calcular_estadisticas_anuales(docente)
 
     return render(request, 'teachers/reportes_directivos.html', {
-        'promedios_materia': list(promedios_materia),
+        'promedios_materia': [
+            {'subject__name': p['subject__name'], 'promedio': float(p['promedio'] or 0), 'total': p['total']}
+            for p in promedios_materia
+        ],
         'clases_stats': clases_stats,
         'en_riesgo': list(en_riesgo),
+        'total_en_riesgo': total_en_riesgo,
         'comparativa': {c['quimestre']: float(c['promedio'] or 0) for c in comparativa},
         'quimestre': quimestre,
+        'grade_levels': GradeLevel.objects.all(),
+        'docentes': Usuario.objects.filter(
+            rol=Usuario.Rol.DOCENTE, clases_como_docente_base__active=True,
+        ).distinct().order_by('nombre'),
+        'grade_level_sel': grade_level_id or '',
+        'docente_sel': docente_id or '',
+        'actualizado': actualizado,
+        'estadisticas_docente': estadisticas_docente,
     })
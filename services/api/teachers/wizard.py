@@ -0,0 +1,56 @@
+"""
+Estado de los wizards del docente en una sola clave de sesión.
+
+Cada wizard guarda un dict compacto {'d': {...datos...}, 'exp': timestamp}
+bajo su nombre ('wiz_aporte', 'wiz_notas', ...), en lugar de una clave por
+campo. Un paso del wizard lee la sesión una vez y, si cambia algo, reescribe
+solo esa clave; con SESSION_BACKEND=cache (config/settings.py) eso no genera
+escrituras en la base de datos.
+
+Los datos caducan a las `ttl` segundos desde la última actualización, aunque
+la sesión siga viva: un wizard abandonado vuelve a empezar desde el paso 1.
+
+    estado = EstadoWizard(request, 'wiz_notas')
+    estado.actualizar(quimestre='Q1', parcial='1P')
+    estado.get('quimestre')
+    estado.limpiar()
+"""
+import time
+
+TTL_WIZARD = 2 * 60 * 60
+
+
+class EstadoWizard:
+    def __init__(self, request, nombre, ttl=TTL_WIZARD):
+        self.session = request.session
+        self.nombre = nombre
+        self.ttl = ttl
+        guardado = self.session.get(nombre)
+        if guardado and guardado.get('exp', 0) > time.time():
+            self.datos = guardado['d']
+        else:
+            self.datos = {}
+            if guardado is not None:
+                self.session.pop(nombre, None)
+
+    def get(self, campo, default=None):
+        return self.datos.get(campo, default)
+
+    def __getitem__(self, campo):
+        return self.datos[campo]
+
+    def __contains__(self, campo):
+        return campo in self.datos
+
+    def actualizar(self, **valores):
+        """Fusiona `valores` (serializables en JSON) y renueva el TTL."""
+        self.datos.update(valores)
+        self.session[self.nombre] = {'d': self.datos, 'exp': int(time.time()) + self.ttl}
+
+    def limpiar(self):
+        """Termina el wizard; borra también las claves sueltas del formato anterior."""
+        self.datos = {}
+        self.session.pop(self.nombre, None)
+        prefijo = f'{self.nombre}_'
+        for clave in [c for c in self.session.keys() if c.startswith(prefijo)]:
+            del self.session[clave]
@@ -4,12 +4,16 @@ from .models import Notificacion
 def notificaciones(request):
     if not request.user.is_authenticated:
         return {'notificaciones_no_leidas': 0, 'notificaciones_recientes': []}
-    try:
-        usuario = request.user.usuario
-    except Exception:
-        return {'notificaciones_no_leidas': 0, 'notificaciones_recientes': []}
-    qs = Notificacion.objects.filter(usuario=usuario, leida=False)
+    # AttachUsuarioProfilesMiddleware ya cargó request.usuario
+    usuario = getattr(request, 'usuario', None)
+    if usuario is None:
+        try:
+            usuario = request.user.usuario
+        except Exception:
+            return {'notificaciones_no_leidas': 0, 'notificaciones_recientes': []}
     return {
-        'notificaciones_no_leidas': qs.count(),
-        'notificaciones_recientes': qs[:5],
+        # Contador cacheado (invalidado al crear/leer notificaciones)
+        'notificaciones_no_leidas': Notificacion.contar_no_leidas(usuario.pk),
+        # QuerySet sin evaluar: solo consulta si la plantilla lo recorre
+        'notificaciones_recientes': Notificacion.objects.filter(usuario=usuario, leida=False)[:5],
     }
@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
 
@@ -95,6 +96,39 @@ class Notificacion(models.Model):
     def __str__(self):
         return f"{self.titulo} → {self.usuario.nombre}"
 
+    # Contador de no leídas cacheado por usuario: el context processor lo lee
+    # en cada render sin tocar la base de datos.
+    NO_LEIDAS_TTL = 60 * 60
+
+    @staticmethod
+    def clave_no_leidas(usuario_id):
+        return f'notificaciones_no_leidas:{usuario_id}'
+
+    @classmethod
+    def contar_no_leidas(cls, usuario_id):
+        clave = cls.clave_no_leidas(usuario_id)
+        total = cache.get(clave)
+        if total is None:
+            total = cls.objects.filter(usuario_id=usuario_id, leida=False).count()
+            cache.set(clave, total, cls.NO_LEIDAS_TTL)
+        return total
+
+    @classmethod
+    def marcar_leidas(cls, usuario_id, ids=None):
+        """Marca como leídas todas (o solo `ids`) las notificaciones del usuario en un UPDATE."""
+        qs = cls.objects.filter(usuario_id=usuario_id, leida=False)
+        if ids is not None:
+            qs = qs.filter(pk__in=ids)
+        actualizadas = qs.update(leida=True)
+        cache.delete(cls.clave_no_leidas(usuario_id))
+        return actualizadas
+
+
+@receiver(post_save, sender=Notificacion)
+@receiver(post_delete, sender=Notificacion)
+def invalidar_notificaciones_no_leidas(sender, instance, **kwargs):
+    cache.delete(Notificacion.clave_no_leidas(instance.usuario_id))
+
 
 @receiver(post_save, sender=User)
 def create_or_update_user_profile(sender, instance, created, **kwargs):
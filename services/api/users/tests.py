@@ -390,3 +390,35 @@ class TestClassSignalWhatsApp:
                 calificacion=8
             )
         assert entrega.pk is not None
+
+
+@pytest.mark.django_db
+class TestNotificacionesNoLeidas:
+    """Contador cacheado de notificaciones no leídas."""
+
+    def setup_method(self):
+        from django.core.cache import cache
+        cache.clear()
+
+    def test_contador_se_invalida_al_crear(self):
+        from users.models import Notificacion
+        usuario = UsuarioFactory()
+        assert Notificacion.contar_no_leidas(usuario.pk) == 0
+        Notificacion.objects.create(usuario=usuario, titulo='A', mensaje='m')
+        assert Notificacion.contar_no_leidas(usuario.pk) == 1
+
+    def test_contador_cacheado_no_consulta(self, django_assert_num_queries):
+        from users.models import Notificacion
+        usuario = UsuarioFactory()
+        Notificacion.objects.create(usuario=usuario, titulo='A', mensaje='m')
+        Notificacion.contar_no_leidas(usuario.pk)
+        with django_assert_num_queries(0):
+            assert Notificacion.contar_no_leidas(usuario.pk) == 1
+
+    def test_marcar_leidas_en_bloque(self):
+        from users.models import Notificacion
+        usuario = UsuarioFactory()
+        n1, n2, _ = [Notificacion.objects.create(usuario=usuario, titulo=t, mensaje='m') for t in 'ABC']
+        assert Notificacion.contar_no_leidas(usuario.pk) == 3
+        assert Notificacion.marcar_leidas(usuario.pk, ids=[n1.pk, n2.pk]) == 2
+        assert Notificacion.contar_no_leidas(usuario.pk) == 1
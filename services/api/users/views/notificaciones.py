@@ -12,7 +12,7 @@ def notificaciones_view(request):
     except Exception:
         return render(request, 'users/notificaciones.html', {'notificaciones': []})
     notificaciones = Notificacion.objects.filter(usuario=usuario).order_by('-fecha')[:50]
-    Notificacion.objects.filter(usuario=usuario, leida=False).update(leida=True)
+    Notificacion.marcar_leidas(usuario.pk)
     return render(request, 'users/notificaciones.html', {'notificaciones': notificaciones})
 
 
@@ -24,17 +24,23 @@ def marcar_leida_view(request, pk):
     except Exception:
         return JsonResponse({'ok': False}, status=403)
     n = get_object_or_404(Notificacion, pk=pk, usuario=usuario)
-    n.leida = True
-    n.save()
-    return JsonResponse({'ok': True})
+    if not n.leida:
+        Notificacion.marcar_leidas(usuario.pk, ids=[n.pk])
+    return JsonResponse({'ok': True, 'no_leidas': Notificacion.contar_no_leidas(usuario.pk)})
 
 
 @login_required
 @require_POST
 def marcar_todas_leidas_view(request):
+    """Marca en bloque las notificaciones indicadas en `ids` (o todas si no se envían)."""
     try:
         usuario = request.user.usuario
     except Exception:
         return JsonResponse({'ok': False}, status=403)
-    Notificacion.objects.filter(usuario=usuario, leida=False).update(leida=True)
-    return JsonResponse({'ok': True})
+    ids = request.POST.getlist('ids')
+    try:
+        ids = [int(i) for i in ids] or None
+    except ValueError:
+        return JsonResponse({'ok': False, 'error': 'ids inválidos'}, status=400)
+    marcadas = Notificacion.marcar_leidas(usuario.pk, ids=ids)
+    return JsonResponse({'ok': True, 'marcadas': marcadas, 'no_leidas': Notificacion.contar_no_leidas(usuario.pk)})
@@ -0,0 +1,259 @@
+"""
+Utilidades compartidas para la API REST (DRF).
+
+- PaginacionCursor: paginación por cursor para todos los listados
+  (configurada en REST_FRAMEWORK['DEFAULT_PAGINATION_CLASS']).
+- ConsultaOptimizadaMixin: proyección `?fields=a,b` (serializer + .only()) y
+  select_related / prefetch_related deducidos del serializer.
+- SincronizacionMixin: GET condicional (ETag / Last-Modified → 304) y
+  sincronización incremental `?since=<cursor>` con tombstones.
+"""
+import hashlib
+from datetime import timedelta
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date, quote_etag
+from rest_framework import serializers, status
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+
+class PaginacionCursor(CursorPagination):
+    """
+    Cursor estable sobre la clave primaria (o `cursor_ordering` de la vista).
+    `?page_size=` permite al cliente móvil pedir páginas más grandes.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = '-pk'
+
+    def get_ordering(self, request, queryset, view):
+        ordering = getattr(view, 'cursor_ordering', None)
+        if ordering:
+            return (ordering,) if isinstance(ordering, str) else tuple(ordering)
+        return super().get_ordering(request, queryset, view)
+
+
+def _campo_modelo(model, nombre):
+    try:
+        return model._meta.get_field(nombre)
+    except FieldDoesNotExist:
+        return None
+
+
+def relaciones_serializer(serializer, model, prefijo=''):
+    """
+    Recorre los campos del serializer y devuelve (select_related, prefetch_related)
+    necesarios para serializar `model` sin consultas por fila.
+    """
+    select, prefetch = set(), set()
+    for campo in serializer.fields.values():
+        if campo.write_only or campo.source == '*':
+            continue
+        anidado = campo.child if isinstance(campo, serializers.ListSerializer) else campo
+        actual, ruta, es_muchos = model, [], isinstance(campo, serializers.ManyRelatedField)
+        for parte in campo.source.split('.'):
+            f = _campo_modelo(actual, parte)
+            if f is None or not f.is_relation:
+                break
+            ruta.append(parte)
+            actual = f.related_model
+            if f.many_to_many or f.one_to_many:
+                es_muchos = True
+                break
+        if not ruta:
+            continue
+        camino = prefijo + '__'.join(ruta)
+        # Un PK simple de una FK se lee de <campo>_id, sin join
+        solo_pk = (
+            isinstance(campo, serializers.PrimaryKeyRelatedField)
+            and len(ruta) == 1 and not es_muchos
+        )
+        if solo_pk:
+            continue
+        if es_muchos:
+            prefetch.add(camino)
+        else:
+            select.add(camino)
+            if isinstance(anidado, serializers.BaseSerializer) and len(ruta) == len(campo.source.split('.')):
+                sub_select, sub_prefetch = relaciones_serializer(anidado, actual, camino + '__')
+                select |= sub_select
+                prefetch |= sub_prefetch
+    # select_related('a__b') ya incluye 'a'
+    select = {s for s in select if not any(o.startswith(s + '__') for o in select)}
+    return select, prefetch
+
+
+def columnas_proyeccion(serializer, model):
+    """
+    Columnas para .only() si todos los campos del serializer son columnas o FKs
+    del modelo; None si alguno depende de propiedades o métodos.
+    """
+    columnas = {model._meta.pk.name}
+    for campo in serializer.fields.values():
+        if campo.write_only:
+            continue
+        if campo.source == '*':
+            return None
+        raiz = campo.source.split('.')[0]
+        f = _campo_modelo(model, raiz)
+        if f is not None and f.many_to_many:
+            continue
+        if f is None or not f.concrete:
+            return None
+        columnas.add(f.name)
+    return columnas
+
+
+class ConsultaOptimizadaMixin:
+    """
+    Mixin para ViewSets:
+
+    - `?fields=id,nombre` limita los campos serializados (solo GET) y, cuando es
+      posible, la consulta con .only().
+    - Añade select_related / prefetch_related según el serializer efectivo.
+    """
+    campos_param = 'fields'
+
+    def _campos_solicitados(self):
+        request = getattr(self, 'request', None)
+        if request is None or request.method not in ('GET', 'HEAD'):
+            return None
+        valor = request.query_params.get(self.campos_param)
+        if not valor:
+            return None
+        return {c.strip() for c in valor.split(',') if c.strip()}
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        campos = self._campos_solicitados()
+        if campos:
+            destino = serializer.child if isinstance(serializer, serializers.ListSerializer) else serializer
+            for nombre in list(destino.fields):
+                if nombre not in campos:
+                    destino.fields.pop(nombre)
+        return serializer
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        serializer = self.get_serializer()
+        model = queryset.model
+        select, prefetch = relaciones_serializer(serializer, model)
+        if self._campos_solicitados():
+            columnas = columnas_proyeccion(serializer, model)
+            if columnas is not None:
+                # Las relaciones recorridas por select_related no pueden diferirse
+                select_previo = queryset.query.select_related
+                if isinstance(select_previo, dict):
+                    queryset = queryset.select_related(None)
+                columnas |= {s.split('__')[0] for s in select}
+                queryset = queryset.only(*columnas)
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
+
+
+# ── GET condicional y sincronización incremental ─────────────────────────────
+
+def firma_etag(*partes):
+    return quote_etag(hashlib.md5('|'.join(str(p) for p in partes).encode()).hexdigest())
+
+
+def respuesta_condicional(request, etag, ultimo=None):
+    """
+    304 Not Modified si If-None-Match / If-Modified-Since coinciden; None si hay
+    que construir la respuesta completa.
+    """
+    last_modified = int(ultimo.timestamp()) if ultimo else None
+    return get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+
+def marcar_cabeceras(response, etag, ultimo=None):
+    response['ETag'] = etag
+    if ultimo:
+        response['Last-Modified'] = http_date(ultimo.timestamp())
+    return response
+
+
+class SincronizacionMixin:
+    """
+    Mixin para ViewSets cuyo modelo tiene un timestamp `auto_now`
+    (`campo_actualizacion`) y registra borrados en classes.RegistroEliminado.
+
+    - list() responde 304 sin serializar si el queryset filtrado no cambió
+      (firma: máximo timestamp + número de filas + último borrado).
+    - `?since=<cursor>` devuelve solo filas modificadas y los ids borrados
+      desde el cursor (menos `solape_since`, para no perder escrituras que
+      se confirmaron después de emitir el cursor), más el cursor siguiente.
+    - Los borrados se filtran con ambito_eliminados(), el equivalente de los
+      filtros del listado sobre RegistroEliminado.ambito.
+    """
+    campo_actualizacion = 'fecha_actualizacion'
+    solape_since = timedelta(seconds=30)
+
+    def firma_extra(self, queryset):
+        """Valores adicionales que invalidan el ETag (p. ej. relaciones anotadas)."""
+        return ()
+
+    def ambito_eliminados(self):
+        """
+        Ids (lista o subconsulta) de RegistroEliminado.ambito visibles con los
+        filtros de la petición, o None si el listado no está acotado.
+        """
+        return None
+
+    def _eliminados(self):
+        from classes.models import RegistroEliminado
+        eliminados = RegistroEliminado.objects.filter(modelo=self.get_queryset().model._meta.label)
+        ambito = self.ambito_eliminados()
+        if ambito is not None:
+            eliminados = eliminados.filter(ambito__in=ambito)
+        return eliminados
+
+    def list(self, request, *args, **kwargs):
+        since = request.query_params.get('since')
+        if since is not None:
+            return self.sincronizar(request, since)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        resumen = queryset.order_by().aggregate(ultimo=Max(self.campo_actualizacion), total=Count('pk'))
+        ultimo_borrado = self._eliminados().aggregate(ultimo=Max('eliminado'))['ultimo']
+        ultimo = max(filter(None, (resumen['ultimo'], ultimo_borrado)), default=None)
+        etag = firma_etag(
+            request.get_full_path(), request.user.pk, resumen['ultimo'], resumen['total'],
+            ultimo_borrado, *self.firma_extra(queryset),
+        )
+        no_modificado = respuesta_condicional(request, etag, ultimo)
+        if no_modificado is not None:
+            return no_modificado
+        return marcar_cabeceras(super().list(request, *args, **kwargs), etag, ultimo)
+
+    def sincronizar(self, request, since):
+        from classes.models import RegistroEliminado
+
+        desde = parse_datetime(since)
+        if desde is None:
+            return Response({'detail': 'Cursor `since` inválido.'}, status=status.HTTP_400_BAD_REQUEST)
+        if timezone.is_naive(desde):
+            desde = timezone.make_aware(desde)
+        # Cursor anterior a la retención de tombstones: el cliente debe resincronizar todo
+        if desde < timezone.now() - timedelta(days=RegistroEliminado.RETENCION_DIAS):
+            return Response({'detail': 'Cursor expirado; sincronice desde cero.'}, status=status.HTTP_410_GONE)
+
+        cursor = timezone.now()
+        desde -= self.solape_since
+        queryset = self.filter_queryset(self.get_queryset())
+        cambios = queryset.filter(**{f'{self.campo_actualizacion}__gt': desde}).order_by(self.campo_actualizacion)
+        eliminados = self._eliminados().filter(eliminado__gt=desde).values_list('objeto_id', flat=True)
+        return Response({
+            'cambios': self.get_serializer(cambios, many=True).data,
+            'eliminados': list(eliminados),
+            'cursor': cursor.isoformat(),
+        })
@@ -0,0 +1,103 @@
+"""
+Espacios de nombres versionados sobre la caché de Django (Redis en producción,
+LocMem en pruebas; ver CACHES en config/settings.py).
+
+- Dominios (DOMINIOS): cada uno tiene un contador de versión que forma parte
+  de la clave. invalidar_dominio() lo incrementa y todas las claves del
+  dominio quedan obsoletas a la vez, sin recorrer ni borrar claves.
+- Etiquetas ('estudiante:42', ...): mismo mecanismo con granularidad fina;
+  una entrada puede depender de varias etiquetas además de su dominio.
+- INVALIDACIONES: modelos cuyo post_save / post_delete invalida dominios
+  (catálogos, malla). Las señales se conectan en ClassesConfig.ready().
+
+Las versiones nuevas se inicializan con la hora en nanosegundos: si Redis
+desaloja un contador, la versión siguiente nunca coincide con una anterior.
+"""
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.db.models.signals import post_delete, post_save
+
+DOMINIOS = ('calificaciones', 'dashboards', 'malla', 'catalogos', 'horarios')
+
+# modelo → dominios que invalida al guardarse o eliminarse
+INVALIDACIONES = {
+    'subjects.Subject': ('catalogos', 'malla', 'horarios'),
+    'classes.GradeLevel': ('catalogos', 'malla'),
+    'classes.MallaCurricular': ('malla',),
+    'classes.Clase': ('catalogos', 'dashboards', 'horarios'),
+    # Grillas semanales de docentes y estudiantes (classes/horarios.py)
+    'classes.Horario': ('horarios',),
+    'classes.Enrollment': ('horarios',),
+    'academia.Horario': ('horarios',),
+    # El peso de un aporte cambia todos los promedios ponderados
+    'classes.TipoAporte': ('catalogos', 'calificaciones'),
+}
+
+
+def _clave_version(nombre):
+    return f'ns:{nombre}'
+
+
+def versiones(*nombres):
+    """{nombre: versión} de dominios y etiquetas, en una sola lectura."""
+    claves = {_clave_version(n): n for n in nombres}
+    encontradas = cache.get_many(list(claves))
+    resultado = {}
+    for clave, nombre in claves.items():
+        version = encontradas.get(clave)
+        if version is None:
+            cache.add(clave, time.time_ns(), None)
+            version = cache.get(clave)
+        resultado[nombre] = version
+    return resultado
+
+
+def clave(dominio, *partes, etiquetas=()):
+    """Clave versionada: cambia al invalidar el dominio o cualquiera de las etiquetas."""
+    if dominio not in DOMINIOS:
+        raise ValueError(f'Dominio de caché desconocido: {dominio!r}')
+    vers = versiones(dominio, *etiquetas)
+    firma = '.'.join(str(vers[n]) for n in (dominio, *etiquetas))
+    if etiquetas:
+        firma = hashlib.md5(firma.encode()).hexdigest()[:12]
+    return ':'.join([dominio, *(str(p) for p in partes), f'v{firma}'])
+
+
+def obtener(dominio, partes, calcular, timeout=DEFAULT_TIMEOUT, etiquetas=()):
+    """Valor cacheado de `calcular()` bajo clave(dominio, *partes, etiquetas=...)."""
+    k = clave(dominio, *partes, etiquetas=etiquetas)
+    valor = cache.get(k)
+    if valor is None:
+        valor = calcular()
+        cache.set(k, valor, timeout)
+    return valor
+
+
+def _incrementar(*nombres):
+    for nombre in nombres:
+        try:
+            cache.incr(_clave_version(nombre))
+        except ValueError:
+            # Contador desalojado o inexistente: cualquier versión nueva sirve
+            cache.add(_clave_version(nombre), time.time_ns(), None)
+
+
+def invalidar_dominio(*dominios):
+    _incrementar(*dominios)
+
+
+def invalidar_etiquetas(*etiquetas):
+    _incrementar(*etiquetas)
+
+
+def _invalidar_por_modelo(sender, **kwargs):
+    invalidar_dominio(*INVALIDACIONES[sender._meta.label])
+
+
+def conectar_invalidaciones():
+    for etiqueta in INVALIDACIONES:
+        for senal in (post_save, post_delete):
+            senal.connect(_invalidar_por_modelo, sender=etiqueta, dispatch_uid=f'cache_dominio:{etiqueta}')
@@ -0,0 +1,103 @@
+"""
+Limpieza y validación vectorizada de columnas de datos personales.
+
+Cada función recibe una columna completa (pd.Series o cualquier iterable) y
+devuelve otra Series alineada con el mismo índice: las de limpieza devuelven
+texto ('' = vacío) y las de validación una máscara booleana. Las celdas
+vacías o NaN se tratan como ''. No depende de Django, así que la usan tanto
+la importación de setup/importar.py como los scripts de tools/ y
+data/archivos_formularios/.
+
+    cedulas = limpieza.cedula(df['cedula'])
+    malas = limpieza.invalidos(cedulas, limpieza.cedula_valida(cedulas))
+    df.loc[malas, ...]
+"""
+import numpy as np
+import pandas as pd
+
+PATRON_EMAIL = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
+PATRON_CELULAR_EC = r'09\d{8}'
+
+# Coeficientes del módulo 10 de la cédula ecuatoriana
+_COEFICIENTES = np.array([2, 1, 2, 1, 2, 1, 2, 1, 2], dtype=np.int16)
+
+
+def _serie(valores) -> pd.Series:
+    serie = valores if isinstance(valores, pd.Series) else pd.Series(list(valores), dtype=object)
+    return serie.astype(object).where(serie.notna(), '').astype(str)
+
+
+def texto(valores, titulo: bool = False, mayusculas: bool = False) -> pd.Series:
+    """Texto sin espacios al borde ni repetidos; opcionalmente en Título o MAYÚSCULAS."""
+    serie = _serie(valores).str.strip().str.replace(r'\s+', ' ', regex=True)
+    serie = serie.mask(serie.str.lower() == 'nan', '')
+    if titulo:
+        serie = serie.str.title()
+    if mayusculas:
+        serie = serie.str.upper()
+    return serie
+
+
+def sin_tildes(valores) -> pd.Series:
+    return _serie(valores).str.normalize('NFKD').str.encode('ascii', 'ignore').str.decode('ascii')
+
+
+def email(valores) -> pd.Series:
+    """Email en minúsculas y sin espacios."""
+    return texto(valores).str.lower().str.replace(' ', '', regex=False)
+
+
+def cedula(valores) -> pd.Series:
+    """
+    Cédula sin separadores. Deshace lo que hace Excel con una cédula guardada
+    como número: quita el '.0' final y repone el cero inicial de las
+    provincias 01-09.
+    """
+    serie = texto(valores).str.replace(r'\.0$', '', regex=True).str.replace(r'[\s.\-]', '', regex=True)
+    return serie.mask(serie.str.fullmatch(r'\d{9}'), '0' + serie)
+
+
+def celular(valores) -> pd.Series:
+    """Solo dígitos; un celular de 9 dígitos que empieza en 9 recupera el 0 inicial."""
+    serie = texto(valores).str.replace(r'\.0$', '', regex=True).str.replace(r'\D', '', regex=True)
+    return serie.mask(serie.str.fullmatch(r'9\d{8}'), '0' + serie)
+
+
+def username(valores, dominio: str = None) -> pd.Series:
+    """'Pérez López Ana' → 'perez.lopez.ana' (o 'perez.lopez.ana@dominio')."""
+    serie = sin_tildes(texto(valores).str.lower()).str.replace(r'[^a-z\s]', '', regex=True)
+    serie = serie.str.strip().str.replace(r'\s+', '.', regex=True)
+    if dominio:
+        serie = serie.mask(serie != '', serie + f'@{dominio}')
+    return serie
+
+
+def email_valido(valores) -> pd.Series:
+    return _serie(valores).str.fullmatch(PATRON_EMAIL)
+
+
+def celular_valido(valores) -> pd.Series:
+    return _serie(valores).str.fullmatch(PATRON_CELULAR_EC)
+
+
+def cedula_valida(valores) -> pd.Series:
+    """
+    Cédulas ecuatorianas de 10 dígitos con dígito verificador correcto
+    (módulo 10 con coeficientes 2-1-2-1..., calculado para toda la columna
+    con NumPy).
+    """
+    serie = _serie(valores)
+    mascara = serie.str.fullmatch(r'[0-9]{10}').to_numpy(dtype=bool)
+    if mascara.any():
+        digitos = (np.frombuffer(''.join(serie[mascara]).encode('ascii'), dtype=np.uint8)
+                   .reshape(-1, 10).astype(np.int16) - ord('0'))
+        productos = digitos[:, :9] * _COEFICIENTES
+        productos -= np.where(productos > 9, 9, 0)
+        verificador = (10 - productos.sum(axis=1) % 10) % 10
+        mascara[mascara] = verificador == digitos[:, 9]
+    return pd.Series(mascara, index=serie.index)
+
+
+def invalidos(limpios: pd.Series, validos: pd.Series) -> pd.Series:
+    """Filas con valor informado que no pasa la validación."""
+    return (limpios != '') & ~validos
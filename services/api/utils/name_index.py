@@ -0,0 +1,169 @@
+"""
+Shared person-name index for ETL and import paths.
+
+NameIndex resolves free-text names (any word order, with or without accents,
+particles or missing middle names) against a known set of people in
+O(tokens) per lookup instead of scanning every candidate:
+
+  1. exact:  order-insensitive key built on norm_key (particles dropped)
+  2. subset: inverted token index; all query tokens present in a candidate,
+             or all candidate tokens present in the query
+  3. fuzzy:  trigram index narrows to at most `max_candidates`, scored with
+             difflib's ratio; only accepted above `fuzzy_threshold` and with
+             a clear margin over the runner-up
+
+Several equally good candidates are reported as ambiguous (value None and
+the candidates listed) rather than resolved to an arbitrary first hit.
+Get-or-create paths should pass fuzzy=False, subset=False so that similar
+or partial names of different people (e.g. a sibling sharing both surnames)
+are never merged.
+"""
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from difflib import SequenceMatcher
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from utils.etl_normalization import norm_key
+
+_PARTICLES = {'de', 'del', 'la', 'las', 'los', 'y'}
+_FUZZY_MARGIN = 0.03
+
+
+def name_tokens(name: Any) -> Tuple[str, ...]:
+    """Normalized name tokens: accent/case-insensitive, punctuation and particles removed."""
+    words = re.sub(r"[^\w\s]", ' ', norm_key(name)).split()
+    tokens = [w for w in words if w not in _PARTICLES]
+    return tuple(tokens or words)
+
+
+def name_key(name: Any) -> str:
+    """Order-insensitive exact key ('Pérez Ana' and 'ana perez' share it)."""
+    return ' '.join(sorted(name_tokens(name)))
+
+
+def _trigrams(key: str) -> Set[str]:
+    padded = f'  {key} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass
+class NameMatch:
+    value: Any = None
+    method: Optional[str] = None  # 'exact' | 'subset' | 'fuzzy' | None
+    score: float = 0.0
+    candidates: List[Any] = field(default_factory=list)
+
+    @property
+    def ambiguous(self) -> bool:
+        return self.value is None and len(self.candidates) > 1
+
+
+class NameIndex:
+    def __init__(self, items: Iterable[Tuple[Any, Any]] = (), fuzzy_threshold: float = 0.88,
+                 max_candidates: int = 50):
+        self.fuzzy_threshold = fuzzy_threshold
+        self.max_candidates = max_candidates
+        self._entries: List[Tuple[Tuple[str, ...], str, Any]] = []
+        self._exact: Dict[str, List[int]] = defaultdict(list)
+        self._tokens: Dict[str, List[int]] = defaultdict(list)
+        self._trigrams: Dict[str, List[int]] = defaultdict(list)
+        for name, value in items:
+            self.add(name, value)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, name: Any) -> bool:
+        """True if `name` has an exact (order/accent-insensitive) entry."""
+        return name_key(name) in self._exact
+
+    def add(self, name: Any, value: Any) -> None:
+        tokens = name_tokens(name)
+        if not tokens:
+            return
+        key = ' '.join(sorted(tokens))
+        if any(self._entries[i][2] == value for i in self._exact.get(key, ())):
+            return
+        pos = len(self._entries)
+        self._entries.append((tokens, key, value))
+        self._exact[key].append(pos)
+        for token in set(tokens):
+            self._tokens[token].append(pos)
+        for trigram in _trigrams(key):
+            self._trigrams[trigram].append(pos)
+
+    def _values(self, positions: Iterable[int]) -> List[Any]:
+        values = []
+        for pos in positions:
+            value = self._entries[pos][2]
+            if value not in values:
+                values.append(value)
+        return values
+
+    def candidates(self, name: Any) -> List[Any]:
+        """Values whose tokens include every token of `name` (e.g. all 'Arias')."""
+        tokens = set(name_tokens(name))
+        if not tokens:
+            return []
+        postings = sorted((self._tokens.get(t, []) for t in tokens), key=len)
+        common = set(postings[0]).intersection(*postings[1:])
+        return self._values(sorted(common))
+
+    def match(self, name: Any, fuzzy: bool = True, subset: bool = True) -> NameMatch:
+        """
+        Best match for `name`. fuzzy=False stops after the exact and subset
+        stages; subset=False as well stops after the exact stage.
+        """
+        tokens = set(name_tokens(name))
+        if not tokens:
+            return NameMatch()
+        key = ' '.join(sorted(tokens))
+
+        exact = self._values(self._exact.get(key, ()))
+        if len(exact) == 1:
+            return NameMatch(exact[0], 'exact', 1.0, exact)
+        if exact:
+            return NameMatch(candidates=exact)
+        if not subset:
+            return NameMatch()
+
+        # Token hits per entry: hits == len(query) → query ⊆ entry;
+        # hits == len(entry) → entry ⊆ query
+        hits = Counter()
+        for token in tokens:
+            hits.update(self._tokens.get(token, ()))
+        subset = [
+            pos for pos, n in hits.items()
+            if min(len(tokens), len(set(self._entries[pos][0]))) >= 2
+            and n in (len(tokens), len(set(self._entries[pos][0])))
+        ]
+        subset = self._values(sorted(subset))
+        if len(subset) == 1:
+            return NameMatch(subset[0], 'subset', 0.95, subset)
+        if subset:
+            return NameMatch(candidates=subset)
+
+        return self._fuzzy(key) if fuzzy else NameMatch()
+
+    def _fuzzy(self, key: str) -> NameMatch:
+        shared = Counter()
+        for trigram in _trigrams(key):
+            shared.update(self._trigrams.get(trigram, ()))
+        scored = []
+        for pos, _n in shared.most_common(self.max_candidates):
+            score = SequenceMatcher(None, key, self._entries[pos][1]).ratio()
+            if score >= self.fuzzy_threshold:
+                scored.append((score, pos))
+        if not scored:
+            return NameMatch()
+        scored.sort(key=lambda s: -s[0])
+        best_score = scored[0][0]
+        close = [pos for score, pos in scored if best_score - score < _FUZZY_MARGIN]
+        values = self._values(close)
+        if len(values) == 1:
+            return NameMatch(values[0], 'fuzzy', round(best_score, 3), values)
+        return NameMatch(score=round(best_score, 3), candidates=values)
+
+    def find(self, name: Any, fuzzy: bool = True, subset: bool = True) -> Optional[Any]:
+        return self.match(name, fuzzy=fuzzy, subset=subset).value
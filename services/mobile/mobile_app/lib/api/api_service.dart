@@ -27,6 +27,27 @@ class ApiService {
     return _handleResponse(response, endpoint);
   }
 
+  // Listados de la API: acepta un array o una página por cursor
+  // ({next, previous, results}) y sigue `next` hasta reunir todas las filas.
+  Future<List<dynamic>> _getList(String endpoint,
+      {String? authToken, Map<String, String>? query}) async {
+    dynamic body = await _get(endpoint, authToken: authToken, query: query);
+    final filas = <dynamic>[];
+    while (true) {
+      if (body == null) return filas;
+      if (body is List) {
+        filas.addAll(body);
+        return filas;
+      }
+      final pagina = body as Map<String, dynamic>;
+      filas.addAll(pagina['results'] as List);
+      final next = pagina['next'] as String?;
+      if (next == null) return filas;
+      final response = await http.get(Uri.parse(next), headers: _headers(authToken: authToken));
+      body = _handleResponse(response, endpoint);
+    }
+  }
+
   Future<dynamic> _post(String endpoint, dynamic data, {String? authToken}) async {
     final response = await http.post(
       Uri.parse('$_baseUrl/$endpoint'),
@@ -85,8 +106,8 @@ class ApiService {
   // ─── HORARIOS ─────────────────────────────────────────────────────────────
 
   Future<List<Horario>> fetchHorarios({String? authToken}) async {
-    final body = await _get('academia/api/v1/horarios/', authToken: authToken);
-    return (body as List).map((e) => Horario.fromJson(e)).toList();
+    final body = await _getList('academia/api/v1/horarios/', authToken: authToken);
+    return body.map((e) => Horario.fromJson(e)).toList();
   }
 
   Future<Horario> fetchHorarioDetail(int id, {String? authToken}) async {
@@ -97,8 +118,8 @@ class ApiService {
   // ─── STUDENTS ─────────────────────────────────────────────────────────────
 
   Future<List<Student>> fetchStudents({String? authToken}) async {
-    final body = await _get('students/api/v1/students/', authToken: authToken);
-    return (body as List).map((e) => Student.fromJson(e)).toList();
+    final body = await _getList('students/api/v1/students/', authToken: authToken);
+    return body.map((e) => Student.fromJson(e)).toList();
   }
 
   Future<Student> fetchStudentDetail(int id, {String? authToken}) async {
@@ -120,8 +141,8 @@ class ApiService {
   // ─── TEACHERS ─────────────────────────────────────────────────────────────
 
   Future<List<Teacher>> fetchTeachers({String? authToken}) async {
-    final body = await _get('teachers/api/v1/teachers/', authToken: authToken);
-    return (body as List).map((e) => Teacher.fromJson(e)).toList();
+    final body = await _getList('teachers/api/v1/teachers/', authToken: authToken);
+    return body.map((e) => Teacher.fromJson(e)).toList();
   }
 
   Future<Teacher> fetchTeacherDetail(int id, {String? authToken}) async {
@@ -161,21 +182,21 @@ class ApiService {
   // ─── CLASES ───────────────────────────────────────────────────────────────
 
   Future<List<Clase>> fetchClases({String? authToken}) async {
-    final body = await _get('classes/api/v1/clases/', authToken: authToken);
-    return (body as List).map((e) => Clase.fromJson(e)).toList();
+    final body = await _getList('classes/api/v1/clases/', authToken: authToken);
+    return body.map((e) => Clase.fromJson(e)).toList();
   }
 
   // ─── TIPOS DE APORTE ──────────────────────────────────────────────────────
 
   Future<List<dynamic>> fetchTiposAporte({String? authToken}) async {
-    return await _get('classes/api/v1/tipos-aportes/', authToken: authToken);
+    return await _getList('classes/api/v1/tipos-aportes/', authToken: authToken);
   }
 
   // ─── GRADES ───────────────────────────────────────────────────────────────
 
   Future<List<dynamic>> fetchStudentGrades(int studentId,
       {String? subject, String? parcial, String? quimestre, String? authToken}) async {
-    return await _get(
+    return await _getList(
       'classes/api/v1/calificaciones/',
       authToken: authToken,
       query: {
@@ -209,7 +230,7 @@ class ApiService {
   // ─── ATTENDANCE ───────────────────────────────────────────────────────────
 
   Future<List<dynamic>> fetchAttendance(int studentId, {String? authToken}) async {
-    return await _get('classes/api/v1/asistencia/',
+    return await _getList('classes/api/v1/asistencia/',
         authToken: authToken, query: {'student': studentId.toString()});
   }
 
@@ -224,7 +245,7 @@ class ApiService {
   // ─── ENROLLMENTS ──────────────────────────────────────────────────────────
 
   Future<List<dynamic>> fetchEnrollments(int studentId, {String? authToken}) async {
-    return await _get('classes/api/v1/enrollments/',
+    return await _getList('classes/api/v1/enrollments/',
         authToken: authToken, query: {'student': studentId.toString()});
   }
 
@@ -263,7 +284,7 @@ class ApiService {
   Future<List<dynamic>> fetchSolicitudesSecretaria({
     String? estado, String? busqueda, String? authToken,
   }) async {
-    return await _get('matriculas/api/lista/',
+    return await _getList('matriculas/api/lista/',
         authToken: authToken,
         query: {
           if (estado != null && estado.isNotEmpty) 'estado': estado,
@@ -286,7 +307,7 @@ class ApiService {
   Future<List<dynamic>> fetchAlertas({
     String? severidad, String? tipo, String? estado, String? authToken,
   }) async {
-    return await _get('agente/api/alertas/', authToken: authToken, query: {
+    return await _getList('agente/api/alertas/', authToken: authToken, query: {
       if (severidad != null && severidad.isNotEmpty) 'severidad': severidad,
       if (tipo != null && tipo.isNotEmpty) 'tipo': tipo,
       if (estado != null && estado.isNotEmpty) 'estado': estado,
@@ -323,7 +344,7 @@ class ApiService {
   Future<List<dynamic>> fetchActividades({
     int? studentId, int? claseId, int? subjectId, String? authToken,
   }) async {
-    return await _get('classes/api/v1/actividades/', authToken: authToken, query: {
+    return await _getList('classes/api/v1/actividades/', authToken: authToken, query: {
       if (studentId != null) 'student': studentId.toString(),
       if (claseId != null) 'clase': claseId.toString(),
       if (subjectId != null) 'subject': subjectId.toString(),
@@ -346,7 +367,7 @@ class ApiService {
   Future<List<dynamic>> fetchDeberes({
     int? claseId, String? estado, int? teacherId, String? authToken,
   }) async {
-    return await _get('classes/api/v1/deberes/', authToken: authToken, query: {
+    return await _getList('classes/api/v1/deberes/', authToken: authToken, query: {
       if (claseId != null) 'clase': claseId.toString(),
       if (estado != null && estado.isNotEmpty) 'estado': estado,
       if (teacherId != null) 'teacher': teacherId.toString(),
@@ -365,13 +386,13 @@ class ApiService {
       _delete('classes/api/v1/deberes/$id/', authToken: authToken);
 
   Future<List<dynamic>> fetchEntregasDeber(int deberId, {String? authToken}) async {
-    return await _get('classes/api/v1/deberes/$deberId/entregas/', authToken: authToken);
+    return await _getList('classes/api/v1/deberes/$deberId/entregas/', authToken: authToken);
   }
 
   // ─── ENTREGAS DE DEBERES ──────────────────────────────────────────────────
 
   Future<List<dynamic>> fetchMisEntregas({int? estudianteId, String? authToken}) async {
-    return await _get('classes/api/v1/entregas/', authToken: authToken, query: {
+    return await _getList('classes/api/v1/entregas/', authToken: authToken, query: {
       if (estudianteId != null) 'estudiante': estudianteId.toString(),
     });
   }
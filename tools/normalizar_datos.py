@@ -19,6 +19,10 @@ import numpy as np
 import re
 import glob
 import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'services', 'api')))
+from utils import limpieza  # noqa: E402  (limpieza vectorizada compartida)
 
 BASE = '/home/jav/SGA1/base_de_datos_json'
 OUT  = os.path.join(BASE, 'normalizado')
@@ -33,8 +37,9 @@ def clean_str(s):
     return str(s).strip()
 
 def clean_name(s):
+    # Mismo criterio que limpieza.texto: 'TAPIA  GARCÍA' y 'TAPIA GARCÍA' son el mismo nombre
     if pd.isna(s): return None
-    return str(s).strip().upper()
+    return re.sub(r'\s+', ' ', str(s).strip()).upper()
 
 INSTRUMENTO_ALIAS = {
     'saxofon':          'Saxofón',
@@ -159,118 +164,97 @@ def get_docente(nombre):
 mat_file = glob.glob(f'{BASE}/*Matriculados*.csv')[0]
 raw = pd.read_csv(mat_file, encoding='utf-8', dtype=str)
 
-estudiantes_rows    = []
-representantes_rows = []
-est_rep_rows        = []
-telefonos_rows      = []
-info_escolar_rows   = []
-info_medica_rows    = []
-matriculas_rows     = []
-
-telefono_id = 1
-
-for _, r in raw.iterrows():
-    cedula_est = clean_str(r.get('Número de Cédula del Estudiante'))
-    # Skip embedded header rows and blank rows
-    if not cedula_est or cedula_est in ('nan', 'Número de Cédula del Estudiante'):
-        continue
-    # Skip rows where cedula is clearly not numeric (header bleed)
-    if not cedula_est.replace(' ', '').isdigit():
-        continue
-
-    # ── 1FN fix: M/F → genero ──
-    if str(r.get('M', '')).strip() == '1':
-        genero = 'M'
-    elif str(r.get('F', '')).strip() == '1':
-        genero = 'F'
-    else:
-        genero = None
-
-    # ── TABLA: estudiante ──
-    estudiantes_rows.append({
-        'cedula':           cedula_est,
-        'apellidos':        clean_name(r.get('Apellidos del Estudiante')),
-        'nombres':          clean_name(r.get('Nombres del Estudiante ')),
-        'genero':           genero,
-        'fecha_nacimiento': clean_str(r.get('Fecha de Nacimiento del estudiante')),
-        # Edad eliminada — viola 3FN (derivable)
-        'correo':           clean_str(r.get('Dirección de correo electrónico')),
-    })
-
-    # ── TABLA: representante ──
-    cedula_rep = clean_str(r.get('Número de cédula del Representante'))
-    # Validar que cedula_rep sea numérica (algunos campos tienen teléfonos o texto)
-    if cedula_rep and cedula_rep != 'nan' and cedula_rep.replace(' ', '').isdigit() and len(cedula_rep.strip()) >= 8:
-        representantes_rows.append({
-            'cedula':   cedula_rep,
-            'apellidos': clean_name(r.get('Apellidos del Representante del Estudiante')),
-            'nombres':   clean_name(r.get('Nombres del Representante del Estudiante')),
-        })
-
-        # ── TABLA: estudiante_representante ──
-        est_rep_rows.append({
-            'cedula_estudiante':    cedula_est,
-            'cedula_representante': cedula_rep,
-            'direccion':            clean_str(r.get('Dirección')),
-        })
-
-        # ── TABLA: telefono (1FN: des-agrupación de grupos repetitivos) ──
-        tel_conv = clean_str(r.get('Número telefónico convencional '))
-        if tel_conv:
-            telefonos_rows.append({
-                'id': telefono_id,
-                'cedula_representante': cedula_rep,
-                'numero': tel_conv,
-                'tipo': 'CONVENCIONAL',
-                'pertenece_a': None,
-            })
-            telefono_id += 1
-
-        for i, (num_col, prop_col) in enumerate([
-            ('Número telefónico celular 1', 'Número telefónico celular 1 pertenece a '),
-            ('Número Telefónico celular 2', 'Número Telefónico celular 2 a quien pertenece'),
-            ('Número Telefónico celular 3', 'Número Telefónico Celular 3 a quien pertenece'),
-        ], 1):
-            num = clean_str(r.get(num_col))
-            prop = clean_str(r.get(prop_col))
-            if num and num != 'nan':
-                telefonos_rows.append({
-                    'id': telefono_id,
-                    'cedula_representante': cedula_rep,
-                    'numero': num,
-                    'tipo': f'CELULAR_{i}',
-                    'pertenece_a': prop,
-                })
-                telefono_id += 1
-
-    # ── TABLA: info_escolar (2FN: depende de estudiante, no de matrícula) ──
-    info_escolar_rows.append({
-        'cedula_estudiante':   cedula_est,
-        'institucion_regular': clean_str(r.get('Institución que estudia su formación regular')),
-        'anio_estudio_regular': clean_str(r.get('Año de Estudio en su formación Regular')),
-    })
 
-    # ── TABLA: info_medica (2FN: depende de estudiante) ──
-    alergias = clean_str(r.get('¿Existe alguna alergia/enfermedad/ condición del estudiante que la institución debe tener en cuenta durante clases?\r\n'))
-    necesidad = clean_str(r.get('Indique si su representado tiene alguna Necesidad Educativa  no asociada a una discapacidad '))
-    detalle   = clean_str(r.get('Si respondió SI Indique cual es la necesidad educativa'))
-    info_medica_rows.append({
-        'cedula_estudiante':   cedula_est,
-        'alergias_condiciones': alergias,
-        'tiene_necesidad_educativa': necesidad,
-        'detalle_necesidad': detalle,
+def col(df, nombre, mayusculas=False):
+    """Columna limpia (texto sin espacios extra; None si está vacía)."""
+    serie = limpieza.texto(df[nombre] if nombre in df.columns else pd.Series(None, index=df.index),
+                           mayusculas=mayusculas)
+    return serie.where(serie != '', None)
+
+
+# Filas-header embebidas, filas vacías y cédulas no numéricas (header bleed)
+cedulas_est = limpieza.texto(raw['Número de Cédula del Estudiante'])
+raw = raw[cedulas_est.str.replace(' ', '', regex=False).str.isdigit()]
+cedulas_est = cedulas_est[raw.index]
+invalidas = limpieza.invalidos(cedulas_est, limpieza.cedula_valida(cedulas_est))
+if invalidas.any():
+    print(f'  [aviso] {int(invalidas.sum())} cédulas de estudiante no superan el dígito verificador: '
+          f'{", ".join(cedulas_est[invalidas].head(10))}')
+
+# ── TABLA: estudiante (1FN fix: M/F → genero; Edad eliminada — viola 3FN) ──
+estudiantes = pd.DataFrame({
+    'cedula':           cedulas_est,
+    'apellidos':        col(raw, 'Apellidos del Estudiante', mayusculas=True),
+    'nombres':          col(raw, 'Nombres del Estudiante ', mayusculas=True),
+    'genero':           np.select([col(raw, 'M') == '1', col(raw, 'F') == '1'], ['M', 'F'], None),
+    'fecha_nacimiento': col(raw, 'Fecha de Nacimiento del estudiante'),
+    'correo':           col(raw, 'Dirección de correo electrónico'),
+})
+estudiantes_rows = estudiantes.to_dict('records')
+
+# ── TABLA: representante ──
+# Validar que cedula_rep sea numérica (algunos campos tienen teléfonos o texto)
+cedulas_rep = limpieza.texto(raw['Número de cédula del Representante'])
+con_rep = cedulas_rep.str.replace(' ', '', regex=False).str.isdigit() & (cedulas_rep.str.len() >= 8)
+rep = raw[con_rep]
+representantes_rows = pd.DataFrame({
+    'cedula':    cedulas_rep[con_rep],
+    'apellidos': col(rep, 'Apellidos del Representante del Estudiante', mayusculas=True),
+    'nombres':   col(rep, 'Nombres del Representante del Estudiante', mayusculas=True),
+}).to_dict('records')
+
+# ── TABLA: estudiante_representante ──
+est_rep_rows = pd.DataFrame({
+    'cedula_estudiante':    cedulas_est[con_rep],
+    'cedula_representante': cedulas_rep[con_rep],
+    'direccion':            col(rep, 'Dirección'),
+}).to_dict('records')
+
+# ── TABLA: telefono (1FN: des-agrupación de grupos repetitivos) ──
+# Un bloque por columna de teléfono; se intercalan por fila para conservar el orden de los ids
+telefonos = []
+for orden, (num_col, prop_col, tipo) in enumerate([
+    ('Número telefónico convencional ', None, 'CONVENCIONAL'),
+    ('Número telefónico celular 1', 'Número telefónico celular 1 pertenece a ', 'CELULAR_1'),
+    ('Número Telefónico celular 2', 'Número Telefónico celular 2 a quien pertenece', 'CELULAR_2'),
+    ('Número Telefónico celular 3', 'Número Telefónico Celular 3 a quien pertenece', 'CELULAR_3'),
+]):
+    bloque = pd.DataFrame({
+        'fila': np.arange(len(rep)),
+        'orden': orden,
+        'cedula_representante': cedulas_rep[con_rep],
+        'numero': col(rep, num_col),
+        'tipo': tipo,
+        'pertenece_a': col(rep, prop_col) if prop_col else None,
     })
-
-    # ── BCNF fix: PARALELO → (letra, jornada) ──
-    paralelo_raw = r.get('PARALELO')
+    telefonos.append(bloque[bloque['numero'].notna()])
+telefonos = pd.concat(telefonos).sort_values(['fila', 'orden'], kind='stable')
+telefonos.insert(0, 'id', np.arange(1, len(telefonos) + 1))
+telefonos_rows = telefonos.drop(columns=['fila', 'orden']).to_dict('records')
+
+# ── TABLA: info_escolar (2FN: depende de estudiante, no de matrícula) ──
+info_escolar_rows = pd.DataFrame({
+    'cedula_estudiante':    cedulas_est,
+    'institucion_regular':  col(raw, 'Institución que estudia su formación regular'),
+    'anio_estudio_regular': col(raw, 'Año de Estudio en su formación Regular'),
+}).to_dict('records')
+
+# ── TABLA: info_medica (2FN: depende de estudiante) ──
+info_medica_rows = pd.DataFrame({
+    'cedula_estudiante':         cedulas_est,
+    'alergias_condiciones':      col(raw, '¿Existe alguna alergia/enfermedad/ condición del estudiante que la institución debe tener en cuenta durante clases?\r\n'),
+    'tiene_necesidad_educativa': col(raw, 'Indique si su representado tiene alguna Necesidad Educativa  no asociada a una discapacidad '),
+    'detalle_necesidad':         col(raw, 'Si respondió SI Indique cual es la necesidad educativa'),
+}).to_dict('records')
+
+# ── TABLA: matricula (BCNF fix: PARALELO → (letra, jornada)) ──
+# Los ids de las tablas lookup se asignan por orden de aparición
+matriculas_rows = []
+for cedula_est, paralelo_raw, anio_raw in zip(cedulas_est, raw['PARALELO'], col(raw, 'CURSO')):
     letra, jornada_nombre = parse_paralelo(paralelo_raw)
     jornada_id  = get_jornada(jornada_nombre) if jornada_nombre else None
     paralelo_id = get_paralelo(letra, jornada_id) if letra else None
-
-    anio_raw = clean_str(r.get('CURSO'))
-    curso_id = get_curso(anio_raw) if anio_raw else None
-
-    # ── TABLA: matricula ──
+    curso_id    = get_curso(anio_raw) if anio_raw else None
     matriculas_rows.append({
         'cedula_estudiante': cedula_est,
         'curso_id':          curso_id,
@@ -283,21 +267,17 @@ for _, r in raw.iterrows():
 # ════════════════════════════════════════════════════════════════════════════
 
 doc_raw = pd.read_csv(f'{BASE}/Docentes_limpio.csv', encoding='utf-8', dtype=str)
-docentes_rows = []
-for _, r in doc_raw.iterrows():
-    nombre = clean_name(r.get('apellidos_y_nombres'))
-    if not nombre: continue
-    did, nombre_norm = get_docente(nombre)
-    docentes_rows.append({
-        'id':                    did,
-        'nombre_completo':       nombre_norm,
-        'cedula':                clean_str(r.get('cedula')),
-        'fecha_nacimiento':      clean_str(r.get('fecha_de_nacimiento')),
-        'puesto_cargo':          clean_str(r.get('puesto_cargo')),
-        'correo_institucional':  clean_str(r.get('correo_electronico_institucional')),
-        'correo_personal':       clean_str(r.get('correo_electronico_personal')),
-        'celular':               clean_str(r.get('celular')),
-    })
+doc = pd.DataFrame({
+    'nombre_completo':       col(doc_raw, 'apellidos_y_nombres', mayusculas=True),
+    'cedula':                col(doc_raw, 'cedula'),
+    'fecha_nacimiento':      col(doc_raw, 'fecha_de_nacimiento'),
+    'puesto_cargo':          col(doc_raw, 'puesto_cargo'),
+    'correo_institucional':  col(doc_raw, 'correo_electronico_institucional'),
+    'correo_personal':       col(doc_raw, 'correo_electronico_personal'),
+    'celular':               col(doc_raw, 'celular'),
+}).dropna(subset=['nombre_completo'])
+doc.insert(0, 'id', [get_docente(nombre)[0] for nombre in doc['nombre_completo']])
+docentes_rows = doc.to_dict('records')
 
 # ════════════════════════════════════════════════════════════════════════════
 # 3. DISTRIBUCION (instrumento y agrupaciones)